@@ -15,6 +15,8 @@ from pathlib import Path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from src.core.agent_system import EnhancedDynamicAgentSystem
+from src.core.session_server import SessionServer
+from src.core.batch_runner import BatchRunner, print_batch_summary
 from src.examples.demo import demo_enhanced_system, demo_iteration_process
 from src.examples.interactive_demo import interactive_demo
 
@@ -53,7 +55,39 @@ def print_banner():
     print(banner)
 
 
-async def run_system(api_key: str, mode: str = "interactive"):
+def load_system_config(file_config: dict) -> dict:
+    """从配置文件中提取系统运行参数"""
+    system = file_config.get('system') or {}
+    performance = file_config.get('performance') or {}
+    message_bus = file_config.get('message_bus') or {}
+    openai_config = (file_config.get('api') or {}).get('openai') or {}
+    return {
+        "max_concurrent_agents": system.get('max_concurrent_agents', 8),
+        "per_agent_concurrency": system.get('per_agent_concurrency', 1),
+        "action_completion": system.get('action_completion'),
+        "context_token_budget": system.get('context_token_budget', 4000),
+        "fused_think_plan": system.get('fused_think_plan', False),
+        "enable_metrics": performance.get('enable_metrics', False),
+        "metrics_host": performance.get('metrics_host', '127.0.0.1'),
+        "metrics_port": performance.get('metrics_port', 9090),
+        "enable_tracing": performance.get('enable_tracing', False),
+        "trace_dir": performance.get('trace_dir', 'traces'),
+        "llm_hedging": performance.get('llm_hedging'),
+        "llm_pool": openai_config.get('pool'),
+        "plugin_cache": performance.get('plugin_cache'),
+        "agents": file_config.get('agents'),
+        "gazetteer": (file_config.get('query_understanding') or {}).get('gazetteer'),
+        "capability_routing": file_config.get('capability_routing'),
+        "sessions": file_config.get('sessions'),
+        "conversation_memory": file_config.get('conversation_memory'),
+        "server": file_config.get('server'),
+        "batch": file_config.get('batch'),
+        "message_log": message_bus.get('message_log')
+    }
+
+
+async def run_system(api_key: str, mode: str = "interactive", config: dict = None,
+                     batch_input: str = None, batch_output: str = None, concurrency: int = None):
     """运行系统"""
     if not api_key or api_key == "your_openai_api_key_here":
         print("❌ 请设置有效的 OpenAI API 密钥")
@@ -63,8 +97,12 @@ async def run_system(api_key: str, mode: str = "interactive"):
         print("  3. 设置环境变量: MAAS_API_KEY=YOUR_KEY")
         return
 
+    if mode == "batch" and not (batch_input and os.path.isfile(batch_input)):
+        print(f"❌ 批量模式需要指定存在的 --input 查询文件: {batch_input}")
+        return
+
     print("🔧 初始化系统...")
-    system = EnhancedDynamicAgentSystem(api_key)
+    system = EnhancedDynamicAgentSystem(api_key, config=config)
     await system.initialize_system()
 
     try:
@@ -76,7 +114,23 @@ async def run_system(api_key: str, mode: str = "interactive"):
             await demo_iteration_process()
         elif mode == "interactive":
             print("💬 运行交互模式...")
-            await interactive_demo()
+            await interactive_demo(system)
+        elif mode == "batch":
+            print("📦 运行批量查询模式...")
+            batch_config = (config or {}).get('batch') or {}
+            runner = BatchRunner(system, batch_input, batch_output,
+                                 concurrency=concurrency or batch_config.get('concurrency', 4),
+                                 pricing=batch_config.get('pricing'),
+                                 progress_every=batch_config.get('progress_every', 10))
+            print_batch_summary(await runner.run())
+        elif mode == "serve":
+            print("🌐 运行会话服务模式...")
+            server_config = (config or {}).get('server') or {}
+            server = SessionServer(system, server_config.get('host', '127.0.0.1'), server_config.get('port', 8765))
+            try:
+                await server.serve_forever()
+            finally:
+                await server.close()
         else:
             print(f"❌ 未知模式: {mode}")
 
@@ -92,9 +146,12 @@ def main():
     """主函数"""
     parser = argparse.ArgumentParser(description="多 Agent 智能系统")
     parser.add_argument("--api-key", help="OpenAI API 密钥")
-    parser.add_argument("--mode", choices=["demo", "interactive", "iteration"],
+    parser.add_argument("--mode", choices=["demo", "interactive", "iteration", "serve", "batch"],
                         default="demo", help="运行模式")
     parser.add_argument("--config", default="config.yaml", help="配置文件路径")
+    parser.add_argument("--input", help="批量模式的查询文件（JSONL）")
+    parser.add_argument("--output", help="批量模式的结果文件（JSONL，默认为 <input>.results.jsonl，已有结果的行会跳过）")
+    parser.add_argument("--concurrency", type=int, help="批量模式同时执行的查询数")
 
     args = parser.parse_args()
 
@@ -102,6 +159,15 @@ def main():
     setup_environment()
     print_banner()
 
+    # 读取配置文件
+    file_config = {}
+    try:
+        import yaml
+        with open(args.config, 'r', encoding='utf-8') as f:
+            file_config = yaml.safe_load(f) or {}
+    except Exception:
+        pass
+
     # 获取 API 密钥 (按优先级)
     api_key = None
     if args.api_key:
@@ -111,17 +177,15 @@ def main():
     else:
         # 尝试从配置文件读取
         try:
-            import yaml
             print(args.config)
-            with open(args.config, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
-                api_key = config.get('api').get('openai').get('key')
-                print(api_key)
+            api_key = file_config.get('api').get('openai').get('key')
+            print(api_key)
         except:
             pass
 
     # 运行系统
-    asyncio.run(run_system(api_key, args.mode))
+    asyncio.run(run_system(api_key, args.mode, load_system_config(file_config),
+                           batch_input=args.input, batch_output=args.output, concurrency=args.concurrency))
 
 
 if __name__ == "__main__":
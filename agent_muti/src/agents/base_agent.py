@@ -3,11 +3,16 @@ import asyncio
 import json
 import time
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional
-from openai import AsyncOpenAI
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, List, Any, Optional
 from openai import APITimeoutError, APIError, RateLimitError
 
 from ..models.agent_models import AgentType, AgentResponse, AgentCapability
+from ..utils.tracing import annotate, span, traced
+from ..utils.llm_hedging import HedgingPolicy
+from ..utils.llm_client_pool import get_llm_client_pool
+from ..utils.llm_priority import LLMPriority, llm_priority
+from ..utils.tokens import record_token_usage
 
 from dotenv import load_dotenv, find_dotenv
 load_dotenv(find_dotenv())
@@ -21,12 +26,29 @@ class BaseAgent(ABC):
         self.description = description
         self.capabilities: List[AgentCapability] = []
         self.model = "gpt-3.5-turbo"
-        self.llm_client = AsyncOpenAI()
+        # 进程内共享的客户端（连接池、在途请求上限与限流状态由所有 Agent 共用）
+        self.llm_client = get_llm_client_pool().client()
         self._initialized = False
         self.timeout = 30  # 默认超时时间
         self.max_retries = 3  # 最大重试次数
         self.retry_delay = 1  # 重试延迟（秒）
-        self.step = None  # 记录步骤
+        # 记录步骤（按任务上下文隔离，并发会话共用同一个 Agent 时互不覆盖）
+        self._step: ContextVar[Optional[str]] = ContextVar(f"agent_step:{name}", default=None)
+        # 对冲与自适应超时策略（为 None 时直接请求，不设超时）
+        self.hedging: Optional[HedgingPolicy] = None
+        # LLM 请求的默认优先级（客户端池按优先级放行在途请求）
+        self.llm_priority = LLMPriority.NORMAL
+        # 累计 token 用量（成功的调用）
+        self.token_usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    @property
+    def step(self) -> Optional[str]:
+        """当前任务中执行的 step"""
+        return self._step.get()
+
+    @step.setter
+    def step(self, step: Optional[str]):
+        self._step.set(step)
 
     def set_step(self, step: str):
         """设置当前执行的 step"""
@@ -45,12 +67,17 @@ class BaseAgent(ABC):
         """获取 Agent 能力列表"""
         return self.capabilities
 
+    @traced("llm", category="llm")
     async def _call_llm(self, messages: List[Dict], **kwargs) -> str:
         """调用 LLM 的通用方法，包含重试机制"""
+        annotate(agent=self.name, step=self.step, model=self.model)
 
         temperature = kwargs.get('temperature', 0.1)
         max_tokens = kwargs.get('max_tokens', 1000)
         timeout = kwargs.get('timeout', self.timeout)
+        priority = LLMPriority(kwargs.get('priority', self.llm_priority))
+        # 结构化输出等额外请求参数原样透传
+        extra_params = {key: kwargs[key] for key in ('response_format',) if key in kwargs}
 
         last_exception = None
 
@@ -60,49 +87,141 @@ class BaseAgent(ABC):
 
                 print(f" 🔄 {self.name}-{self.agent_type}{f' - {self.step}' if self.step else ''}  请求消息:\n {messages}")
 
-                response = await self.llm_client.chat.completions.create(
-                            model=self.model,
-                            messages=messages,
-                            temperature=temperature,
-                            max_tokens=max_tokens
-                        )
+                def request():
+                    return self.llm_client.chat.completions.create(
+                                model=self.model,
+                                messages=messages,
+                                temperature=temperature,
+                                max_tokens=max_tokens,
+                                **extra_params
+                            )
+
+                with span("llm.attempt", "llm", attempt=attempt + 1) as attempt_span, llm_priority(priority):
+                    if self.hedging is not None:
+                        latency_key = self.step or self.name
+                        response = await self.hedging.run(
+                            latency_key, request, self.hedging.timeout_for(latency_key, timeout))
+                    else:
+                        response = await request()
+                    usage = getattr(response, "usage", None)
+                    if usage is not None:
+                        self._add_token_usage(usage)
+                        if attempt_span is not None:
+                            attempt_span.set_attribute("prompt_tokens", usage.prompt_tokens)
+                            attempt_span.set_attribute("completion_tokens", usage.completion_tokens)
+                    self._add_token_usage(calls=1)
                 content = response.choices[0].message.content
+                annotate(attempts=attempt + 1)
                 print(f" ☑️ {self.name}-{self.agent_type}{f' - {self.step}' if self.step else ''}  返回消息: \n {content}")
                 return content
 
-            except asyncio.TimeoutError:
-                last_exception = f"LLM 请求超时 (尝试 {attempt + 1}/{self.max_retries})"
-                print(f"⏰ {last_exception}")
+            except Exception as error:
+                last_exception = await self._backoff_after_failure(error, attempt)
 
-            except APITimeoutError:
-                last_exception = f"API 超时 (尝试 {attempt + 1}/{self.max_retries})"
-                print(f"⏰ {last_exception}")
+        # 所有重试都失败
+        error_msg = f"LLM 调用失败: {last_exception}"
+        annotate(attempts=self.max_retries)
+        print(f"💥 {error_msg}")
+        raise Exception(error_msg)
 
-            except RateLimitError:
-                last_exception = f"速率限制 (尝试 {attempt + 1}/{self.max_retries})"
-                print(f"🚫 {last_exception}")
-                # 速率限制时增加等待时间
+    async def _backoff_after_failure(self, error: Exception, attempt: int) -> str:
+        """打印失败原因并在下一次尝试前等待，返回失败描述"""
+        if isinstance(error, asyncio.TimeoutError):
+            message = f"LLM 请求超时 (尝试 {attempt + 1}/{self.max_retries})"
+            print(f"⏰ {message}")
+        elif isinstance(error, APITimeoutError):
+            message = f"API 超时 (尝试 {attempt + 1}/{self.max_retries})"
+            print(f"⏰ {message}")
+        elif isinstance(error, RateLimitError):
+            message = f"速率限制 (尝试 {attempt + 1}/{self.max_retries})"
+            print(f"🚫 {message}")
+            # 速率限制时增加等待时间
+            with span("llm.backoff", "llm", reason="rate_limit"):
                 await asyncio.sleep(self.retry_delay * (attempt + 1) * 2)
-                continue
-
-            except APIError as e:
-                last_exception = f"API 错误: {e} (尝试 {attempt + 1}/{self.max_retries})"
-                print(f"❌ {last_exception}")
+            return message
+        elif isinstance(error, APIError):
+            message = f"API 错误: {error} (尝试 {attempt + 1}/{self.max_retries})"
+            print(f"❌ {message}")
+        else:
+            message = f"未知错误: {error} (尝试 {attempt + 1}/{self.max_retries})"
+            print(f"❌ {message}")
+
+        # 如果不是最后一次尝试，等待后重试
+        if attempt < self.max_retries - 1:
+            wait_time = self.retry_delay * (attempt + 1)
+            print(f"⏳ 等待 {wait_time} 秒后重试...")
+            with span("llm.backoff", "llm", reason="retry"):
+                await asyncio.sleep(wait_time)
+        return message
+
+    def _add_token_usage(self, usage=None, calls: int = 0):
+        """累计本 Agent 的用量，并计入当前请求（见 track_token_usage）"""
+        prompt_tokens = (usage.prompt_tokens or 0) if usage is not None else 0
+        completion_tokens = (usage.completion_tokens or 0) if usage is not None else 0
+        self.token_usage["calls"] += calls
+        self.token_usage["prompt_tokens"] += prompt_tokens
+        self.token_usage["completion_tokens"] += completion_tokens
+        record_token_usage(self.model, prompt_tokens, completion_tokens, calls)
+
+    async def _stream_llm(self, messages: List[Dict], **kwargs) -> AsyncIterator[str]:
+        """流式调用 LLM，逐段产出内容
+
+        收到第一个片段之前的失败按 _call_llm 的方式重试；已经输出部分内容后的失败直接抛出。
+        流式请求不做对冲，timeout 只约束首个响应到达之前的时间。
+        """
+        temperature = kwargs.get('temperature', 0.1)
+        max_tokens = kwargs.get('max_tokens', 1000)
+        timeout = kwargs.get('timeout', self.timeout)
+        priority = LLMPriority(kwargs.get('priority', self.llm_priority))
+        extra_params = {key: kwargs[key] for key in ('response_format',) if key in kwargs}
 
-            except Exception as e:
-                last_exception = f"未知错误: {e} (尝试 {attempt + 1}/{self.max_retries})"
-                print(f"❌ {last_exception}")
+        last_exception = None
 
-            # 如果不是最后一次尝试，等待后重试
-            if attempt < self.max_retries - 1:
-                wait_time = self.retry_delay * (attempt + 1)
-                print(f"⏳ 等待 {wait_time} 秒后重试...")
-                await asyncio.sleep(wait_time)
+        with span("llm", "llm", agent=self.name, step=self.step, model=self.model, stream=True) as llm_span:
+            for attempt in range(self.max_retries):
+                received = False
+                try:
+                    print(f" 🔄 [{self.name}] LLM 流式调用尝试 {attempt + 1}/{self.max_retries}")
+                    print(f" 🔄 {self.name}-{self.agent_type}{f' - {self.step}' if self.step else ''}  请求消息:\n {messages}")
 
-        # 所有重试都失败
-        error_msg = f"LLM 调用失败: {last_exception}"
-        print(f"💥 {error_msg}")
-        raise Exception(error_msg)
+                    with span("llm.attempt", "llm", attempt=attempt + 1) as attempt_span, llm_priority(priority):
+                        started = time.perf_counter()
+                        stream = await asyncio.wait_for(self.llm_client.chat.completions.create(
+                            model=self.model,
+                            messages=messages,
+                            temperature=temperature,
+                            max_tokens=max_tokens,
+                            stream=True,
+                            stream_options={"include_usage": True},
+                            **extra_params
+                        ), timeout)
+                        async for chunk in stream:
+                            usage = getattr(chunk, "usage", None)
+                            if usage is not None:
+                                self._add_token_usage(usage)
+                            delta = chunk.choices[0].delta.content if chunk.choices else None
+                            if not delta:
+                                continue
+                            if not received:
+                                received = True
+                                if attempt_span is not None:
+                                    attempt_span.set_attribute("time_to_first_token",
+                                                               round(time.perf_counter() - started, 3))
+                            yield delta
+                    self._add_token_usage(calls=1)
+                    if llm_span is not None:
+                        llm_span.set_attribute("attempts", attempt + 1)
+                    print(f" ☑️ {self.name}-{self.agent_type}{f' - {self.step}' if self.step else ''}  流式输出完成")
+                    return
+
+                except Exception as error:
+                    if received:
+                        raise
+                    last_exception = await self._backoff_after_failure(error, attempt)
+
+            error_msg = f"LLM 调用失败: {last_exception}"
+            print(f"💥 {error_msg}")
+            raise Exception(error_msg)
 
     def get_agent_info(self) -> Dict[str, Any]:
         """获取 Agent 信息"""
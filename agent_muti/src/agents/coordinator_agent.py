@@ -1,14 +1,22 @@
 # multi_agent_system/agents/coordinator_agent.py
 import asyncio
 import json
-from typing import Dict, List, Any, Optional, Callable
+import os
+import time
+from urllib.parse import quote
+from typing import AsyncIterator, Dict, List, Any, Optional, Callable, Union
 
 from lazy_object_proxy.utils import await_
 
 from .plugin_agent import PluginAgent
-from ..models.agent_models import AgentType, AgentResponse
+from ..models.agent_models import AgentType, AgentResponse, StreamingResponse
 from ..core.iteration_controller import IterationController
-from ..prompt.constants import SUMMARY_PROMPT, summary_prompt
+from ..core.session_manager import ConversationSession
+from ..core.conversation_memory import ConversationMemory, format_turns
+from ..prompt.constants import SUMMARY_PROMPT, summary_prompt, MEMORY_SUMMARY_PROMPT, memory_summary_prompt
+from ..utils.tracing import span
+from ..utils.llm_priority import LLMPriority, llm_request_scope
+from ..utils.query_features import get_query_analyzer
 
 
 class EnhancedCoordinatorAgent(PluginAgent):
@@ -18,8 +26,16 @@ class EnhancedCoordinatorAgent(PluginAgent):
         super().__init__(AgentType.COORDINATOR, name, description)
         self.agent_registry: Dict[str, PluginAgent] = {}
         self.planning_strategies: Dict[str, Callable] = {}
+        # 未指定会话的请求使用默认会话；其迭代控制器同时是新会话控制器的配置模板
         self.iteration_controller = IterationController(max_iterations=5)
-        self.conversation_memory: List[Dict] = []
+        # 对话记忆配置（内存轮数、落盘目录、摘要频率等），见 configure_memory
+        self.memory_config: Dict[str, Any] = {}
+        # 落盘文件名中的运行标识：每次运行写新文件，不与之前运行的记录混在一起
+        self.memory_run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.default_session = ConversationSession("default", self.iteration_controller, self._create_memory("default"))
+        self.conversation_memory: ConversationMemory = self.default_session.conversation_memory
+        # 协调器的迭代阶段与总结位于关键路径上，优先于专业 Agent 的调用
+        self.llm_priority = LLMPriority.CRITICAL
 
     def register_agent(self, agent: PluginAgent):
         """注册 Agent"""
@@ -36,19 +52,75 @@ class EnhancedCoordinatorAgent(PluginAgent):
         """注册规划策略"""
         self.planning_strategies[name] = strategy_func
 
-    async def process_request(self, query: str, context: Dict[str, Any] = None) -> AgentResponse:
-        """处理请求 - 支持多轮迭代"""
+    def create_session(self, session_id: str) -> ConversationSession:
+        """创建会话：独立的对话记忆与迭代状态，共用 Agent 注册表和迭代配置"""
+        return ConversationSession(session_id, self.iteration_controller.spawn(), self._create_memory(session_id))
+
+    def configure_memory(self, max_turns: int = 20, summary_every: int = 10, summary_chars: int = 1200,
+                         spill_dir: str = None, llm_summary: bool = True):
+        """设置对话记忆参数（默认会话立即重建，其他会话在创建时生效）"""
+        self.memory_config = {"max_turns": max_turns, "summary_every": summary_every,
+                              "summary_chars": summary_chars, "spill_dir": spill_dir, "llm_summary": llm_summary}
+        self.default_session.conversation_memory.close()
+        self.default_session.conversation_memory = self._create_memory("default")
+        self.conversation_memory = self.default_session.conversation_memory
+
+    def _create_memory(self, session_id: str) -> ConversationMemory:
+        config = dict(self.memory_config)
+        spill_dir = config.pop("spill_dir", None)
+        llm_summary = config.pop("llm_summary", True)
+        return ConversationMemory(
+            spill_path=os.path.join(spill_dir, f"{quote(session_id, safe='')}.{self.memory_run_id}.jsonl")
+            if spill_dir else None,
+            summarizer=self._summarize_conversation if llm_summary else None,
+            **config
+        )
+
+    async def _summarize_conversation(self, summary: str, turns: List[Dict]) -> str:
+        """把移出内存的对话并入滚动摘要（后台优先级，不阻塞请求）"""
+        max_chars = self.memory_config.get("summary_chars", 1200)
+        messages = [
+            {"role": "system", "content": MEMORY_SUMMARY_PROMPT},
+            {"role": "user", "content": memory_summary_prompt(summary, format_turns(turns), max_chars)}
+        ]
+        self.set_step("memory")
+        with span("memory_summary", "phase", turns=len(turns)):
+            return await self._call_llm(messages, priority=LLMPriority.BACKGROUND, max_tokens=max_chars)
+
+    async def process_request(self, query: str, context: Dict[str, Any] = None,
+                              session: ConversationSession = None) -> AgentResponse:
+        """处理请求 - 支持多轮迭代（总结使用普通调用，保留对冲与自适应超时）"""
+        source = self._process_stream(query, context, session or self.default_session, stream=False)
+        return await StreamingResponse(source).collect()
+
+    def process_request_stream(self, query: str, context: Dict[str, Any] = None,
+                               session: ConversationSession = None) -> StreamingResponse:
+        """处理请求并流式输出最终回答（迭代阶段完成后逐段产出总结内容）"""
+        return StreamingResponse(self._process_stream(query, context, session or self.default_session))
+
+    async def _process_stream(self, query: str, context: Dict[str, Any], session: ConversationSession,
+                              stream: bool = True) -> AsyncIterator[Union[str, AgentResponse]]:
+        # 同一会话的请求依次处理，不同会话并发
+        async with session.lock:
+            async for item in self._process_session_stream(query, context, session, stream):
+                yield item
+
+    async def _process_session_stream(self, query: str, context: Dict[str, Any], session: ConversationSession,
+                                      stream: bool = True) -> AsyncIterator[Union[str, AgentResponse]]:
+        started = time.perf_counter()
+        conversation_memory = session.conversation_memory
         # 更新对话记忆
-        self.conversation_memory.append({
+        conversation_memory.append({
             "role": "user",
             "content": query,
             "timestamp": asyncio.get_event_loop().time()
         })
 
-        # 构建执行上下文
+        # 构建执行上下文（查询特征每个请求只解析一次，各 Agent 直接读取）
         execution_context = {
             "last_query": query,
-            "conversation_history": self.conversation_memory[-10:],  # 最近10轮对话
+            "query_features": get_query_analyzer().analyze(query),
+            "conversation_history": conversation_memory.history(10),  # 滚动摘要 + 最近10轮对话
             "available_agents": list(self.agent_registry.keys()),
             **(context or {})
         }
@@ -56,46 +128,60 @@ class EnhancedCoordinatorAgent(PluginAgent):
         print("🚀 开始多轮迭代执行...")
         print(f"可用Agent: {execution_context['available_agents']}")
 
-        # 执行多轮迭代
-        iteration_result = await self.iteration_controller.execute_iteration_cycle(
-            query, execution_context, self, execution_context['available_agents']
-        )
-
-        # 生成最终响应
-        final_response = await self._generate_final_response(query, iteration_result)
+        # 本次请求中的全部 LLM 调用（包括各 Agent 的调用）按请求开始时间排队老化
+        with llm_request_scope():
+            # 执行多轮迭代
+            iteration_result = await session.iteration_controller.execute_iteration_cycle(
+                query, execution_context, self, execution_context['available_agents']
+            )
+
+            # 流式生成最终响应
+            parts = []
+            time_to_first_token = None
+            async for delta in self._stream_final_response(query, iteration_result, stream):
+                if time_to_first_token is None and stream:
+                    time_to_first_token = time.perf_counter() - started
+                parts.append(delta)
+                yield delta
+        final_response = "".join(parts)
 
         # 更新对话记忆
-        self.conversation_memory.append({
+        conversation_memory.append({
             "role": "assistant",
             "content": final_response,
             "timestamp": asyncio.get_event_loop().time(),
             "iteration_data": iteration_result
         })
 
-        return AgentResponse(
+        yield AgentResponse(
             agent_type=self.agent_type,
             content=final_response,
             data={
                 "query": query,
                 "iteration_result": iteration_result,
                 "agent_registry": list(self.agent_registry.keys()),
-                "conversation_length": len(self.conversation_memory)
+                "conversation_length": conversation_memory.total_turns,
+                "session_id": session.session_id
             },
             confidence=iteration_result.get("final_result", {}).get("confidence_score", 0.8),
             metadata={
                 "iterations": iteration_result["iteration_count"],
                 "strategy": "multi_iteration",
-                "completion_reason": "normal" if iteration_result["iteration_count"] < 5 else "max_iterations"
+                "completion_reason": "normal" if iteration_result["iteration_count"] < 5 else "max_iterations",
+                "llm_calls_saved": iteration_result.get("llm_calls_saved", 0),
+                "time_to_first_token": time_to_first_token
             }
         )
 
-    async def _generate_final_response(self, query: str, iteration_result: Dict) -> str:
-        """生成最终响应"""
+    async def _stream_final_response(self, query: str, iteration_result: Dict,
+                                     stream: bool = True) -> AsyncIterator[str]:
+        """生成最终响应（stream 为假时一次性产出，使用带对冲的普通调用）"""
         final_data = iteration_result["final_result"]
         agent_responses = final_data.get("agent_responses", {})
 
         if not agent_responses:
-            return "抱歉，我无法获取足够的信息来回答您的问题。"
+            yield "抱歉，我无法获取足够的信息来回答您的问题。"
+            return
 
         # 构建整合提示
         response_summaries = []
@@ -112,4 +198,9 @@ class EnhancedCoordinatorAgent(PluginAgent):
             {"role": "user", "content": prompt}
         ]
         self.set_step("summary")
-        return await self._call_llm(messages)
\ No newline at end of file
+        with span("summary", "phase"):
+            if not stream:
+                yield await self._call_llm(messages)
+                return
+            async for delta in self._stream_llm(messages):
+                yield delta
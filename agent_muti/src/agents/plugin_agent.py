@@ -1,12 +1,14 @@
 # multi_agent_system/agents/plugin_agent.py
 import asyncio
 import inspect
-from typing import Dict, List, Any, Callable
+from typing import Dict, List, Any, Callable, Optional
 
 from lazy_object_proxy.utils import await_
 
 from .base_agent import BaseAgent
 from ..models.agent_models import AgentType, AgentResponse, AgentCapability
+from ..utils.tracing import span
+from ..utils.plugin_cache import PluginCache, get_plugin_cache
 
 
 class PluginAgent(BaseAgent):
@@ -15,11 +17,25 @@ class PluginAgent(BaseAgent):
     def __init__(self, agent_type: AgentType, name: str, description: str):
         super().__init__(agent_type, name, description)
         self.plugins: Dict[str, Callable] = {}
+        # 插件结果缓存时间（秒），未设置或为 0 的插件每次都重新执行
+        self.cache_durations: Dict[str, float] = {}
+        self.plugin_cache: PluginCache = get_plugin_cache()
 
-    def register_plugin(self, name: str, function: Callable, capability: AgentCapability):
+    def register_plugin(self, name: str, function: Callable, capability: AgentCapability,
+                        cache_duration: Optional[float] = None):
         """注册插件函数"""
         self.plugins[name] = function
         self.register_capability(capability)
+        if cache_duration:
+            self.cache_durations[name] = cache_duration
+
+    def set_cache_duration(self, seconds: Optional[float], plugin_name: str = None):
+        """设置插件结果缓存时间（不指定插件时应用于全部插件，0 或 None 表示不缓存）"""
+        for name in ([plugin_name] if plugin_name else list(self.plugins)):
+            if seconds:
+                self.cache_durations[name] = seconds
+            else:
+                self.cache_durations.pop(name, None)
 
     async def execute_plugin(self, plugin_name: str, **kwargs) -> Any:
         """执行插件函数"""
@@ -28,11 +44,22 @@ class PluginAgent(BaseAgent):
 
         plugin_func = self.plugins[plugin_name]
 
-        # 检查是否是异步函数
-        if inspect.iscoroutinefunction(plugin_func):
-            return await plugin_func(**kwargs)
-        else:
-            return plugin_func(**kwargs)
+        async def run():
+            # 检查是否是异步函数
+            if inspect.iscoroutinefunction(plugin_func):
+                return await plugin_func(**kwargs)
+            else:
+                return plugin_func(**kwargs)
+
+        with span(f"plugin:{plugin_name}", "plugin", agent=self.name, plugin=plugin_name) as plugin_span:
+            ttl = self.cache_durations.get(plugin_name)
+            if not ttl:
+                return await run()
+            result, cache_result = await self.plugin_cache.get_or_compute(
+                self.name, plugin_name, kwargs, ttl, run)
+            if plugin_span is not None:
+                plugin_span.set_attribute("cache", cache_result)
+            return result
 
 
     def list_plugins(self) -> List[str]:
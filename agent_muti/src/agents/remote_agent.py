@@ -0,0 +1,37 @@
+# multi_agent_system/agents/remote_agent.py
+from typing import Dict, Any
+
+from .plugin_agent import PluginAgent
+from ..models.agent_models import AgentType, AgentResponse
+from ..utils.message_bus import MessageBus, MessageType, MessageChannels
+
+
+class RemoteAgent(PluginAgent):
+    """远程 Agent 代理 - 通过消息总线调用工作进程中托管的 Agent"""
+
+    def __init__(self, message_bus: MessageBus, agent_type: AgentType, name: str, description: str = ""):
+        super().__init__(agent_type, name, description or f"远程Agent: {name}")
+        self.message_bus = message_bus
+
+    async def process_request(self, query: str, context: Dict[str, Any] = None) -> AgentResponse:
+        response = await self.message_bus.request_response(
+            request_channel=MessageChannels.agent_requests_for(self.name),
+            response_channel=MessageChannels.AGENT_RESPONSES,
+            message_type=MessageType.AGENT_REQUEST,
+            payload={
+                "target_agent": self.name,
+                "query": query,
+                "context": context or {}
+            },
+            timeout=self.timeout + 10
+        )
+
+        if response is None:
+            return AgentResponse(
+                agent_type=self.agent_type,
+                content=f"Agent {self.name} 执行超时",
+                data={},
+                confidence=0.0
+            )
+
+        return AgentResponse.from_dict(response.payload["response"])
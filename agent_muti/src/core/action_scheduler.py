@@ -0,0 +1,180 @@
+# multi_agent_system/core/action_scheduler.py
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+COMPLETION_MODES = ("all", "first_k", "quorum", "deadline")
+LATE_AGENT_MODES = ("cancel", "continue")
+
+
+@dataclass
+class CompletionPolicy:
+    """ACTION 阶段的完成策略
+
+    - all: 等待全部 Agent
+    - first_k: k 个 Agent 成功即完成
+    - quorum: k 个 Agent 以不低于 min_confidence 的置信度成功即完成
+    - deadline: 只按截止时间返回部分结果
+    deadline（秒）可与任意模式组合；未完成的 Agent 按 late_agents 取消或继续执行，
+    继续执行的结果会合并到下一轮迭代的上下文中。
+    """
+    mode: str = "all"
+    k: int = 1
+    min_confidence: float = 0.7
+    deadline: Optional[float] = None
+    late_agents: str = "cancel"
+
+    def __post_init__(self):
+        if self.mode not in COMPLETION_MODES:
+            raise ValueError(f"未知的完成策略: {self.mode}")
+        if self.late_agents not in LATE_AGENT_MODES:
+            raise ValueError(f"未知的迟到Agent处理方式: {self.late_agents}")
+        if self.mode == "deadline" and self.deadline is None:
+            raise ValueError("deadline 策略需要设置 deadline")
+
+    def is_satisfied(self, results: Dict[str, Any]) -> bool:
+        """根据已完成的结果判断是否可以提前结束"""
+        if self.mode == "first_k":
+            return sum(1 for result in results.values() if not isinstance(result, Exception)) >= self.k
+        if self.mode == "quorum":
+            confident = sum(1 for result in results.values()
+                            if not isinstance(result, Exception)
+                            and (getattr(result, "confidence", 0.0) or 0.0) >= self.min_confidence)
+            return confident >= self.k
+        return False
+
+
+class ActionScheduler:
+    """Agent 执行调度器 - 按依赖图（DAG）调度
+
+    每个 Agent 在其全部前驱完成后立即启动（而不是等待整个上一组完成），
+    同时受全局并发上限和单个 Agent 并发上限约束。
+    """
+
+    def __init__(self, max_concurrency: int = 8, per_agent_concurrency: int = 1):
+        self.max_concurrency = max_concurrency
+        self.per_agent_concurrency = per_agent_concurrency
+        self._global_slots = asyncio.Semaphore(max_concurrency)
+        self._agent_slots: Dict[str, asyncio.Semaphore] = {}
+
+    @staticmethod
+    def _members(group) -> List[str]:
+        """execution_sequence 中的一项可以是单个 Agent 名称或一组并行的 Agent"""
+        if isinstance(group, str):
+            return [group]
+        if isinstance(group, (list, tuple)):
+            return [name for name in group if isinstance(name, str)]
+        return []
+
+    @classmethod
+    def sequence_agents(cls, plan: Dict[str, Any]) -> List[str]:
+        """按出现顺序列出执行序列中的 Agent"""
+        agents = []
+        for group in plan.get("execution_sequence") or []:
+            agents.extend(cls._members(group))
+        return list(dict.fromkeys(agents))
+
+    @classmethod
+    def build_graph(cls, plan: Dict[str, Any], agents: List[str]) -> Dict[str, List[str]]:
+        """根据计划构建依赖图 {Agent: [前驱Agent]}
+
+        execution_sequence 中每组 Agent 依赖上一组；plan["dependencies"] 中显式声明的依赖优先。
+        未出现在序列中的 Agent 没有前驱，环上的依赖会被丢弃。
+        """
+        selected = list(dict.fromkeys(agents))
+        graph: Dict[str, List[str]] = {name: [] for name in selected}
+
+        previous: List[str] = []
+        placed = set()
+        for group in plan.get("execution_sequence") or []:
+            members = [name for name in cls._members(group) if name in graph and name not in placed]
+            if not members:
+                continue
+            for name in members:
+                graph[name] = list(previous)
+            placed.update(members)
+            previous = members
+
+        dependencies = plan.get("dependencies")
+        if isinstance(dependencies, dict):
+            for name, upstream in dependencies.items():
+                if name in graph and isinstance(upstream, (list, tuple)):
+                    graph[name] = [dep for dep in dict.fromkeys(upstream) if dep in graph and dep != name]
+
+        cls._break_cycles(graph)
+        return graph
+
+    @staticmethod
+    def _break_cycles(graph: Dict[str, List[str]]):
+        """拓扑排序；遇到环时丢弃环上第一个节点的未完成依赖后继续"""
+        remaining = {name: set(deps) for name, deps in graph.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                name = next(iter(remaining))
+                print(f"⚠️  执行计划存在循环依赖，忽略 {name} 的依赖: {sorted(remaining[name])}")
+                graph[name] = [dep for dep in graph[name] if dep not in remaining]
+                ready = [name]
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def _agent_slot(self, name: str) -> asyncio.Semaphore:
+        slot = self._agent_slots.get(name)
+        if slot is None:
+            slot = self._agent_slots[name] = asyncio.Semaphore(self.per_agent_concurrency)
+        return slot
+
+    async def run(self, graph: Dict[str, List[str]],
+                  execute: Callable[[str], Awaitable[Any]]) -> Dict[str, Any]:
+        """执行全部依赖图，返回 {Agent: 结果或异常}（按完成顺序）"""
+        results, _ = await self.run_until(graph, execute, CompletionPolicy())
+        return results
+
+    async def run_until(self, graph: Dict[str, List[str]],
+                        execute: Callable[[str], Awaitable[Any]],
+                        policy: CompletionPolicy) -> Tuple[Dict[str, Any], Dict[str, asyncio.Task]]:
+        """执行依赖图直到满足完成策略
+
+        返回 ({Agent: 结果或异常}, {Agent: 仍在执行的任务})；后者只在 late_agents 为 continue 时非空，
+        任务完成后返回该 Agent 的结果或异常。前驱失败不会阻止后继执行，后继只是拿不到该前驱的输出。
+        """
+        results: Dict[str, Any] = {}
+        finished = {name: asyncio.Event() for name in graph}
+
+        async def run_node(name: str):
+            try:
+                for dep in graph[name]:
+                    await finished[dep].wait()
+                # 先占用 Agent 自身的名额，避免排队等待时占住全局名额
+                async with self._agent_slot(name), self._global_slots:
+                    results[name] = await execute(name)
+            except Exception as e:
+                results[name] = e
+            finally:
+                finished[name].set()
+            return results[name]
+
+        tasks = {name: asyncio.create_task(run_node(name), name=f"agent:{name}") for name in graph}
+        try:
+            try:
+                for completed in asyncio.as_completed(list(tasks.values()), timeout=policy.deadline):
+                    await completed
+                    if len(results) < len(tasks) and policy.is_satisfied(results):
+                        print(f"🏁 完成策略 {policy.mode} 已满足 ({len(results)}/{len(tasks)})")
+                        break
+            except asyncio.TimeoutError:
+                print(f"⏰ ACTION 截止时间已到，返回部分结果 ({len(results)}/{len(tasks)})")
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        pending = {name: task for name, task in tasks.items() if not task.done()}
+        if pending and policy.late_agents == "cancel":
+            for task in pending.values():
+                task.cancel()
+            await asyncio.gather(*pending.values(), return_exceptions=True)
+            pending = {}
+        return results, pending
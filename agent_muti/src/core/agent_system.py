@@ -1,25 +1,111 @@
 # multi_agent_system/core/agent_system.py
 import asyncio
-from typing import Dict, Any, List
+from typing import AsyncIterator, Dict, Any, List, Union
 from ..agents.coordinator_agent import EnhancedCoordinatorAgent
 from ..plugins.weather_agent import WeatherAgent
 from ..plugins.transport_agent import TransportAgent
 from ..plugins.budget_agent import BudgetAgent
 from ..plugins.hotel_agent import HotelAgent
 from ..plugins.attraction_agent import AttractionAgent
+from ..agents.remote_agent import RemoteAgent
 from .plugin_manager import AgentPluginManager
+from .agent_worker import create_agent_request_handler
+from .action_scheduler import CompletionPolicy
 from ..utils.performance_monitor import PerformanceMonitor
-from ..utils.message_bus import MessageBus, MessageType, MessagePriority
-from ..models.agent_models import AgentResponse
+from ..utils.message_bus import MessageBus, MessagePriority, MessageChannels
+from ..utils.message_transport import MessageTransport
+from ..utils.message_log import MessageLog
+from ..utils.metrics_exporter import MetricsExporter
+from ..utils.tracing import start_trace
+from ..utils.llm_hedging import HedgingPolicy
+from ..utils.llm_client_pool import get_llm_client_pool
+from ..utils.plugin_cache import get_plugin_cache
+from ..utils.query_features import get_query_analyzer
+from ..utils.llm_priority import LLMPriority, llm_priority
+from .capability_index import CapabilityIndex
+from .session_manager import SessionManager
+from .response_journal import ResponseJournal
+from ..models.agent_models import AgentResponse, AgentType, StreamingResponse
+
+# 整个查询处理的超时时间（秒）
+QUERY_TIMEOUT = 120
+
+_STREAM_END = object()
+
+
+async def _iterate_with_deadline(stream: StreamingResponse, timeout: float
+                                 ) -> AsyncIterator[Union[str, AgentResponse]]:
+    """在独立任务中消费流并转发片段，最后产出完整响应；总耗时超过 timeout 秒时取消并抛出 TimeoutError
+
+    生成器始终由同一个任务驱动（其中设置的上下文变量保持有效），
+    截止时间只作用于等待下一个片段，调用方处理片段的时间同样计入。
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def produce():
+        try:
+            async for delta in stream:
+                queue.put_nowait(delta)
+            queue.put_nowait(stream.response)
+        except Exception as e:
+            queue.put_nowait(e)
+        finally:
+            await stream.aclose()
+            queue.put_nowait(_STREAM_END)
+
+    producer = asyncio.create_task(produce())
+    deadline = loop.time() + timeout
+    try:
+        while True:
+            item = await asyncio.wait_for(queue.get(), max(0.0, deadline - loop.time()))
+            if item is _STREAM_END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
 
 
 class EnhancedDynamicAgentSystem:
     """增强的动态 Agent 系统"""
 
-    def __init__(self, api_key: str, config: Dict[str, Any] = None):
+    def __init__(self, api_key: str, config: Dict[str, Any] = None, transport: MessageTransport = None):
         self.api_key = api_key
         self.config = config or {}
+        # 所有 Agent 共用的 LLM 客户端池（在第一次请求前配置即可生效）
+        self.llm_client_pool = get_llm_client_pool()
+        if self.config.get('llm_pool'):
+            self.llm_client_pool.configure(**self.config['llm_pool'])
+        # 插件结果缓存（各 Agent 的缓存时间来自 agents.<类型>.cache_duration）
+        self.plugin_cache = get_plugin_cache()
+        if self.config.get('plugin_cache'):
+            self.plugin_cache.configure(**self.config['plugin_cache'])
+        # 查询理解词典（城市/景点/兴趣/酒店档次）
+        if self.config.get('gazetteer'):
+            get_query_analyzer().configure(self.config['gazetteer'])
         self.coordinator = EnhancedCoordinatorAgent()
+        if 'max_concurrent_agents' in self.config:
+            self.coordinator.iteration_controller.set_concurrency_limits(
+                self.config['max_concurrent_agents'],
+                self.config.get('per_agent_concurrency', 1)
+            )
+        self.coordinator.iteration_controller.fused_think_plan = self.config.get('fused_think_plan', False)
+        if 'context_token_budget' in self.config:
+            self.coordinator.iteration_controller.context_store.token_budget = self.config['context_token_budget']
+        if self.config.get('action_completion'):
+            self.coordinator.iteration_controller.set_completion_policy(
+                CompletionPolicy(**self.config['action_completion'])
+            )
+        self.capability_index = self._create_capability_index(self.config.get('capability_routing'))
+        self.coordinator.iteration_controller.capability_index = self.capability_index
+        # 对话记忆：最近若干轮在内存中，更早的落盘并由滚动摘要代替
+        if self.config.get('conversation_memory'):
+            self.coordinator.configure_memory(**self.config['conversation_memory'])
+        # 会话管理（每个会话独立的对话记忆与迭代状态，共享 Agent 注册表和 LLM 客户端池）
+        self.session_manager = SessionManager(self.coordinator.create_session, **(self.config.get('sessions') or {}))
 
         # 从配置获取超时设置
         agent_timeout = self.config.get('agent_timeout', 30)
@@ -29,10 +115,40 @@ class EnhancedDynamicAgentSystem:
 
         # 性能监控
         self.performance_monitor = PerformanceMonitor()
-        self.message_bus = MessageBus()
+        # transport 为空时使用进程内传输；传入 SocketTransport 可将 Agent 部署到其他进程
+        self.message_bus = MessageBus(transport=transport, **self._message_log_options())
+        # 配置持久化日志时记录 ACTION 阶段的 Agent 响应，崩溃重启后无需重新调用 LLM
+        self.response_journal = None
+        if self.message_bus.message_log is not None:
+            self.response_journal = ResponseJournal(self.message_bus)
+            self.coordinator.iteration_controller.response_journal = self.response_journal
+
+        # LLM 请求对冲与自适应超时（协调器和所有 Agent 共享延迟统计与对冲预算）
+        hedging_config = self.config.get('llm_hedging')
+        self.hedging_policy = HedgingPolicy(**hedging_config) if hedging_config else None
+
+        # OpenMetrics 指标导出（enable_metrics 为真时在初始化阶段启动）
+        self.metrics_exporter = None
+        if self.config.get('enable_metrics'):
+            self.metrics_exporter = MetricsExporter(
+                performance_monitor=self.performance_monitor,
+                message_bus=self.message_bus,
+                hedging_policy=self.hedging_policy,
+                llm_client_pool=self.llm_client_pool,
+                plugin_cache=self.plugin_cache,
+                capability_index=self.capability_index,
+                session_manager=self.session_manager,
+                host=self.config.get('metrics_host', '127.0.0.1'),
+                port=self.config.get('metrics_port', 9090)
+            )
 
         # 注册内置 Agent
         self._register_builtin_agents(agent_timeout)
+        for agent in self.coordinator.agent_registry.values():
+            self._apply_cache_duration(agent)
+        if self.hedging_policy is not None:
+            for agent in [self.coordinator, *self.coordinator.agent_registry.values()]:
+                agent.hedging = self.hedging_policy
 
         # 注册规划策略
         self._register_planning_strategies()
@@ -40,6 +156,50 @@ class EnhancedDynamicAgentSystem:
         # 注意：不在构造函数中初始化消息总线
         self._is_initialized = False
 
+    def _message_log_options(self) -> Dict[str, Any]:
+        """根据 message_log 配置创建持久化消息日志（未配置 directory 时不启用）"""
+        log_config = self.config.get('message_log') or {}
+        if not log_config.get('directory'):
+            return {}
+
+        message_log = MessageLog(
+            directory=log_config['directory'],
+            segment_bytes=log_config.get('segment_bytes', 64 * 1024 * 1024),
+            retention_bytes=log_config.get('retention_bytes'),
+            retention_seconds=log_config.get('retention_seconds'),
+            flush_interval=log_config.get('flush_interval', 0.2),
+            flush_batch=log_config.get('flush_batch', 512),
+            fsync=log_config.get('fsync', True)
+        )
+        return {
+            "message_log": message_log,
+            "persisted_channels": log_config.get('channels', [MessageChannels.AGENT_RESPONSES])
+        }
+
+    def _create_capability_index(self, routing_config: Dict[str, Any] = None):
+        """按配置创建能力索引（未配置或 enabled 为 false 时不创建，每轮都由 PLAN 阶段规划）"""
+        options = dict(routing_config or {})
+        if not options.pop('enabled', False):
+            return None
+        embedding_model = options.pop('embedding_model', None)
+        if embedding_model:
+            client = self.llm_client_pool.client(self.api_key)
+
+            async def embed(texts: List[str]) -> List[List[float]]:
+                # 查询向量在关键路径上，与协调器调用同一优先级
+                with llm_priority(LLMPriority.CRITICAL):
+                    response = await client.embeddings.create(model=embedding_model, input=texts)
+                return [item.embedding for item in response.data]
+
+            options['embedder'] = embed
+        return CapabilityIndex(**options)
+
+    def _apply_cache_duration(self, agent):
+        """按 agents.<类型>.cache_duration 设置 Agent 插件结果的缓存时间"""
+        agent_config = (self.config.get('agents') or {}).get(agent.agent_type.value) or {}
+        if 'cache_duration' in agent_config:
+            agent.set_cache_duration(agent_config['cache_duration'])
+
     def _register_builtin_agents(self, timeout: int = 30):
         """注册内置 Agent"""
         # 天气 Agent
@@ -51,7 +211,9 @@ class EnhancedDynamicAgentSystem:
         self.coordinator.register_agent(transport_agent)
 
         # 预算 Agent
-        budget_agent = BudgetAgent()
+        budget_config = (self.config.get('agents') or {}).get('budget') or {}
+        budget_agent = BudgetAgent(default_days=budget_config.get('default_days', 3),
+                                   default_travelers=budget_config.get('default_travelers', 2))
         self.coordinator.register_agent(budget_agent)
         
         # 酒店选择师 Agent
@@ -119,45 +281,13 @@ class EnhancedDynamicAgentSystem:
         """同步设置消息总线 - 只注册处理器，不初始化"""
 
         # 注册消息处理器
-        async def handle_agent_request(message):
-            """处理Agent请求"""
-            payload = message.payload
-            agent_name = payload.get("target_agent")
-            query = payload.get("query")
-            context = payload.get("context", {})
-
-            if agent_name in self.coordinator.agent_registry:
-                agent = self.coordinator.agent_registry[agent_name]
-
-                # 使用性能监控跟踪执行
-                with self.performance_monitor.track_performance("agent_request", agent_name):
-                    try:
-                        response = await asyncio.wait_for(
-                            agent.process_request(query, context),
-                            timeout=agent.timeout + 10
-                        )
-                    except asyncio.TimeoutError:
-                        response = AgentResponse(
-                            agent_type=agent.agent_type,
-                            content=f"Agent {agent_name} 执行超时",
-                            data={},
-                            confidence=0.0
-                        )
-
-                # 发布响应
-                await self.message_bus.publish(
-                    channel="agent.responses",
-                    message_type=MessageType.AGENT_RESPONSE,
-                    payload={
-                        "agent_name": agent_name,
-                        "response": response.to_dict(),
-                        "original_request_id": message.message_id
-                    },
-                    correlation_id=message.correlation_id
-                )
+        handle_agent_request = create_agent_request_handler(
+            self.message_bus, self.coordinator.agent_registry, self.performance_monitor
+        )
 
-        # 订阅Agent请求频道 - 同步调用
-        self.message_bus.subscribe("agent.requests", handle_agent_request)
+        # 订阅Agent请求频道 - 同步调用，每个Agent一个并发工作协程
+        self.message_bus.subscribe("agent.requests", handle_agent_request,
+                                   concurrency=max(1, len(self.coordinator.agent_registry)))
 
         print("✅ 消息总线处理器注册完成")
 
@@ -170,38 +300,112 @@ class EnhancedDynamicAgentSystem:
         agent = self.plugin_manager.create_agent_instance(plugin_name, *args, **kwargs)
         timeout = kwargs.get('timeout', 30)
         agent.initialize(self.api_key, timeout=timeout)
+        self._apply_cache_duration(agent)
+        self.coordinator.register_agent(agent)
+        return agent
+
+    def register_remote_agent(self, name: str, agent_type: AgentType, description: str = "") -> RemoteAgent:
+        """注册由工作进程托管的远程 Agent（同名的本地 Agent 会被替换）"""
+        agent = RemoteAgent(self.message_bus, agent_type, name, description)
         self.coordinator.register_agent(agent)
         return agent
 
-    async def process_query(self, query: str) -> AgentResponse:
-        """处理用户查询"""
+    async def process_query(self, query: str, session_id: str = None) -> AgentResponse:
+        """处理用户查询（指定 session_id 时使用该会话的对话记忆，否则使用默认会话）"""
         if not self._is_initialized:
             raise RuntimeError("系统未初始化，请先调用 initialize_system()")
 
         print(f"🤖 增强多Agent系统开始处理: {query}")
         print("=" * 60)
 
+        if not self.config.get('enable_tracing'):
+            return await self._process_query(query, session_id)
+
+        # 追踪整个请求，完成后导出 Chrome trace / Perfetto JSON
+        with start_trace("query", query=query) as trace:
+            response = await self._process_query(query, session_id)
+        trace_file = await asyncio.to_thread(trace.export, self.config.get('trace_dir', 'traces'))
+        response.metadata = {**(response.metadata or {}), "trace_file": trace_file}
+        print(f"🧭 追踪文件已导出: {trace_file}")
+        return response
+
+    async def _process_query(self, query: str, session_id: str = None) -> AgentResponse:
+        """执行查询（带性能监控和整体超时）"""
+        if session_id is None:
+            return await self._process_session_query(query)
+        async with self.session_manager.acquire(session_id) as session:
+            return await self._process_session_query(query, session)
+
+    async def _process_session_query(self, query: str, session=None) -> AgentResponse:
         # 性能监控
         with self.performance_monitor.track_performance("system_query"):
             try:
                 response = await asyncio.wait_for(
-                    self.coordinator.process_request(query),
-                    timeout=120  # 整个查询处理的超时时间
+                    self.coordinator.process_request(query, session=session),
+                    timeout=QUERY_TIMEOUT
                 )
             except asyncio.TimeoutError:
-                print("⏰ 系统处理超时，返回错误响应")
-                response = AgentResponse(
-                    agent_type=self.coordinator.agent_type,
-                    content="系统处理超时，请稍后重试或简化您的请求",
-                    data={"error": "timeout", "query": query},
-                    confidence=0.0
-                )
+                response = self._timeout_response(query)
 
+        self._record_time_to_first_token(response)
         print(f"✅ 处理完成! 迭代次数: {response.metadata.get('iterations', 1)}")
         print("=" * 60)
 
         return response
 
+    def process_query_stream(self, query: str, session_id: str = None) -> StreamingResponse:
+        """流式处理用户查询：逐段产出最终回答，迭代结束后 response 为完整响应"""
+        if not self._is_initialized:
+            raise RuntimeError("系统未初始化，请先调用 initialize_system()")
+        return StreamingResponse(self._process_query_stream(query, session_id))
+
+    async def _process_query_stream(self, query: str, session_id: str = None
+                                    ) -> AsyncIterator[Union[str, AgentResponse]]:
+        if session_id is None:
+            async for item in self._process_session_stream(query):
+                yield item
+            return
+        async with self.session_manager.acquire(session_id) as session:
+            async for item in self._process_session_stream(query, session):
+                yield item
+
+    async def _process_session_stream(self, query: str, session=None) -> AsyncIterator[Union[str, AgentResponse]]:
+        print(f"🤖 增强多Agent系统开始处理: {query}")
+        print("=" * 60)
+
+        stream = self.coordinator.process_request_stream(query, session=session)
+        response = None
+        with self.performance_monitor.track_performance("system_query"):
+            try:
+                # 与 process_query 相同的整体超时：流在首个片段之后停滞时同样会结束并释放会话名额
+                async for item in _iterate_with_deadline(stream, QUERY_TIMEOUT):
+                    if isinstance(item, AgentResponse):
+                        response = item
+                    else:
+                        yield item
+            except asyncio.TimeoutError:
+                response = self._timeout_response(query)
+
+        self._record_time_to_first_token(response)
+        print(f"\n✅ 处理完成! 迭代次数: {response.metadata.get('iterations', 1)}")
+        print("=" * 60)
+        yield response
+
+    def _timeout_response(self, query: str) -> AgentResponse:
+        print("⏰ 系统处理超时，返回错误响应")
+        return AgentResponse(
+            agent_type=self.coordinator.agent_type,
+            content="系统处理超时，请稍后重试或简化您的请求",
+            data={"error": "timeout", "query": query},
+            confidence=0.0,
+            metadata={}
+        )
+
+    def _record_time_to_first_token(self, response: AgentResponse):
+        time_to_first_token = (response.metadata or {}).get("time_to_first_token")
+        if time_to_first_token is not None:
+            self.performance_monitor.record_time_to_first_token(time_to_first_token)
+
     def get_system_status(self) -> Dict[str, Any]:
         """获取系统状态"""
         agent_info = {}
@@ -217,8 +421,14 @@ class EnhancedDynamicAgentSystem:
             "registered_agents": list(self.coordinator.agent_registry.keys()),
             "agent_details": agent_info,
             "conversation_memory": len(self.coordinator.conversation_memory),
+            "conversation_memory_stats": self.coordinator.conversation_memory.get_statistics(),
             "performance_metrics": self.performance_monitor.get_metrics(),
             "system_health": self.performance_monitor.get_system_health(),
+            "llm_hedging": self.hedging_policy.get_statistics() if self.hedging_policy else None,
+            "llm_pool": self.llm_client_pool.get_statistics(),
+            "plugin_cache": self.plugin_cache.get_statistics(),
+            "capability_index": self.capability_index.get_statistics() if self.capability_index else None,
+            "sessions": self.session_manager.get_statistics(),
             "is_initialized": self._is_initialized
         }
 
@@ -234,6 +444,12 @@ class EnhancedDynamicAgentSystem:
         print("🔧 注册消息处理器...")
         self._setup_message_bus_sync()  # 同步调用
 
+        if self.response_journal is not None:
+            await self.response_journal.load()
+
+        if self.metrics_exporter is not None:
+            await self.metrics_exporter.start()
+
         self._is_initialized = True
         print("✅ 多Agent系统初始化完成")
 
@@ -243,7 +459,12 @@ class EnhancedDynamicAgentSystem:
             print("⚠️  系统未初始化，无需关闭")
             return
 
+        if self.metrics_exporter is not None:
+            await self.metrics_exporter.close()
+
+        self.session_manager.close_all()
         await self.message_bus.shutdown()
+        await self.llm_client_pool.close()
         self._is_initialized = False
         print("🛑 多Agent系统已关闭")
 
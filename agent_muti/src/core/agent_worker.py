@@ -0,0 +1,138 @@
+# multi_agent_system/core/agent_worker.py
+import asyncio
+import multiprocessing
+import signal
+from typing import Callable, Dict, List
+
+from ..agents.base_agent import BaseAgent
+from ..models.agent_models import AgentResponse
+from ..utils.message_bus import MessageBus, MessageType, MessageChannels
+from ..utils.message_transport import MessageTransport, SocketTransport
+from ..utils.performance_monitor import PerformanceMonitor
+
+
+def create_agent_request_handler(message_bus: MessageBus,
+                                 agent_registry: Dict[str, BaseAgent],
+                                 performance_monitor: PerformanceMonitor) -> Callable:
+    """创建 Agent 请求处理器 - 本地系统与工作进程共用"""
+
+    async def handle_agent_request(message):
+        """处理Agent请求"""
+        payload = message.payload
+        agent_name = payload.get("target_agent")
+        query = payload.get("query")
+        context = payload.get("context", {})
+
+        if agent_name not in agent_registry:
+            return
+
+        agent = agent_registry[agent_name]
+
+        # 使用性能监控跟踪执行
+        with performance_monitor.track_performance("agent_request", agent_name):
+            try:
+                response = await asyncio.wait_for(
+                    agent.process_request(query, context),
+                    timeout=agent.timeout + 10
+                )
+            except asyncio.TimeoutError:
+                response = AgentResponse(
+                    agent_type=agent.agent_type,
+                    content=f"Agent {agent_name} 执行超时",
+                    data={},
+                    confidence=0.0
+                )
+            except Exception as e:
+                # 返回错误响应，避免请求方一直等到超时
+                response = AgentResponse(
+                    agent_type=agent.agent_type,
+                    content=f"执行错误: {str(e)}",
+                    data={},
+                    confidence=0.0
+                )
+
+        # 发布响应
+        await message_bus.publish(
+            channel=payload.get("reply_to", MessageChannels.AGENT_RESPONSES),
+            message_type=MessageType.AGENT_RESPONSE,
+            payload={
+                "agent_name": agent_name,
+                "response": response.to_dict(),
+                "original_request_id": message.message_id
+            },
+            correlation_id=message.correlation_id
+        )
+
+    return handle_agent_request
+
+
+class AgentWorker:
+    """Agent 工作进程 - 在独立进程中托管部分 Agent，通过消息总线对外提供服务"""
+
+    def __init__(self, agents: List[BaseAgent], transport: MessageTransport,
+                 worker_id: str = None, concurrency_per_agent: int = 1):
+        self.worker_id = worker_id or f"worker-{multiprocessing.current_process().pid}"
+        self.agent_registry: Dict[str, BaseAgent] = {agent.name: agent for agent in agents}
+        self.concurrency_per_agent = concurrency_per_agent
+        self.performance_monitor = PerformanceMonitor()
+        self.message_bus = MessageBus(transport=transport)
+        self._stopped = asyncio.Event()
+
+    async def start(self):
+        """连接消息总线并订阅所托管 Agent 的请求频道"""
+        await self.message_bus.initialize()
+
+        handler = create_agent_request_handler(self.message_bus, self.agent_registry, self.performance_monitor)
+        for agent_name in self.agent_registry:
+            channel = MessageChannels.agent_requests_for(agent_name)
+            # 同一 Agent 的多个副本组成一个消费组，请求在副本之间轮询分发
+            self.message_bus.subscribe(channel, handler, concurrency=self.concurrency_per_agent, group=channel)
+
+        print(f"✅ 工作进程 {self.worker_id} 已启动，托管Agent: {list(self.agent_registry.keys())}")
+
+    async def serve_forever(self):
+        """运行直到收到停止信号"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self._stopped.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        await self.start()
+        try:
+            await self._stopped.wait()
+        finally:
+            await self.message_bus.shutdown()
+            print(f"🛑 工作进程 {self.worker_id} 已停止")
+
+    def stop(self):
+        """请求停止工作进程"""
+        self._stopped.set()
+
+
+def run_agent_worker(address: str, agent_factory: Callable[[], List[BaseAgent]], worker_id: str = None):
+    """工作进程入口 - agent_factory 在子进程中创建要托管的 Agent"""
+    worker = AgentWorker(agent_factory(), SocketTransport(address), worker_id=worker_id)
+    asyncio.run(worker.serve_forever())
+
+
+def launch_agent_workers(address: str, agent_factory: Callable[[], List[BaseAgent]], count: int,
+                         start_method: str = "spawn") -> List[multiprocessing.Process]:
+    """启动 count 个工作进程，每个进程托管 agent_factory 创建的 Agent
+
+    agent_factory 必须是模块级函数（可被子进程导入）。
+    """
+    context = multiprocessing.get_context(start_method)
+    processes = []
+    for index in range(count):
+        process = context.Process(
+            target=run_agent_worker,
+            args=(address, agent_factory, f"worker-{index + 1}"),
+            daemon=True
+        )
+        process.start()
+        processes.append(process)
+
+    print(f"🚀 已启动 {count} 个Agent工作进程")
+    return processes
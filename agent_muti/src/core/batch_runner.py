@@ -0,0 +1,188 @@
+# multi_agent_system/core/batch_runner.py
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, Set, Tuple
+
+from ..utils.latency_histogram import LatencyHistogram
+from ..utils.tokens import track_token_usage, usage_cost
+
+
+class BatchRunner:
+    """批量查询 - 读取 JSONL 查询文件，有界并发执行，结果逐行追加写入 JSONL
+
+    输入每行一个 JSON 对象 {"query": "...", "id": ...}（也可以直接是查询字符串）。
+    输出每行对应一个输入行（按完成顺序），以 line 字段（输入行号，从 1 开始）关联；
+    重新运行时跳过输出文件中已成功的行，失败（带 error 字段）的行重新执行，因此中断或临时故障后可以继续执行。
+    重试的行会追加新记录，同一行有多条记录时以最后一条为准。
+    每个查询使用独立的临时会话，查询之间互不影响。
+    """
+
+    def __init__(self, system, input_path: str, output_path: str = None, concurrency: int = 4,
+                 pricing: Dict[str, Dict[str, float]] = None, progress_every: int = 10):
+        self.system = system
+        self.input_path = input_path
+        self.output_path = output_path or os.path.splitext(input_path)[0] + ".results.jsonl"
+        self.concurrency = max(1, concurrency)
+        self.pricing = pricing or {}
+        self.progress_every = progress_every
+        self.latency = LatencyHistogram()
+        self.stats = {"completed": 0, "failed": 0, "skipped": 0, "retried": 0, "prompt_tokens": 0,
+                      "completion_tokens": 0, "llm_calls": 0, "cost": 0.0}
+        self._pending = 0
+
+    async def run(self) -> Dict[str, Any]:
+        """执行全部未完成的查询，返回汇总统计"""
+        completed, failed = self._load_completed()
+        self._pending = sum(1 for line_no, _ in self._read_input() if line_no not in completed)
+        self.stats["skipped"] = len(completed)
+        self.stats["retried"] = len(failed)
+        print(f"📦 批量查询: 待执行 {self._pending} 条（其中重试失败行 {len(failed)} 条），"
+              f"已完成 {len(completed)} 条，并发 {self.concurrency}")
+
+        requests = ((line_no, text) for line_no, text in self._read_input() if line_no not in completed)
+        started = time.perf_counter()
+        with open(self.output_path, "a", encoding="utf-8") as output:
+            workers = [self._worker(requests, output) for _ in range(self.concurrency)]
+            try:
+                await _gather(workers)
+            finally:
+                self.stats["elapsed"] = time.perf_counter() - started
+        return self.get_summary()
+
+    async def _worker(self, requests: Iterator[Tuple[int, str]], output):
+        # 各 worker 从同一个迭代器取下一行，并发数即 worker 数
+        for line_no, text in requests:
+            result = await self._run_one(line_no, text)
+            output.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+            output.flush()
+            done = self.stats["completed"] + self.stats["failed"]
+            if self.progress_every and done % self.progress_every == 0:
+                print(f"📦 进度: {done}/{self._pending}")
+
+    async def _run_one(self, line_no: int, text: str) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"line": line_no}
+        try:
+            request = json.loads(text)
+            if isinstance(request, str):
+                request = {"query": request}
+            query = request["query"]
+        except (ValueError, KeyError, TypeError) as e:
+            self.stats["failed"] += 1
+            return {**result, "error": f"无效的输入行: {e}"}
+        if request.get("id") is not None:
+            result["id"] = request["id"]
+        result["query"] = query
+
+        session_id = f"batch:{line_no}"
+        started = time.perf_counter()
+        with track_token_usage() as usage:
+            try:
+                response = await self.system.process_query(query, session_id=session_id)
+                error = (response.data or {}).get("error")
+            except Exception as e:
+                response, error = None, str(e)
+            finally:
+                self.system.session_manager.close(session_id)
+        latency = time.perf_counter() - started
+
+        cost = usage_cost(usage, self.pricing)
+        self.latency.record(latency)
+        self.stats["prompt_tokens"] += usage["prompt_tokens"]
+        self.stats["completion_tokens"] += usage["completion_tokens"]
+        self.stats["llm_calls"] += usage["calls"]
+        self.stats["cost"] += cost or 0.0
+        self.stats["failed" if error else "completed"] += 1
+
+        if response is not None:
+            metadata = response.metadata or {}
+            result.update({
+                "response": response.content,
+                "confidence": response.confidence,
+                "iterations": metadata.get("iterations"),
+                "time_to_first_token": metadata.get("time_to_first_token")
+            })
+        result.update({
+            "latency": round(latency, 3),
+            "tokens": {key: usage[key] for key in ("calls", "prompt_tokens", "completion_tokens")},
+            "cost": round(cost, 6) if cost is not None else None
+        })
+        if error:
+            result["error"] = error
+        return result
+
+    def _read_input(self) -> Iterator[Tuple[int, str]]:
+        with open(self.input_path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_no, line
+
+    def _load_completed(self) -> Tuple[Set[int], Set[int]]:
+        """读取已成功和仍然失败的行号（同一行以最后一条记录为准）；中断时写了一半的末行被截掉"""
+        completed: Set[int] = set()
+        failed: Set[int] = set()
+        if not os.path.exists(self.output_path):
+            return completed, failed
+        end = 0
+        with open(self.output_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                end += len(line)
+                try:
+                    record = json.loads(line)
+                    line_no = int(record["line"])
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if record.get("error"):
+                    completed.discard(line_no)
+                    failed.add(line_no)
+                else:
+                    failed.discard(line_no)
+                    completed.add(line_no)
+        if end < os.path.getsize(self.output_path):
+            with open(self.output_path, "r+b") as f:
+                f.truncate(end)
+        return completed, failed
+
+    def get_summary(self) -> Dict[str, Any]:
+        """吞吐与延迟汇总"""
+        executed = self.stats["completed"] + self.stats["failed"]
+        elapsed = self.stats.get("elapsed", 0.0)
+        total_tokens = self.stats["prompt_tokens"] + self.stats["completion_tokens"]
+        return {
+            **self.stats,
+            "executed": executed,
+            "qps": executed / elapsed if elapsed else 0.0,
+            "latency": self.latency.summary((50, 95)),
+            "tokens_per_query": total_tokens / executed if executed else 0.0,
+            "cost_per_query": self.stats["cost"] / executed if executed and self.pricing else None,
+            "output_path": self.output_path
+        }
+
+
+async def _gather(coroutines):
+    """并发执行，任一失败或被取消时取消其余协程"""
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def print_batch_summary(summary: Dict[str, Any]):
+    """打印批量查询汇总"""
+    latency = summary["latency"]
+    print("📊 批量查询汇总:")
+    print(f"   执行: {summary['executed']} 条 (成功 {summary['completed']}, 失败 {summary['failed']}), "
+          f"跳过已完成: {summary['skipped']} 条, 重试上次失败: {summary['retried']} 条")
+    print(f"   耗时: {summary.get('elapsed', 0.0):.1f}秒, 吞吐: {summary['qps']:.2f} QPS")
+    print(f"   延迟: p50 {latency['p50']:.2f}秒, p95 {latency['p95']:.2f}秒, 平均 {latency['average']:.2f}秒")
+    print(f"   Token: 每条 {summary['tokens_per_query']:.0f} "
+          f"(输入 {summary['prompt_tokens']}, 输出 {summary['completion_tokens']}, LLM 调用 {summary['llm_calls']} 次)")
+    if summary["cost_per_query"] is not None:
+        print(f"   费用: 每条 {summary['cost_per_query']:.4f}, 合计 {summary['cost']:.4f}")
+    print(f"   结果文件: {summary['output_path']}")
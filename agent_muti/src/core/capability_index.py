@@ -0,0 +1,187 @@
+# multi_agent_system/core/capability_index.py
+import asyncio
+import hashlib
+import json
+import math
+import os
+import re
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from ..utils.query_features import AhoCorasick
+
+# 批量计算文本向量的函数：texts -> vectors
+Embedder = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+_CJK_RUN = re.compile(r"[一-鿿]+")
+_WORD = re.compile(r"[a-z][a-z0-9_]+")
+
+
+def index_terms(text: str) -> Set[str]:
+    """切分索引词：中文取相邻两字，英文取单词"""
+    text = text.lower()
+    terms = set(_WORD.findall(text))
+    for run in _CJK_RUN.findall(text):
+        terms.update(run[index:index + 2] for index in range(len(run) - 1))
+    return terms
+
+
+def _schema_descriptions(schema: Dict[str, Any]) -> Iterable[str]:
+    for prop in (schema or {}).get("properties", {}).values():
+        if isinstance(prop, dict) and prop.get("description"):
+            yield prop["description"]
+
+
+def _cosine(left: List[float], right: List[float]) -> float:
+    dot = sum(a * b for a, b in zip(left, right))
+    norm = math.sqrt(sum(a * a for a in left)) * math.sqrt(sum(b * b for b in right))
+    return dot / norm if norm else 0.0
+
+
+class CapabilityIndex:
+    """Agent 能力索引 - 根据查询直接给出需要调用的 Agent 及置信度
+
+    倒排索引的词来自 Agent 名称、描述、各能力的描述与输入参数说明（相邻两字），
+    以及配置中按 Agent 类型给出的关键词（整词，权重更高），用 Aho-Corasick 一次扫描匹配。
+    词 t 对 Agent a 的证据为 权重 / 包含该词的 Agent 数，置信度按 noisy-OR 合并；
+    超过半数 Agent 都有的词（查询、城市等）不计入。
+    配置了向量函数时另按查询与能力文本的余弦相似度加权，能力文本的向量按内容哈希缓存到磁盘。
+    """
+
+    def __init__(self, min_confidence: float = 0.6, keywords: Dict[str, List[str]] = None,
+                 keyword_weight: float = 0.9, description_weight: float = 0.5,
+                 embedder: Embedder = None, vector_path: str = None, embedding_weight: float = 0.8,
+                 similarity_floor: float = 0.5):
+        self.min_confidence = min_confidence
+        self.keywords = keywords or {}
+        self.keyword_weight = keyword_weight
+        self.description_weight = description_weight
+        self.embedder = embedder
+        self.vector_path = vector_path
+        self.embedding_weight = embedding_weight
+        self.similarity_floor = similarity_floor
+
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._automaton = AhoCorasick()
+        self._documents: Dict[str, str] = {}
+        self._vectors: Dict[str, List[float]] = {}
+        self._vector_cache: Optional[Dict[str, List[float]]] = None
+        self.stats = {"routes": 0, "direct": 0, "fallback": 0, "llm_calls_saved": 0}
+
+    def build(self, agents: Dict[str, Any]):
+        """为已注册的 Agent 建立索引（agents: 名称 -> Agent）"""
+        postings: Dict[str, Dict[str, float]] = {}
+        self._documents = {}
+        for name, agent in agents.items():
+            texts = [name, getattr(agent, "description", "")]
+            for capability in getattr(agent, "capabilities", []):
+                texts.extend([capability.name, capability.description])
+                texts.extend(_schema_descriptions(capability.input_schema))
+            agent_type = getattr(getattr(agent, "agent_type", None), "value", None)
+            agent_keywords = self.keywords.get(agent_type, []) + self.keywords.get(name, [])
+            self._documents[name] = " ".join(texts + agent_keywords)
+
+            for term in index_terms(" ".join(texts)):
+                postings.setdefault(term, {})[name] = self.description_weight
+            for keyword in agent_keywords:
+                postings.setdefault(keyword.lower(), {})[name] = self.keyword_weight
+
+        self._postings = postings
+        self._automaton = AhoCorasick()
+        for term in postings:
+            self._automaton.add(term)
+        self._automaton.build()
+        self._vectors = {}
+
+    def _ensure_built(self, agents: Dict[str, Any]):
+        if set(agents) != set(self._documents):
+            self.build(agents)
+
+    def rank(self, query: str, agents: Dict[str, Any]) -> Dict[str, float]:
+        """按关键词证据为各 Agent 打分，返回 名称 -> 置信度（由高到低）"""
+        self._ensure_built(agents)
+        max_df = max(1, len(agents) // 2)
+        misses: Dict[str, float] = {}
+        for term in self._matched_terms(query):
+            postings = self._postings[term]
+            if len(postings) > max_df:
+                continue
+            for name, weight in postings.items():
+                misses[name] = misses.get(name, 1.0) * (1 - weight / len(postings))
+        scores = {name: 1 - miss for name, miss in misses.items()}
+        return dict(sorted(scores.items(), key=lambda item: item[1], reverse=True))
+
+    def _matched_terms(self, query: str) -> Set[str]:
+        return {term for _, _, term, _ in self._automaton.iter_matches(query.lower())}
+
+    async def _semantic_scores(self, query: str) -> Dict[str, float]:
+        """查询与各 Agent 能力文本的相似度，映射到 [0, 1]"""
+        if self.embedder is None:
+            return {}
+        await self._load_vectors()
+        query_vector = (await self.embedder([query]))[0]
+        floor = self.similarity_floor
+        return {name: max(0.0, (_cosine(query_vector, vector) - floor) / (1 - floor))
+                for name, vector in self._vectors.items()}
+
+    async def _load_vectors(self):
+        """计算缺失的能力文本向量（按内容哈希读写磁盘缓存，文件读写在线程池中进行，不阻塞事件循环）"""
+        if set(self._vectors) == set(self._documents):
+            return
+        if self._vector_cache is None:
+            cache = await asyncio.to_thread(self._read_vector_cache)
+            if self._vector_cache is None:
+                self._vector_cache = cache
+
+        keys = {name: hashlib.sha1(text.encode("utf-8")).hexdigest() for name, text in self._documents.items()}
+        missing = [name for name, key in keys.items() if key not in self._vector_cache]
+        if missing:
+            vectors = await self.embedder([self._documents[name] for name in missing])
+            for name, vector in zip(missing, vectors):
+                self._vector_cache[keys[name]] = list(vector)
+            if self.vector_path:
+                await asyncio.to_thread(self._write_vector_cache, dict(self._vector_cache))
+        self._vectors = {name: self._vector_cache[key] for name, key in keys.items()}
+
+    def _read_vector_cache(self) -> Dict[str, List[float]]:
+        if not self.vector_path or not os.path.exists(self.vector_path):
+            return {}
+        with open(self.vector_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_vector_cache(self, cache: Dict[str, List[float]]):
+        os.makedirs(os.path.dirname(os.path.abspath(self.vector_path)), exist_ok=True)
+        with open(self.vector_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+
+    async def route(self, query: str, agents: Dict[str, Any]) -> Optional[Dict[str, float]]:
+        """返回可直接调度的 Agent 及置信度；没有把握时返回 None（交给 PLAN 阶段）
+
+        要求至少一个 Agent 的置信度达到 min_confidence，并且查询中匹配到的每个有区分度的词
+        都属于被选中的 Agent，避免多意图查询只调度了其中一部分。
+        """
+        self.stats["routes"] += 1
+        scores = self.rank(query, agents)
+        semantic = await self._semantic_scores(query)
+        for name, similarity in semantic.items():
+            scores[name] = 1 - (1 - scores.get(name, 0.0)) * (1 - similarity * self.embedding_weight)
+
+        selected = {name: round(score, 3) for name, score in scores.items() if score >= self.min_confidence}
+        max_df = max(1, len(agents) // 2)
+        uncovered = [term for term in self._matched_terms(query)
+                     if len(self._postings[term]) <= max_df and not set(self._postings[term]) & set(selected)]
+        if not selected or uncovered:
+            self.stats["fallback"] += 1
+            return None
+
+        self.stats["direct"] += 1
+        self.stats["llm_calls_saved"] += 1
+        return dict(sorted(selected.items(), key=lambda item: item[1], reverse=True))
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "agents": len(self._documents),
+            "terms": len(self._postings),
+            "min_confidence": self.min_confidence,
+            "embeddings": self.embedder is not None
+        }
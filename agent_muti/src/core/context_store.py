@@ -0,0 +1,146 @@
+# multi_agent_system/core/context_store.py
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..utils.tokens import estimate_tokens
+
+
+def _json_default(value: Any) -> Any:
+    """json.dumps 遇到无法序列化的对象时调用，只处理这些节点而不遍历整棵树"""
+    if hasattr(value, "to_dict") and callable(getattr(value, "to_dict")):
+        return value.to_dict()
+    if asyncio.iscoroutine(value):
+        return f"<coroutine object at {hex(id(value))}>"
+    try:
+        return str(value)
+    except Exception:
+        return f"<object {type(value).__name__}>"
+
+
+def serialize(value: Any) -> str:
+    """序列化为 JSON 片段"""
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+@dataclass
+class _Entry:
+    fragment: str
+    tokens: int
+    version: int
+    summary: Optional[str] = None
+    summary_tokens: int = 0
+    compacted: bool = False
+
+    def render(self, full: bool) -> str:
+        return self.fragment if full and not self.compacted else self.summary
+
+    def cost(self, full: bool) -> int:
+        return self.tokens if full and not self.compacted else self.summary_tokens
+
+
+class ContextStore:
+    """增量上下文存储 - 为迭代提示词提供有 token 预算的上下文
+
+    每个键在写入时序列化一次并缓存 JSON 片段和 token 数；渲染时直接拼接缓存的片段。
+    render(since=...) 只输出指定版本之后变化的键的完整内容，其余键输出摘要。
+    总 token 数超过预算时，最旧的条目被压缩为摘要（固定键除外）。
+    """
+
+    def __init__(self, token_budget: int = 4000, summary_chars: int = 160,
+                 pinned_keys: Iterable[str] = ("last_query",)):
+        self.token_budget = token_budget
+        self.summary_chars = summary_chars
+        self.pinned_keys = set(pinned_keys)
+        self.version = 0
+        self.total_tokens = 0
+        self._entries: Dict[str, _Entry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def keys(self) -> List[str]:
+        return list(self._entries)
+
+    def set(self, key: str, value: Any):
+        """写入一个键（只序列化这一个值）"""
+        fragment = serialize(value)
+        previous = self._entries.get(key)
+        if previous is not None:
+            if previous.fragment == fragment:
+                return
+            self.total_tokens -= previous.cost(True)
+
+        self.version += 1
+        # 重新写入的键移到末尾，保证字典顺序即新旧顺序
+        self._entries.pop(key, None)
+        entry = self._entries[key] = _Entry(fragment, estimate_tokens(fragment), self.version)
+        self.total_tokens += entry.tokens
+        self._compact()
+
+    def update(self, values: Dict[str, Any]):
+        """批量写入"""
+        for key, value in values.items():
+            self.set(key, value)
+
+    def remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_tokens -= entry.cost(True)
+
+    def clear(self):
+        self._entries.clear()
+        self.total_tokens = 0
+
+    def mark(self) -> int:
+        """返回当前版本号，作为之后 render(since=...) 的游标"""
+        return self.version
+
+    def _summarize(self, entry: _Entry):
+        if entry.summary is not None:
+            return
+        if len(entry.fragment) <= self.summary_chars:
+            entry.summary = entry.fragment
+        else:
+            entry.summary = serialize(f"[摘要] {entry.fragment[:self.summary_chars]}…")
+        entry.summary_tokens = estimate_tokens(entry.summary)
+
+    def _compact(self):
+        """超出预算时从最旧的条目开始压缩为摘要"""
+        if self.total_tokens <= self.token_budget:
+            return
+        for key, entry in self._entries.items():
+            if self.total_tokens <= self.token_budget:
+                break
+            if entry.compacted or key in self.pinned_keys:
+                continue
+            self._summarize(entry)
+            entry.compacted = True
+            self.total_tokens += entry.summary_tokens - entry.tokens
+
+    def render(self, since: int = None) -> str:
+        """拼接缓存的片段为 JSON 对象；指定 since 时只有之后变化的键输出完整内容"""
+        parts = []
+        for key, entry in self._entries.items():
+            full = since is None or entry.version > since or key in self.pinned_keys
+            if not full or entry.compacted:
+                self._summarize(entry)
+            parts.append(f"{serialize(key)}: {entry.render(full)}")
+        return "{" + ", ".join(parts) + "}"
+
+    def changed_keys(self, since: int) -> List[str]:
+        """列出指定版本之后变化的键"""
+        return [key for key, entry in self._entries.items() if entry.version > since]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            "keys": len(self._entries),
+            "version": self.version,
+            "total_tokens": self.total_tokens,
+            "token_budget": self.token_budget,
+            "compacted_keys": [key for key, entry in self._entries.items() if entry.compacted]
+        }
@@ -0,0 +1,220 @@
+# multi_agent_system/core/conversation_memory.py
+import asyncio
+import json
+import os
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional
+
+# 滚动摘要函数：(已有摘要, 新移出内存的对话) -> 新摘要
+Summarizer = Callable[[str, List[Dict]], Awaitable[str]]
+
+
+def compact_turn(message: Dict[str, Any]) -> Dict[str, Any]:
+    """压缩单轮对话：完整的迭代数据只保留轮次、参与的 Agent 和置信度"""
+    turn = {key: message[key] for key in ("role", "content", "timestamp") if key in message}
+    iteration_data = message.get("iteration_data")
+    if isinstance(iteration_data, dict):
+        final_result = iteration_data.get("final_result") or {}
+        turn["iteration"] = {
+            "iterations": iteration_data.get("iteration_count"),
+            "agents": list((final_result.get("agent_responses") or {}).keys()),
+            "confidence": final_result.get("confidence_score")
+        }
+    return turn
+
+
+def format_turns(turns: List[Dict], content_chars: int = 200) -> str:
+    """对话转为摘要提示词中的文本，每轮截断到 content_chars 个字符"""
+    return "\n".join(f"{turn.get('role', 'user')}: {str(turn.get('content', ''))[:content_chars]}" for turn in turns)
+
+
+class ConversationMemory:
+    """分层对话记忆 - 内存占用不随对话轮数增长
+
+    - 最近 max_turns 轮保存在内存中（已压缩，不含完整迭代数据）
+    - 更早的轮次追加写入磁盘（每行一个紧凑 JSON，spill_path 为空时不落盘）；
+      写入在线程池中进行，文件句柄保持打开，不阻塞事件循环
+    - 每移出 summary_every 轮，后台生成一次滚动摘要，提示词中用摘要代替更早的对话；
+      未配置摘要函数或调用失败时，按截断拼接生成摘要
+    """
+
+    def __init__(self, max_turns: int = 20, spill_path: str = None, summarizer: Summarizer = None,
+                 summary_every: int = 10, summary_chars: int = 1200):
+        self.max_turns = max(1, max_turns)
+        self.spill_path = spill_path
+        self.summarizer = summarizer
+        self.summary_every = max(1, summary_every)
+        self.summary_chars = summary_chars
+        self.summary = ""
+        self.total_turns = 0
+        self._recent: Deque[Dict] = deque()
+        self._pending: List[Dict] = []  # 已移出内存、尚未并入摘要的轮次
+        self._summary_task: Optional[asyncio.Task] = None
+        self._spill_buffer: List[Dict] = []
+        self._spill_task: Optional[asyncio.Task] = None
+        self._spill_file = None
+        self.stats = {"spilled": 0, "summaries": 0, "summary_failures": 0}
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self._recent)
+
+    def __getitem__(self, index):
+        """按下标或切片读取内存中的最近轮次"""
+        if isinstance(index, slice):
+            return list(self._recent)[index]
+        return self._recent[index]
+
+    def append(self, message: Dict[str, Any]):
+        """追加一轮对话，超出内存容量的旧轮次落盘并等待并入摘要"""
+        self._recent.append(compact_turn(message))
+        self.total_turns += 1
+        evicted = []
+        while len(self._recent) > self.max_turns:
+            evicted.append(self._recent.popleft())
+        if not evicted:
+            return
+        self._spill(evicted)
+        self._pending.extend(evicted)
+        if len(self._pending) >= self.summary_every:
+            self._schedule_summary()
+
+    def history(self, limit: int = 10) -> List[Dict]:
+        """提示词使用的对话历史：滚动摘要 + 最近 limit 轮"""
+        turns = list(self._recent)[-limit:] if limit else []
+        summary = self._summary_text()
+        if summary:
+            return [{"role": "summary", "content": summary}] + turns
+        return turns
+
+    def _summary_text(self) -> str:
+        if not self._pending:
+            return self.summary
+        # 尚未并入摘要的轮次直接以截断文本附在摘要后
+        return self._fold(self.summary, self._pending)
+
+    def _fold(self, summary: str, turns: List[Dict]) -> str:
+        """不调用 LLM 的摘要：拼接后保留最近的 summary_chars 个字符"""
+        text = "\n".join(part for part in (summary, format_turns(turns, content_chars=80)) if part)
+        return text[-self.summary_chars:]
+
+    def _schedule_summary(self):
+        if self._summary_task is not None and not self._summary_task.done():
+            # 摘要生成跟不上时，直接截断合并积压的轮次，保证内存有界
+            if len(self._pending) >= 2 * self.summary_every:
+                self.summary = self._fold(self.summary, self._pending)
+                self._pending.clear()
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if self.summarizer is None or loop is None:
+            self.summary = self._fold(self.summary, self._pending)
+            self._pending.clear()
+            return
+        self._summary_task = loop.create_task(self._summarize(list(self._pending)))
+
+    async def _summarize(self, batch: List[Dict]):
+        try:
+            summary = await self.summarizer(self.summary, batch)
+            self.stats["summaries"] += 1
+            summary = (summary or "").strip()[:self.summary_chars] or self._fold(self.summary, batch)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️  对话摘要生成失败，使用截断摘要: {e}")
+            self.stats["summary_failures"] += 1
+            summary = self._fold(self.summary, batch)
+        # 摘要期间积压被截断合并时，批次中的轮次可能已不在 _pending 中
+        if self._pending[:len(batch)] == batch:
+            del self._pending[:len(batch)]
+            self.summary = summary
+
+    async def wait_for_summary(self):
+        """等待进行中的摘要生成完成"""
+        if self._summary_task is not None:
+            await asyncio.gather(self._summary_task, return_exceptions=True)
+
+    def _spill(self, turns: List[Dict]):
+        """追加写入磁盘（只追加，不改写）；在事件循环中时交给后台任务按顺序写入"""
+        if not self.spill_path:
+            return
+        self._spill_buffer.extend(turns)
+        if self._spill_task is not None and not self._spill_task.done():
+            return  # 进行中的写入任务会接着写出缓冲区
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None:
+            turns, self._spill_buffer = self._spill_buffer, []
+            self._write_spilled(turns)
+            return
+        self._spill_task = loop.create_task(self._flush_spilled())
+
+    async def _flush_spilled(self):
+        while self._spill_buffer:
+            turns, self._spill_buffer = self._spill_buffer, []
+            try:
+                await asyncio.to_thread(self._write_spilled, turns)
+            except OSError as e:
+                print(f"⚠️  对话记录落盘失败: {e}")
+
+    def _write_spilled(self, turns: List[Dict]):
+        if self._spill_file is None or self._spill_file.closed:
+            os.makedirs(os.path.dirname(os.path.abspath(self.spill_path)), exist_ok=True)
+            self._spill_file = open(self.spill_path, "a", encoding="utf-8")
+        self._spill_file.write("".join(
+            json.dumps(turn, ensure_ascii=False, separators=(",", ":"), default=str) + "\n" for turn in turns))
+        self._spill_file.flush()
+        self.stats["spilled"] += len(turns)
+
+    async def flush(self):
+        """等待缓冲的轮次全部写入磁盘"""
+        if self._spill_task is not None:
+            await asyncio.gather(self._spill_task, return_exceptions=True)
+
+    def read_spilled(self) -> Iterator[Dict]:
+        """按顺序读取已写入磁盘的轮次（在事件循环中请先 await flush()）"""
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        with open(self.spill_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def clear(self):
+        """清空内存中的对话和摘要（已落盘的记录保留）"""
+        if self._summary_task is not None and not self._summary_task.done():
+            self._summary_task.cancel()
+        self._summary_task = None
+        self._recent.clear()
+        self._pending.clear()
+        self.summary = ""
+
+    def close(self):
+        """取消摘要生成；写入任务完成后关闭落盘文件"""
+        if self._summary_task is not None and not self._summary_task.done():
+            self._summary_task.cancel()
+        self._summary_task = None
+        if self._spill_task is not None and not self._spill_task.done():
+            self._spill_task.add_done_callback(lambda _: self._close_spill_file())
+        else:
+            self._close_spill_file()
+
+    def _close_spill_file(self):
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "turns": self.total_turns,
+            "in_memory": len(self._recent),
+            "pending": len(self._pending),
+            "summary_chars": len(self.summary)
+        }
@@ -6,13 +6,82 @@ from typing import Dict, List, Any, Optional
 
 from ..models.agent_models import IterationStep, AgentResponse, AgentType
 from ..prompt.constants import  THINK_PROMPT, think_prompt, plan_prompt,PLAN_PROMPT,next_prompt,NEXT_PROMPT
+from ..prompt.constants import THINK_PLAN_PROMPT, think_plan_prompt
+from ..utils.tracing import span, traced
+from .action_scheduler import ActionScheduler, CompletionPolicy
+from .capability_index import CapabilityIndex
+from .context_store import ContextStore, serialize
+from .response_journal import ResponseJournal
+
+# THINK+PLAN 合并输出的结构（JSON Schema 子集：type / required / properties / items）
+THINK_PLAN_SCHEMA = {
+    "type": "object",
+    "required": ["analysis", "plan"],
+    "properties": {
+        "analysis": {
+            "type": "object",
+            "required": ["missing_info", "should_complete"],
+            "properties": {
+                "core_requirements": {"type": "array"},
+                "missing_info": {"type": "array"},
+                "confidence_level": {"type": "number"},
+                "should_complete": {"type": "boolean"},
+                "reasoning": {"type": "string"}
+            }
+        },
+        "plan": {
+            "type": "object",
+            "properties": {
+                "required_agents": {"type": "array", "items": {"type": "string"}},
+                "execution_sequence": {"type": "array"},
+                "dependencies": {"type": "object"},
+                "expected_outputs": {"type": "object"},
+                "strategy": {"type": "string"},
+                "iteration_goal": {"type": "string"}
+            }
+        }
+    }
+}
+
+_SCHEMA_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "number": (int, float)
+}
+
+
+def validate_schema(data: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """按 JSON Schema 子集校验数据，返回错误列表"""
+    expected = schema.get("type")
+    if expected:
+        python_type = _SCHEMA_TYPES[expected]
+        # bool 是 int 的子类，number 不接受布尔值
+        if not isinstance(data, python_type) or (expected == "number" and isinstance(data, bool)):
+            return [f"{path}: 应为 {expected}"]
+
+    errors = []
+    if isinstance(data, dict):
+        for key in schema.get("required", []):
+            if key not in data:
+                errors.append(f"{path}.{key}: 缺少字段")
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in data:
+                errors.extend(validate_schema(data[key], sub_schema, f"{path}.{key}"))
+    elif isinstance(data, list) and "items" in schema:
+        for index, item in enumerate(data):
+            errors.extend(validate_schema(item, schema["items"], f"{path}[{index}]"))
+    return errors
 
 
 class IterationController:
     """多轮迭代控制器"""
 
-    def __init__(self, max_iterations: int = 5):
+    def __init__(self, max_iterations: int = 5, max_concurrent_agents: int = 8, per_agent_concurrency: int = 1,
+                 context_token_budget: int = 4000, fused_think_plan: bool = False):
         self.max_iterations = max_iterations
+        self.fused_think_plan = fused_think_plan
         self.current_iteration = 0
         self.iteration_history: List[IterationStep] = []
         self.phase_timeouts = {
@@ -21,70 +90,116 @@ class IterationController:
             "action": 6000,
             "next": 1500
         }
+        self.scheduler = ActionScheduler(max_concurrent_agents, per_agent_concurrency)
+        self.completion_policy = CompletionPolicy()
+        # 完成策略满足后仍在执行的Agent任务，结果并入下一轮迭代的上下文
+        self._late_agents: Dict[str, asyncio.Task] = {}
+        # 提示词上下文：按键缓存序列化片段，各阶段只展开上次之后变化的键
+        self.context_store = ContextStore(token_budget=context_token_budget)
+        self._context_cursors: Dict[str, int] = {}
+        # 能力索引：首轮查询意图明确时直接调度 Agent，省去 PLAN 调用
+        self.capability_index: Optional[CapabilityIndex] = None
+        self.llm_calls_saved = 0
+        # Agent 响应日志：配置持久化消息日志时启用，崩溃重启后复用未完成查询的响应
+        self.response_journal: Optional[ResponseJournal] = None
 
     async def execute_iteration_cycle(self, query: str, context: Dict[str, Any],
                                       coordinator, available_agents: List[str]) -> Dict[str, Any]:
         """执行完整的迭代周期"""
         self.coordinator = coordinator
         self.current_iteration = 0
-        final_results = {}
+        # 历史只记录本次周期的步骤，避免长会话中无限增长
+        self.iteration_history = []
         execution_context = context or {}
+        self.context_store.clear()
+        self.context_store.update(execution_context)
+        self._context_cursors = {}
+        self.llm_calls_saved = 0
+
+        try:
+            result = await self._run_iterations(query, execution_context, coordinator, available_agents)
+        finally:
+            self.cancel_pending()
+        if self.response_journal is not None:
+            await self.response_journal.complete(query)
+        return result
+
+    async def _run_iterations(self, query: str, execution_context: Dict[str, Any],
+                              coordinator, available_agents: List[str]) -> Dict[str, Any]:
+        """执行迭代循环"""
+        final_results = {}
 
         while self.current_iteration < self.max_iterations:
             print(f"🔄 迭代 {self.current_iteration + 1}/{self.max_iterations}")
-
-            try:
-                # THINK 阶段 - 分析当前状态和需求
-                coordinator.set_step("think")
-                think_result = await self._think_phase(query, execution_context, coordinator)
-                self._record_step("think", think_result)
-
-                # 检查是否可以直接完成
-                if think_result.get("should_complete", False):
-                    final_results = think_result
-                    break
-
-                # PLAN 阶段 - 制定执行计划
-                coordinator.set_step("plan")
-                plan_result = await self._plan_phase(query, think_result, coordinator, available_agents)
-                self._record_step("plan", plan_result)
-
-                # ACTION 阶段 - 执行计划
-                coordinator.set_step("action")
-                action_result = await self._action_phase(plan_result, coordinator, execution_context)
-                self._record_step("action", action_result, action_result.get("agent_responses"))
-
-                # NEXT 阶段 - 决定下一步
-                coordinator.set_step("next")
-                next_result = await self._next_phase(query, action_result, coordinator)
-                self._record_step("next", next_result)
-
-                # 更新上下文
-                execution_context.update(action_result.get("updated_context", {}))
-
-                # 检查迭代终止条件
-                if next_result.get("should_terminate", False):
-                    final_results = action_result
-                    break
-
-            except Exception as e:
-                print(f"❌ 迭代 {self.current_iteration + 1} 失败: {e}")
-                # 记录错误但继续下一轮迭代
-                error_step = IterationStep(
-                    state="error",
-                    data={"error": str(e), "iteration": self.current_iteration + 1},
-                    timestamp=asyncio.get_event_loop().time()
-                )
-                self.iteration_history.append(error_step)
-
-                # 如果是最后一次迭代，返回错误信息
-                if self.current_iteration == self.max_iterations - 1:
-                    final_results = {
-                        "error": str(e),
-                        "agent_responses": {},
-                        "updated_context": execution_context
-                    }
-                    break
+            self._collect_late_results(execution_context)
+
+            with span("iteration", "iteration", iteration=self.current_iteration + 1):
+                try:
+                    # THINK+PLAN 合并模式 - 一次调用完成分析和规划，失败时回退到两次调用
+                    fused = None
+                    if self.fused_think_plan:
+                        coordinator.set_step("think_plan")
+                        fused = await self._think_plan_phase(query, coordinator, available_agents)
+
+                    if fused is not None:
+                        think_result, plan_result = fused
+                    else:
+                        # THINK 阶段 - 分析当前状态和需求
+                        coordinator.set_step("think")
+                        think_result = await self._think_phase(query, execution_context, coordinator)
+                        plan_result = None
+                    self._record_step("think", think_result)
+
+                    # 检查是否可以直接完成
+                    if think_result.get("should_complete", False):
+                        final_results = think_result
+                        break
+
+                    if plan_result is None and self.current_iteration == 0:
+                        # 首轮由能力索引直接路由，没有把握时再交给 PLAN 阶段
+                        plan_result = await self._route_phase(query, coordinator, available_agents)
+                    if plan_result is None:
+                        # PLAN 阶段 - 制定执行计划
+                        coordinator.set_step("plan")
+                        plan_result = await self._plan_phase(query, think_result, coordinator, available_agents)
+                    self._record_step("plan", plan_result)
+
+                    # ACTION 阶段 - 执行计划
+                    coordinator.set_step("action")
+                    action_result = await self._action_phase(plan_result, coordinator, execution_context, query)
+                    self._record_step("action", action_result, action_result.get("agent_responses"))
+
+                    # NEXT 阶段 - 决定下一步
+                    coordinator.set_step("next")
+                    next_result = await self._next_phase(query, action_result, coordinator)
+                    self._record_step("next", next_result)
+
+                    # 更新上下文
+                    execution_context.update(action_result.get("updated_context", {}))
+
+                    # 检查迭代终止条件
+                    if next_result.get("should_terminate", False):
+                        final_results = action_result
+                        break
+
+                except Exception as e:
+                    print(f"❌ 迭代 {self.current_iteration + 1} 失败: {e}")
+                    # 记录错误但继续下一轮迭代
+                    error_step = IterationStep(
+                        state="error",
+                        data={"error": str(e), "iteration": self.current_iteration + 1},
+                        timestamp=asyncio.get_event_loop().time()
+                    )
+                    self.iteration_history.append(error_step)
+
+                    # 如果是最后一次迭代，返回错误信息
+                    if self.current_iteration == self.max_iterations - 1:
+                        final_results = {
+                            "error": str(e),
+                            "agent_responses": {},
+                            "updated_context": execution_context
+                        }
+                        break
 
             self.current_iteration += 1
 
@@ -94,16 +209,21 @@ class IterationController:
         return {
             "final_result": final_results,
             "iteration_count": self.current_iteration + 1,
+            "llm_calls_saved": self.llm_calls_saved,
             "history": [step.to_dict() for step in self.iteration_history]
         }
 
+    @traced("think", category="phase")
     async def _think_phase(self, query: str, context: Dict, coordinator) -> Dict[str, Any]:
         """思考阶段 - 分析意图和当前状态"""
         try:
 
+            # 首轮展开全部上下文，之后只展开上次 THINK 以来变化的键，其余使用摘要
+            context_json = self.context_store.render(since=self._context_cursors.get("think"))
+            self._context_cursors["think"] = self.context_store.mark()
             prompt = think_prompt(
                 query=query,
-                context=json.dumps(context, ensure_ascii=False, default=str),
+                context=context_json,
                 iteration_count=self.current_iteration + 1
             )
 
@@ -112,19 +232,18 @@ class IterationController:
                 {"role": "user", "content": prompt}
             ]
 
+            timeout = self._phase_timeout("think", coordinator)
             analysis_text = await asyncio.wait_for(
-                coordinator._call_llm(messages, timeout=self.phase_timeouts["think"]),
-                timeout=self.phase_timeouts["think"] + 5
+                coordinator._call_llm(messages, timeout=timeout),
+                timeout=timeout + 5
             )
 
             try:
-                result = json.loads(analysis_text)
-                # 确保结果可序列化
-                return self._make_serializable(result)
+                return json.loads(analysis_text)
             except Exception:
                 return {
                     "core_requirements": [query],
-                    "acquired_info": self._make_serializable(context),
+                    "acquired_info": json.loads(context_json),
                     "missing_info": ["更多详细信息"],
                     "confidence_level": 0.3,
                     "should_complete": False,
@@ -142,6 +261,81 @@ class IterationController:
                 "reasoning": "分析超时，需要收集基础信息"
             }
 
+    @traced("think_plan", category="phase")
+    async def _think_plan_phase(self, query: str, coordinator, available_agents: List[str]) -> Optional[tuple]:
+        """思考+规划合并阶段 - 一次调用返回 (分析结果, 执行计划)，超时或输出不符合结构时返回 None"""
+        context_json = self.context_store.render(since=self._context_cursors.get("think"))
+        prompt = think_plan_prompt(
+            query=query,
+            context=context_json,
+            iteration_count=self.current_iteration + 1,
+            available_agents=available_agents
+        )
+        messages = [
+            {"role": "system", "content": THINK_PLAN_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        timeout = self._phase_timeout("think_plan", coordinator,
+                                      self.phase_timeouts["think"] + self.phase_timeouts["plan"])
+
+        try:
+            text = await asyncio.wait_for(
+                coordinator._call_llm(messages, timeout=timeout, max_tokens=1500,
+                                      response_format={"type": "json_object"}),
+                timeout=timeout + 5
+            )
+            result = json.loads(text)
+        except asyncio.TimeoutError:
+            print("⏰ Think+Plan 合并阶段超时，回退到两次调用")
+            return None
+        except (ValueError, TypeError) as e:
+            print(f"⚠️  Think+Plan 合并阶段输出无法解析，回退到两次调用: {e}")
+            return None
+
+        errors = validate_schema(result, THINK_PLAN_SCHEMA)
+        if not errors and not result["analysis"]["should_complete"]:
+            errors = [f"$.plan.{key}: 缺少字段" for key in ("required_agents", "execution_sequence")
+                      if key not in result["plan"]]
+        if errors:
+            print(f"⚠️  Think+Plan 合并阶段输出不符合结构，回退到两次调用: {errors[:3]}")
+            return None
+
+        self._context_cursors["think"] = self.context_store.mark()
+        analysis = result["analysis"]
+        plan = result["plan"]
+        plan.setdefault("expected_outputs", {})
+        plan.setdefault("strategy", "parallel")
+        plan.setdefault("iteration_goal", "收集缺失信息")
+        return analysis, plan
+
+    @traced("route", category="phase")
+    async def _route_phase(self, query: str, coordinator, available_agents: List[str]) -> Optional[Dict[str, Any]]:
+        """路由阶段 - 能力索引有把握时直接生成执行计划，否则返回 None"""
+        if self.capability_index is None:
+            return None
+        agents = {name: coordinator.agent_registry[name] for name in available_agents
+                  if name in coordinator.agent_registry}
+        try:
+            routing = await self.capability_index.route(query, agents)
+        except Exception as e:
+            print(f"⚠️  能力索引路由失败，使用 PLAN 阶段: {e}")
+            return None
+        if routing is None:
+            return None
+
+        self.llm_calls_saved += 1
+        print(f"⚡ 能力索引直接路由 {routing}，跳过 PLAN 调用")
+        required_agents = list(routing)
+        return {
+            "required_agents": required_agents,
+            "execution_sequence": [required_agents],
+            "expected_outputs": {},
+            "strategy": "parallel",
+            "iteration_goal": "按能力索引直接调度",
+            "routing": routing
+        }
+
+    @traced("plan", category="phase")
     async def _plan_phase(self, query: str, think_result: Dict, coordinator, available_agents: List[str]) -> Dict[
         str, Any]:
         """规划阶段 - 制定执行计划"""
@@ -151,7 +345,7 @@ class IterationController:
 
             prompt = plan_prompt(
                 query=query,
-                context=json.dumps(current_context, ensure_ascii=False, default=str),
+                context=serialize(current_context),
                 missing_info=missing_info,
                 available_agents=available_agents
             )
@@ -161,9 +355,10 @@ class IterationController:
                 {"role": "user", "content": prompt}
             ]
 
+            timeout = self._phase_timeout("plan", coordinator)
             plan_text = await asyncio.wait_for(
-                coordinator._call_llm(messages, timeout=self.phase_timeouts["plan"]),
-                timeout=self.phase_timeouts["plan"] + 5
+                coordinator._call_llm(messages, timeout=timeout),
+                timeout=timeout + 5
             )
 
             try:
@@ -174,8 +369,7 @@ class IterationController:
                 plan.setdefault("expected_outputs", {})
                 plan.setdefault("strategy", "parallel")
                 plan.setdefault("iteration_goal", "收集缺失信息")
-                # 确保结果可序列化
-                return self._make_serializable(plan)
+                return plan
             except Exception:
                 return {
                     "required_agents": available_agents,
@@ -195,61 +389,90 @@ class IterationController:
                 "iteration_goal": "超时后备计划"
             }
 
-    async def _action_phase(self, plan: Dict, coordinator, context: Dict) -> Dict[str, Any]:
-        """执行阶段 - 调用Agent执行计划"""
-        required_agents = plan.get("required_agents", [])
-        expected_outputs = plan.get("expected_outputs", {})
-        execution_sequence = plan.get("execution_sequence", [required_agents])
+    @traced("action", category="phase")
+    async def _action_phase(self, plan: Dict, coordinator, context: Dict, query: str = "") -> Dict[str, Any]:
+        """执行阶段 - 按执行序列构建依赖图并调度Agent"""
+        required_agents = plan.get("required_agents") or ActionScheduler.sequence_agents(plan)
+        expected_outputs = plan.get("expected_outputs") or {}
+
+        runnable = []
+        for agent_name in required_agents:
+            if agent_name in self._late_agents:
+                print(f"⏳ Agent {agent_name} 仍在执行上一轮任务，本轮跳过")
+            elif agent_name in coordinator.agent_registry:
+                runnable.append(agent_name)
+            else:
+                print(f"⚠️  Agent {agent_name} 未注册，已跳过")
+        graph = ActionScheduler.build_graph(plan, runnable)
 
         agent_responses = {}
         updated_context = context.copy()
-
-        # 按序列执行
-        tasks = []
-        for agent_name in required_agents:
-            if agent_name in coordinator.agent_registry:
-                agent = coordinator.agent_registry[agent_name]
-                prompt = expected_outputs[agent_name]
-                # 为每个Agent任务设置超时
-                task = asyncio.wait_for(
-                    agent.process_request(prompt, updated_context),
-                    timeout=self.phase_timeouts["action"]
+        self._context_cursors["action"] = self.context_store.mark()
+
+        async def execute(agent_name: str):
+            agent = coordinator.agent_registry[agent_name]
+            prompt = self._agent_prompt(expected_outputs.get(agent_name), query)
+            # 启动时的上下文快照已包含所有已完成的上游Agent输出
+            result = await asyncio.wait_for(
+                self._run_agent(agent_name, agent, prompt, dict(updated_context), query),
+                timeout=self.phase_timeouts["action"]
+            )
+            if isinstance(result, AgentResponse):
+                # 更新上下文并确保数据可序列化，下游Agent启动时即可读取
+                updated_context[agent_name] = self._make_serializable(result.data)
+                self.context_store.set(agent_name, updated_context[agent_name])
+            return result
+
+        results, late_agents = await self.scheduler.run_until(graph, execute, self.completion_policy)
+        self._late_agents.update(late_agents)
+        for agent_name, result in results.items():
+            if isinstance(result, AgentResponse):
+                agent_responses[agent_name] = result
+            elif isinstance(result, Exception):
+                print(f"❌ Agent {agent_name} 执行错误: {result}")
+                agent_responses[agent_name] = AgentResponse(
+                    agent_type=AgentType.CUSTOM,
+                    content=f"执行错误: {str(result)}",
+                    data={},
+                    confidence=0.0
                 )
-                tasks.append(task)
-
-        # 并行执行任务组
-        if tasks:
-            try:
-                task_results = await asyncio.gather(*tasks, return_exceptions=True)
-                for agent_name, result in zip(required_agents, task_results):
-                    if isinstance(result, AgentResponse):
-                        agent_responses[agent_name] = result
-                        # 更新上下文并确保数据可序列化
-                        updated_context[agent_name] = self._make_serializable(result.data)
-                    elif isinstance(result, Exception):
-                        print(f"❌ Agent {agent_name} 执行错误: {result}")
-                        agent_responses[agent_name] = AgentResponse(
-                            agent_type=AgentType.CUSTOM,
-                            content=f"执行错误: {str(result)}",
-                            data={},
-                            confidence=0.0
-                        )
-            except Exception as e:
-                print(f"❌ 任务组执行失败: {e}")
 
         return {
             "agent_responses": agent_responses,
             "updated_context": updated_context,
-            "plan_executed": plan
+            "plan_executed": plan,
+            "pending_agents": [name for name in graph if name not in results]
         }
 
+    @staticmethod
+    def _agent_prompt(expected_output, query: str) -> str:
+        """计划未给出期望输出时使用原始查询"""
+        if not expected_output:
+            return query
+        if isinstance(expected_output, str):
+            return expected_output
+        return json.dumps(expected_output, ensure_ascii=False, default=str)
+
+    async def _run_agent(self, agent_name: str, agent, prompt: str, context: Dict, query: str = "") -> AgentResponse:
+        """执行单个Agent（记录追踪区间）；响应日志中有崩溃前的响应时直接复用"""
+        journal = self.response_journal
+        if journal is not None:
+            recovered = journal.take(query, agent_name, prompt)
+            if recovered is not None:
+                return recovered
+        with span(f"agent:{agent_name}", "agent", agent=agent_name):
+            response = await agent.process_request(prompt, context)
+        if journal is not None and isinstance(response, AgentResponse):
+            await journal.record(query, agent_name, prompt, response)
+        return response
+
+    @traced("next", category="phase")
     async def _next_phase(self, query: str, action_result: Dict, coordinator) -> Dict[str, Any]:
         """下一步决策阶段"""
         try:
             agent_responses = action_result.get("agent_responses", {})
-            updated_context = action_result.get("updated_context", {})
-
-            context = json.dumps(updated_context, ensure_ascii=False, default=str)
+            # 本轮 ACTION 新增的信息完整展开，之前的信息使用摘要
+            context = self.context_store.render(since=self._context_cursors.get("action"))
             agent_responses_context = json.dumps({k: v.content for k, v in agent_responses.items()}, ensure_ascii=False)
 
             prompt = next_prompt(query, context, agent_responses_context)
@@ -258,15 +481,14 @@ class IterationController:
                 {"role": "user", "content": prompt}
             ]
 
+            timeout = self._phase_timeout("next", coordinator)
             next_text = await asyncio.wait_for(
-                coordinator._call_llm(messages, timeout=self.phase_timeouts["next"]),
-                timeout=self.phase_timeouts["next"] + 5
+                coordinator._call_llm(messages, timeout=timeout),
+                timeout=timeout + 5
             )
 
             try:
-                result = json.loads(next_text)
-                # 确保结果可序列化
-                return self._make_serializable(result)
+                return json.loads(next_text)
             except Exception:
                 return {
                     "should_terminate": len(agent_responses) > 0,
@@ -325,6 +547,58 @@ class IterationController:
         
         return data
 
+    def _collect_late_results(self, context: Dict[str, Any]) -> Dict[str, AgentResponse]:
+        """把上一轮迟到但已完成的Agent结果并入上下文"""
+        collected = {}
+        for agent_name, task in list(self._late_agents.items()):
+            if not task.done():
+                continue
+            del self._late_agents[agent_name]
+            result = None if task.cancelled() else task.result()
+            if isinstance(result, AgentResponse):
+                context[agent_name] = self._make_serializable(result.data)
+                self.context_store.set(agent_name, context[agent_name])
+                collected[agent_name] = result
+        if collected:
+            print(f"📥 并入迟到的Agent结果: {list(collected)}")
+        return collected
+
+    def cancel_pending(self):
+        """取消仍在后台执行的Agent任务（迭代周期结束或会话关闭时调用）"""
+        for task in self._late_agents.values():
+            task.cancel()
+        self._late_agents.clear()
+
+    def spawn(self) -> "IterationController":
+        """创建新的控制器（每个会话一个）：迭代状态、上下文与未完成的Agent任务独立，
+        配置、调度器（全局与单个Agent的并发上限）和能力索引与当前控制器共用"""
+        controller = IterationController(self.max_iterations, fused_think_plan=self.fused_think_plan,
+                                         context_token_budget=self.context_store.token_budget)
+        controller.phase_timeouts = self.phase_timeouts
+        controller.scheduler = self.scheduler
+        controller.completion_policy = self.completion_policy
+        controller.capability_index = self.capability_index
+        controller.response_journal = self.response_journal
+        return controller
+
+    def set_completion_policy(self, policy: CompletionPolicy):
+        """设置ACTION阶段的完成策略"""
+        self.completion_policy = policy
+        print(f"🏁 设置ACTION完成策略: {policy.mode}")
+
+    def set_concurrency_limits(self, max_concurrent_agents: int, per_agent_concurrency: int = 1):
+        """设置Agent执行的全局并发上限和单个Agent并发上限"""
+        self.scheduler = ActionScheduler(max_concurrent_agents, per_agent_concurrency)
+        print(f"🚦 设置Agent并发上限: 全局 {max_concurrent_agents}，单个Agent {per_agent_concurrency}")
+
+    def _phase_timeout(self, phase: str, coordinator, default: float = None) -> float:
+        """阶段超时：协调器配置了对冲策略时按观测到的延迟分位数自适应，上限为配置值"""
+        default = self.phase_timeouts[phase] if default is None else default
+        hedging = getattr(coordinator, "hedging", None)
+        if hedging is None:
+            return default
+        return hedging.timeout_for(phase, default)
+
     def set_phase_timeout(self, phase: str, timeout: int):
         """设置阶段超时时间"""
         if phase in self.phase_timeouts:
@@ -0,0 +1,83 @@
+# multi_agent_system/core/response_journal.py
+import asyncio
+import hashlib
+from typing import Any, Dict, Optional
+
+from ..models.agent_models import AgentResponse
+from ..utils.message_bus import MessageBus, MessageType, MessageChannels
+
+
+def response_key(*parts: str) -> str:
+    """跨进程重启保持不变的键：各部分拼接后取 SHA-256"""
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResponseJournal:
+    """Agent 响应日志 - ACTION 阶段的 Agent 响应写入 agent.responses 频道，由总线的持久化日志落盘
+
+    记录以 查询 + Agent + 任务 的哈希为键，查询完成后追加完成标记。崩溃重启后 load() 重放日志，
+    未完成查询的响应在再次执行到同一查询、同一 Agent、同一任务时直接取用（每条只用一次），无需重新调用 LLM。
+    """
+
+    def __init__(self, message_bus: MessageBus, channel: str = MessageChannels.AGENT_RESPONSES):
+        self.message_bus = message_bus
+        self.channel = channel
+        self._recovered: Dict[str, AgentResponse] = {}
+        self.stats = {"recorded": 0, "recovered": 0, "reused": 0}
+
+    async def load(self) -> int:
+        """从持久化日志恢复未完成查询的 Agent 响应，返回恢复的数量"""
+        if self.message_bus.message_log is None:
+            return 0
+        self._recovered = await asyncio.to_thread(self._replay)
+        self.stats["recovered"] = len(self._recovered)
+        if self._recovered:
+            print(f"♻️  从消息日志恢复 {len(self._recovered)} 个未完成查询的Agent响应")
+        return len(self._recovered)
+
+    def _replay(self) -> Dict[str, AgentResponse]:
+        by_query: Dict[str, Dict[str, AgentResponse]] = {}
+        for _, message in self.message_bus.message_log.replay(self.channel):
+            payload = message.payload or {}
+            query_key = payload.get("query_key")
+            if not query_key:
+                continue  # 其他请求-响应流量，关联ID只在当次运行有效
+            if payload.get("completed"):
+                by_query.pop(query_key, None)
+            else:
+                by_query.setdefault(query_key, {})[message.correlation_id] = AgentResponse.from_dict(payload["response"])
+        return {key: response for responses in by_query.values() for key, response in responses.items()}
+
+    def take(self, query: str, agent_name: str, task: str) -> Optional[AgentResponse]:
+        """取出恢复的响应（取出后不再复用）"""
+        response = self._recovered.pop(response_key(query, agent_name, task), None)
+        if response is not None:
+            self.stats["reused"] += 1
+            print(f"♻️  复用日志中的 {agent_name} 响应，跳过调用")
+        return response
+
+    async def record(self, query: str, agent_name: str, task: str, response: AgentResponse):
+        """记录成功的 Agent 响应（置信度为 0 的错误响应不记录，重启后重新执行）"""
+        if response.confidence <= 0:
+            return
+        await self._publish({
+            "query_key": response_key(query),
+            "agent_name": agent_name,
+            "response": response.to_dict()
+        }, correlation_id=response_key(query, agent_name, task))
+        self.stats["recorded"] += 1
+
+    async def complete(self, query: str):
+        """查询完成后追加完成标记，此前记录的响应不再参与恢复"""
+        await self._publish({"query_key": response_key(query), "completed": True})
+
+    async def _publish(self, payload: Dict[str, Any], correlation_id: str = None):
+        await self.message_bus.publish(
+            channel=self.channel,
+            message_type=MessageType.AGENT_RESPONSE,
+            payload=payload,
+            correlation_id=correlation_id
+        )
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {**self.stats, "pending": len(self._recovered)}
@@ -0,0 +1,152 @@
+# multi_agent_system/core/session_manager.py
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from .conversation_memory import ConversationMemory
+from .iteration_controller import IterationController
+
+
+class ConversationSession:
+    """会话状态 - 对话记忆与迭代状态（当前轮次、历史、上下文），与共享的 Agent 注册表分离
+
+    同一会话的请求按顺序处理（lock），不同会话可以并发。
+    """
+
+    def __init__(self, session_id: str, iteration_controller: IterationController,
+                 conversation_memory: ConversationMemory = None):
+        self.session_id = session_id
+        self.iteration_controller = iteration_controller
+        self.conversation_memory = conversation_memory if conversation_memory is not None else ConversationMemory()
+        self.lock = asyncio.Lock()
+        self.created_at = time.time()
+        self.last_active = time.monotonic()
+        self.requests = 0
+        self.active = 0  # 正在处理或排队的请求数，大于 0 时不会被淘汰
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    def close(self):
+        """释放会话：取消仍在后台执行的Agent任务和摘要生成"""
+        self.iteration_controller.cancel_pending()
+        self.conversation_memory.close()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "requests": self.requests,
+            "conversation_memory": self.conversation_memory.get_statistics(),
+            "idle_seconds": round(time.monotonic() - self.last_active, 3),
+            "active": self.active
+        }
+
+
+class SessionManager:
+    """会话管理器 - 按会话 ID 创建/复用会话
+
+    - 会话数超过 max_sessions 时淘汰最久未使用的空闲会话（LRU），空闲超过 idle_timeout 秒的会话也会被淘汰
+    - 同时处理的会话请求数不超过 max_concurrent，超出的请求排队等待
+    """
+
+    def __init__(self, factory: Callable[[str], ConversationSession], max_sessions: int = 1000,
+                 max_concurrent: int = 16, idle_timeout: Optional[float] = None):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.max_concurrent = max_concurrent
+        self.idle_timeout = idle_timeout
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.active = 0
+        self.waiting = 0
+        self.stats = {"created": 0, "evicted": 0, "expired": 0, "requests": 0, "peak_active": 0}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get(self, session_id: str) -> ConversationSession:
+        """获取会话，不存在时创建"""
+        self._expire()
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = self.factory(session_id)
+            self.stats["created"] += 1
+        self._sessions.move_to_end(session_id)
+        session.touch()
+        self._evict(keep=session_id)
+        return session
+
+    @asynccontextmanager
+    async def acquire(self, session_id: str) -> AsyncIterator[ConversationSession]:
+        """占用一个并发名额处理该会话的请求"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        session = self.get(session_id)
+        session.active += 1
+        self.waiting += 1
+        acquired = False
+        try:
+            await self._slots.acquire()
+            acquired = True
+            self.waiting -= 1
+            self.active += 1
+            self.stats["peak_active"] = max(self.stats["peak_active"], self.active)
+            self.stats["requests"] += 1
+            session.requests += 1
+            yield session
+        finally:
+            if acquired:
+                self.active -= 1
+                self._slots.release()
+            else:
+                self.waiting -= 1  # 排队时被取消
+            session.active -= 1
+            session.touch()
+            self._evict()
+
+    def close(self, session_id: str) -> bool:
+        """结束会话"""
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        return True
+
+    def close_all(self):
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+
+    def _evict(self, keep: str = None):
+        """超过会话数上限时按 LRU 淘汰空闲会话（正在处理请求的会话保留）"""
+        while len(self._sessions) > self.max_sessions:
+            victim = next((session_id for session_id, session in self._sessions.items()
+                           if not session.active and session_id != keep), None)
+            if victim is None:
+                return
+            self._sessions.pop(victim).close()
+            self.stats["evicted"] += 1
+
+    def _expire(self):
+        if not self.idle_timeout:
+            return
+        deadline = time.monotonic() - self.idle_timeout
+        for session_id, session in list(self._sessions.items()):
+            if session.last_active <= deadline and not session.active:
+                self._sessions.pop(session_id).close()
+                self.stats["expired"] += 1
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "sessions": len(self._sessions),
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_sessions": self.max_sessions,
+            "max_concurrent": self.max_concurrent
+        }
@@ -0,0 +1,104 @@
+# multi_agent_system/core/session_server.py
+import asyncio
+import json
+from typing import Any, Dict, Optional
+
+from .context_store import serialize
+
+
+class SessionServer:
+    """会话服务 - 基于 asyncio 的 JSON Lines 服务，多个会话共享同一个系统实例和 LLM 客户端池
+
+    每行一个请求：{"session_id": "...", "query": "...", "stream": true}
+    响应：流式时先逐行返回 {"type": "delta", "content": "..."}，最后返回
+    {"type": "response", "session_id": "...", "response": {...}}；出错时返回 {"type": "error", "error": "..."}。
+    {"type": "close", "session_id": "..."} 结束会话。同一连接上的请求依次处理，不同连接并发。
+    """
+
+    def __init__(self, system, host: str = "127.0.0.1", port: int = 8765):
+        self.system = system
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.connections = 0
+        self.stats = {"connections": 0, "requests": 0, "errors": 0}
+
+    async def start(self):
+        """启动服务"""
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"🌐 会话服务已启动: {self.host}:{self.port}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """关闭服务"""
+        if self._server is None:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+        print("🛑 会话服务已关闭")
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self.stats["connections"] += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                await self._handle_line(line, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _handle_line(self, line: bytes, writer: asyncio.StreamWriter):
+        try:
+            request = json.loads(line)
+            session_id = str(request.get("session_id") or "default")
+            if request.get("type") == "close":
+                closed = self.system.session_manager.close(session_id)
+                await self._send(writer, {"type": "closed", "session_id": session_id, "closed": closed})
+                return
+            query = request["query"]
+        except (ValueError, KeyError, AttributeError) as e:
+            self.stats["errors"] += 1
+            await self._send(writer, {"type": "error", "error": f"无效请求: {e}"})
+            return
+
+        self.stats["requests"] += 1
+        try:
+            stream = self.system.process_query_stream(query, session_id=session_id)
+            try:
+                async for delta in stream:
+                    if request.get("stream", True):
+                        await self._send(writer, {"type": "delta", "content": delta})
+            finally:
+                await stream.aclose()
+            await self._send(writer, {"type": "response", "session_id": session_id,
+                                      "response": stream.response})
+        except ConnectionError:
+            raise
+        except Exception as e:
+            self.stats["errors"] += 1
+            await self._send(writer, {"type": "error", "session_id": session_id, "error": str(e)})
+
+    async def _send(self, writer: asyncio.StreamWriter, message: Dict[str, Any]):
+        writer.write(serialize(message).encode("utf-8") + b"\n")
+        await writer.drain()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {**self.stats, "open_connections": self.connections}
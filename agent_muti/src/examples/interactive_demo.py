@@ -10,18 +10,20 @@ from ..core.agent_system import EnhancedDynamicAgentSystem
 from ..models.agent_models import AgentResponse
 
 
-async def interactive_demo():
-    """交互式演示"""
-    api_key = "your_openai_api_key_here"  # 替换为你的实际 API 密钥
+async def interactive_demo(system: EnhancedDynamicAgentSystem = None):
+    """交互式演示（传入已初始化的系统时复用它，退出时由调用方关闭）"""
+    owns_system = system is None
+    if owns_system:
+        api_key = "your_openai_api_key_here"  # 替换为你的实际 API 密钥
 
-    if api_key == "your_openai_api_key_here":
-        print("❌ 请设置有效的 OpenAI API 密钥")
-        print("请在 interactive_demo.py 中设置你的 API 密钥")
-        return
+        if api_key == "your_openai_api_key_here":
+            print("❌ 请设置有效的 OpenAI API 密钥")
+            print("请在 interactive_demo.py 中设置你的 API 密钥")
+            return
 
-    # 创建系统
-    system = EnhancedDynamicAgentSystem(api_key)
-    await system.initialize_system()
+        # 创建系统
+        system = EnhancedDynamicAgentSystem(api_key)
+        await system.initialize_system()
 
     print("🤖 增强多Agent旅行规划系统")
     print("=" * 60)
@@ -51,6 +53,8 @@ async def interactive_demo():
                 print("🔧 系统状态:")
                 print(f"   已注册Agent: {status['registered_agents']}")
                 print(f"   对话记忆: {status['conversation_memory']} 条")
+                memory = status['conversation_memory_stats']
+                print(f"   对话总轮数: {memory['turns']}, 已落盘: {memory['spilled']}, 滚动摘要: {memory['summaries']} 次")
                 print(f"   系统健康: {status['system_health']['status']}")
                 if status['system_health']['issues']:
                     print(f"   问题: {status['system_health']['issues']}")
@@ -62,6 +66,9 @@ async def interactive_demo():
                 print(f"   成功率: {report['overall_metrics']['success_rate']:.1f}%")
                 print(f"   平均响应时间: {report['overall_metrics']['average_response_time']:.2f}秒")
                 print(f"   最大并发Agent: {report['overall_metrics']['max_concurrent_agents']}")
+                time_to_first_token = report['overall_metrics']['time_to_first_token']
+                if time_to_first_token['count']:
+                    print(f"   首字延迟: p50 {time_to_first_token['p50']:.2f}秒, p90 {time_to_first_token['p90']:.2f}秒")
 
                 if report['agent_performance']:
                     print("\n   Agent性能:")
@@ -84,13 +91,25 @@ async def interactive_demo():
                 continue
 
             print("🔄 多轮迭代规划中...")
-            response = await system.process_query(user_input)
-
-            print(f"\n🎯 最终回答:")
-            print(f"{response.content}")
+            # 最终回答逐段输出，不必等待整个总结生成完毕
+            stream = system.process_query_stream(user_input)
+            answering = False
+            try:
+                async for delta in stream:
+                    if not answering:
+                        print(f"\n🎯 最终回答:")
+                        answering = True
+                    print(delta, end="", flush=True)
+            finally:
+                await stream.aclose()
+            response = stream.response
 
             print(f"\n📈 执行统计:")
+            if response.metadata.get('time_to_first_token') is not None:
+                print(f"• 首字延迟: {response.metadata['time_to_first_token']:.2f}秒")
             print(f"• 迭代轮次: {response.metadata.get('iterations')}")
+            if response.metadata.get('llm_calls_saved'):
+                print(f"• 能力索引省去 LLM 调用: {response.metadata['llm_calls_saved']} 次")
             print(f"• 完成原因: {response.metadata.get('completion_reason')}")
             print(f"• 整体置信度: {response.confidence:.2f}")
             print(f"• 使用Agent: {', '.join(response.data.get('agent_registry', []))}")
@@ -101,7 +120,8 @@ async def interactive_demo():
         except Exception as e:
             print(f"❌ 系统错误: {e}")
 
-    await system.shutdown_system()
+    if owns_system:
+        await system.shutdown_system()
 
 
 if __name__ == "__main__":
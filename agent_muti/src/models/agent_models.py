@@ -1,7 +1,7 @@
 # multi_agent_system/models/agent_models.py
 from dataclasses import dataclass, asdict
 from enum import Enum
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Any, Optional, Union
 import json
 from datetime import datetime
 
@@ -41,6 +41,45 @@ class AgentResponse:
         """转换为JSON字符串"""
         return json.dumps(self.to_dict(), ensure_ascii=False, default=str)
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AgentResponse":
+        """从字典创建响应"""
+        return cls(
+            agent_type=AgentType(data["agent_type"]),
+            content=data["content"],
+            data=data.get("data") or {},
+            confidence=data.get("confidence", 0.0),
+            metadata=data.get("metadata") or None
+        )
+
+
+class StreamingResponse:
+    """流式响应 - 异步迭代得到内容片段，迭代结束后 response 为完整的 AgentResponse
+
+    source 依次产出 str 片段，最后产出一个 AgentResponse。
+    """
+
+    def __init__(self, source: AsyncIterator[Union[str, AgentResponse]]):
+        self._source = source
+        self.response: Optional[AgentResponse] = None
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        async for item in self._source:
+            if isinstance(item, AgentResponse):
+                self.response = item
+            else:
+                yield item
+
+    async def collect(self) -> AgentResponse:
+        """消费全部片段并返回完整响应"""
+        async for _ in self:
+            pass
+        return self.response
+
+    async def aclose(self):
+        """提前结束时关闭底层生成器，释放其占用的资源"""
+        await self._source.aclose()
+
 
 @dataclass
 class AgentCapability:
@@ -5,6 +5,7 @@ from typing import Dict, Any, List
 
 from ..agents.plugin_agent import PluginAgent
 from ..models.agent_models import AgentType, AgentResponse, AgentCapability
+from ..utils.query_features import query_features
 
 
 class AttractionAgent(PluginAgent):
@@ -86,9 +87,10 @@ class AttractionAgent(PluginAgent):
         }
 
     async def process_request(self, query: str, context: Dict[str, Any] = None) -> AgentResponse:
-        # 从查询中提取城市和天数信息
-        city = self._extract_city(query)
-        days = self._extract_days(query)
+        # 使用请求级的查询特征
+        features = query_features(query, context)
+        city = features.city or "北京"  # 默认城市
+        days = features.days or 2  # 默认2天
 
         # 执行景点查询
         attraction_data = await self.execute_plugin("attraction_query", city=city, days=days)
@@ -108,28 +110,6 @@ class AttractionAgent(PluginAgent):
             confidence=0.9
         )
 
-    def _extract_city(self, query: str) -> str:
-        """从查询中提取城市信息"""
-        cities = ["北京", "上海", "广州", "深圳", "杭州", "成都", "武汉", "西安"]
-        for city in cities:
-            if city in query:
-                return city
-        return "北京"  # 默认城市
-    
-    def _extract_days(self, query: str) -> int:
-        """从查询中提取游玩天数"""
-        if "一天" in query or "1天" in query:
-            return 1
-        elif "两天" in query or "2天" in query:
-            return 2
-        elif "三天" in query or "3天" in query:
-            return 3
-        elif "四天" in query or "4天" in query:
-            return 4
-        elif "五天" in query or "5天" in query:
-            return 5
-        return 2  # 默认2天
-
     def _query_attraction(self, city: str, days: int = 2) -> Dict[str, Any]:
         """查询景点信息（模拟）"""
         # 获取城市景点列表，如果城市不存在则使用默认景点
@@ -5,13 +5,17 @@ from typing import Dict, Any
 
 from ..agents.plugin_agent import PluginAgent
 from ..models.agent_models import AgentType, AgentResponse, AgentCapability
+from ..utils.query_features import query_features
 
 
 class BudgetAgent(PluginAgent):
     """预算分析 Agent 插件"""
 
-    def __init__(self):
+    def __init__(self, default_days: int = 3, default_travelers: int = 2):
         super().__init__(AgentType.BUDGET, "预算分析师", "提供专业的旅行预算分析和成本优化建议")
+        # 查询中没有提到天数/人数时使用（agents.budget.default_days / default_travelers）
+        self.default_days = default_days
+        self.default_travelers = default_travelers
 
         # 注册预算分析插件
         budget_capability = AgentCapability(
@@ -38,9 +42,10 @@ class BudgetAgent(PluginAgent):
         self.register_plugin("budget_analysis", self._analyze_budget, budget_capability)
 
     async def process_request(self, query: str, context: Dict[str, Any] = None) -> AgentResponse:
-        days = self._extract_days(query)
-        travelers = self._extract_travelers(query)
-        city = self._extract_city(query)
+        features = query_features(query, context)
+        days = features.days or self.default_days
+        travelers = features.travelers or self.default_travelers
+        city = features.city or "北京"  # 默认城市
 
         # 执行预算分析
         budget_data = await self.execute_plugin(
@@ -65,44 +70,6 @@ class BudgetAgent(PluginAgent):
             confidence=0.8
         )
 
-    def _extract_days(self, query: str) -> int:
-        """从查询中提取旅行天数"""
-        if "三天" in query or "3天" in query:
-            return 3
-        elif "五天" in query or "5天" in query:
-            return 5
-        elif "七天" in query or "7天" in query:
-            return 7
-        elif "一天" in query or "1天" in query:
-            return 1
-        elif "两天" in query or "2天" in query:
-            return 2
-        else:
-            return random.randint(3, 7)  # 默认3-7天
-
-    def _extract_travelers(self, query: str) -> int:
-        """从查询中提取旅行人数"""
-        if "一人" in query or "1人" in query:
-            return 1
-        elif "两人" in query or "2人" in query:
-            return 2
-        elif "三人" in query or "3人" in query:
-            return 3
-        elif "四人" in query or "4人" in query:
-            return 4
-        elif "五人" in query or "5人" in query:
-            return 5
-        else:
-            return random.randint(1, 4)  # 默认1-4人
-
-    def _extract_city(self, query: str) -> str:
-        """从查询中提取城市信息"""
-        cities = ["北京", "上海", "广州", "深圳", "杭州", "成都", "武汉", "西安"]
-        for city in cities:
-            if city in query:
-                return city
-        return "北京"  # 默认城市
-
     def _analyze_budget(self, days: int, travelers: int, city: str = "北京") -> Dict[str, Any]:
         """分析预算（模拟）"""
         # 生成预算分析
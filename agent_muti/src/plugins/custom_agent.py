@@ -5,6 +5,7 @@ from typing import List, Dict, Any
 
 from ..agents.plugin_agent import PluginAgent
 from ..models.agent_models import AgentType, AgentResponse, AgentCapability
+from ..utils.query_features import query_features
 
 
 class HotelAgent(PluginAgent):
@@ -39,9 +40,10 @@ class HotelAgent(PluginAgent):
         self.register_plugin("hotel_query", self._query_hotels, hotel_capability)
 
     async def process_request(self, query: str, context: Dict[str, Any] = None) -> AgentResponse:
-        # 从查询中提取城市信息
-        city = self._extract_city(query)
-        budget = self._extract_budget(query)
+        # 使用请求级的查询特征
+        features = query_features(query, context)
+        city = features.city or "北京"  # 默认城市
+        budget = self.TIER_BUDGETS.get(features.price_tier, 500)  # 默认中等预算
 
         # 执行酒店查询
         hotel_data = await self.execute_plugin("hotel_query", city=city, budget=budget)
@@ -61,22 +63,8 @@ class HotelAgent(PluginAgent):
             confidence=0.85
         )
 
-    def _extract_city(self, query: str) -> str:
-        """从查询中提取城市信息"""
-        cities = ["北京", "上海", "广州", "深圳", "杭州", "成都", "武汉", "西安"]
-        for city in cities:
-            if city in query:
-                return city
-        return "北京"  # 默认城市
-
-    def _extract_budget(self, query: str) -> int:
-        """从查询中提取预算信息"""
-        if "豪华" in query or "五星" in query:
-            return 1000
-        elif "经济" in query or "快捷" in query:
-            return 200
-        else:
-            return 500  # 默认中等预算
+    # 酒店档次对应的预算
+    TIER_BUDGETS = {"economy": 200, "comfort": 500, "luxury": 1000}
 
     def _query_hotels(self, city: str, budget: int = 500) -> Dict[str, Any]:
         """查询酒店（模拟）"""
@@ -135,9 +123,10 @@ class AttractionAgent(PluginAgent):
         self.register_plugin("attraction_query", self._query_attractions, attraction_capability)
 
     async def process_request(self, query: str, context: Dict[str, Any] = None) -> AgentResponse:
-        city = self._extract_city(query)
-        interests = self._extract_interests(query)
-        days = self._extract_days(query)
+        features = query_features(query, context)
+        city = features.city or "北京"
+        interests = features.interests or ["历史", "自然"]  # 默认兴趣
+        days = features.days or 2  # 默认2天
 
         # 执行景点查询
         attraction_data = await self.execute_plugin(
@@ -162,41 +151,6 @@ class AttractionAgent(PluginAgent):
             confidence=0.8
         )
 
-    def _extract_city(self, query: str) -> str:
-        """从查询中提取城市信息"""
-        cities = ["北京", "上海", "广州", "深圳", "杭州", "成都", "武汉", "西安"]
-        for city in cities:
-            if city in query:
-                return city
-        return "北京"
-
-    def _extract_interests(self, query: str) -> List[str]:
-        """从查询中提取兴趣标签"""
-        interests = []
-        interest_map = {
-            "历史": ["历史", "文化", "古迹", "博物馆"],
-            "自然": ["自然", "风景", "公园", "山水"],
-            "美食": ["美食", "小吃", "餐厅", "特色菜"],
-            "购物": ["购物", "商场", "商业街", "买"]
-        }
-
-        for category, keywords in interest_map.items():
-            if any(keyword in query for keyword in keywords):
-                interests.append(category)
-
-        return interests if interests else ["历史", "自然"]  # 默认兴趣
-
-    def _extract_days(self, query: str) -> int:
-        """从查询中提取游玩天数"""
-        if "一天" in query or "1天" in query:
-            return 1
-        elif "两天" in query or "2天" in query:
-            return 2
-        elif "三天" in query or "3天" in query:
-            return 3
-        else:
-            return 2  # 默认2天
-
     def _query_attractions(self, city: str, interests: List[str], days: int) -> Dict[str, Any]:
         """查询景点（模拟）"""
         # 各城市的景点数据库
@@ -5,6 +5,7 @@ from typing import Dict, Any
 
 from ..agents.plugin_agent import PluginAgent
 from ..models.agent_models import AgentType, AgentResponse, AgentCapability
+from ..utils.query_features import query_features
 
 
 class HotelAgent(PluginAgent):
@@ -47,9 +48,10 @@ class HotelAgent(PluginAgent):
         self.register_plugin("hotel_query", self._query_hotel, hotel_capability)
 
     async def process_request(self, query: str, context: Dict[str, Any] = None) -> AgentResponse:
-        # 从查询中提取城市信息
-        city = self._extract_city(query)
-        budget = self._extract_budget(query)
+        # 使用请求级的查询特征
+        features = query_features(query, context)
+        city = features.city or "北京"  # 默认城市
+        budget = self.TIER_BUDGETS.get(features.price_tier, 0)  # 0 表示不指定预算
 
         # 执行酒店查询
         hotel_data = await self.execute_plugin("hotel_query", city=city, budget=budget)
@@ -69,24 +71,8 @@ class HotelAgent(PluginAgent):
             confidence=0.9
         )
 
-    def _extract_city(self, query: str) -> str:
-        """从查询中提取城市信息"""
-        cities = ["北京", "上海", "广州", "深圳", "杭州", "成都", "武汉", "西安"]
-        for city in cities:
-            if city in query:
-                return city
-        return "北京"  # 默认城市
-    
-    def _extract_budget(self, query: str) -> float:
-        """从查询中提取预算信息"""
-        # 简单的预算提取逻辑
-        if "经济型" in query or "便宜" in query or "实惠" in query:
-            return 500
-        elif "豪华" in query or "高档" in query:
-            return 1500
-        elif "舒适" in query or "商务" in query:
-            return 1000
-        return 0  # 不指定预算
+    # 酒店档次对应的预算（每晚）
+    TIER_BUDGETS = {"economy": 500, "comfort": 1000, "luxury": 1500}
 
     def _query_hotel(self, city: str, budget: float = 0) -> Dict[str, Any]:
         """查询酒店信息（模拟）"""
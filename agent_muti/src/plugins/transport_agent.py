@@ -5,6 +5,7 @@ from typing import Any, Dict
 
 from ..agents.plugin_agent import PluginAgent
 from ..models.agent_models import AgentType, AgentResponse, AgentCapability
+from ..utils.query_features import query_features
 
 
 class TransportAgent(PluginAgent):
@@ -37,13 +38,13 @@ class TransportAgent(PluginAgent):
         self.register_plugin("transport_query", self._query_transport, transport_capability)
 
     async def process_request(self, query: str, context: Dict[str, Any] = None) -> AgentResponse:
-        locations = self._extract_locations(query)
+        features = query_features(query, context)
 
         # 执行交通查询
         transport_data = await self.execute_plugin(
             "transport_query",
-            from_city=locations.get("from", "北京"),
-            to_city=locations.get("to", "上海")
+            from_city=features.from_city or "北京",
+            to_city=features.to_city or "上海"
         )
 
         # 使用 LLM 生成建议
@@ -61,18 +62,6 @@ class TransportAgent(PluginAgent):
             confidence=0.85
         )
 
-    def _extract_locations(self, query: str) -> Dict[str, str]:
-        """提取地点信息"""
-        cities = ["北京", "上海", "广州", "深圳", "杭州", "成都", "武汉", "西安"]
-        found_cities = [city for city in cities if city in query]
-
-        if len(found_cities) >= 2:
-            return {"from": found_cities[0], "to": found_cities[1]}
-        elif len(found_cities) == 1:
-            return {"to": found_cities[0]}
-        else:
-            return {"from": "北京", "to": "上海"}
-
     def _query_transport(self, from_city: str, to_city: str) -> Dict[str, Any]:
         """查询交通方式（模拟）"""
         transport_options = []
@@ -6,6 +6,7 @@ from typing import Dict, Any
 
 from ..agents.plugin_agent import PluginAgent
 from ..models.agent_models import AgentType, AgentResponse, AgentCapability
+from ..utils.query_features import query_features
 
 
 class WeatherAgent(PluginAgent):
@@ -39,8 +40,8 @@ class WeatherAgent(PluginAgent):
         self.register_plugin("weather_query", self._query_weather, weather_capability)
 
     async def process_request(self, query: str, context: Dict[str, Any] = None) -> AgentResponse:
-        # 从查询中提取城市信息
-        city = self._extract_city(query)
+        # 使用请求级的查询特征
+        city = query_features(query, context).city or "北京"  # 默认城市
 
         # 执行天气查询
         weather_data = await self.execute_plugin("weather_query", city=city)
@@ -60,14 +61,6 @@ class WeatherAgent(PluginAgent):
             confidence=0.9
         )
 
-    def _extract_city(self, query: str) -> str:
-        """从查询中提取城市信息"""
-        cities = ["北京", "上海", "广州", "深圳", "杭州", "成都", "武汉", "西安"]
-        for city in cities:
-            if city in query:
-                return city
-        return "北京"  # 默认城市
-
     def _query_weather(self, city: str) -> Dict[str, Any]:
         """查询天气（模拟）"""
         weather_conditions = ["晴朗", "多云", "小雨", "大雨", "雾", "雪"]
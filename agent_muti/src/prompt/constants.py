@@ -51,7 +51,8 @@ def plan_prompt(query, context, missing_info, available_agents) -> str:
 
 请制定一个详细的执行计划来获取缺失信息：
 - required_agents: 需要调用的Agent列表
-- execution_sequence: 执行序列（并行/串行）
+- execution_sequence: 执行序列，按先后顺序排列的Agent分组，同组并行、后一组依赖前一组
+- dependencies: （可选）Agent之间的依赖，格式为 {{Agent: [前置Agent]}}，优先于分组顺序
 - expected_outputs: 期望从每个Agent获得的输出
 - strategy: 执行策略
 - iteration_goal: 本轮迭代的目标
@@ -60,6 +61,36 @@ def plan_prompt(query, context, missing_info, available_agents) -> str:
 """
     return plan_prompt
 
+# think + plan 合并提示词（一次调用同时完成分析和规划）
+THINK_PLAN_PROMPT = """
+你是一个深思熟虑的分析专家和任务规划师，能够在一次回答中评估当前状况并制定执行计划。
+"""
+
+def think_plan_prompt(query, context, iteration_count, available_agents) -> str:
+    think_plan_prompt = f"""
+当前用户查询: {query}
+历史上下文: {context}
+当前迭代: {iteration_count}
+可用Agent: {available_agents}
+
+请先分析当前状况，再制定获取缺失信息的执行计划。返回一个JSON对象，包含两个字段：
+- analysis: 分析结果
+  - core_requirements: 核心需求列表
+  - missing_info: 缺失的关键信息列表
+  - confidence_level: 当前置信度(0-1)
+  - should_complete: 是否可以直接完成
+  - reasoning: 推理过程
+- plan: 执行计划（should_complete 为 true 时可以为空对象）
+  - required_agents: 需要调用的Agent列表
+  - execution_sequence: 执行序列，按先后顺序排列的Agent分组，同组并行、后一组依赖前一组
+  - dependencies: （可选）Agent之间的依赖，格式为 {{Agent: [前置Agent]}}
+  - expected_outputs: 期望从每个Agent获得的输出
+  - strategy: 执行策略
+  - iteration_goal: 本轮迭代的目标
+{JSON_FORMAT}
+"""
+    return think_plan_prompt
+
 NEXT_PROMPT = """
 你是一个决策专家，能够基于当前信息质量决定是否继续迭代。
 """
@@ -103,4 +134,23 @@ def summary_prompt(query, summaries, iteration_count,agent_count) -> str:
 请基于以上所有信息，生成一个完整、准确、有用的最终回答。
 确保回答自然流畅，突出关键信息，并提供实用的建议。
 """
-    return summary_prompt
\ No newline at end of file
+    return summary_prompt
+
+
+# 对话记忆摘要提示词
+MEMORY_SUMMARY_PROMPT = """
+你是一个对话记忆整理专家，负责把较早的对话压缩成简洁的摘要，供后续对话参考。
+"""
+
+def memory_summary_prompt(summary, turns, max_chars) -> str:
+    memory_summary_prompt = f"""
+已有摘要:
+{summary or "（无）"}
+
+新增对话:
+{turns}
+
+请将新增对话并入已有摘要，保留用户的出行目的地、日期、人数、预算、偏好以及已经给出的关键结论，
+删除寒暄和重复内容。只返回摘要正文，不超过{max_chars}个字。
+"""
+    return memory_summary_prompt
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+LLM 请求优先级基准测试 - 在途名额受限时对比先到先得与按优先级放行的端到端延迟
+
+多个系统实例同时处理查询，共用进程级的 LLM 客户端池；
+LLM 使用 think_plan_benchmark 中的模拟客户端（固定往返延迟 + 按输出 token 计的生成时间）。
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import os
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+
+from src.core.agent_system import EnhancedDynamicAgentSystem
+from src.utils.latency_histogram import LatencyHistogram
+from src.utils.llm_client_pool import get_llm_client_pool
+from src.utils.llm_priority import LLMPriority
+from src.tests.think_plan_benchmark import DEMO_QUERIES, SimulatedLLMClient
+
+
+class _RawResponse:
+    def __init__(self, response):
+        self.headers = {}
+        self._response = response
+
+    def parse(self):
+        return self._response
+
+
+class SimulatedRawClient(SimulatedLLMClient):
+    """为模拟客户端补充 with_raw_response 接口，供客户端池调用"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(
+            with_raw_response=SimpleNamespace(create=self._create_raw)))
+
+    async def _create_raw(self, **params):
+        return _RawResponse(await self.create(**params))
+
+
+async def run_mode(prioritized: bool, concurrency: int, rounds: int, max_in_flight: int, aging: float,
+                   scale: float) -> dict:
+    """concurrency 个系统实例并发处理查询，返回每个查询的端到端延迟分布"""
+    pool = get_llm_client_pool()
+    # 老化周期与模拟延迟按同一比例缩放
+    pool.configure(max_in_flight=max_in_flight, max_in_flight_per_model=max_in_flight, priority_aging=aging * scale)
+    raw_client = SimulatedRawClient(scale=scale)
+    pool._raw_client = lambda state, api_key, base_url: raw_client
+
+    histogram = LatencyHistogram()
+
+    async def worker(index: int, system: EnhancedDynamicAgentSystem):
+        for round_index in range(rounds):
+            query = DEMO_QUERIES[(index + round_index) % len(DEMO_QUERIES)]
+            started = time.perf_counter()
+            await system.process_query(query)
+            histogram.record(time.perf_counter() - started)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        systems = [EnhancedDynamicAgentSystem(os.environ["OPENAI_API_KEY"]) for _ in range(concurrency)]
+        if not prioritized:
+            for system in systems:
+                system.coordinator.llm_priority = LLMPriority.NORMAL
+        for system in systems:
+            await system.initialize_system()
+        try:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(index, system) for index, system in enumerate(systems)))
+            elapsed = time.perf_counter() - started
+            # 所有请求使用同一模型，排队发生在单模型名额上
+            model_queue, = [model["queue"] for model in pool.get_statistics()["models"].values()]
+            queue = model_queue["priorities"]
+        finally:
+            for system in systems:
+                await system.shutdown_system()
+
+    del pool._raw_client
+    return {
+        "mode": "priority" if prioritized else "fifo",
+        "elapsed": elapsed,
+        "latency": histogram.summary((50, 95, 99)),
+        "queue": queue
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="LLM 请求优先级基准测试")
+    parser.add_argument("--concurrency", type=int, default=6, help="并发的系统实例数")
+    parser.add_argument("--rounds", type=int, default=4, help="每个实例处理的查询数")
+    parser.add_argument("--max-in-flight", type=int, default=3, help="客户端池的在途请求上限")
+    parser.add_argument("--aging", type=float, default=10.0, help="优先级老化周期（秒，未缩放）")
+    parser.add_argument("--scale", type=float, default=0.1, help="模拟延迟的缩放系数")
+    args = parser.parse_args()
+
+    print(f"🚀 LLM 请求优先级基准测试（{args.concurrency} 个并发实例, 在途上限 {args.max_in_flight}）")
+    print("=" * 60)
+    results = [await run_mode(prioritized, args.concurrency, args.rounds, args.max_in_flight, args.aging, args.scale)
+               for prioritized in (False, True)]
+
+    for result in results:
+        latency = result["latency"]
+        print(f"\n📊 {result['mode']}")
+        print(f"• 总耗时: {result['elapsed']:.2f}s, 查询 {latency['count']} 个")
+        print(f"• 端到端延迟: p50 {latency['p50']:.2f}s, p95 {latency['p95']:.2f}s, p99 {latency['p99']:.2f}s")
+        for name, stats in result["queue"].items():
+            if stats["admitted"]:
+                print(f"• {name}: {stats['admitted']} 个请求, 排队共 {stats['wait_seconds']:.2f}s, "
+                      f"最长 {stats['max_wait_seconds']:.2f}s")
+
+    fifo, prioritized = results
+    print("\n📈 按优先级放行相对先到先得:")
+    for key in ("p50", "p95"):
+        print(f"• {key} 延迟: {prioritized['latency'][key] / fifo['latency'][key] - 1:+.1%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
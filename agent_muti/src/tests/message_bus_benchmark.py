@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+消息总线请求-响应延迟与持久化日志开销基准测试
+"""
+
+import asyncio
+import contextlib
+import io
+import statistics
+import sys
+import os
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.utils.message_bus import MessageBus, MessageType
+from src.utils.message_log import MessageLog
+
+
+REQUEST_CHANNEL = "bench.requests"
+RESPONSE_CHANNEL = "bench.responses"
+
+
+async def _run_round(concurrency: int) -> dict:
+    """并发发起 concurrency 个请求并统计往返延迟"""
+    bus = MessageBus(max_queue_size=concurrency * 2 + 10)
+
+    async def responder(message):
+        await bus.publish(
+            channel=RESPONSE_CHANNEL,
+            message_type=MessageType.AGENT_RESPONSE,
+            payload={"echo": message.payload["seq"]},
+            correlation_id=message.correlation_id
+        )
+
+    bus.subscribe(REQUEST_CHANNEL, responder)
+
+    async def one_request(seq: int) -> float:
+        start = time.perf_counter()
+        response = await bus.request_response(
+            request_channel=REQUEST_CHANNEL,
+            response_channel=RESPONSE_CHANNEL,
+            message_type=MessageType.AGENT_REQUEST,
+            payload={"seq": seq},
+            timeout=30.0
+        )
+        assert response is not None and response.payload["echo"] == seq
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(one_request(i) for i in range(concurrency)))
+    wall_time = time.perf_counter() - start
+
+    await bus.shutdown()
+
+    latencies = sorted(latencies)
+    return {
+        "concurrency": concurrency,
+        "wall_time": wall_time,
+        "per_request": wall_time / concurrency,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "max": latencies[-1],
+    }
+
+
+async def benchmark_request_response(levels=(10, 100, 1000)):
+    """请求-响应往返延迟测试"""
+    print("开始请求-响应基准测试...")
+
+    results = []
+    for concurrency in levels:
+        # 屏蔽消息总线的逐条日志输出
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = await _run_round(concurrency)
+        results.append(result)
+
+        print(f"\n并发请求数: {concurrency}")
+        print(f"总耗时: {result['wall_time'] * 1000:.2f}ms")
+        print(f"单请求摊销耗时: {result['per_request'] * 1000:.3f}ms")
+        print(f"往返延迟 p50/p95/max: {result['p50'] * 1000:.2f} / "
+              f"{result['p95'] * 1000:.2f} / {result['max'] * 1000:.2f} ms")
+
+    return results
+
+
+async def _publish_throughput(count: int, message_log: MessageLog = None) -> float:
+    """发布 count 条消息（含刷盘），返回每秒消息数"""
+    bus = MessageBus(max_queue_size=count + 10, message_log=message_log)
+    await bus.initialize()
+
+    start = time.perf_counter()
+    for seq in range(count):
+        await bus.publish(
+            channel=RESPONSE_CHANNEL,
+            message_type=MessageType.AGENT_RESPONSE,
+            payload={"echo": seq, "content": "响应内容" * 20}
+        )
+    await bus.shutdown()
+    return count / (time.perf_counter() - start)
+
+
+async def benchmark_message_log(count: int = 20000):
+    """持久化日志对 publish 的开销测试"""
+    print("\n开始持久化日志开销测试...")
+
+    with tempfile.TemporaryDirectory() as directory:
+        with contextlib.redirect_stdout(io.StringIO()):
+            baseline = await _publish_throughput(count)
+            logged = await _publish_throughput(count, MessageLog(directory))
+
+    print(f"无日志: {baseline:.0f} msg/s")
+    print(f"有日志(批量刷盘+fsync): {logged:.0f} msg/s")
+    print(f"吞吐下降: {(1 - logged / baseline) * 100:.1f}%")
+    return {"baseline": baseline, "logged": logged}
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark_request_response())
+    asyncio.run(benchmark_message_log())
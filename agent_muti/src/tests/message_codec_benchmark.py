@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+消息编解码微基准测试 - 对比 JSON 与二进制编解码器
+"""
+
+import sys
+import os
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.utils.message import Message, MessageType, MessagePriority
+from src.utils.message_codec import BinaryMessageCodec, JsonMessageCodec
+
+
+def _build_message(seq: int) -> Message:
+    """构造一条典型的 Agent 响应消息"""
+    return Message(
+        message_id=f"bench-{seq:x}",
+        message_type=MessageType.AGENT_RESPONSE,
+        channel="agent.responses",
+        payload={
+            "agent_name": "交通规划师",
+            "response": {
+                "agent_type": "transport",
+                "content": "建议乘坐高铁前往上海，全程约4.5小时，二等座约553元。" * 4,
+                "data": {
+                    "from_city": "北京",
+                    "to_city": "上海",
+                    "options": [
+                        {"type": "飞机", "duration": "2小时", "cost": 1280, "recommendation": "可选"},
+                        {"type": "高铁", "duration": "4小时", "cost": 553, "recommendation": "推荐"},
+                        {"type": "自驾", "duration": "12小时", "cost": 420, "recommendation": "可选"},
+                    ],
+                },
+                "confidence": 0.85,
+                "metadata": {},
+            },
+            "original_request_id": f"bench-req-{seq:x}",
+        },
+        priority=MessagePriority.NORMAL,
+        source="交通规划师",
+        correlation_id=f"bench-corr-{seq:x}",
+    )
+
+
+def _measure(codec, messages, rounds: int = 5) -> dict:
+    """测量编码/解码吞吐和平均消息大小"""
+    encode_best = decode_best = float("inf")
+    encoded = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        encoded = [codec.encode(message) for message in messages]
+        encode_best = min(encode_best, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for data in encoded:
+            codec.decode(data)
+        decode_best = min(decode_best, time.perf_counter() - start)
+
+    result = {
+        "encode_per_sec": len(messages) / encode_best,
+        "decode_per_sec": len(messages) / decode_best,
+        "bytes_per_message": sum(len(data) for data in encoded) / len(encoded),
+    }
+
+    if hasattr(codec, "decode_envelope"):
+        start = time.perf_counter()
+        for data in encoded:
+            codec.decode_envelope(data)
+        result["envelope_per_sec"] = len(messages) / (time.perf_counter() - start)
+
+    return result
+
+
+def benchmark_codecs(count: int = 20000):
+    """编解码吞吐对比"""
+    print(f"开始编解码基准测试 ({count} 条消息)...")
+    messages = [_build_message(i) for i in range(count)]
+
+    codecs = {
+        "json (to_json)": JsonMessageCodec(),
+        "binary (msgpack 加速)": BinaryMessageCodec(),
+        "binary (纯 Python)": BinaryMessageCodec(accelerated=False),
+    }
+
+    results = {}
+    for label, codec in codecs.items():
+        if label.startswith("binary (msgpack") and not codec.accelerated:
+            print(f"\n{label}: 未安装 msgpack，跳过")
+            continue
+
+        result = _measure(codec, messages)
+        results[label] = result
+
+        print(f"\n编解码器: {label}")
+        print(f"编码: {result['encode_per_sec']:,.0f} 条/秒")
+        print(f"解码: {result['decode_per_sec']:,.0f} 条/秒")
+        if "envelope_per_sec" in result:
+            print(f"仅解码消息头: {result['envelope_per_sec']:,.0f} 条/秒")
+        print(f"平均大小: {result['bytes_per_message']:.0f} 字节/条")
+
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_codecs()
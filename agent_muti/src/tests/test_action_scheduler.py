@@ -0,0 +1,189 @@
+import unittest
+import asyncio
+import sys
+import os
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.action_scheduler import ActionScheduler, CompletionPolicy
+from src.core.iteration_controller import IterationController
+from src.models.agent_models import AgentResponse, AgentType
+
+
+class _RecordingAgent:
+    def __init__(self, name: str, delay: float, log: list):
+        self.name = name
+        self.delay = delay
+        self.log = log
+
+    async def process_request(self, prompt, context):
+        self.log.append(("start", self.name, time.monotonic(), prompt, dict(context)))
+        await asyncio.sleep(self.delay)
+        self.log.append(("end", self.name, time.monotonic(), prompt, None))
+        return AgentResponse(agent_type=AgentType.CUSTOM, content=self.name, data={"from": self.name}, confidence=1.0)
+
+
+class _Coordinator:
+    def __init__(self, delays: dict, log: list):
+        self.agent_registry = {name: _RecordingAgent(name, delay, log) for name, delay in delays.items()}
+
+
+class TestActionScheduler(unittest.IsolatedAsyncioTestCase):
+    def test_build_graph_from_sequence_and_dependencies(self):
+        """测试由执行序列与显式依赖构建依赖图"""
+        plan = {"execution_sequence": [["weather", "hotel"], "transport", ["budget", "ghost"]]}
+        graph = ActionScheduler.build_graph(plan, ["weather", "hotel", "transport", "budget", "attraction"])
+        self.assertEqual(graph["weather"], [])
+        self.assertEqual(graph["transport"], ["weather", "hotel"])
+        self.assertEqual(graph["budget"], ["transport"])
+        self.assertEqual(graph["attraction"], [])
+
+        plan["dependencies"] = {"transport": ["weather"], "budget": ["transport", "weather", "ghost"]}
+        graph = ActionScheduler.build_graph(plan, ["weather", "hotel", "transport", "budget"])
+        self.assertEqual(graph["transport"], ["weather"])
+        self.assertEqual(graph["budget"], ["transport", "weather"])
+
+    def test_cycles_are_broken(self):
+        """测试循环依赖被丢弃而不是死锁"""
+        plan = {"dependencies": {"a": ["b"], "b": ["a"], "c": ["a"]}}
+        graph = ActionScheduler.build_graph(plan, ["a", "b", "c"])
+        self.assertEqual(graph["a"], [])
+        self.assertEqual(graph["b"], ["a"])
+        self.assertEqual(graph["c"], ["a"])
+
+    async def test_agents_start_when_predecessors_finish(self):
+        """测试Agent在前驱完成后立即启动，不等待整组完成，并能读取上游输出"""
+        log = []
+        coordinator = _Coordinator({"weather": 0.02, "hotel": 0.3, "transport": 0.02, "budget": 0.02}, log)
+        plan = {
+            "required_agents": ["weather", "hotel", "transport", "budget"],
+            "execution_sequence": [["weather", "hotel"], ["transport"], ["budget"]],
+            "dependencies": {"transport": ["weather"], "budget": ["transport"]},
+            "expected_outputs": {"weather": "天气"}
+        }
+        controller = IterationController()
+        started = time.monotonic()
+        result = await controller._action_phase(plan, coordinator, {"last_query": "q"}, "去杭州")
+
+        self.assertEqual(set(result["agent_responses"]), {"weather", "hotel", "transport", "budget"})
+        events = {(kind, name): (at, prompt, context) for kind, name, at, prompt, context in log}
+        # budget 在慢速的 hotel 之前完成
+        self.assertLess(events[("end", "budget")][0], events[("end", "hotel")][0])
+        self.assertLess(events[("end", "budget")][0] - started, 0.25)
+        # 上游输出传递给下游，缺失的期望输出回退为原始查询
+        self.assertEqual(events[("start", "budget")][2]["transport"], {"from": "transport"})
+        self.assertEqual(events[("start", "budget")][2]["weather"], {"from": "weather"})
+        self.assertEqual(events[("start", "weather")][1], "天气")
+        self.assertEqual(events[("start", "budget")][1], "去杭州")
+        self.assertEqual(result["updated_context"]["hotel"], {"from": "hotel"})
+
+    async def test_global_concurrency_limit(self):
+        """测试全局并发上限"""
+        running = 0
+        peak = 0
+
+        async def execute(name):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return name
+
+        scheduler = ActionScheduler(max_concurrency=2)
+        results = await scheduler.run({name: [] for name in "abcdef"}, execute)
+        self.assertEqual(peak, 2)
+        self.assertEqual(sorted(results), list("abcdef"))
+
+    async def test_failures_do_not_block_successors(self):
+        """测试前驱失败时后继仍然执行，失败转换为错误响应"""
+        log = []
+        coordinator = _Coordinator({"transport": 0.01}, log)
+
+        async def broken(prompt, context):
+            raise RuntimeError("boom")
+
+        coordinator.agent_registry["weather"] = _RecordingAgent("weather", 0, log)
+        coordinator.agent_registry["weather"].process_request = broken
+        plan = {"required_agents": ["weather", "transport", "unknown"],
+                "execution_sequence": [["weather"], ["transport"]]}
+        result = await IterationController()._action_phase(plan, coordinator, {})
+
+        self.assertEqual(result["agent_responses"]["weather"].confidence, 0.0)
+        self.assertEqual(result["agent_responses"]["transport"].content, "transport")
+        self.assertNotIn("unknown", result["agent_responses"])
+
+
+class TestCompletionPolicy(unittest.IsolatedAsyncioTestCase):
+    def _plan(self, agents):
+        return {"required_agents": agents, "execution_sequence": [agents]}
+
+    def test_invalid_policy(self):
+        """测试非法的完成策略配置"""
+        with self.assertRaises(ValueError):
+            CompletionPolicy(mode="fastest")
+        with self.assertRaises(ValueError):
+            CompletionPolicy(mode="deadline")
+
+    async def test_first_k_cancels_slow_agents(self):
+        """测试 first_k 满足后立即返回并取消慢速Agent"""
+        log = []
+        coordinator = _Coordinator({"weather": 0.01, "hotel": 0.02, "budget": 5}, log)
+        controller = IterationController()
+        controller.set_completion_policy(CompletionPolicy(mode="first_k", k=2))
+
+        started = time.monotonic()
+        result = await controller._action_phase(self._plan(["weather", "hotel", "budget"]), coordinator, {})
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(set(result["agent_responses"]), {"weather", "hotel"})
+        self.assertEqual(result["pending_agents"], ["budget"])
+        self.assertNotIn(("end", "budget"), [(kind, name) for kind, name, *_ in log])
+        self.assertEqual(controller._late_agents, {})
+
+    async def test_quorum_requires_confident_responses(self):
+        """测试 quorum 只统计置信度达标的响应"""
+        log = []
+        coordinator = _Coordinator({"weather": 0.01, "hotel": 0.02, "budget": 0.05, "transport": 5}, log)
+        original = _RecordingAgent.process_request
+
+        async def low_confidence(prompt, context):
+            response = await original(coordinator.agent_registry["weather"], prompt, context)
+            response.confidence = 0.3
+            return response
+
+        coordinator.agent_registry["weather"].process_request = low_confidence
+        controller = IterationController()
+        controller.set_completion_policy(CompletionPolicy(mode="quorum", k=2, min_confidence=0.7))
+
+        result = await controller._action_phase(
+            self._plan(["weather", "hotel", "budget", "transport"]), coordinator, {})
+        self.assertEqual(set(result["agent_responses"]), {"weather", "hotel", "budget"})
+        self.assertEqual(result["pending_agents"], ["transport"])
+
+    async def test_deadline_with_late_agents_continuing(self):
+        """测试截止时间返回部分结果，迟到的Agent结果并入下一轮上下文"""
+        log = []
+        coordinator = _Coordinator({"weather": 0.01, "hotel": 0.6}, log)
+        controller = IterationController()
+        controller.set_completion_policy(CompletionPolicy(mode="deadline", deadline=0.3, late_agents="continue"))
+
+        result = await controller._action_phase(self._plan(["weather", "hotel"]), coordinator, {})
+        self.assertEqual(set(result["agent_responses"]), {"weather"})
+        self.assertIn("hotel", controller._late_agents)
+
+        # 仍在执行的Agent不会在下一轮被重复调度
+        rerun = await controller._action_phase(self._plan(["hotel"]), coordinator, {})
+        self.assertEqual(rerun["agent_responses"], {})
+
+        await asyncio.sleep(0.5)
+        context = {}
+        collected = controller._collect_late_results(context)
+        self.assertEqual(set(collected), {"hotel"})
+        self.assertEqual(context["hotel"], {"from": "hotel"})
+        self.assertEqual(controller._late_agents, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+import asyncio
+import json
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.batch_runner import BatchRunner
+from src.core.session_manager import SessionManager
+from src.models.agent_models import AgentResponse, AgentType
+from src.utils.tokens import record_token_usage
+
+
+class _Session:
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.active = 0
+        self.requests = 0
+
+    def touch(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _System:
+    """模拟系统：每条查询两次 LLM 调用，记录并发数"""
+
+    def __init__(self):
+        self.session_manager = SessionManager(_Session)
+        self.active = 0
+        self.peak = 0
+        self.queries = []
+
+    async def process_query(self, query, session_id=None):
+        async with self.session_manager.acquire(session_id):
+            self.queries.append(query)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            try:
+                await asyncio.sleep(0.01)
+                record_token_usage("gpt-3.5-turbo", 1000, 200, calls=1)
+                await asyncio.create_task(self._agent_call())
+            finally:
+                self.active -= 1
+        if query == "超时":
+            return AgentResponse(agent_type=AgentType.COORDINATOR, content="系统处理超时",
+                                 data={"error": "timeout"}, confidence=0.0)
+        return AgentResponse(agent_type=AgentType.COORDINATOR, content=f"回答:{query}", data={},
+                             confidence=0.9, metadata={"iterations": 1})
+
+    async def _agent_call(self):
+        record_token_usage("other-model", 500, 100, calls=1)
+
+
+def _write_lines(path, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def _read_results(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class TestBatchRunner(unittest.IsolatedAsyncioTestCase):
+    async def test_run_with_bounded_concurrency(self):
+        """测试有界并发执行、逐行写出结果，并汇总 token 与费用"""
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, "queries.jsonl")
+            queries = [json.dumps({"id": f"q{i}", "query": f"查询{i}"}, ensure_ascii=False) for i in range(10)]
+            _write_lines(input_path, queries + ['"北京天气"', "", "not json", '{"query": "超时"}'])
+            system = _System()
+            runner = BatchRunner(system, input_path, concurrency=3,
+                                 pricing={"gpt-3.5-turbo": {"prompt": 0.5, "completion": 1.5}})
+            summary = await runner.run()
+
+            results = {result["line"]: result for result in _read_results(runner.output_path)}
+            self.assertEqual(sorted(results), list(range(1, 12)) + [13, 14])
+            self.assertEqual(results[1]["id"], "q0")
+            self.assertEqual(results[1]["response"], "回答:查询0")
+            self.assertEqual(results[1]["tokens"], {"calls": 2, "prompt_tokens": 1500, "completion_tokens": 300})
+            self.assertEqual(results[1]["cost"], 0.8)  # other-model 没有单价
+            self.assertEqual(results[11]["query"], "北京天气")
+            self.assertIn("无效的输入行", results[13]["error"])
+            self.assertEqual(results[14]["error"], "timeout")
+
+        self.assertEqual(system.peak, 3)
+        self.assertEqual(len(system.session_manager), 0)
+        self.assertEqual((summary["completed"], summary["failed"], summary["executed"]), (11, 2, 13))
+        self.assertEqual(summary["tokens_per_query"], 12 * 1800 / 13)
+        self.assertAlmostEqual(summary["cost_per_query"], 12 * 0.8 / 13)
+        self.assertGreater(summary["qps"], 0)
+        self.assertGreater(summary["latency"]["p95"], 0)
+
+    async def test_resume(self):
+        """测试重新运行时跳过已成功的行、重试失败的行，并截掉中断时写了一半的末行"""
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, "queries.jsonl")
+            output_path = os.path.join(directory, "results.jsonl")
+            _write_lines(input_path, [json.dumps({"query": f"查询{i}"}, ensure_ascii=False) for i in range(5)])
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"line": 2, "response": "旧结果"}) + "\n")
+                f.write(json.dumps({"line": 4, "response": "旧结果"}) + "\n")
+                f.write(json.dumps({"line": 1, "error": "timeout"}) + "\n")
+                f.write(json.dumps({"line": 3, "error": "timeout"}) + "\n")
+                f.write(json.dumps({"line": 3, "response": "重试成功"}) + "\n")
+                f.write('{"line": 5, "resp')
+
+            system = _System()
+            summary = await BatchRunner(system, input_path, output_path, concurrency=2).run()
+
+            self.assertEqual(sorted(system.queries), ["查询0", "查询4"])
+            self.assertEqual((summary["skipped"], summary["retried"], summary["executed"]), (3, 1, 2))
+            lines = [result["line"] for result in _read_results(output_path)]
+            self.assertEqual(lines[:5], [2, 4, 1, 3, 3])
+            self.assertEqual(sorted(lines[5:]), [1, 5])
+
+            summary = await BatchRunner(_System(), input_path, output_path).run()
+            self.assertEqual((summary["skipped"], summary["executed"]), (5, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import unittest
+import json
+import sys
+import os
+import tempfile
+import threading
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.capability_index import CapabilityIndex, index_terms
+from src.core.iteration_controller import IterationController
+from src.models.agent_models import AgentCapability, AgentResponse, AgentType
+from src.prompt.constants import THINK_PROMPT, PLAN_PROMPT, NEXT_PROMPT
+
+
+class _Agent:
+    def __init__(self, agent_type: AgentType, description: str, capability: str):
+        self.agent_type = agent_type
+        self.description = description
+        self.capabilities = [AgentCapability(name=f"{agent_type.value}_query", description=capability,
+                                             input_schema={"properties": {"city": {"description": "城市名称"}}},
+                                             output_schema={})]
+
+    async def process_request(self, prompt, context):
+        return AgentResponse(agent_type=self.agent_type, content="ok", data={}, confidence=0.9)
+
+
+def _agents():
+    return {
+        "天气专家": _Agent(AgentType.WEATHER, "提供专业的天气查询和预报服务", "查询城市天气信息"),
+        "交通规划师": _Agent(AgentType.TRANSPORT, "提供专业的交通路线规划和出行建议", "查询交通路线和方式"),
+        "预算分析师": _Agent(AgentType.BUDGET, "提供专业的旅行预算分析和成本优化建议", "分析旅行预算"),
+        "酒店选择师": _Agent(AgentType.HOTEL, "提供专业的酒店查询和推荐服务", "查询城市酒店信息"),
+    }
+
+
+_KEYWORDS = {"weather": ["天气", "下雨"], "transport": ["高铁", "怎么去"], "budget": ["多少钱"], "hotel": ["住宿"]}
+
+
+class _Coordinator:
+    """按系统提示词返回预设结果，并记录调用的阶段"""
+
+    def __init__(self):
+        self.agent_registry = _agents()
+        self.calls = []
+        self.step = None
+
+    def set_step(self, step):
+        self.step = step
+
+    async def _call_llm(self, messages, **kwargs):
+        system = messages[0]["content"]
+        self.calls.append(self.step)
+        if system == THINK_PROMPT:
+            return json.dumps({"missing_info": ["天气"], "should_complete": False})
+        if system == PLAN_PROMPT:
+            return json.dumps({"required_agents": ["天气专家"], "execution_sequence": [["天气专家"]]})
+        if system == NEXT_PROMPT:
+            return json.dumps({"should_terminate": True})
+        raise AssertionError(system)
+
+
+class TestCapabilityIndex(unittest.IsolatedAsyncioTestCase):
+    def test_index_terms(self):
+        """测试中文按相邻两字切分，英文按单词切分"""
+        self.assertEqual(index_terms("天气 query"), {"天气", "query"})
+        self.assertEqual(index_terms("查询天气"), {"查询", "询天", "天气"})
+
+    async def test_route_obvious_queries(self):
+        """测试意图明确的查询直接给出 Agent，多意图查询给出全部相关 Agent"""
+        index = CapabilityIndex(keywords=_KEYWORDS)
+        agents = _agents()
+        self.assertEqual(list(await index.route("北京明天天气怎么样", agents)), ["天气专家"])
+        self.assertEqual(set(await index.route("上海天气如何，坐高铁怎么去", agents)), {"天气专家", "交通规划师"})
+
+        ranked = index.rank("北京住宿推荐", agents)
+        self.assertEqual(next(iter(ranked)), "酒店选择师")
+        self.assertGreater(ranked["酒店选择师"], 0.9)
+
+    async def test_fallback_when_unsure(self):
+        """测试没有足够证据，或部分意图找不到有把握的 Agent 时交给 PLAN 阶段"""
+        index = CapabilityIndex(keywords=_KEYWORDS)
+        agents = _agents()
+        self.assertIsNone(await index.route("帮我规划一下", agents))
+        self.assertIsNone(await index.route("查询城市信息", agents))
+        # "天气"有把握，但"建议"只有低置信度的 Agent 能解释
+        self.assertIsNone(await index.route("杭州天气，给点建议", agents))
+        statistics = index.get_statistics()
+        self.assertEqual((statistics["direct"], statistics["fallback"]), (0, 3))
+
+    async def test_embeddings_persisted(self):
+        """测试能力文本向量缓存到磁盘（读写不在事件循环线程中），重建索引后不再重新计算"""
+        embedded = []
+        io_threads = []
+
+        async def embedder(texts):
+            embedded.extend(texts)
+            return [[1.0, 0.0] if "天气" in text or "雨" in text else [0.0, 1.0] for text in texts]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "vectors.json")
+            index = CapabilityIndex(embedder=embedder, vector_path=path)
+            routing = await index.route("明天会不会下雨", _agents())
+            self.assertEqual(list(routing), ["天气专家"])
+            self.assertEqual(len(embedded), 5)  # 4 个能力文本 + 1 个查询
+
+            embedded.clear()
+            index = CapabilityIndex(embedder=embedder, vector_path=path)
+            read_vector_cache = index._read_vector_cache
+
+            def recording_read():
+                io_threads.append(threading.current_thread())
+                return read_vector_cache()
+
+            index._read_vector_cache = recording_read
+            await index.route("明天会不会下雨", _agents())
+            self.assertEqual(embedded, ["明天会不会下雨"])
+            self.assertEqual(len(io_threads), 1)
+            self.assertIsNot(io_threads[0], threading.current_thread())
+
+    async def test_controller_skips_plan(self):
+        """测试首轮路由成功时跳过 PLAN 调用，并报告省去的调用数"""
+        coordinator = _Coordinator()
+        controller = IterationController(max_iterations=2)
+        controller.capability_index = CapabilityIndex(keywords=_KEYWORDS)
+        result = await controller.execute_iteration_cycle("杭州明天天气", {}, coordinator, list(coordinator.agent_registry))
+
+        self.assertEqual(coordinator.calls, ["think", "next"])
+        self.assertEqual(result["llm_calls_saved"], 1)
+        self.assertIn("天气专家", result["final_result"]["agent_responses"])
+
+        coordinator = _Coordinator()
+        result = await controller.execute_iteration_cycle("帮我规划行程", {}, coordinator, list(coordinator.agent_registry))
+        self.assertEqual(coordinator.calls, ["think", "plan", "next"])
+        self.assertEqual(result["llm_calls_saved"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
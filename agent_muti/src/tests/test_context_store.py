@@ -0,0 +1,81 @@
+import unittest
+import json
+import sys
+import os
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core import context_store
+from src.core.context_store import ContextStore, estimate_tokens
+from src.models.agent_models import AgentResponse, AgentType
+
+
+class TestContextStore(unittest.TestCase):
+    def test_token_estimate(self):
+        """测试 token 估算：中文按字符，ASCII 按 4 字符"""
+        self.assertEqual(estimate_tokens("abcdefgh"), 2)
+        self.assertEqual(estimate_tokens("北京天气"), 4)
+
+    def test_incremental_serialization(self):
+        """测试只序列化变化的键，渲染结果与整体序列化一致"""
+        store = ContextStore(token_budget=10_000)
+        values = {"last_query": "去杭州", "天气专家": {"city": "杭州", "temp": [20, 25]}, "n": 3}
+        store.update(values)
+        self.assertEqual(json.loads(store.render()), values)
+
+        with mock.patch.object(context_store, "serialize", wraps=context_store.serialize) as serialize:
+            store.set("交通规划师", {"train": "G7311"})
+            store.render()
+        # 新键的值与键名各序列化一次，已有键直接使用缓存片段
+        serialized = [call.args[0] for call in serialize.call_args_list]
+        self.assertIn({"train": "G7311"}, serialized)
+        self.assertNotIn(values["天气专家"], serialized)
+
+        tokens = store.total_tokens
+        store.set("n", 3)
+        self.assertEqual(store.total_tokens, tokens)
+
+    def test_delta_rendering(self):
+        """测试游标之后变化的键完整展开，其余键使用摘要"""
+        store = ContextStore(token_budget=10_000, summary_chars=20)
+        store.set("last_query", "查询")
+        store.set("old", {"detail": "x" * 200})
+        cursor = store.mark()
+        store.set("new", {"detail": "y" * 200})
+
+        rendered = json.loads(store.render(since=cursor))
+        self.assertEqual(rendered["new"], {"detail": "y" * 200})
+        self.assertEqual(rendered["last_query"], "查询")
+        self.assertTrue(rendered["old"].startswith("[摘要]"))
+        self.assertEqual(store.changed_keys(cursor), ["new"])
+
+    def test_compaction_under_budget(self):
+        """测试超出预算时最旧的条目被压缩，固定键保持完整"""
+        store = ContextStore(token_budget=200, summary_chars=16)
+        store.set("last_query", "q" * 200)
+        for index in range(5):
+            store.set(f"agent{index}", {"data": "z" * 160})
+
+        statistics = store.get_statistics()
+        self.assertLessEqual(store.total_tokens, 200)
+        self.assertIn("agent0", statistics["compacted_keys"])
+        self.assertNotIn("agent4", statistics["compacted_keys"])
+        self.assertNotIn("last_query", statistics["compacted_keys"])
+        rendered = json.loads(store.render())
+        self.assertEqual(rendered["agent4"], {"data": "z" * 160})
+        self.assertEqual(rendered["last_query"], "q" * 200)
+
+    def test_unserializable_values(self):
+        """测试 AgentResponse 等对象只在遇到时转换"""
+        store = ContextStore()
+        response = AgentResponse(agent_type=AgentType.CUSTOM, content="ok", data={}, confidence=1.0)
+        store.set("response", {"items": [response, object]})
+        rendered = json.loads(store.render())
+        self.assertEqual(rendered["response"]["items"][0]["content"], "ok")
+        self.assertIsInstance(rendered["response"]["items"][1], str)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import asyncio
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.conversation_memory import ConversationMemory, compact_turn
+
+
+def _turn(index):
+    role = "user" if index % 2 == 0 else "assistant"
+    message = {"role": role, "content": f"第{index}轮 " + "内容" * 50, "timestamp": float(index)}
+    if role == "assistant":
+        message["iteration_data"] = {
+            "iteration_count": 2,
+            "final_result": {"agent_responses": {"天气专家": "晴" * 500}, "confidence_score": 0.9},
+            "history": [{"state": "think", "data": {"x": "y" * 1000}}] * 4
+        }
+    return message
+
+
+class TestConversationMemory(unittest.IsolatedAsyncioTestCase):
+    def test_compact_turn(self):
+        """测试压缩后只保留迭代数据的摘要"""
+        turn = compact_turn(_turn(1))
+        self.assertEqual(turn["iteration"], {"iterations": 2, "agents": ["天气专家"], "confidence": 0.9})
+        self.assertNotIn("iteration_data", turn)
+
+    def test_memory_stays_flat(self):
+        """测试数千轮对话后内存中的轮次、积压和摘要都有上限，旧轮次按顺序落盘"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "session.jsonl")
+            memory = ConversationMemory(max_turns=8, spill_path=path, summary_every=4, summary_chars=300)
+            for index in range(3000):
+                memory.append(_turn(index))
+
+            self.assertEqual(len(memory), 8)
+            self.assertLess(len(memory._pending), 4)
+            self.assertLessEqual(len(memory.summary), 300)
+            self.assertEqual(memory.total_turns, 3000)
+            self.assertEqual(memory[-1]["timestamp"], 2999.0)
+
+            spilled = list(memory.read_spilled())
+            self.assertEqual(len(spilled), 3000 - 8)
+            self.assertEqual([turn["timestamp"] for turn in spilled[:3]], [0.0, 1.0, 2.0])
+            self.assertLess(os.path.getsize(path), 3000 * 500)  # 完整迭代数据每轮约 6KB
+
+            history = memory.history(3)
+            self.assertEqual(history[0]["role"], "summary")
+            self.assertIn("第2991轮", history[0]["content"])
+            self.assertEqual(len(history), 4)
+
+    async def test_spill_in_background(self):
+        """测试事件循环中的落盘交给后台线程按顺序写入，文件句柄复用，关闭后释放"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "nested", "session.jsonl")
+            memory = ConversationMemory(max_turns=2, spill_path=path, summary_every=100)
+            for index in range(50):
+                memory.append(_turn(index))
+                if index == 10:
+                    await memory.flush()
+                    handle = memory._spill_file
+            await memory.flush()
+
+            self.assertIs(memory._spill_file, handle)
+            self.assertEqual([turn["timestamp"] for turn in memory.read_spilled()], [float(i) for i in range(48)])
+            memory.close()
+            self.assertIsNone(memory._spill_file)
+            self.assertTrue(handle.closed)
+
+    async def test_rolling_summary(self):
+        """测试后台生成滚动摘要，提示词使用摘要代替更早的对话；失败时回退到截断摘要"""
+        calls = []
+
+        async def summarizer(summary, turns):
+            calls.append((summary, [turn["timestamp"] for turn in turns]))
+            if len(calls) == 2:
+                raise RuntimeError("rate limited")
+            return f"摘要{len(calls)}"
+
+        memory = ConversationMemory(max_turns=2, summarizer=summarizer, summary_every=2)
+        for index in range(4):
+            memory.append(_turn(index))
+        await memory.wait_for_summary()
+        self.assertEqual(calls, [("", [0.0, 1.0])])
+        self.assertEqual(memory.summary, "摘要1")
+        self.assertEqual(memory.history(10)[0], {"role": "summary", "content": "摘要1"})
+
+        for index in range(4, 6):
+            memory.append(_turn(index))
+        await memory.wait_for_summary()
+        self.assertTrue(memory.summary.startswith("摘要1\nuser: 第2轮"))
+        self.assertEqual(memory.get_statistics()["summary_failures"], 1)
+
+    async def test_backlog_bounded_when_summarizer_is_slow(self):
+        """测试摘要生成跟不上时积压的轮次被截断合并"""
+        release = asyncio.Event()
+
+        async def summarizer(summary, turns):
+            await release.wait()
+            return "慢摘要"
+
+        memory = ConversationMemory(max_turns=2, summarizer=summarizer, summary_every=2)
+        for index in range(100):
+            memory.append(_turn(index))
+            await asyncio.sleep(0)
+        self.assertLess(len(memory._pending), 4)
+        release.set()
+        await memory.wait_for_summary()
+        self.assertIn("第97轮", memory.history(0)[0]["content"])
+        memory.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
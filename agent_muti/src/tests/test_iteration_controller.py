@@ -0,0 +1,87 @@
+import unittest
+import json
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.iteration_controller import IterationController, THINK_PLAN_SCHEMA, validate_schema
+from src.models.agent_models import AgentResponse, AgentType
+from src.prompt.constants import THINK_PROMPT, PLAN_PROMPT, THINK_PLAN_PROMPT, NEXT_PROMPT
+
+
+class _Agent:
+    async def process_request(self, prompt, context):
+        return AgentResponse(agent_type=AgentType.WEATHER, content="晴", data={"weather": "晴"}, confidence=0.9)
+
+
+class _Coordinator:
+    """按系统提示词返回预设结果，并记录调用顺序"""
+
+    def __init__(self, fused_reply: str):
+        self.agent_registry = {"天气专家": _Agent()}
+        self.fused_reply = fused_reply
+        self.calls = []
+        self.step = None
+
+    def set_step(self, step):
+        self.step = step
+
+    async def _call_llm(self, messages, **kwargs):
+        system = messages[0]["content"]
+        self.calls.append((self.step, kwargs.get("response_format")))
+        if system == THINK_PLAN_PROMPT:
+            return self.fused_reply
+        if system == THINK_PROMPT:
+            return json.dumps({"missing_info": ["天气"], "should_complete": False})
+        if system == PLAN_PROMPT:
+            return json.dumps({"required_agents": ["天气专家"], "execution_sequence": [["天气专家"]]})
+        if system == NEXT_PROMPT:
+            return json.dumps({"should_terminate": True})
+        raise AssertionError(system)
+
+
+_VALID_FUSED = json.dumps({
+    "analysis": {"missing_info": ["天气"], "should_complete": False, "confidence_level": 0.3},
+    "plan": {"required_agents": ["天气专家"], "execution_sequence": [["天气专家"]],
+             "expected_outputs": {"天气专家": "杭州天气"}}
+}, ensure_ascii=False)
+
+
+class TestFusedThinkPlan(unittest.IsolatedAsyncioTestCase):
+    def test_validate_schema(self):
+        """测试合并输出的结构校验"""
+        self.assertEqual(validate_schema(json.loads(_VALID_FUSED), THINK_PLAN_SCHEMA), [])
+        errors = validate_schema({"analysis": {"missing_info": "天气", "should_complete": 1}}, THINK_PLAN_SCHEMA)
+        self.assertIn("$.plan: 缺少字段", errors)
+        self.assertIn("$.analysis.missing_info: 应为 array", errors)
+        self.assertIn("$.analysis.should_complete: 应为 boolean", errors)
+        self.assertEqual(validate_schema({"analysis": {"missing_info": [], "should_complete": True,
+                                                       "confidence_level": True}, "plan": {}}, THINK_PLAN_SCHEMA),
+                         ["$.analysis.confidence_level: 应为 number"])
+
+    async def test_fused_mode_uses_single_call(self):
+        """测试合并模式用一次结构化调用替代 THINK 和 PLAN"""
+        coordinator = _Coordinator(_VALID_FUSED)
+        controller = IterationController(max_iterations=2, fused_think_plan=True)
+        result = await controller.execute_iteration_cycle("杭州天气", {}, coordinator, ["天气专家"])
+
+        self.assertEqual(coordinator.calls, [("think_plan", {"type": "json_object"}), ("next", None)])
+        self.assertIn("天气专家", result["final_result"]["agent_responses"])
+        states = [step["state"] for step in result["history"]]
+        self.assertEqual(states, ["think", "plan", "action", "next"])
+
+    async def test_fallback_to_two_calls(self):
+        """测试输出无法解析或不符合结构时回退到两次调用"""
+        for reply in ("不是JSON", json.dumps({"analysis": {"missing_info": [], "should_complete": False}, "plan": {}})):
+            coordinator = _Coordinator(reply)
+            controller = IterationController(max_iterations=1, fused_think_plan=True)
+            result = await controller.execute_iteration_cycle("杭州天气", {}, coordinator, ["天气专家"])
+
+            self.assertEqual([step for step, _ in coordinator.calls], ["think_plan", "think", "plan", "next"])
+            self.assertIn("天气专家", result["final_result"]["agent_responses"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import random
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.utils.latency_histogram import LatencyHistogram, WindowedHistogram
+from src.utils.performance_monitor import PerformanceMonitor
+
+
+def _exact_percentile(values, percentile):
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percentile // 100))
+    return ordered[int(rank) - 1]
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles_within_relative_error(self):
+        """测试百分位数相对误差在桶精度以内"""
+        rng = random.Random(7)
+        values = [rng.lognormvariate(-2, 1.2) for _ in range(20000)]
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+
+        for percentile in (50, 90, 99, 99.9):
+            exact = _exact_percentile(values, percentile)
+            self.assertAlmostEqual(histogram.percentile(percentile) / exact, 1.0, delta=0.02)
+        self.assertEqual(histogram.count, len(values))
+        self.assertEqual(histogram.max, max(values))
+        self.assertLess(len(histogram.counts), 1200)
+
+    def test_merge_equals_combined_recording(self):
+        """测试合并结果与直接记录全部样本一致"""
+        first, second, combined = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for i in range(1, 1000):
+            (first if i % 2 else second).record(i / 1000)
+            combined.record(i / 1000)
+
+        first.merge(second)
+        self.assertEqual(list(first.counts), list(combined.counts))
+        self.assertEqual(first.percentiles(), combined.percentiles())
+        self.assertAlmostEqual(first.mean, combined.mean)
+
+    def test_window_rotation_expires_old_slots(self):
+        """测试滑动窗口只包含最近的时间片"""
+        histogram = WindowedHistogram(window_seconds=60, slots=6)
+        histogram.record(5.0, timestamp=1000.0)
+        histogram.record(0.1, timestamp=1055.0)
+
+        self.assertEqual(histogram.window(now=1055.0).count, 2)
+        window = histogram.window(now=1065.0)
+        self.assertEqual(window.count, 1)
+        self.assertAlmostEqual(window.percentile(99), 0.1, delta=0.002)
+        self.assertEqual(histogram.cumulative.count, 2)
+
+    def test_monitor_exposes_agent_percentiles(self):
+        """测试 track_performance 写入直方图，get_metrics 提供每个 Agent 的 p50/p90/p99"""
+        monitor = PerformanceMonitor()
+        for _ in range(50):
+            with monitor.track_performance("agent_request", "天气专家", tags={"phase": "action"}):
+                pass
+
+        agent = monitor.get_metrics()["agent_metrics"]["天气专家"]
+        self.assertLessEqual(agent["p50_execution_time"], agent["p90_execution_time"])
+        self.assertLessEqual(agent["p90_execution_time"], agent["p99_execution_time"])
+        self.assertLessEqual(agent["p99_execution_time"], agent["max_execution_time"])
+        self.assertIn("p99_execution_time", monitor.generate_report()["agent_performance"]["天气专家"])
+
+        for i in range(1, 101):
+            monitor.record_custom_metric("llm.latency", i / 100, tags={"phase": "think"})
+        stats = monitor.get_metric_percentiles("llm.latency", tags={"phase": "think"})
+        self.assertEqual(stats["count"], 100)
+        self.assertAlmostEqual(stats["p90"], 0.9, delta=0.02)
+        self.assertEqual(monitor.get_metric_percentiles("llm.latency", tags={"phase": "plan"})["count"], 0)
+        self.assertEqual(monitor.get_metric_percentiles("agent_request.duration", windowed=True)["count"], 50)
+
+if __name__ == '__main__':
+    unittest.main()
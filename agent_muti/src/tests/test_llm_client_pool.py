@@ -0,0 +1,159 @@
+import unittest
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.utils.llm_client_pool import LLMClientPool, TokenBucket, parse_duration, get_llm_client_pool
+from src.utils.llm_priority import llm_priority
+from src.utils.metrics_exporter import render_openmetrics
+
+
+class _RawResponse:
+    def __init__(self, headers, content="ok"):
+        self.headers = headers
+        self._content = content
+
+    def parse(self):
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self._content))], usage=usage)
+
+
+class _FakeRawClient:
+    """模拟 AsyncOpenAI 的 with_raw_response 接口，记录并发峰值"""
+
+    def __init__(self, delay=0.02, headers=None):
+        self.delay = delay
+        self.headers = headers or {}
+        self.running = 0
+        self.peak = 0
+        self.calls = []
+        raw = SimpleNamespace(create=self._create)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=raw))
+
+    async def _create(self, **params):
+        self.calls.append(params)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        return _RawResponse(self.headers)
+
+
+def _pool_with(raw_client, **options) -> LLMClientPool:
+    pool = LLMClientPool(**options)
+    pool._raw_client = lambda state, api_key, base_url: raw_client
+    return pool
+
+
+class TestLLMClientPool(unittest.IsolatedAsyncioTestCase):
+    def test_parse_duration(self):
+        """测试限流响应头时长解析"""
+        self.assertEqual(parse_duration("20"), 20.0)
+        self.assertEqual(parse_duration("1s"), 1.0)
+        self.assertEqual(parse_duration("6m0s"), 360.0)
+        self.assertAlmostEqual(parse_duration("120ms"), 0.12)
+        self.assertAlmostEqual(parse_duration("1m30.5s"), 90.5)
+        self.assertIsNone(parse_duration(None))
+        self.assertIsNone(parse_duration("soon"))
+
+    def test_token_bucket_calibration(self):
+        """测试令牌桶由响应头校准：未校准时不限速，额度耗尽时暂停到重置时间"""
+        bucket = TokenBucket()
+        self.assertEqual(bucket.reserve(1000), 0.0)
+
+        bucket.update(limit=60, remaining=2, reset=58)
+        self.assertAlmostEqual(bucket.rate, 1.0)
+        self.assertEqual(bucket.reserve(1), 0.0)
+        self.assertEqual(bucket.reserve(1), 0.0)
+        self.assertGreater(bucket.reserve(1), 0.5)
+
+        bucket.update(limit=60, remaining=0, reset=5)
+        self.assertGreater(bucket.reserve(1), 4.5)
+
+    async def test_clients_are_shared(self):
+        """测试相同密钥与地址的Agent共用一个底层客户端"""
+        pool = LLMClientPool()
+        state = pool._loop_state()
+        first = pool._raw_client(state, "key-a", None)
+        self.assertIs(pool._raw_client(state, "key-a", None), first)
+        self.assertIsNot(pool._raw_client(state, "key-b", None), first)
+        self.assertEqual(pool.get_statistics()["clients"], 2)
+        await pool.close()
+        self.assertEqual(pool.get_statistics()["clients"], 0)
+        self.assertIs(get_llm_client_pool(), get_llm_client_pool())
+
+    async def test_in_flight_limits(self):
+        """测试全局与单模型在途请求上限"""
+        raw_client = _FakeRawClient()
+        pool = _pool_with(raw_client, max_in_flight=4, max_in_flight_per_model=2)
+        client = pool.client(api_key="key", base_url="http://llm.test")
+
+        messages = [{"role": "user", "content": "你好"}]
+        await asyncio.gather(*(client.chat.completions.create(model="m1", messages=messages) for _ in range(6)))
+        self.assertEqual(raw_client.peak, 2)
+
+        raw_client.peak = 0
+        await asyncio.gather(*(client.chat.completions.create(model=f"m{i % 3}", messages=messages)
+                               for i in range(12)))
+        self.assertEqual(raw_client.peak, 4)
+        statistics = pool.get_statistics()
+        self.assertEqual(statistics["in_flight"], 0)
+        self.assertEqual(statistics["peak_in_flight"], 4)
+        self.assertEqual(statistics["models"]["m1@http://llm.test"]["requests"], 6 + 4)
+
+    async def test_rate_limit_headers_throttle_requests(self):
+        """测试剩余额度耗尽时按重置时间延后后续请求"""
+        raw_client = _FakeRawClient(delay=0, headers={
+            "x-ratelimit-limit-requests": "100",
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "200ms",
+        })
+        pool = _pool_with(raw_client)
+        client = pool.client(api_key="key", base_url="http://llm.test")
+
+        response = await client.chat.completions.create(model="m", messages=[])
+        self.assertEqual(response.choices[0].message.content, "ok")
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await client.chat.completions.create(model="m", messages=[])
+        self.assertGreaterEqual(loop.time() - started, 0.15)
+        model = pool.get_statistics()["models"]["m@http://llm.test"]
+        self.assertGreater(model["throttled_seconds"], 0)
+        self.assertEqual(model["request_bucket"]["limit"], 100)
+
+        text = render_openmetrics({"llm_pool": pool.get_statistics()}).decode()
+        self.assertIn('agent_muti_llm_throttled_seconds_total{model="m@http://llm.test"}', text)
+
+    async def test_critical_requests_admitted_first(self):
+        """测试在途名额占满时协调器的关键请求先于排队更早的普通请求"""
+        raw_client = _FakeRawClient(delay=0.05)
+        pool = _pool_with(raw_client, max_in_flight=1, max_in_flight_per_model=1, priority_aging=60)
+        client = pool.client(api_key="key", base_url="http://llm.test")
+        order = []
+
+        async def call(name, priority):
+            with llm_priority(priority):
+                await client.chat.completions.create(model="m", messages=[{"role": "user", "content": name}])
+            order.append(name)
+
+        tasks = [asyncio.create_task(call("agent-1", "normal"))]
+        await asyncio.sleep(0.01)
+        tasks += [asyncio.create_task(call(f"agent-{i}", "normal")) for i in (2, 3)]
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.create_task(call("think", "critical")))
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(order, ["agent-1", "think", "agent-2", "agent-3"])
+        queue = pool.get_statistics()["queue"]["priorities"]
+        self.assertEqual(queue["critical"]["admitted"], 1)
+        self.assertEqual(queue["normal"]["admitted"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import asyncio
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.utils.llm_hedging import HedgingPolicy
+from src.utils.metrics_exporter import render_openmetrics
+
+
+class _Backend:
+    """按调用顺序返回不同延迟的模拟请求"""
+
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.calls = 0
+
+    def request(self):
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        index = self.calls
+        self.calls += 1
+
+        async def call():
+            await asyncio.sleep(delay)
+            return index
+
+        return call()
+
+
+def _warm(policy: HedgingPolicy, key: str, seconds: float, count: int = 20):
+    for _ in range(count):
+        policy.record(key, seconds)
+
+
+class TestHedgingPolicy(unittest.IsolatedAsyncioTestCase):
+    def test_adaptive_timeout(self):
+        """测试样本不足时使用配置超时，之后按 p99 × 倍数并受上下限约束"""
+        policy = HedgingPolicy(min_samples=20, timeout_multiplier=2.0, min_timeout=1.0)
+        self.assertEqual(policy.timeout_for("think", 30), 30)
+        _warm(policy, "think", 2.0)
+        self.assertAlmostEqual(policy.timeout_for("think", 30), 4.0, delta=0.1)
+        self.assertEqual(policy.timeout_for("think", 3), 3)
+        _warm(policy, "next", 0.01)
+        self.assertEqual(policy.timeout_for("next", 30), 1.0)
+
+    async def test_hedge_wins_over_slow_primary(self):
+        """测试主请求超过 p95 后发起对冲，先返回者胜出，主请求耗时仍被记录"""
+        policy = HedgingPolicy(min_samples=20)
+        _warm(policy, "plan", 0.02)
+        backend = _Backend([0.3, 0.01])
+
+        started = asyncio.get_running_loop().time()
+        result = await policy.run("plan", backend.request, timeout=5)
+        self.assertEqual(result, 1)
+        self.assertLess(asyncio.get_running_loop().time() - started, 0.2)
+        self.assertEqual(policy.stats["hedges_fired"], 1)
+        self.assertEqual(policy.stats["hedges_won"], 1)
+
+        await asyncio.sleep(0.35)
+        statistics = policy.get_statistics()
+        latency = statistics["latency"]["plan"]
+        self.assertGreaterEqual(latency["raw"]["max"], 0.3)
+        self.assertLess(latency["observed"]["max"], 0.2)
+        self.assertAlmostEqual(statistics["hedge_rate"], 1.0)
+
+    async def test_fast_requests_are_not_hedged(self):
+        """测试在阈值内返回的请求不会对冲"""
+        policy = HedgingPolicy(min_samples=20)
+        _warm(policy, "think", 0.2)
+        backend = _Backend([0.01])
+        self.assertEqual(await policy.run("think", backend.request, timeout=5), 0)
+        self.assertEqual(backend.calls, 1)
+        self.assertEqual(policy.stats["hedges_fired"], 0)
+
+    async def test_hedge_budget(self):
+        """测试对冲预算耗尽后不再发起对冲"""
+        policy = HedgingPolicy(min_samples=20, burst=1, budget_ratio=0.0)
+        _warm(policy, "next", 0.005, count=40)
+        for _ in range(3):
+            await policy.run("next", _Backend([0.03]).request, timeout=5)
+        self.assertEqual(policy.stats["hedges_fired"], 1)
+        self.assertEqual(policy.stats["hedges_denied"], 2)
+
+    async def test_timeout_and_errors(self):
+        """测试超时抛出 TimeoutError，所有请求失败时抛出最后一个异常"""
+        policy = HedgingPolicy(enabled=False)
+        with self.assertRaises(asyncio.TimeoutError):
+            await policy.run("think", _Backend([1]).request, timeout=0.05)
+        self.assertEqual(policy.stats["timeouts"], 1)
+
+        async def failing():
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            await policy.run("think", failing, timeout=1)
+
+    async def test_metrics_rendering(self):
+        """测试对冲比例与延迟分位数导出为 OpenMetrics"""
+        policy = HedgingPolicy(min_samples=20)
+        _warm(policy, "plan", 0.02)
+        await policy.run("plan", _Backend([0.2, 0.01]).request, timeout=5)
+
+        text = render_openmetrics({"llm_hedging": policy.get_statistics()}).decode()
+        self.assertIn('agent_muti_llm_hedges_total{result="fired"} 1', text)
+        self.assertIn("agent_muti_llm_hedge_rate 1.0", text)
+        self.assertIn('agent_muti_llm_latency_quantile_seconds{key="plan",kind="observed",quantile="0.99"}', text)
+        self.assertIn('agent_muti_llm_p99_improvement_ratio{key="plan"}', text)
+        self.assertTrue(text.endswith("# EOF\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import asyncio
+import sys
+import os
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.utils.llm_priority import (LLMPriority, PrioritySemaphore, current_llm_priority, current_request_origin,
+                                   llm_priority, llm_request_scope)
+
+
+class TestPrioritySemaphore(unittest.IsolatedAsyncioTestCase):
+    async def _admission_order(self, semaphore, requests, hold=0.01):
+        order = []
+
+        async def worker(name, priority):
+            async with semaphore.slot(priority):
+                order.append(name)
+                await asyncio.sleep(hold)
+
+        blocker = asyncio.create_task(worker("blocker", LLMPriority.NORMAL))
+        await asyncio.sleep(0)
+        tasks = []
+        for name, priority, delay in requests:
+            if delay:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(worker(name, priority)))
+            await asyncio.sleep(0)
+        await asyncio.gather(blocker, *tasks)
+        return order[1:]
+
+    async def test_priority_order(self):
+        """测试名额空出时按优先级放行，同优先级先到先得"""
+        semaphore = PrioritySemaphore(1, aging=60)
+        order = await self._admission_order(semaphore, [
+            ("background", LLMPriority.BACKGROUND, 0),
+            ("normal-1", LLMPriority.NORMAL, 0),
+            ("critical", LLMPriority.CRITICAL, 0),
+            ("normal-2", LLMPriority.NORMAL, 0),
+        ])
+        self.assertEqual(order, ["critical", "normal-1", "normal-2", "background"])
+        statistics = semaphore.get_statistics()
+        self.assertEqual(statistics["priorities"]["critical"]["admitted"], 1)
+        self.assertEqual(statistics["waiting"]["normal"], 0)
+
+    async def test_aging_prevents_starvation(self):
+        """测试早到超过两个老化周期的低优先级请求先于高优先级请求"""
+        semaphore = PrioritySemaphore(1, aging=0.05)
+        order = await self._admission_order(semaphore, [
+            ("background", LLMPriority.BACKGROUND, 0),
+            ("critical", LLMPriority.CRITICAL, 0.15),
+        ], hold=0.3)
+        self.assertEqual(order, ["background", "critical"])
+
+    async def test_aging_starts_at_request_origin(self):
+        """测试老化从端到端请求开始时算起：老查询的普通调用先于新查询的关键调用"""
+        semaphore = PrioritySemaphore(1, aging=0.05)
+        await semaphore.acquire()
+        now = time.monotonic()
+        order = []
+
+        async def worker(name, priority, origin):
+            await semaphore.acquire(priority, origin)
+            order.append(name)
+            semaphore.release()
+
+        tasks = [asyncio.create_task(worker("new-think", LLMPriority.CRITICAL, now)),
+                 asyncio.create_task(worker("old-agent", LLMPriority.NORMAL, now - 0.2))]
+        await asyncio.sleep(0)
+        semaphore.release()
+        await asyncio.gather(*tasks)
+        self.assertEqual(order, ["old-agent", "new-think"])
+
+    async def test_cancelled_waiter_releases_slot(self):
+        """测试排队中或刚被放行就取消的请求不会占用名额"""
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire()
+        waiter = asyncio.create_task(semaphore.acquire(LLMPriority.CRITICAL))
+        await asyncio.sleep(0)
+        semaphore.release()
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        self.assertFalse(semaphore.locked())
+        await asyncio.wait_for(semaphore.acquire(), timeout=1)
+
+    async def test_priority_context(self):
+        """测试优先级上下文对其中创建的任务生效"""
+        self.assertEqual(current_llm_priority(), LLMPriority.NORMAL)
+        with llm_priority("critical"):
+            inner = asyncio.create_task(self._current())
+            self.assertEqual(await inner, LLMPriority.CRITICAL)
+        self.assertEqual(current_llm_priority(), LLMPriority.NORMAL)
+        with self.assertRaises(ValueError):
+            LLMPriority("urgent")
+
+        self.assertIsNone(current_request_origin())
+        with llm_request_scope():
+            origin = current_request_origin()
+            with llm_request_scope():
+                self.assertEqual(current_request_origin(), origin)
+        self.assertIsNone(current_request_origin())
+
+    async def _current(self):
+        return current_llm_priority()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,226 @@
+import unittest
+import asyncio
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.utils.message_bus import MessageBus, MessageType, OverflowPolicy
+
+
+class TestMessageBus(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        """测试前准备"""
+        self.bus = MessageBus()
+
+    async def asyncTearDown(self):
+        await self.bus.shutdown()
+
+    def _echo_responder(self, response_channel: str):
+        async def responder(message):
+            await self.bus.publish(
+                channel=response_channel,
+                message_type=MessageType.AGENT_RESPONSE,
+                payload={"echo": message.payload["value"]},
+                correlation_id=message.correlation_id
+            )
+        return responder
+
+    async def test_request_response_routes_by_correlation(self):
+        """测试并发请求按关联ID路由响应"""
+        self.bus.subscribe("req", self._echo_responder("resp"))
+
+        responses = await asyncio.gather(*(
+            self.bus.request_response("req", "resp", MessageType.AGENT_REQUEST, {"value": i}, timeout=5)
+            for i in range(50)
+        ))
+
+        self.assertEqual([r.payload["echo"] for r in responses], list(range(50)))
+        self.assertEqual(self.bus.pending_requests(), 0)
+        self.assertEqual(self.bus.get_statistics()["replies_routed"], 50)
+        # 已路由的响应不会堆积在响应频道队列中
+        self.assertNotIn("resp", self.bus.channels)
+
+    async def test_request_response_same_channel(self):
+        """测试请求与响应共用频道时不会把请求当作响应"""
+        async def responder(message):
+            if message.message_type == MessageType.AGENT_REQUEST:
+                await self.bus.publish(
+                    channel="shared",
+                    message_type=MessageType.AGENT_RESPONSE,
+                    payload={"ok": True},
+                    correlation_id=message.correlation_id
+                )
+
+        self.bus.subscribe("shared", responder)
+        response = await self.bus.request_response("shared", "shared", MessageType.AGENT_REQUEST, {}, timeout=5)
+
+        self.assertEqual(response.message_type, MessageType.AGENT_RESPONSE)
+
+    async def test_request_response_timeout(self):
+        """测试无响应时超时返回 None"""
+        response = await self.bus.request_response("nobody", "resp", MessageType.AGENT_REQUEST, {}, timeout=0.05)
+
+        self.assertIsNone(response)
+        self.assertEqual(self.bus.pending_requests(), 0)
+
+    async def test_publish_does_not_wait_for_slow_subscriber(self):
+        """测试发布不等待慢订阅者"""
+        release = asyncio.Event()
+        received = []
+
+        async def slow_subscriber(message):
+            await release.wait()
+            received.append(message.payload["value"])
+
+        self.bus.subscribe("events", slow_subscriber)
+        for i in range(3):
+            await asyncio.wait_for(
+                self.bus.publish("events", MessageType.SYSTEM_EVENT, {"value": i}), timeout=1
+            )
+
+        self.assertEqual(received, [])
+        release.set()
+        await self.bus.wait_until_idle()
+        self.assertEqual(received, [0, 1, 2])
+
+    async def test_channel_queue_never_blocks_publisher(self):
+        """测试频道队列只为 receive() 消费者保留消息，队列满时丢弃计数而不阻塞发布"""
+        bus = MessageBus(max_queue_size=3)
+        try:
+            for i in range(5):
+                await asyncio.wait_for(bus.publish("unread", MessageType.SYSTEM_EVENT, {"value": i}), timeout=1)
+            self.assertEqual(bus.channels["unread"].qsize(), 0)
+
+            self.assertIsNone(await bus.receive("inbox", timeout=0.01))
+            for i in range(5):
+                await asyncio.wait_for(bus.publish("inbox", MessageType.SYSTEM_EVENT, {"value": i}), timeout=1)
+            self.assertEqual(bus.get_statistics()["messages_overflowed"], 2)
+            received = [(await bus.receive("inbox", timeout=1)).payload["value"] for _ in range(3)]
+            self.assertEqual(received, [0, 1, 2])
+
+            # 已交给订阅者的消息不再进入队列
+            bus.subscribe("inbox", lambda message: None)
+            await bus.publish("inbox", MessageType.SYSTEM_EVENT, {"value": 5})
+            self.assertEqual(bus.channels["inbox"].qsize(), 0)
+        finally:
+            await bus.shutdown()
+
+    async def test_sync_subscriber_runs_in_executor(self):
+        """测试同步订阅者在线程池中执行"""
+        received = []
+        self.bus.subscribe("events", lambda message: received.append(message.payload["value"]))
+
+        await self.bus.publish("events", MessageType.SYSTEM_EVENT, {"value": 1})
+        await self.bus.wait_until_idle()
+
+        self.assertEqual(received, [1])
+
+    async def test_overflow_policies(self):
+        """测试邮箱溢出策略和丢弃计数"""
+        release = asyncio.Event()
+        seen = {"drop": [], "reject": []}
+
+        def make_subscriber(name):
+            async def subscriber(message):
+                await release.wait()
+                seen[name].append(message.payload["value"])
+            subscriber.__name__ = name
+            return subscriber
+
+        self.bus.subscribe("events", make_subscriber("drop"), mailbox_size=2,
+                           overflow_policy=OverflowPolicy.DROP_OLDEST)
+        self.bus.subscribe("events", make_subscriber("reject"), mailbox_size=2,
+                           overflow_policy=OverflowPolicy.REJECT)
+
+        for i in range(6):
+            await self.bus.publish("events", MessageType.SYSTEM_EVENT, {"value": i})
+            await asyncio.sleep(0)
+
+        release.set()
+        await self.bus.wait_until_idle()
+
+        # 第一条消息已被工作协程取出，邮箱中只保留最多2条
+        self.assertEqual(seen["drop"], [0, 4, 5])
+        self.assertEqual(seen["reject"], [0, 1, 2])
+
+        stats = {sub["handler"]: sub for sub in self.bus.get_statistics()["subscribers"]}
+        self.assertEqual(stats["drop"]["dropped"], 3)
+        self.assertEqual(stats["reject"]["rejected"], 3)
+        self.assertEqual(self.bus.get_statistics()["messages_dropped"], 3)
+
+    async def test_publish_many_notifies_once_per_batch(self):
+        """测试批量发布时每个订阅者只被唤醒一次"""
+        batches = []
+        subscription = self.bus.subscribe_to_message_type(MessageType.ITERATION_PROGRESS, lambda m: None)
+        original_offer_batch = subscription.offer_batch
+
+        async def recording_offer_batch(messages):
+            batches.append([m.channel for m in messages])
+            return await original_offer_batch(messages)
+
+        subscription.offer_batch = recording_offer_batch
+
+        message_ids = await self.bus.publish_many([
+            {"channel": f"iteration.{i}", "message_type": MessageType.ITERATION_PROGRESS, "payload": {"step": i}}
+            for i in range(5)
+        ])
+        await self.bus.wait_until_idle()
+
+        self.assertEqual(len(set(message_ids)), 5)
+        self.assertEqual(batches, [[f"iteration.{i}" for i in range(5)]])
+        self.assertEqual(subscription.get_statistics()["processed"], 5)
+
+    async def test_broadcast_reaches_every_channel(self):
+        """测试广播投递到所有已有频道"""
+        for channel in ("a", "b", "c"):
+            self.assertIsNone(await self.bus.receive(channel, timeout=0.01))  # 注册为 receive() 频道
+            await self.bus.publish(channel, MessageType.SYSTEM_EVENT, {})
+
+        message_ids = await self.bus.broadcast(MessageType.PLANNING_UPDATE, {"plan": 1}, exclude_channels=["c"])
+
+        self.assertEqual(len(message_ids), 2)
+        self.assertEqual(self.bus.channels["a"].qsize(), 2)
+        self.assertEqual(self.bus.channels["c"].qsize(), 1)
+
+    async def test_wildcard_subscriptions(self):
+        """测试通配符订阅与路由缓存失效"""
+        agent_messages, system_messages = [], []
+        agent_subscription = self.bus.subscribe("agent.*", lambda m: agent_messages.append(m.channel))
+        self.bus.subscribe("system.#", lambda m: system_messages.append(m.channel))
+
+        for channel in ("agent.requests", "agent.requests.天气专家", "system.events", "system.health.cpu"):
+            await self.bus.publish(channel, MessageType.SYSTEM_EVENT, {})
+        await self.bus.wait_until_idle()
+
+        self.assertEqual(agent_messages, ["agent.requests"])
+        self.assertEqual(system_messages, ["system.events", "system.health.cpu"])
+        self.assertEqual(self.bus._route("agent.requests"), (agent_subscription,))
+
+        # 新增订阅后缓存的路由表必须失效
+        exact_messages = []
+        self.bus.subscribe("agent.requests", lambda m: exact_messages.append(m.channel))
+        self.assertEqual(len(self.bus._route("agent.requests")), 2)
+
+        await self.bus.unsubscribe("agent.*", agent_subscription.callback)
+        await self.bus.publish("agent.requests", MessageType.SYSTEM_EVENT, {})
+        await self.bus.wait_until_idle()
+
+        self.assertEqual(agent_messages, ["agent.requests"])
+        self.assertEqual(exact_messages, ["agent.requests"])
+
+    async def test_broadcast_to_pattern(self):
+        """测试按模式广播只投递到匹配的频道"""
+        for channel in ("agents.weather", "agents.budget", "system.events"):
+            self.assertIsNone(await self.bus.receive(channel, timeout=0.01))
+            await self.bus.publish(channel, MessageType.SYSTEM_EVENT, {})
+
+        message_ids = await self.bus.broadcast(MessageType.SYSTEM_EVENT, {"reload": True}, pattern="agents.*")
+
+        self.assertEqual(len(message_ids), 2)
+        self.assertEqual(self.bus.channels["system.events"].qsize(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.utils.message import Message, MessageType, MessagePriority
+from src.utils.message_codec import BinaryMessageCodec, JsonMessageCodec, get_codec
+
+
+def _sample_message(**overrides) -> Message:
+    fields = dict(
+        message_id="1a2b-00ff-1",
+        message_type=MessageType.AGENT_RESPONSE,
+        channel="agent.responses",
+        payload={
+            "agent_name": "天气专家",
+            "response": {"content": "明天成都多云，气温 18°C", "confidence": 0.9, "data": {}},
+            "numbers": [0, 1, -1, -33, 127, 128, 70000, 2 ** 40, -(2 ** 40), 3.25],
+            "flags": [True, False, None],
+            "long_text": "旅" * 300,
+            "blob": b"\x00\x01binary",
+        },
+        priority=MessagePriority.HIGH,
+        timestamp=1700000000.125,
+        source="coordinator",
+        target=None,
+        correlation_id="corr-42",
+        metadata={"attempt": 2},
+    )
+    fields.update(overrides)
+    return Message(**fields)
+
+
+class TestMessageCodec(unittest.TestCase):
+    def test_message_is_slotted(self):
+        """测试消息对象不分配实例字典"""
+        self.assertFalse(hasattr(_sample_message(), "__dict__"))
+
+    def test_binary_round_trip(self):
+        """测试二进制编解码往返（C 加速与纯 Python 实现）"""
+        message = _sample_message()
+        for codec in (BinaryMessageCodec(), BinaryMessageCodec(accelerated=False)):
+            decoded = codec.decode(codec.encode(message))
+            self.assertEqual(decoded, message)
+
+    def test_pure_python_and_accelerated_are_compatible(self):
+        """测试两种实现产生的字节可以互相解码"""
+        message = _sample_message(payload={"big": list(range(300)), "map": {str(i): i for i in range(20)}})
+        pure = BinaryMessageCodec(accelerated=False)
+        fast = BinaryMessageCodec()
+
+        self.assertEqual(fast.decode(pure.encode(message)), message)
+        self.assertEqual(pure.decode(fast.encode(message)), message)
+
+    def test_decode_envelope_leaves_payload_undecoded(self):
+        """测试只解码消息头时 payload 为原缓冲区的切片"""
+        codec = BinaryMessageCodec()
+        data = codec.encode(_sample_message())
+
+        header, payload_view = codec.decode_envelope(data)
+
+        self.assertIsNone(header.payload)
+        self.assertEqual(header.channel, "agent.responses")
+        self.assertIsInstance(payload_view, memoryview)
+        self.assertIs(payload_view.obj, data)
+        self.assertEqual(codec.decode_payload(payload_view)["agent_name"], "天气专家")
+
+    def test_none_metadata_and_json_codec(self):
+        """测试空元数据与 JSON 编解码器"""
+        message = _sample_message(metadata=None, payload={"text": "你好"})
+        self.assertIsNone(BinaryMessageCodec().decode(BinaryMessageCodec().encode(message)).metadata)
+
+        json_codec = get_codec("json")
+        self.assertIsInstance(json_codec, JsonMessageCodec)
+        self.assertEqual(json_codec.decode(json_codec.encode(message)).payload, {"text": "你好"})
+
+    def test_header_length_limit(self):
+        """测试头部字符串长度上限：0xFFFE 字节可往返，达到 0xFFFF（None 标记）及以上时报错"""
+        codec = BinaryMessageCodec()
+        message = _sample_message(source="a" * 0xFFFE)
+        self.assertEqual(codec.decode(codec.encode(message)).source, message.source)
+
+        for length in (0xFFFF, 0x10000):
+            with self.assertRaises(ValueError):
+                codec.encode(_sample_message(source="a" * length))
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            get_codec("xml")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,241 @@
+import unittest
+import asyncio
+import sys
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.core import agent_system  # 先加载 core 包，避免 agents 包的循环导入
+from src.core.iteration_controller import IterationController
+from src.core.response_journal import ResponseJournal
+from src.models.agent_models import AgentResponse, AgentType
+from src.utils.message import Message, MessageType
+from src.utils.message_bus import MessageBus, MessageChannels
+from src.utils.message_log import MessageLog
+
+
+def _message(index: int, channel: str = "agent.responses") -> Message:
+    return Message(
+        message_id=f"msg-{index}",
+        message_type=MessageType.AGENT_RESPONSE,
+        channel=channel,
+        payload={"index": index, "text": "响应" * 10},
+        correlation_id=f"corr-{index}"
+    )
+
+
+class TestMessageLog(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.directory = self._temp_dir.name
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    async def test_append_flush_and_read(self):
+        """测试追加、刷盘后按偏移量读取"""
+        log = MessageLog(self.directory)
+        await log.start()
+        offsets = [log.append(_message(i)) for i in range(200)]
+        await log.flush()
+
+        self.assertEqual(offsets, list(range(200)))
+        records = log.read("agent.responses", offset=150, max_messages=10)
+        self.assertEqual([offset for offset, _ in records], list(range(150, 160)))
+        self.assertEqual(records[0][1].payload["index"], 150)
+        await log.close()
+
+    async def test_segment_rotation_and_size_retention(self):
+        """测试分段滚动与按大小清理旧分段"""
+        log = MessageLog(self.directory, segment_bytes=2048, retention_bytes=6000)
+        await log.start()
+        for i in range(300):
+            log.append(_message(i))
+        await log.flush()
+
+        stats = log.get_statistics()["channels"]["agent.responses"]
+        self.assertGreater(stats["segments"], 1)
+        self.assertLessEqual(stats["bytes"], 6000 + 2048)
+        self.assertGreater(log.start_offset("agent.responses"), 0)
+
+        # 已清理的偏移量从最早保留的位置开始读取
+        records = log.read("agent.responses", offset=0)
+        self.assertEqual(records[0][0], log.start_offset("agent.responses"))
+        self.assertEqual(records[-1][0], 299)
+        await log.close()
+
+    async def test_age_retention(self):
+        """测试按时间清理旧分段"""
+        log = MessageLog(self.directory, segment_bytes=1024, retention_seconds=60)
+        await log.start()
+        for i in range(20):
+            log.append(_message(i))
+        await log.flush()
+
+        # 把除活跃分段外的分段修改时间调到过期
+        channel_dir = log.channel_directory("agent.responses")
+        segments = sorted(channel_dir.glob("*.log"))
+        expired = time.time() - 3600
+        for path in segments[:-1]:
+            os.utime(path, (expired, expired))
+
+        log.append(_message(20))
+        await log.flush()
+        self.assertEqual(len(list(channel_dir.glob("*.log"))), 1)
+        await log.close()
+
+    async def test_torn_tail_is_truncated_on_reopen(self):
+        """测试崩溃时写了一半的尾部记录在重新打开时被截断"""
+        log = MessageLog(self.directory)
+        await log.start()
+        for i in range(5):
+            log.append(_message(i))
+        await log.close()
+
+        segment = next(log.channel_directory("agent.responses").glob("*.log"))
+        with open(segment, "ab") as file:
+            file.write(b"\x00\x00\x01\x00partial")
+
+        reopened = MessageLog(self.directory)
+        self.assertEqual(reopened.end_offset("agent.responses"), 5)
+        reopened.append(_message(5))
+        await reopened.flush()
+        self.assertEqual([offset for offset, _ in reopened.read("agent.responses")], list(range(6)))
+        await reopened.close()
+
+    async def test_channel_directories_stay_inside_log_directory(self):
+        """测试 '.'、'..' 和含 '/' 的频道名映射到日志目录下各自的子目录"""
+        log = MessageLog(self.directory)
+        await log.start()
+        channels = [".", "..", "../escape", "a/b"]
+        for index, channel in enumerate(channels):
+            self.assertEqual(log.channel_directory(channel).parent, log.directory)
+            log.append(_message(index, channel=channel))
+        await log.flush()
+
+        self.assertEqual(len(os.listdir(self.directory)), len(channels))
+        self.assertEqual(log.list_channels(), sorted(channels))
+        self.assertEqual([message.payload["index"] for _, message in log.read("..")], [1])
+        with self.assertRaises(ValueError):
+            log.channel_directory("")
+        await log.close()
+
+    async def test_consumer_commits_offsets(self):
+        """测试消费者提交的偏移量在重新打开后保留"""
+        log = MessageLog(self.directory)
+        await log.start()
+        for i in range(10):
+            log.append(_message(i))
+        await log.flush()
+
+        consumer = log.consumer("agent.responses", "recovery")
+        first = consumer.poll(max_messages=4)
+        self.assertEqual([offset for offset, _ in first], [0, 1, 2, 3])
+        consumer.commit()
+        await log.close()
+
+        reopened = MessageLog(self.directory)
+        consumer = reopened.consumer("agent.responses", "recovery")
+        self.assertEqual(consumer.committed, 4)
+        self.assertEqual(consumer.poll()[0][0], 4)
+        await reopened.close()
+
+    async def test_bus_recovers_responses_after_crash(self):
+        """测试总线写入的响应在进程崩溃后可从日志恢复"""
+        bus = MessageBus(
+            message_log=MessageLog(self.directory, flush_interval=0.01),
+            persisted_channels=[MessageChannels.AGENT_RESPONSES]
+        )
+        await bus.initialize()
+
+        async def responder(message):
+            await bus.publish(
+                channel=MessageChannels.AGENT_RESPONSES,
+                message_type=MessageType.AGENT_RESPONSE,
+                payload={"response": {"content": f"回答: {message.payload['query']}"}},
+                correlation_id=message.correlation_id
+            )
+
+        bus.subscribe(MessageChannels.AGENT_REQUESTS, responder)
+        reply = await bus.request_response(
+            request_channel=MessageChannels.AGENT_REQUESTS,
+            response_channel=MessageChannels.AGENT_RESPONSES,
+            message_type=MessageType.AGENT_REQUEST,
+            payload={"query": "成都天气"},
+            timeout=2
+        )
+        self.assertIsNotNone(reply)
+
+        # 等待后台刷盘后模拟崩溃：不调用 shutdown，直接丢弃总线
+        await asyncio.sleep(0.1)
+        self.assertEqual(bus.get_statistics()["messages_persisted"], 1)
+        bus.message_log._closing = True
+
+        recovered = MessageLog(self.directory).latest_by_correlation(MessageChannels.AGENT_RESPONSES)
+        self.assertEqual(recovered[reply.correlation_id].payload["response"]["content"], "回答: 成都天气")
+
+        bus.message_log = None
+        await bus.shutdown()
+
+    async def test_action_phase_reuses_responses_after_restart(self):
+        """测试崩溃重启后 ACTION 阶段复用未完成查询的 Agent 响应，查询完成后不再复用"""
+        calls = []
+
+        class _Agent:
+            def __init__(self, name, crash=False):
+                self.name, self.crash = name, crash
+
+            async def process_request(self, prompt, context):
+                calls.append(self.name)
+                if self.crash:
+                    raise RuntimeError("进程崩溃")
+                return AgentResponse(agent_type=AgentType.WEATHER, content=f"{self.name}: {prompt}",
+                                     data={"agent": self.name}, confidence=0.9)
+
+        query = "成都三日游"
+        plan = {"required_agents": ["天气专家", "交通专家"], "execution_sequence": [["天气专家", "交通专家"]]}
+
+        async def start(crash: bool):
+            bus = MessageBus(message_log=MessageLog(self.directory, flush_interval=0.01),
+                             persisted_channels=[MessageChannels.AGENT_RESPONSES])
+            await bus.initialize()
+            journal = ResponseJournal(bus)
+            await journal.load()
+            controller = IterationController()
+            controller.response_journal = journal
+            coordinator = SimpleNamespace(agent_registry={"天气专家": _Agent("天气专家"),
+                                                          "交通专家": _Agent("交通专家", crash=crash)})
+            return bus, journal, controller, coordinator
+
+        bus, journal, controller, coordinator = await start(crash=True)
+        await controller._action_phase(plan, coordinator, {}, query)
+        await bus.message_log.flush()
+        self.assertEqual(journal.stats["recorded"], 1)
+        # 模拟崩溃：不写完成标记，也不正常关闭
+        bus.message_log._closing = True
+        bus.message_log = None
+        await bus.shutdown()
+
+        bus, journal, controller, coordinator = await start(crash=False)
+        self.assertEqual(journal.stats["recovered"], 1)
+        result = await controller._action_phase(plan, coordinator, {}, query)
+        self.assertEqual(sorted(calls), ["交通专家", "交通专家", "天气专家"])
+        self.assertEqual(result["agent_responses"]["天气专家"].content, f"天气专家: {query}")
+        self.assertEqual(result["updated_context"]["天气专家"], {"agent": "天气专家"})
+        self.assertEqual(journal.stats["reused"], 1)
+        await journal.complete(query)
+        await bus.shutdown()
+
+        # 已完成查询的响应在下次重启时不再恢复
+        bus, journal, _, _ = await start(crash=False)
+        self.assertEqual(journal.stats["recovered"], 0)
+        await bus.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
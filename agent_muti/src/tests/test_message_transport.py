@@ -0,0 +1,203 @@
+import unittest
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.core.agent_worker import launch_agent_workers
+from src.agents.plugin_agent import PluginAgent
+from src.agents.remote_agent import RemoteAgent
+from src.models.agent_models import AgentType, AgentResponse
+from src.utils.message_bus import MessageBus, MessageType, MessageChannels
+from src.utils.message_transport import SocketTransport, SocketTransportHub
+
+BLOCKING_AGENT_NAME = "阻塞测试Agent"
+WORK_SECONDS = 0.05
+
+
+class BlockingAgent(PluginAgent):
+    """模拟阻塞式调用的测试 Agent，同一进程内的请求只能串行执行"""
+
+    def __init__(self):
+        super().__init__(AgentType.CUSTOM, BLOCKING_AGENT_NAME, "测试用阻塞Agent")
+
+    async def process_request(self, query, context=None):
+        time.sleep(WORK_SECONDS)
+        return AgentResponse(
+            agent_type=self.agent_type,
+            content=f"done:{query}",
+            data={"pid": os.getpid()},
+            confidence=1.0
+        )
+
+
+def blocking_agent_factory():
+    """工作进程中创建托管的 Agent"""
+    return [BlockingAgent()]
+
+
+class TestSocketTransport(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        """测试前准备"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.address = f"unix:{os.path.join(self.tmpdir, 'hub.sock')}"
+        self.hub = SocketTransportHub(self.address)
+        await self.hub.start()
+
+    async def asyncTearDown(self):
+        await self.hub.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    async def _connected_bus(self, **kwargs) -> MessageBus:
+        bus = MessageBus(transport=SocketTransport(self.address), **kwargs)
+        await bus.initialize()
+        return bus
+
+    async def _wait_for_subscribers(self, channel: str, count: int, timeout: float = 60):
+        deadline = time.monotonic() + timeout
+        while self.hub.subscriber_count(channel) < count:
+            if time.monotonic() > deadline:
+                self.fail(f"等待 {count} 个订阅者超时 (频道: {channel})")
+            await asyncio.sleep(0.05)
+
+    async def test_subscription_and_request_response_across_buses(self):
+        """测试跨总线的订阅与请求-响应语义"""
+        client = await self._connected_bus()
+        server = await self._connected_bus()
+        received = []
+
+        async def responder(message):
+            received.append(message.payload["value"])
+            await server.publish("resp", MessageType.AGENT_RESPONSE, {"echo": message.payload["value"]},
+                                 correlation_id=message.correlation_id)
+
+        server.subscribe("req", responder)
+        await self._wait_for_subscribers("req", 1)
+
+        responses = await asyncio.gather(*(
+            client.request_response("req", "resp", MessageType.AGENT_REQUEST, {"value": i}, timeout=5)
+            for i in range(20)
+        ))
+
+        self.assertEqual([r.payload["echo"] for r in responses], list(range(20)))
+        self.assertEqual(sorted(received), list(range(20)))
+        self.assertEqual(client.pending_requests(), 0)
+
+        await client.shutdown()
+        await server.shutdown()
+
+    async def test_round_trips_beyond_queue_size(self):
+        """测试往返次数超过 max_queue_size 时发布不会阻塞，全部请求都能完成"""
+        client = await self._connected_bus()
+        server = await self._connected_bus()
+
+        async def responder(message):
+            await server.publish("resp", MessageType.AGENT_RESPONSE, {"echo": message.payload["value"]},
+                                 correlation_id=message.correlation_id)
+
+        server.subscribe("req", responder)
+        await self._wait_for_subscribers("req", 1)
+
+        count = client.max_queue_size + 50
+        responses = await asyncio.wait_for(asyncio.gather(*(
+            client.request_response("req", "resp", MessageType.AGENT_REQUEST, {"value": i}, timeout=30)
+            for i in range(count)
+        )), timeout=60)
+
+        self.assertEqual([r.payload["echo"] for r in responses], list(range(count)))
+        self.assertEqual(client.get_statistics()["messages_overflowed"], 0)
+        self.assertEqual(client.channels["req"].qsize(), 0)
+
+        await client.shutdown()
+        await server.shutdown()
+
+    async def test_group_subscribers_share_messages(self):
+        """测试同组订阅者之间每条消息只投递一次"""
+        publisher = await self._connected_bus()
+        consumers = [await self._connected_bus() for _ in range(2)]
+        received = [[], []]
+
+        for index, consumer in enumerate(consumers):
+            consumer.subscribe("jobs", lambda message, index=index: received[index].append(message.payload["n"]),
+                               group="workers")
+        await self._wait_for_subscribers("jobs", 2)
+
+        for n in range(10):
+            await publisher.publish("jobs", MessageType.SYSTEM_EVENT, {"n": n})
+
+        deadline = time.monotonic() + 5
+        while len(received[0]) + len(received[1]) < 10 and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+
+        self.assertEqual(sorted(received[0] + received[1]), list(range(10)))
+        self.assertEqual(len(received[0]), 5)
+
+        for bus in [publisher, *consumers]:
+            await bus.shutdown()
+
+    async def test_wildcard_subscription_across_buses(self):
+        """测试中枢按通配符模式转发，且同一进程只收到一份"""
+        publisher = await self._connected_bus()
+        monitor = await self._connected_bus()
+        received = []
+
+        monitor.subscribe("metrics.#", lambda message: received.append(message.channel))
+        monitor.subscribe("metrics.events", lambda message: received.append(message.channel))
+        await self._wait_for_subscribers("metrics.#", 1)
+        await self._wait_for_subscribers("metrics.events", 1)
+
+        for channel in ("metrics.events", "metrics.health.cpu", "agent.requests"):
+            await publisher.publish(channel, MessageType.SYSTEM_EVENT, {})
+
+        deadline = time.monotonic() + 5
+        while len(received) < 3 and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.1)
+
+        # metrics.events 同时匹配两个本地订阅，但中枢只转发一帧
+        self.assertEqual(sorted(received), ["metrics.events", "metrics.events", "metrics.health.cpu"])
+        self.assertEqual(self.hub.get_statistics()["frames_forwarded"], 2)
+
+        for bus in (publisher, monitor):
+            await bus.shutdown()
+
+    async def _measure_worker_throughput(self, worker_count: int, requests: int) -> float:
+        processes = launch_agent_workers(self.address, blocking_agent_factory, worker_count)
+        bus = await self._connected_bus()
+        try:
+            await self._wait_for_subscribers(MessageChannels.agent_requests_for(BLOCKING_AGENT_NAME), worker_count)
+            agent = RemoteAgent(bus, AgentType.CUSTOM, BLOCKING_AGENT_NAME)
+
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(agent.process_request(f"q{i}") for i in range(requests)))
+            elapsed = time.perf_counter() - start
+
+            self.assertEqual(sorted(r.content for r in responses), sorted(f"done:q{i}" for i in range(requests)))
+            self.assertEqual(len({r.data["pid"] for r in responses}), worker_count)
+            return requests / elapsed
+        finally:
+            await bus.shutdown()
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join(timeout=10)
+
+    async def test_worker_processes_scale_agent_requests(self):
+        """测试 4 个工作进程处理 Agent 请求的吞吐接近线性扩展"""
+        requests = 80
+        single = await self._measure_worker_throughput(1, requests)
+        quad = await self._measure_worker_throughput(4, requests)
+
+        print(f"\n1 个工作进程: {single:.1f} 请求/秒, 4 个工作进程: {quad:.1f} 请求/秒, "
+              f"加速比: {quad / single:.2f}x")
+        self.assertGreater(quad / single, 3.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
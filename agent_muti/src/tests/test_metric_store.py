@@ -0,0 +1,132 @@
+import unittest
+import sys
+import os
+import time
+import tracemalloc
+from collections import deque
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.utils import metric_store
+from src.utils.metric_store import MetricSeries, TagInterner
+from src.utils.performance_monitor import PerformanceMonitor, PerformanceMetric
+
+
+class TestMetricSeries(unittest.TestCase):
+    def _check_ring(self):
+        series = MetricSeries(capacity=50)
+        for i in range(237):
+            series.append(float(i), i * 2.0, tag_id=i % 3)
+
+        columns = series.columns()
+        self.assertEqual(len(series), 50)
+        self.assertEqual(list(columns["timestamps"]), [float(i) for i in range(187, 237)])
+        self.assertEqual(list(columns["values"]), [i * 2.0 for i in range(187, 237)])
+        self.assertEqual(list(columns["tag_ids"]), [i % 3 for i in range(187, 237)])
+
+        self.assertEqual(list(series.columns(since=230.0)["timestamps"]), [float(i) for i in range(230, 237)])
+        self.assertEqual(list(series.columns(limit=3)["values"]), [468.0, 470.0, 472.0])
+        return series, columns
+
+    def test_ring_buffer_order_and_windows(self):
+        """测试环形缓冲区覆盖最旧样本、按时间窗口和数量切片"""
+        series, columns = self._check_ring()
+        if metric_store.np is not None:
+            # 导出的是底层数组的只读视图，而不是副本
+            self.assertTrue(metric_store.np.shares_memory(columns["values"], series.values))
+            self.assertFalse(columns["values"].flags.writeable)
+
+    def test_ring_buffer_without_numpy(self):
+        """测试未安装 NumPy 时退化为 array + memoryview"""
+        with mock.patch.object(metric_store, "np", None):
+            series, columns = self._check_ring()
+            self.assertIsInstance(columns["values"], memoryview)
+            self.assertTrue(columns["values"].readonly)
+
+    def test_tag_interner(self):
+        """测试相同标签组合得到相同ID"""
+        interner = TagInterner()
+        first = interner.intern({"phase": "think", "agent": "天气专家"})
+        self.assertEqual(interner.intern({"agent": "天气专家", "phase": "think"}), first)
+        self.assertEqual(interner.intern(None), 0)
+        self.assertIsNone(interner.find({"phase": "plan"}))
+        self.assertEqual(interner.lookup(first), {"phase": "think", "agent": "天气专家"})
+        self.assertNotEqual(interner.intern({"values": [1, 2]}), first)
+
+    def test_tag_interner_is_bounded(self):
+        """测试驻留表达到上限后新组合退化为 ID 0，已登记的组合不受影响"""
+        interner = TagInterner(max_entries=3)
+        first = interner.intern({"n": 1})
+        interner.intern({"n": 2})
+        self.assertEqual(interner.intern({"n": 3}), 0)
+        self.assertEqual(interner.intern({"n": 1}), first)
+        self.assertEqual((len(interner), interner.overflowed), (3, 1))
+
+
+class TestColumnarPerformanceMonitor(unittest.TestCase):
+    def test_failure_messages_are_not_interned(self):
+        """测试不同的错误信息不会在驻留表中累积"""
+        monitor = PerformanceMonitor()
+        for i in range(50):
+            with self.assertRaises(ValueError):
+                with monitor.track_performance("agent_request", "天气专家"):
+                    raise ValueError(f"第 {i} 次失败")
+
+        self.assertEqual(len(monitor._tag_interner), 2)
+        metadata = monitor.get_metric_history("agent_request.duration", limit=1)[0].metadata
+        self.assertEqual(metadata, {"agent": "天气专家", "status": "failed", "error": "ValueError"})
+
+    def test_history_and_statistics(self):
+        """测试历史还原与按时间窗口统计"""
+        monitor = PerformanceMonitor(max_metrics_history=100)
+        now = time.time()
+        for i in range(150):
+            monitor._record_sample("llm.latency", float(i), now - 150 + i, {"phase": "think"}, {"agent": "a"})
+
+        history = monitor.get_metric_history("llm.latency", limit=2)
+        self.assertEqual([m.value for m in history], [148.0, 149.0])
+        self.assertEqual(history[0].tags, {"phase": "think"})
+        self.assertEqual(history[0].metadata, {"agent": "a"})
+
+        stats = monitor.get_metric_statistics("llm.latency")
+        self.assertEqual(stats["count"], 100)
+        self.assertEqual(stats["min"], 50.0)
+        self.assertAlmostEqual(stats["p95"], monitor._calculate_percentile(list(range(50, 150)), 95))
+
+        windowed = monitor.get_metric_statistics("llm.latency", time_window=10.5)
+        self.assertEqual(windowed["count"], 10)
+        self.assertEqual(windowed["min"], 140.0)
+
+        columns = monitor.get_metric_columns("llm.latency", time_window=10.5)
+        self.assertEqual(monitor.resolve_tags(columns["tag_ids"][0]), {"phase": "think"})
+        self.assertEqual(monitor.get_metric_statistics("missing")["count"], 0)
+
+    def test_memory_per_sample_reduced_tenfold(self):
+        """测试每个样本的内存占用比数据类对象降低 10 倍以上"""
+        count = 5000
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            legacy = deque(maxlen=count)
+            for i in range(count):
+                legacy.append(PerformanceMetric(name="agent_request.duration", value=i * 0.001,
+                                                timestamp=time.time(), tags={},
+                                                metadata={"agent": "天气专家", "status": "success"}))
+            legacy_bytes = tracemalloc.get_traced_memory()[0] - baseline
+
+            baseline = tracemalloc.get_traced_memory()[0]
+            monitor = PerformanceMonitor(max_metrics_history=count)
+            for i in range(count):
+                monitor._record_sample("agent_request.duration", i * 0.001, time.time(), None,
+                                       {"agent": "天气专家", "status": "success"})
+            columnar_bytes = tracemalloc.get_traced_memory()[0] - baseline
+        finally:
+            tracemalloc.stop()
+
+        self.assertGreaterEqual(legacy_bytes / columnar_bytes, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
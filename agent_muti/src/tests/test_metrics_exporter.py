@@ -0,0 +1,81 @@
+import unittest
+import asyncio
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.utils.message_bus import MessageBus, MessageType
+from src.utils.metrics_exporter import MetricsExporter, CONTENT_TYPE
+from src.utils.performance_monitor import PerformanceMonitor
+
+
+class TestMetricsExporter(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        """测试前准备"""
+        self.monitor = PerformanceMonitor()
+        self.bus = MessageBus()
+        self.exporter = MetricsExporter(self.monitor, self.bus, host="127.0.0.1", port=0)
+        await self.exporter.start()
+
+    async def asyncTearDown(self):
+        await self.exporter.close()
+        await self.bus.shutdown()
+
+    async def _get(self, path: str):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.exporter.port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nAccept: {CONTENT_TYPE}\r\n\r\n".encode())
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        return head.decode(), body.decode("utf-8")
+
+    async def test_scrape_exposes_monitor_and_bus_metrics(self):
+        """测试抓取结果包含性能计数、直方图、Agent 指标和总线队列深度"""
+        for _ in range(3):
+            with self.monitor.track_performance("agent_request", "天气专家", tags={"phase": "action"}):
+                pass
+        self.monitor.record_custom_metric("llm.latency", 0.2, tags={"phase": "think"})
+        await self.bus.receive("agent.requests", timeout=0.01)  # 有 receive() 消费者的频道才保留消息
+        await self.bus.publish("agent.requests", MessageType.AGENT_REQUEST, {"query": "成都"})
+
+        head, body = await self._get("/metrics")
+        lines = body.splitlines()
+
+        self.assertIn("200 OK", head)
+        self.assertIn(CONTENT_TYPE, head)
+        self.assertEqual(lines[-1], "# EOF")
+        self.assertIn('agent_muti_requests_total{status="success"} 3', lines)
+        self.assertIn('agent_muti_agent_executions_total{agent="天气专家",status="success"} 3', lines)
+        self.assertIn('agent_muti_bus_channel_queue_depth{channel="agent.requests"} 1', lines)
+        self.assertIn('agent_muti_bus_messages_total{kind="sent"} 1', lines)
+        self.assertIn('agent_muti_operation_duration_seconds_count{metric="llm.latency",phase="think"} 1', lines)
+        self.assertIn('agent_muti_operation_duration_seconds_bucket{metric="llm.latency",phase="think",le="0.1"} 0',
+                      lines)
+        self.assertIn('agent_muti_operation_duration_seconds_bucket{metric="llm.latency",phase="think",le="0.25"} 1',
+                      lines)
+        self.assertTrue(any(line.startswith('agent_muti_agent_execution_quantile_seconds{agent="天气专家",quantile="0.99"}')
+                            for line in lines))
+
+        # 每个 TYPE 声明只出现一次
+        type_lines = [line for line in lines if line.startswith("# TYPE")]
+        self.assertEqual(len(type_lines), len(set(type_lines)))
+        self.assertEqual(self.exporter.scrapes, 1)
+
+    async def test_unknown_path_returns_404(self):
+        """测试未知路径返回 404"""
+        head, _ = await self._get("/unknown")
+        self.assertIn("404", head.splitlines()[0])
+
+    async def test_port_in_use_does_not_raise(self):
+        """测试端口被占用时启动失败只打印错误，关闭时不报错"""
+        exporter = MetricsExporter(self.monitor, port=self.exporter.port)
+        await exporter.start()
+        self.assertIsNone(exporter._server)
+        await exporter.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
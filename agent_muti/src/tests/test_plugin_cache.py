@@ -0,0 +1,126 @@
+import unittest
+import asyncio
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.core import agent_system  # 先加载 core 包，避免 agents 包的循环导入
+from src.agents.plugin_agent import PluginAgent
+from src.models.agent_models import AgentCapability, AgentType
+from src.utils.metrics_exporter import render_openmetrics
+from src.utils.plugin_cache import PluginCache, normalize_arguments
+
+
+class _WeatherAgent(PluginAgent):
+    def __init__(self, cache: PluginCache):
+        super().__init__(AgentType.WEATHER, "天气专家", "测试用天气Agent")
+        self.plugin_cache = cache
+        self.calls = 0
+        self.register_plugin("weather_query", self.weather_query,
+                             AgentCapability(name="weather_query", description="查询天气",
+                                             input_schema={"city": "str"}, output_schema={"weather": "str"}))
+
+    async def weather_query(self, city: str, date: str = "今天"):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return {"city": city, "date": date, "weather": "晴"}
+
+    async def process_request(self, prompt, context=None):
+        pass
+
+
+class TestPluginCache(unittest.IsolatedAsyncioTestCase):
+    async def _compute(self, value, counter):
+        counter.append(value)
+        await asyncio.sleep(0.01)
+        return {"value": value}
+
+    async def test_ttl_expiry(self):
+        """测试缓存在 TTL 内命中，过期后重新执行"""
+        cache = PluginCache()
+        calls = []
+        compute = lambda: self._compute(1, calls)
+
+        self.assertEqual((await cache.get_or_compute("a", "p", {"x": 1}, 0.05, compute))[1], "miss")
+        self.assertEqual((await cache.get_or_compute("a", "p", {"x": 1}, 0.05, compute))[1], "hit")
+        await asyncio.sleep(0.06)
+        self.assertEqual((await cache.get_or_compute("a", "p", {"x": 1}, 0.05, compute))[1], "miss")
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(cache.get_statistics()["expirations"], 1)
+
+    async def test_normalized_keys_and_copies(self):
+        """测试参数规范化后相同的调用共享缓存，且调用方修改结果不影响缓存"""
+        self.assertEqual(normalize_arguments({"city": " 杭州 ", "days": 3.0}),
+                         normalize_arguments({"days": 3, "city": "杭州"}))
+        cache = PluginCache()
+        calls = []
+        result, _ = await cache.get_or_compute("a", "p", {"city": "杭州 "}, 60, lambda: self._compute(1, calls))
+        result["value"] = 99
+        cached, status = await cache.get_or_compute("a", "p", {"city": "杭州"}, 60, lambda: self._compute(2, calls))
+        self.assertEqual((cached, status), ({"value": 1}, "hit"))
+
+    async def test_lru_eviction(self):
+        """测试超过条目数或字节上限时淘汰最久未使用的条目"""
+        cache = PluginCache(max_entries=2)
+        calls = []
+        for key in ("a", "b"):
+            await cache.get_or_compute("agent", "p", {"k": key}, 60, lambda: self._compute(key, calls))
+        await cache.get_or_compute("agent", "p", {"k": "a"}, 60, lambda: self._compute("a", calls))
+        await cache.get_or_compute("agent", "p", {"k": "c"}, 60, lambda: self._compute("c", calls))
+
+        self.assertEqual((await cache.get_or_compute("agent", "p", {"k": "a"}, 60,
+                                                     lambda: self._compute("a", calls)))[1], "hit")
+        self.assertEqual((await cache.get_or_compute("agent", "p", {"k": "b"}, 60,
+                                                     lambda: self._compute("b", calls)))[1], "miss")
+        self.assertEqual(cache.get_statistics()["evictions"], 2)
+
+        cache.configure(max_entries=100, max_bytes=cache.total_bytes // 2)
+        self.assertLessEqual(cache.total_bytes, cache.max_bytes)
+
+    async def test_singleflight_and_errors(self):
+        """测试并发的相同调用只执行一次，失败结果不缓存"""
+        cache = PluginCache()
+        calls = []
+        results = await asyncio.gather(*[
+            cache.get_or_compute("a", "p", {"x": 1}, 60, lambda: self._compute(1, calls)) for _ in range(5)])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(status for _, status in results), ["coalesced"] * 4 + ["miss"])
+
+        async def failing():
+            calls.append("fail")
+            raise RuntimeError("upstream down")
+
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                await cache.get_or_compute("a", "q", {}, 60, failing)
+        self.assertEqual(calls.count("fail"), 2)
+        statistics = cache.get_statistics()
+        self.assertEqual(statistics["inflight"], 0)
+        self.assertEqual(statistics["plugins"]["a.p"], {"hits": 0, "misses": 1, "coalesced": 4})
+
+    async def test_execute_plugin_uses_cache_duration(self):
+        """测试 execute_plugin 按 Agent 的缓存时间缓存插件结果"""
+        agent = _WeatherAgent(PluginCache())
+        await agent.execute_plugin("weather_query", city="杭州")
+        await agent.execute_plugin("weather_query", city="杭州")
+        self.assertEqual(agent.calls, 2)
+
+        agent.set_cache_duration(60)
+        await agent.execute_plugin("weather_query", city="杭州")
+        result = await agent.execute_plugin("weather_query", city=" 杭州")
+        self.assertEqual(result["weather"], "晴")
+        self.assertEqual(agent.calls, 3)
+
+        agent.plugin_cache.invalidate(agent="天气专家")
+        await agent.execute_plugin("weather_query", city="杭州")
+        self.assertEqual(agent.calls, 4)
+
+        text = render_openmetrics({"plugin_cache": agent.plugin_cache.get_statistics()}).decode()
+        self.assertIn('agent_muti_plugin_cache_lookups_total{plugin="天气专家.weather_query",result="hits"} 1', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
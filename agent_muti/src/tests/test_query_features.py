@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.core import agent_system  # 先加载 core 包，避免 agents 包的循环导入
+from src.plugins.transport_agent import TransportAgent
+from src.plugins.attraction_agent import AttractionAgent
+from src.plugins.budget_agent import BudgetAgent
+from src.utils.query_features import (AhoCorasick, QueryAnalyzer, QueryFeatures, parse_budget,
+                                      parse_duration_days, parse_number, parse_travelers, query_features)
+
+
+class TestQueryFeatures(unittest.TestCase):
+    def test_aho_corasick(self):
+        """测试自动机找出全部（含重叠）匹配，并支持最左最长选择"""
+        automaton = AhoCorasick()
+        for word in ("he", "she", "his", "hers"):
+            automaton.add(word, word.upper())
+        matches = sorted((start, word) for start, _, word, _ in automaton.iter_matches("ushers"))
+        self.assertEqual(matches, [(1, "she"), (2, "he"), (2, "hers")])
+        self.assertEqual([(word, value) for _, _, word, value in automaton.find_all("ushers")], [("she", "SHE")])
+
+    def test_number_parsers(self):
+        """测试中文数字、天数、人数与预算解析"""
+        self.assertEqual(parse_number("两"), 2)
+        self.assertEqual(parse_number("十五"), 15)
+        self.assertEqual(parse_number("一百二十"), 120)
+        self.assertEqual(parse_number("两万"), 20000)
+        self.assertIsNone(parse_number("几"))
+
+        self.assertEqual(parse_duration_days("杭州三日游"), 3)
+        self.assertEqual(parse_duration_days("玩一周"), 7)
+        self.assertEqual(parse_duration_days("住3晚"), 4)
+        self.assertIsNone(parse_duration_days("第三天去西湖"))
+        self.assertIsNone(parse_duration_days("10月12日出发"))
+
+        self.assertEqual(parse_travelers("我们两个人"), 2)
+        self.assertEqual(parse_travelers("一家三口出游"), 3)
+        self.assertEqual(parse_budget("预算5000元"), 5000)
+        self.assertEqual(parse_budget("总共两万块"), 20000)
+        self.assertEqual(parse_budget("预算8千"), 8000)
+
+    def test_analyze(self):
+        """测试词典匹配城市、景点、兴趣与酒店档次"""
+        analyzer = QueryAnalyzer()
+        features = analyzer.analyze("从上海到北京玩五天，4人，想看故宫和博物馆，住经济型酒店")
+        self.assertEqual((features.from_city, features.to_city), ("上海", "北京"))
+        self.assertEqual(features.pois, ["故宫"])
+        self.assertEqual(features.interests, ["历史"])
+        self.assertEqual((features.price_tier, features.days, features.travelers), ("economy", 5, 4))
+
+        features = analyzer.analyze("上海博物馆和外滩一日游")
+        self.assertEqual(features.cities, [])
+        self.assertEqual(features.city, "上海")
+
+        analyzer.configure({"cities": ["厦门"], "pois": {"厦门": ["鼓浪屿"]}})
+        self.assertEqual(analyzer.analyze("鼓浪屿两天").city, "厦门")
+
+        restored = QueryFeatures.from_dict(features.to_dict())
+        self.assertEqual(restored.pois, features.pois)
+
+
+class TestPluginFeatures(unittest.IsolatedAsyncioTestCase):
+    async def _run(self, agent, query, context):
+        calls = []
+        agent.plugins = {name: (lambda name: lambda **kwargs: calls.append((name, kwargs)) or {})(name)
+                         for name in agent.plugins}
+
+        async def call_llm(messages, **kwargs):
+            return "ok"
+
+        agent._call_llm = call_llm
+        await agent.process_request(query, context)
+        return calls[0][1]
+
+    async def test_plugins_use_context_features(self):
+        """测试插件读取上下文中的查询特征，而不是重新解析 Agent 提示词"""
+        features = QueryAnalyzer().analyze("从广州去成都三天，喜欢美食")
+        context = {"query_features": features}
+
+        kwargs = await self._run(TransportAgent(), "查询交通方式", context)
+        self.assertEqual(kwargs, {"from_city": "广州", "to_city": "成都"})
+        kwargs = await self._run(AttractionAgent(), "推荐北京景点", context)
+        self.assertEqual(kwargs, {"city": "成都", "days": 3})
+
+        kwargs = await self._run(BudgetAgent(), "分析预算", context)
+        self.assertEqual(kwargs, {"days": 3, "travelers": 2, "city": "成都"})
+
+        # 查询没有提到天数/人数时使用配置的默认值（固定值，插件缓存可以命中）
+        plain = {"query_features": QueryAnalyzer().analyze("去杭州玩")}
+        kwargs = await self._run(BudgetAgent(default_days=4, default_travelers=1), "分析预算", plain)
+        self.assertEqual(kwargs, {"days": 4, "travelers": 1, "city": "杭州"})
+
+        # 直接调用（上下文中没有特征，或特征经过序列化）时仍能得到结果
+        self.assertEqual(query_features("西安两日游").city, "西安")
+        self.assertEqual(query_features("", {"query_features": features.to_dict()}).days, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
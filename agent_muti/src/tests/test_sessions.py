@@ -0,0 +1,202 @@
+import unittest
+import asyncio
+import json
+import sys
+import os
+from types import SimpleNamespace
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.core import agent_system  # 先加载 core 包，避免 agents 包的循环导入
+from src.agents.coordinator_agent import EnhancedCoordinatorAgent
+from src.core.session_manager import SessionManager
+from src.core.session_server import SessionServer
+from src.models.agent_models import AgentResponse, AgentType, StreamingResponse
+from src.prompt.constants import THINK_PROMPT, PLAN_PROMPT, NEXT_PROMPT, SUMMARY_PROMPT
+
+
+class _Client:
+    """模拟 chat.completions.create：按提示词返回 JSON，总结时原样复述查询，并记录调用时的步骤"""
+
+    def __init__(self, coordinator_ref):
+        self.coordinator_ref = coordinator_ref
+        self.steps = []
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, model, messages, stream=False, **kwargs):
+        system = messages[0]["content"]
+        await asyncio.sleep(0.01)  # 让不同会话的请求交错执行
+        if stream:
+            return self._stream(messages[-1]["content"])
+        if system == SUMMARY_PROMPT:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="总结"))], usage=None)
+        expected = {THINK_PROMPT: "think", PLAN_PROMPT: "plan", NEXT_PROMPT: "next"}[system]
+        self.steps.append((expected, self.coordinator_ref[0].step))
+        replies = {
+            THINK_PROMPT: {"missing_info": ["天气"], "should_complete": False},
+            PLAN_PROMPT: {"required_agents": ["天气专家"], "execution_sequence": [["天气专家"]]},
+            NEXT_PROMPT: {"should_terminate": True},
+        }
+        content = json.dumps(replies[system], ensure_ascii=False)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    async def _stream(self, prompt):
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="总结"))], usage=None)
+
+
+class _WeatherAgent:
+    async def process_request(self, prompt, context):
+        return AgentResponse(agent_type=AgentType.WEATHER, content="晴", data={"weather": "晴"}, confidence=0.9)
+
+
+class _Session:
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.active = 0
+        self.requests = 0
+        self.closed = False
+
+    def touch(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class _System:
+    """模拟系统：回答内容为会话 ID 与查询"""
+
+    def __init__(self):
+        self.session_manager = SessionManager(_Session)
+
+    def process_query_stream(self, query, session_id=None):
+        async def source():
+            if query == "boom":
+                raise RuntimeError("boom")
+            async with self.session_manager.acquire(session_id):
+                yield session_id
+                yield ":" + query
+                yield AgentResponse(agent_type=AgentType.COORDINATOR, content=f"{session_id}:{query}",
+                                    data={}, confidence=1.0)
+        return StreamingResponse(source())
+
+
+class TestSessionManager(unittest.IsolatedAsyncioTestCase):
+    async def test_lru_eviction_keeps_active_sessions(self):
+        """测试超出会话上限时淘汰最久未使用的空闲会话，正在处理请求的会话保留"""
+        manager = SessionManager(_Session, max_sessions=2)
+        first = manager.get("a")
+        manager.get("b")
+        async with manager.acquire("a"):
+            manager.get("c")  # a 正在使用，淘汰 b
+            self.assertEqual(set(manager._sessions), {"a", "c"})
+            manager.get("d")  # 只剩 c 可淘汰
+            self.assertEqual(set(manager._sessions), {"a", "d"})
+        self.assertFalse(first.closed)
+        manager.get("e")
+        self.assertNotIn("a", manager)
+        self.assertTrue(first.closed)
+        self.assertEqual(manager.get_statistics()["evicted"], 3)
+
+    async def test_concurrency_cap(self):
+        """测试同时处理的请求数不超过 max_concurrent，排队中被取消的请求不占名额"""
+        manager = SessionManager(_Session, max_concurrent=2)
+
+        async def request(session_id):
+            async with manager.acquire(session_id):
+                await asyncio.sleep(0.02)
+
+        await asyncio.gather(*(request(f"s{i}") for i in range(6)))
+        statistics = manager.get_statistics()
+        self.assertEqual(statistics["peak_active"], 2)
+        self.assertEqual(statistics["requests"], 6)
+
+        blocker = asyncio.gather(request("x"), request("y"))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(request("z"))
+        await asyncio.sleep(0.005)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        await blocker
+        self.assertEqual((manager.active, manager.waiting), (0, 0))
+        self.assertEqual(manager._sessions["z"].active, 0)
+
+
+class TestSessionIsolation(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_sessions_keep_separate_state(self):
+        """测试并发会话各自保存对话记忆和迭代历史，共享 Agent 注册表，步骤互不干扰"""
+        ref = []
+        coordinator = EnhancedCoordinatorAgent()
+        ref.append(coordinator)
+        coordinator.llm_client = _Client(ref)
+        coordinator.retry_delay = 0
+        coordinator.agent_registry["天气专家"] = _WeatherAgent()
+        coordinator.iteration_controller.max_iterations = 1
+
+        first, second = coordinator.create_session("u1"), coordinator.create_session("u2")
+        self.assertIsNot(first.iteration_controller, second.iteration_controller)
+        self.assertIs(first.iteration_controller.phase_timeouts, coordinator.iteration_controller.phase_timeouts)
+
+        responses = await asyncio.gather(
+            coordinator.process_request("北京天气", session=first),
+            coordinator.process_request("上海天气", session=second),
+            coordinator.process_request("广州天气", session=first),
+        )
+
+        self.assertEqual([r.data["session_id"] for r in responses], ["u1", "u2", "u1"])
+        self.assertEqual([m["content"] for m in first.conversation_memory if m["role"] == "user"],
+                         ["北京天气", "广州天气"])
+        self.assertEqual([m["content"] for m in second.conversation_memory if m["role"] == "user"], ["上海天气"])
+        self.assertEqual(len(coordinator.conversation_memory), 0)
+        second_states = [step.state for step in second.iteration_controller.iteration_history]
+        self.assertEqual(second_states, ["think", "plan", "action", "next"])
+        self.assertEqual(len(first.iteration_controller.iteration_history), len(second_states))
+        for expected, observed in coordinator.llm_client.steps:
+            self.assertEqual(observed, expected)
+
+    async def test_default_session(self):
+        """测试未指定会话时沿用协调器自身的对话记忆"""
+        ref = []
+        coordinator = EnhancedCoordinatorAgent()
+        ref.append(coordinator)
+        coordinator.llm_client = _Client(ref)
+        coordinator.agent_registry["天气专家"] = _WeatherAgent()
+        coordinator.iteration_controller.max_iterations = 1
+
+        response = await coordinator.process_request("北京天气")
+        self.assertEqual(response.data["session_id"], "default")
+        self.assertEqual(len(coordinator.conversation_memory), 2)
+
+
+class TestSessionServer(unittest.IsolatedAsyncioTestCase):
+    async def test_round_trip(self):
+        """测试 JSON Lines 协议：流式片段、完整响应、错误和关闭会话"""
+        system = _System()
+        server = SessionServer(system, port=0)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            requests = [{"session_id": "u1", "query": "你好"}, {"session_id": "u1", "query": "boom"},
+                        "not json", {"type": "close", "session_id": "u1"}]
+            for request in requests:
+                line = request if isinstance(request, str) else json.dumps(request, ensure_ascii=False)
+                writer.write(line.encode("utf-8") + b"\n")
+            await writer.drain()
+
+            messages = [json.loads(await asyncio.wait_for(reader.readline(), timeout=5)) for _ in range(6)]
+            writer.close()
+            await writer.wait_closed()
+        finally:
+            await server.close()
+
+        self.assertEqual([m["type"] for m in messages], ["delta", "delta", "response", "error", "error", "closed"])
+        self.assertEqual(messages[2]["response"]["content"], "u1:你好")
+        self.assertEqual(messages[3]["error"], "boom")
+        self.assertTrue(messages[5]["closed"])
+        self.assertEqual(server.get_statistics()["requests"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
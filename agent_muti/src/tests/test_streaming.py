@@ -0,0 +1,143 @@
+import unittest
+import asyncio
+import json
+import sys
+import os
+from types import SimpleNamespace
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.core.agent_system import _iterate_with_deadline
+from src.agents.coordinator_agent import EnhancedCoordinatorAgent
+from src.models.agent_models import AgentResponse, AgentType, StreamingResponse
+from src.prompt.constants import THINK_PROMPT, PLAN_PROMPT, NEXT_PROMPT, SUMMARY_PROMPT
+from src.utils.performance_monitor import PerformanceMonitor
+
+
+def _chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class _StreamingClient:
+    """模拟 chat.completions.create：普通请求按提示词返回 JSON，流式请求逐段输出总结"""
+
+    def __init__(self, pieces, failures=0):
+        self.pieces = pieces
+        self.failures = failures
+        self.stream_calls = 0
+        self.summary_calls = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, model, messages, stream=False, **kwargs):
+        system = messages[0]["content"]
+        if stream:
+            self.stream_calls += 1
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("connection reset")
+            return self._stream()
+        replies = {
+            THINK_PROMPT: {"missing_info": ["天气"], "should_complete": False},
+            PLAN_PROMPT: {"required_agents": ["天气专家"], "execution_sequence": [["天气专家"]]},
+            NEXT_PROMPT: {"should_terminate": True},
+        }
+        if system == SUMMARY_PROMPT:
+            self.summary_calls += 1
+            content = "".join(self.pieces)
+        else:
+            content = json.dumps(replies[system], ensure_ascii=False)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    async def _stream(self):
+        yield _chunk("")
+        for piece in self.pieces:
+            await asyncio.sleep(0.01)
+            yield _chunk(piece)
+        yield _chunk(usage=SimpleNamespace(prompt_tokens=30, completion_tokens=len(self.pieces)))
+
+
+class _WeatherAgent:
+    async def process_request(self, prompt, context):
+        return AgentResponse(agent_type=AgentType.WEATHER, content="晴", data={"weather": "晴"}, confidence=0.9)
+
+
+def _coordinator(client) -> EnhancedCoordinatorAgent:
+    coordinator = EnhancedCoordinatorAgent()
+    coordinator.llm_client = client
+    coordinator.retry_delay = 0
+    coordinator.agent_registry["天气专家"] = _WeatherAgent()
+    coordinator.iteration_controller.max_iterations = 1
+    return coordinator
+
+
+class TestStreaming(unittest.IsolatedAsyncioTestCase):
+    async def test_stream_llm_retries_before_first_token(self):
+        """测试流式调用在首个片段前失败时重试，并累计用量"""
+        client = _StreamingClient(["杭州", "晴天"], failures=1)
+        coordinator = _coordinator(client)
+        messages = [{"role": "system", "content": SUMMARY_PROMPT}, {"role": "user", "content": "q"}]
+
+        pieces = [piece async for piece in coordinator._stream_llm(messages)]
+        self.assertEqual(pieces, ["杭州", "晴天"])
+        self.assertEqual(client.stream_calls, 2)
+        self.assertEqual(coordinator.token_usage, {"calls": 1, "prompt_tokens": 30, "completion_tokens": 2})
+
+    async def test_process_request_stream(self):
+        """测试协调器逐段产出最终回答，结束后得到完整响应与首字延迟"""
+        coordinator = _coordinator(_StreamingClient(["建议", "带伞", "出行"]))
+        stream = coordinator.process_request_stream("杭州天气")
+
+        pieces = [piece async for piece in stream]
+        self.assertEqual(pieces, ["建议", "带伞", "出行"])
+        self.assertEqual(stream.response.content, "建议带伞出行")
+        self.assertGreater(stream.response.metadata["time_to_first_token"], 0)
+        self.assertEqual(coordinator.conversation_memory[-1]["content"], "建议带伞出行")
+
+        # 非流式调用方使用普通调用生成总结（保留对冲与自适应超时）
+        response = await coordinator.process_request("杭州天气")
+        self.assertEqual(response.content, "建议带伞出行")
+        self.assertEqual((coordinator.llm_client.stream_calls, coordinator.llm_client.summary_calls), (1, 1))
+        self.assertIsNone(response.metadata["time_to_first_token"])
+
+    async def test_stream_deadline(self):
+        """测试流在首个片段之后停滞时按整体截止时间结束，并关闭底层生成器"""
+        closed = []
+
+        async def source():
+            try:
+                yield "第一段"
+                await asyncio.sleep(10)
+                yield AgentResponse(agent_type=AgentType.COORDINATOR, content="", data={}, confidence=1.0)
+            finally:
+                closed.append(True)
+
+        received = []
+        with self.assertRaises(asyncio.TimeoutError):
+            async for item in _iterate_with_deadline(StreamingResponse(source()), 0.05):
+                received.append(item)
+        self.assertEqual(received, ["第一段"])
+        self.assertEqual(closed, [True])
+
+        async def complete():
+            yield "回答"
+            yield AgentResponse(agent_type=AgentType.COORDINATOR, content="回答", data={}, confidence=1.0)
+
+        items = [item async for item in _iterate_with_deadline(StreamingResponse(complete()), 1)]
+        self.assertEqual(items[0], "回答")
+        self.assertEqual(items[1].content, "回答")
+
+    def test_time_to_first_token_report(self):
+        """测试首字延迟进入性能报告"""
+        monitor = PerformanceMonitor()
+        for seconds in (0.5, 1.0, 1.5):
+            monitor.record_time_to_first_token(seconds)
+        report = monitor.generate_report()["overall_metrics"]["time_to_first_token"]
+        self.assertEqual(report["count"], 3)
+        self.assertAlmostEqual(report["p50"], 1.0, delta=0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.utils.topic_trie import TopicTrie, topic_matches, is_pattern
+
+
+class TestTopicTrie(unittest.TestCase):
+    def setUp(self):
+        """测试前准备"""
+        self.trie = TopicTrie()
+        for pattern in ("agent.requests", "agent.*", "agent.#", "system.#", "#", "*.responses", "a.#.z"):
+            self.trie.add(pattern, pattern)
+
+    def test_match_wildcards(self):
+        """测试 * 匹配一段、# 匹配零段或多段"""
+        self.assertEqual(sorted(self.trie.match("agent.requests")),
+                         sorted(["agent.requests", "agent.*", "agent.#", "#"]))
+        self.assertEqual(sorted(self.trie.match("agent")), sorted(["agent.#", "#"]))
+        self.assertEqual(sorted(self.trie.match("agent.requests.天气专家")), sorted(["agent.#", "#"]))
+        self.assertEqual(sorted(self.trie.match("agent.responses")),
+                         sorted(["agent.*", "agent.#", "#", "*.responses"]))
+        self.assertEqual(sorted(self.trie.match("system.health.cpu")), sorted(["system.#", "#"]))
+        self.assertEqual(sorted(self.trie.match("a.z")), sorted(["a.#.z", "#"]))
+        self.assertEqual(sorted(self.trie.match("a.b.c.z")), sorted(["a.#.z", "#"]))
+
+    def test_remove_prunes_nodes(self):
+        """测试移除后不再匹配，空节点被清理"""
+        self.assertTrue(self.trie.remove("agent.*", "agent.*"))
+        self.assertFalse(self.trie.remove("agent.*", "agent.*"))
+        self.assertNotIn("agent.*", self.trie.match("agent.responses"))
+        self.assertNotIn("*", self.trie._root.children["agent"].children)
+        self.assertEqual(len(self.trie), 6)
+
+    def test_match_agrees_with_topic_matches(self):
+        """测试前缀树与逐个模式匹配结果一致"""
+        topics = ["agent", "agent.requests", "agent.requests.x", "system", "system.events",
+                  "a.z", "a.b.z", "a.b", "x.responses", "performance.metrics"]
+        patterns = ["agent.requests", "agent.*", "agent.#", "system.#", "#", "*.responses", "a.#.z"]
+        for topic in topics:
+            expected = sorted(p for p in patterns if topic_matches(p, topic))
+            self.assertEqual(sorted(self.trie.match(topic)), expected, topic)
+
+    def test_is_pattern(self):
+        """测试通配符识别只针对完整分段"""
+        self.assertTrue(is_pattern("agent.*"))
+        self.assertTrue(is_pattern("system.#"))
+        self.assertFalse(is_pattern("agent.requests"))
+        self.assertFalse(is_pattern("agent*"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+import asyncio
+import json
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.iteration_controller import IterationController
+from src.models.agent_models import AgentResponse, AgentType
+from src.utils.tracing import current_span, span, start_trace, traced
+
+
+class _FakeAgent:
+    def __init__(self, name: str, delay: float):
+        self.name = name
+        self.delay = delay
+
+    async def process_request(self, prompt, context):
+        with span("work", "plugin"):
+            await asyncio.sleep(self.delay)
+        return AgentResponse(agent_type=AgentType.CUSTOM, content=f"{self.name} done", data={}, confidence=1.0)
+
+
+class _FakeCoordinator:
+    def __init__(self):
+        self.agent_registry = {"weather": _FakeAgent("weather", 0.02), "hotel": _FakeAgent("hotel", 0.01)}
+        self.step = None
+
+    def set_step(self, step):
+        self.step = step
+
+    @traced("llm", category="llm")
+    async def _call_llm(self, messages, **kwargs):
+        await asyncio.sleep(0.001)
+        if self.step == "plan":
+            return json.dumps({
+                "required_agents": ["weather", "hotel"],
+                "expected_outputs": {"weather": "天气", "hotel": "酒店"}
+            })
+        if self.step == "next":
+            return json.dumps({"should_terminate": True})
+        return json.dumps({"should_complete": False, "acquired_info": {}})
+
+
+class TestTracing(unittest.IsolatedAsyncioTestCase):
+    async def test_spans_are_noop_without_trace(self):
+        """测试未开启追踪时区间不做任何记录"""
+        with span("idle") as idle:
+            self.assertIsNone(idle)
+            self.assertIsNone(current_span())
+
+    async def test_parent_propagates_into_tasks(self):
+        """测试父区间通过 contextvars 传播到并发子任务"""
+        async def child(index):
+            with span(f"child-{index}", index=index):
+                await asyncio.sleep(0.01)
+
+        with start_trace("request") as trace:
+            with span("fanout") as fanout:
+                await asyncio.gather(child(0), child(1), child(2))
+
+        spans = {item.name: item for item in trace.spans}
+        for index in range(3):
+            child_span = spans[f"child-{index}"]
+            self.assertEqual(child_span.parent_id, fanout.span_id)
+            self.assertNotEqual(child_span.lane, fanout.lane)
+            self.assertGreaterEqual(child_span.duration_us, 10_000)
+        self.assertIsNone(spans["request"].parent_id)
+        self.assertEqual(fanout.parent_id, spans["request"].span_id)
+        self.assertIsNone(current_span())
+
+    async def test_errors_are_recorded(self):
+        """测试异常会记录到区间属性并继续抛出"""
+        with start_trace("request") as trace:
+            with self.assertRaises(ValueError):
+                with span("failing"):
+                    raise ValueError("boom")
+
+        failing = next(item for item in trace.spans if item.name == "failing")
+        self.assertEqual(failing.attributes["error"], "ValueError: boom")
+        self.assertIsNotNone(failing.end_us)
+
+    async def test_iteration_cycle_exports_chrome_trace(self):
+        """测试迭代周期各阶段和 Agent 执行被导出为 Chrome trace"""
+        controller = IterationController(max_iterations=2)
+        with start_trace("query", query="去杭州") as trace:
+            await controller.execute_iteration_cycle("去杭州", {}, _FakeCoordinator(), ["weather", "hotel"])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = trace.export(directory)
+            with open(path, encoding="utf-8") as file:
+                exported = json.load(file)
+
+        events = [event for event in exported["traceEvents"] if event["ph"] == "X"]
+        names = [event["name"] for event in events]
+        for name in ("query", "iteration", "think", "plan", "action", "next", "agent:weather", "agent:hotel"):
+            self.assertIn(name, names)
+        self.assertEqual(names.count("llm"), 3)
+        self.assertEqual(names.count("work"), 2)
+
+        by_id = {event["args"]["span_id"]: event for event in events}
+        action = next(event for event in events if event["name"] == "action")
+        for event in events:
+            if event["name"].startswith("agent:"):
+                self.assertEqual(event["args"]["parent_id"], action["args"]["span_id"])
+                # 子区间落在父区间的时间范围内
+                self.assertGreaterEqual(event["ts"], action["ts"])
+                self.assertLessEqual(event["ts"] + event["dur"], action["ts"] + action["dur"] + 1)
+            if event["name"] == "work":
+                self.assertTrue(by_id[event["args"]["parent_id"]]["name"].startswith("agent:"))
+
+        lanes = {event["tid"] for event in exported["traceEvents"] if event["ph"] == "M" and event["name"] == "thread_name"}
+        self.assertTrue({event["tid"] for event in events} <= lanes)
+        self.assertEqual(exported["otherData"]["query"], "去杭州")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+THINK+PLAN 合并模式基准测试 - 对比两次调用与一次合并调用的端到端延迟和 token 用量
+
+默认使用模拟的 LLM（固定往返延迟 + 按输出 token 计的生成时间），
+加 --live 时使用真实的 OpenAI 接口（需要 OPENAI_API_KEY）。
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import re
+import sys
+import os
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+
+from src.core.agent_system import EnhancedDynamicAgentSystem
+from src.core.context_store import estimate_tokens
+from src.prompt.constants import THINK_PROMPT, PLAN_PROMPT, THINK_PLAN_PROMPT, NEXT_PROMPT, SUMMARY_PROMPT
+
+# 与 src/examples/demo.py 中的演示查询一致
+DEMO_QUERIES = [
+    "两人去成都玩三天大概要花多少钱？天气怎么样？怎么去最方便？",
+    "我想规划一次去上海的旅行，需要了解天气、交通和预算，还要考虑酒店和景点",
+    "帮我比较北京、上海、广州三个城市的旅行成本，包括交通、住宿和餐饮",
+    "我需要一个完整的杭州五日游计划，要详细的天气预测、交通方案和每日预算",
+]
+
+_AGENT_KEYWORDS = [
+    ("天气专家", ("天气",)),
+    ("交通规划师", ("交通", "怎么去", "方便")),
+    ("酒店选择师", ("酒店", "住宿")),
+    ("景点推荐师", ("景点", "游", "玩")),
+    ("预算分析师", ("预算", "钱", "成本", "花")),
+]
+
+
+class SimulatedLLMClient:
+    """模拟 AsyncOpenAI 的 chat.completions 接口，按提示词类型返回结构化结果"""
+
+    def __init__(self, rtt: float = 0.4, seconds_per_token: float = 0.01, scale: float = 1.0):
+        self.rtt = rtt * scale
+        self.seconds_per_token = seconds_per_token * scale
+        self.chat = SimpleNamespace(completions=self)
+
+    @staticmethod
+    def _query(prompt: str) -> str:
+        match = re.search(r"(?:当前用户查询|用户查询|原始查询|用户原始查询): (.*)", prompt)
+        return match.group(1).strip() if match else ""
+
+    @staticmethod
+    def _plan(query: str) -> dict:
+        agents = [name for name, words in _AGENT_KEYWORDS if any(word in query for word in words)]
+        upstream = [name for name in agents if name != "预算分析师"]
+        plan = {
+            "required_agents": agents,
+            "execution_sequence": [upstream, ["预算分析师"]] if "预算分析师" in agents and upstream else [agents],
+            "expected_outputs": {name: f"{query}（{name}视角）" for name in agents},
+            "strategy": "dependency",
+            "iteration_goal": "收集天气、交通、住宿与预算信息"
+        }
+        if "预算分析师" in agents:
+            plan["dependencies"] = {"预算分析师": [name for name in upstream if name in ("交通规划师", "酒店选择师")]}
+        return plan
+
+    @staticmethod
+    def _analysis(query: str) -> dict:
+        return {
+            "core_requirements": [part for part in re.split(r"[，？、,]", query) if part][:4],
+            "missing_info": ["目的地天气", "往返交通方案", "住宿价位", "总体预算"],
+            "confidence_level": 0.3,
+            "should_complete": False,
+            "reasoning": "需要调用专业Agent获取天气、交通、住宿和预算数据后再整合回答。"
+        }
+
+    def _reply(self, system: str, prompt: str) -> str:
+        query = self._query(prompt)
+        if system == THINK_PROMPT:
+            return json.dumps(self._analysis(query), ensure_ascii=False)
+        if system == PLAN_PROMPT:
+            return json.dumps(self._plan(query), ensure_ascii=False)
+        if system == THINK_PLAN_PROMPT:
+            return json.dumps({"analysis": self._analysis(query), "plan": self._plan(query)}, ensure_ascii=False)
+        if system == NEXT_PROMPT:
+            return json.dumps({"should_terminate": True, "confidence_score": 0.85,
+                               "next_focus": "整合现有信息", "reasoning": "信息已足够"}, ensure_ascii=False)
+        if system == SUMMARY_PROMPT:
+            return "综合各专业Agent的分析，建议如下：" + "出行前关注天气，优先选择高铁，预算控制在合理范围。" * 4
+        return "根据查询数据给出的专业建议：" + "行程安排合理，注意提前预订。" * 3
+
+    async def create(self, model, messages, temperature=None, max_tokens=None, stream=False, **kwargs):
+        system = messages[0]["content"]
+        prompt = messages[-1]["content"]
+        content = self._reply(system, prompt)
+        usage = SimpleNamespace(prompt_tokens=sum(estimate_tokens(message["content"]) for message in messages),
+                                completion_tokens=estimate_tokens(content))
+        if stream:
+            await asyncio.sleep(self.rtt)
+            return self._stream(content, usage)
+        await asyncio.sleep(self.rtt + usage.completion_tokens * self.seconds_per_token)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+    async def _stream(self, content: str, usage):
+        """按固定长度切分内容逐段输出，最后一个片段携带用量"""
+        for start in range(0, len(content), 8):
+            piece = content[start:start + 8]
+            await asyncio.sleep(estimate_tokens(piece) * self.seconds_per_token)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))], usage=None)
+        yield SimpleNamespace(choices=[], usage=usage)
+
+
+async def run_mode(fused: bool, queries, live: bool, scale: float) -> dict:
+    """用指定模式跑完全部查询，返回延迟与 token 统计"""
+    system = EnhancedDynamicAgentSystem(os.environ["OPENAI_API_KEY"], config={"fused_think_plan": fused})
+    agents = [system.coordinator, *system.coordinator.agent_registry.values()]
+    if not live:
+        client = SimulatedLLMClient(scale=scale)
+        for agent in agents:
+            agent.llm_client = client
+
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        await system.initialize_system()
+        try:
+            for query in queries:
+                started = time.perf_counter()
+                await system.process_query(query)
+                latencies.append(time.perf_counter() - started)
+        finally:
+            await system.shutdown_system()
+
+    coordinator_usage = system.coordinator.token_usage
+    total_prompt = sum(agent.token_usage["prompt_tokens"] for agent in agents)
+    total_completion = sum(agent.token_usage["completion_tokens"] for agent in agents)
+    return {
+        "mode": "fused" if fused else "two-call",
+        "total_seconds": sum(latencies),
+        "mean_seconds": sum(latencies) / len(latencies),
+        "coordinator_calls": coordinator_usage["calls"],
+        "coordinator_tokens": coordinator_usage["prompt_tokens"] + coordinator_usage["completion_tokens"],
+        "prompt_tokens": total_prompt,
+        "completion_tokens": total_completion
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="THINK+PLAN 合并模式基准测试")
+    parser.add_argument("--live", action="store_true", help="使用真实的 OpenAI 接口")
+    parser.add_argument("--scale", type=float, default=0.1, help="模拟延迟的缩放系数（仅模拟模式）")
+    args = parser.parse_args()
+
+    print("🚀 THINK+PLAN 合并模式基准测试" + ("（真实 LLM）" if args.live else f"（模拟 LLM，延迟缩放 {args.scale}）"))
+    print("=" * 60)
+    results = [await run_mode(False, DEMO_QUERIES, args.live, args.scale),
+               await run_mode(True, DEMO_QUERIES, args.live, args.scale)]
+
+    for result in results:
+        print(f"\n📊 {result['mode']}")
+        print(f"• 总耗时: {result['total_seconds']:.2f}s (平均每个查询 {result['mean_seconds']:.2f}s)")
+        print(f"• 协调器 LLM 调用: {result['coordinator_calls']} 次, {result['coordinator_tokens']} tokens")
+        print(f"• 全部 token: 输入 {result['prompt_tokens']}, 输出 {result['completion_tokens']}")
+
+    baseline, fused = results
+    print("\n📈 合并模式相对两次调用:")
+    print(f"• 端到端延迟: {fused['total_seconds'] / baseline['total_seconds'] - 1:+.1%}")
+    print(f"• 协调器调用次数: {fused['coordinator_calls'] - baseline['coordinator_calls']:+d}")
+    print(f"• 协调器 token: {fused['coordinator_tokens'] / baseline['coordinator_tokens'] - 1:+.1%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,14 +1,34 @@
 # multi_agent_system/utils/__init__.py
 from .config_manager import ConfigManager, get_config_manager
 from .performance_monitor import PerformanceMonitor
-from .message_bus import MessageBus, Message, MessageType, MessagePriority
+from .latency_histogram import LatencyHistogram, WindowedHistogram
+from .message_bus import MessageBus, Message, MessageType, MessagePriority, OverflowPolicy
+from .message_codec import MessageCodec, JsonMessageCodec, BinaryMessageCodec, get_codec
+from .message_log import MessageLog, LogConsumer
+from .metrics_exporter import MetricsExporter
+from .tracing import Trace, Span, start_trace, span, traced
 
 __all__ = [
     "ConfigManager",
     "get_config_manager",
     "PerformanceMonitor",
+    "LatencyHistogram",
+    "WindowedHistogram",
     "MessageBus",
     "Message",
     "MessageType",
-    "MessagePriority"
+    "MessagePriority",
+    "OverflowPolicy",
+    "MessageCodec",
+    "JsonMessageCodec",
+    "BinaryMessageCodec",
+    "get_codec",
+    "MessageLog",
+    "LogConsumer",
+    "MetricsExporter",
+    "Trace",
+    "Span",
+    "start_trace",
+    "span",
+    "traced"
 ]
\ No newline at end of file
@@ -86,7 +86,18 @@ class ConfigManager:
                 "log_level": "INFO",
                 "max_iterations": 5,
                 "enable_monitoring": True,
-                "api_timeout": 30
+                "api_timeout": 30,
+                "max_concurrent_agents": 8,
+                "per_agent_concurrency": 1,
+                "fused_think_plan": False,
+                "context_token_budget": 4000,
+                "action_completion": {
+                    "mode": "all",
+                    "k": 2,
+                    "min_confidence": 0.7,
+                    "deadline": None,
+                    "late_agents": "cancel"
+                }
             },
             "agents": {
                 "coordinator": {
@@ -104,25 +115,76 @@ class ConfigManager:
                 "transport": {
                     "enabled": True,
                     "default_from_city": "北京",
-                    "transport_types": ["飞机", "高铁", "自驾", "大巴"]
+                    "transport_types": ["飞机", "高铁", "自驾", "大巴"],
+                    "cache_duration": 1800
                 },
                 "budget": {
                     "enabled": True,
                     "currency": "CNY",
                     "default_days": 3,
-                    "default_travelers": 2
+                    "default_travelers": 2,
+                    "cache_duration": 3600
+                }
+            },
+            "sessions": {
+                "max_sessions": 1000,
+                "max_concurrent": 16,
+                "idle_timeout": 3600
+            },
+            "conversation_memory": {
+                "max_turns": 20,
+                "summary_every": 10,
+                "summary_chars": 1200,
+                "spill_dir": "cache/conversations",
+                "llm_summary": True
+            },
+            "batch": {
+                "concurrency": 4,
+                "progress_every": 10,
+                "pricing": {
+                    "gpt-3.5-turbo": {"prompt": 0.0005, "completion": 0.0015}
                 }
             },
+            "server": {
+                "host": "127.0.0.1",
+                "port": 8765
+            },
             "performance": {
                 "enable_metrics": True,
+                "metrics_host": "127.0.0.1",
                 "metrics_port": 9090,
                 "collect_interval": 30,
-                "enable_tracing": False
+                "enable_tracing": False,
+                "plugin_cache": {
+                    "max_entries": 1024,
+                    "max_bytes": 16 * 1024 * 1024
+                },
+                "llm_hedging": {
+                    "enabled": True,
+                    "hedge_percentile": 95,
+                    "timeout_percentile": 99,
+                    "timeout_multiplier": 2.0,
+                    "min_timeout": 5.0,
+                    "min_samples": 20,
+                    "budget_ratio": 0.1,
+                    "burst": 3
+                },
+                "trace_dir": "traces"
             },
             "message_bus": {
                 "max_queue_size": 1000,
                 "enable_health_monitor": True,
-                "health_check_interval": 30
+                "health_check_interval": 30,
+                "message_log": {
+                    "directory": None,
+                    "channels": ["agent.responses"],
+                    "segment_bytes": 64 * 1024 * 1024,
+                    "retention_bytes": 1024 * 1024 * 1024,
+                    "retention_seconds": 7 * 24 * 3600,
+                    "flush_interval": 0.2,
+                    "flush_batch": 512,
+                    "fsync": True
+                }
             },
             "security": {
                 "enable_encryption": False,
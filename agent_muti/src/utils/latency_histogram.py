@@ -0,0 +1,194 @@
+# multi_agent_system/utils/latency_histogram.py
+import math
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+# 每个二进制数量级内的子桶精度位数：64 个线性子桶，相对误差约 1.6%
+_SUB_BUCKET_BITS = 6
+_SUB_BUCKET_COUNT = 1 << _SUB_BUCKET_BITS
+_SUB_BUCKET_HALF = _SUB_BUCKET_COUNT >> 1
+
+
+def _bucket_index(units: int) -> int:
+    """计算整数值所在的桶下标（HDR 风格的对数-线性分桶）"""
+    if units < _SUB_BUCKET_COUNT:
+        return units
+    shift = units.bit_length() - _SUB_BUCKET_BITS
+    return shift * _SUB_BUCKET_HALF + (units >> shift)
+
+
+def _bucket_bounds(index: int):
+    """返回桶覆盖的整数区间 [lower, upper)"""
+    if index < _SUB_BUCKET_COUNT:
+        return index, index + 1
+    shift = index // _SUB_BUCKET_HALF - 1
+    mantissa = index - shift * _SUB_BUCKET_HALF
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class LatencyHistogram:
+    """可合并的流式直方图 - 固定相对精度，O(1) 记录，内存只与数值范围有关
+
+    数值按 unit 换算成整数后落入对数-线性桶（与 HdrHistogram 的分桶方式相同），
+    百分位查询返回桶中点，并用精确的最小/最大值截断。
+    """
+
+    __slots__ = ("unit", "counts", "count", "total", "min", "max")
+
+    def __init__(self, unit: float = 1e-6):
+        self.unit = unit
+        self.counts = array("Q")
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def record(self, value: float):
+        """记录一个数值（负数按 0 处理，NaN/无穷大忽略）"""
+        if not math.isfinite(value):
+            return
+        value = max(value, 0.0)
+        index = _bucket_index(int(value / self.unit))
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "LatencyHistogram"):
+        """合并另一个直方图（单位必须一致）"""
+        if other.unit != self.unit:
+            raise ValueError("无法合并单位不同的直方图")
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, bucket_count in enumerate(other.counts):
+            if bucket_count:
+                self.counts[index] += bucket_count
+
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def copy(self) -> "LatencyHistogram":
+        """复制直方图（计数数组整体复制，开销与桶数成正比）"""
+        clone = LatencyHistogram(self.unit)
+        clone.counts = array("Q", self.counts)
+        clone.count = self.count
+        clone.total = self.total
+        clone.min = self.min
+        clone.max = self.max
+        return clone
+
+    def cumulative_counts(self, bounds: List[float]) -> List[int]:
+        """按给定的上界（升序）统计累计样本数，用于导出 Prometheus le 桶
+
+        细粒度桶整体计入第一个不小于其上界的区间，误差不超过一个细粒度桶宽。
+        """
+        counts = [0] * len(bounds)
+        position = 0
+        for index, bucket_count in enumerate(self.counts):
+            if not bucket_count:
+                continue
+            upper = _bucket_bounds(index)[1] * self.unit
+            while position < len(bounds) and bounds[position] < upper:
+                position += 1
+            if position == len(bounds):
+                break
+            counts[position] += bucket_count
+
+        running = 0
+        for position, bucket_count in enumerate(counts):
+            running += bucket_count
+            counts[position] = running
+        return counts
+
+    def reset(self):
+        """清空直方图"""
+        self.counts = array("Q")
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def percentile(self, percentile: float) -> float:
+        """查询百分位数（0-100）"""
+        if not self.count:
+            return 0.0
+
+        # 最近秩定义: 第 ceil(p% * count) 个样本
+        rank = min(max(1, math.ceil(percentile / 100 * self.count)), self.count)
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                lower, upper = _bucket_bounds(index)
+                value = (lower + upper) / 2 * self.unit
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def percentiles(self, percentiles: Iterable[float] = (50, 90, 99)) -> Dict[str, float]:
+        """批量查询百分位数，返回 {"p50": ..., "p90": ...}"""
+        return {f"p{p:g}": self.percentile(p) for p in percentiles}
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self, percentiles: Iterable[float] = (50, 90, 99)) -> Dict[str, float]:
+        """汇总统计"""
+        summary = {
+            "count": self.count,
+            "average": self.mean,
+            "min": self.min if self.count else 0.0,
+            "max": self.max
+        }
+        summary.update(self.percentiles(percentiles))
+        return summary
+
+
+class WindowedHistogram:
+    """滑动时间窗口直方图 - 窗口被划分为 slots 个轮转桶，过期的桶在复用时清空
+
+    同时维护一个全量直方图，用于进程生命周期内的稳定百分位统计。
+    """
+
+    def __init__(self, window_seconds: float = 60.0, slots: int = 6, unit: float = 1e-6):
+        self.window_seconds = window_seconds
+        self.slot_seconds = window_seconds / slots
+        self.unit = unit
+        self.cumulative = LatencyHistogram(unit)
+        self._slots: List[Optional[LatencyHistogram]] = [None] * slots
+        self._epochs: List[int] = [-1] * slots
+
+    def record(self, value: float, timestamp: float = None):
+        """记录数值到全量直方图和当前时间片"""
+        self.cumulative.record(value)
+
+        epoch = int((timestamp if timestamp is not None else time.time()) / self.slot_seconds)
+        position = epoch % len(self._slots)
+        histogram = self._slots[position]
+        if histogram is None:
+            histogram = self._slots[position] = LatencyHistogram(self.unit)
+        if self._epochs[position] != epoch:
+            if self._epochs[position] > epoch:
+                # 比窗口更旧的乱序数据只计入全量直方图
+                return
+            histogram.reset()
+            self._epochs[position] = epoch
+        histogram.record(value)
+
+    def window(self, now: float = None) -> LatencyHistogram:
+        """合并窗口内仍有效的时间片"""
+        current = int((now if now is not None else time.time()) / self.slot_seconds)
+        merged = LatencyHistogram(self.unit)
+        for epoch, histogram in zip(self._epochs, self._slots):
+            if histogram is not None and current - len(self._slots) < epoch <= current:
+                merged.merge(histogram)
+        return merged
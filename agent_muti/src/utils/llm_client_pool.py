@@ -0,0 +1,409 @@
+# multi_agent_system/utils/llm_client_pool.py
+import asyncio
+import os
+import re
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, RateLimitError
+
+from .llm_priority import PrioritySemaphore, current_llm_priority, current_request_origin
+from .tokens import estimate_tokens
+from .tracing import annotate
+
+try:
+    from httpx import Limits
+except ImportError:  # openai 使用的 HTTP 库不是 httpx 时保留 SDK 默认连接池
+    Limits = None
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+# 未收到 retry-after 等响应头时，429 之后暂停的秒数
+DEFAULT_RATE_LIMIT_PAUSE = 1.0
+
+
+def parse_duration(value: Any) -> Optional[float]:
+    """解析限流响应头中的时长（"20"、"1s"、"6m0s"、"120ms"）为秒数"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    parts = _DURATION_PART.findall(str(value))
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def _header_number(headers, name: str) -> Optional[float]:
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def estimate_request_tokens(params: Dict[str, Any]) -> int:
+    """估算一次请求占用的 token 限额：输入消息 + 最大输出 token 数"""
+    prompt = 0
+    for message in params.get("messages") or []:
+        content = message.get("content")
+        if isinstance(content, str):
+            prompt += estimate_tokens(content)
+    return prompt + (params.get("max_tokens") or 0)
+
+
+class TokenBucket:
+    """令牌桶 - 容量与补充速率由响应头校准，收到限额信息之前不限速"""
+
+    def __init__(self, window_seconds: float = 60.0):
+        self.window_seconds = window_seconds
+        self.capacity: Optional[float] = None
+        self.rate = 0.0
+        self.tokens = 0.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float):
+        if self.capacity is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """尝试取出令牌，返回还需等待的秒数（0 表示已取出）"""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.capacity is None:
+            return 0.0
+        self._refill(now)
+        # 单次请求超过桶容量时按整桶计，避免永远等待
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """等待并取出令牌，返回等待的总秒数"""
+        waited = 0.0
+        while True:
+            delay = self.reserve(amount)
+            if delay <= 0:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def refund(self, amount: float):
+        """按实际用量修正预扣的令牌（amount 为负时补扣）"""
+        if self.capacity is not None:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def pause(self, seconds: float):
+        """在指定时间内拒绝所有请求（服务端返回 429 时使用）"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def update(self, limit: Optional[float], remaining: Optional[float], reset: Optional[float]):
+        """用响应头中的限额、剩余额度和重置时间校准令牌桶"""
+        if not limit:
+            return
+        now = time.monotonic()
+        self._refill(now)
+        calibrated = self.capacity is not None
+        self.capacity = float(limit)
+        # 重置时间是额度回满所需的时间，据此推算补充速率
+        if remaining is not None and reset and remaining < limit:
+            self.rate = (limit - remaining) / reset
+        else:
+            self.rate = limit / self.window_seconds
+        if remaining is not None:
+            # 服务端的剩余额度包含其他进程的用量，取两者中较小的
+            self.tokens = min(self.tokens, float(remaining)) if calibrated else float(remaining)
+            if remaining <= 0 and reset:
+                self.pause(reset)
+        else:
+            self.tokens = min(self.tokens, self.capacity) if calibrated else self.capacity
+
+    def get_statistics(self) -> Dict[str, Any]:
+        if self.capacity is not None:
+            self._refill(time.monotonic())
+        return {
+            "limit": self.capacity,
+            "available": round(self.tokens, 1) if self.capacity is not None else None,
+            "paused_seconds": max(0.0, round(self._paused_until - time.monotonic(), 3))
+        }
+
+
+class _ModelGovernor:
+    """单个 (base_url, api_key, model) 的限流状态"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.requests = TokenBucket()
+        self.tokens = TokenBucket()
+        self.stats = {
+            "requests": 0,
+            "failures": 0,
+            "rate_limited": 0,
+            "throttled_seconds": 0.0,
+            "in_flight": 0,
+            "peak_in_flight": 0
+        }
+
+    def observe(self, headers):
+        self.requests.update(_header_number(headers, "x-ratelimit-limit-requests"),
+                             _header_number(headers, "x-ratelimit-remaining-requests"),
+                             parse_duration(headers.get("x-ratelimit-reset-requests")))
+        self.tokens.update(_header_number(headers, "x-ratelimit-limit-tokens"),
+                           _header_number(headers, "x-ratelimit-remaining-tokens"),
+                           parse_duration(headers.get("x-ratelimit-reset-tokens")))
+
+    def rate_limited(self, headers):
+        """收到 429：按 retry-after 暂停该模型的所有请求"""
+        self.stats["rate_limited"] += 1
+        delay = None
+        if headers is not None:
+            self.observe(headers)
+            retry_after_ms = _header_number(headers, "retry-after-ms")
+            delay = retry_after_ms / 1000 if retry_after_ms is not None else parse_duration(headers.get("retry-after"))
+        self.requests.pause(delay if delay is not None else DEFAULT_RATE_LIMIT_PAUSE)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "throttled_seconds": round(self.stats["throttled_seconds"], 3),
+            "request_bucket": self.requests.get_statistics(),
+            "token_bucket": self.tokens.get_statistics()
+        }
+
+
+class _LoopState:
+    """与事件循环绑定的对象：信号量和底层客户端（其连接池）不能跨事件循环使用"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_in_flight: int, aging: float):
+        self.loop = loop
+        self.slots = PrioritySemaphore(max_in_flight, aging)
+        self.model_slots: Dict[Tuple, PrioritySemaphore] = {}
+        self.clients: Dict[Tuple, AsyncOpenAI] = {}
+
+
+class PooledLLMClient:
+    """共享客户端视图 - 与 AsyncOpenAI 的 chat.completions.create / embeddings.create 接口一致，请求经连接池统一调度"""
+
+    def __init__(self, pool: "LLMClientPool", api_key: Optional[str], base_url: Optional[str]):
+        self.pool = pool
+        self.api_key = api_key
+        self.base_url = base_url
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.embeddings = SimpleNamespace(create=self._embed)
+
+    async def _create(self, **params) -> Any:
+        return await self.pool.create(self.api_key, self.base_url, **params)
+
+    async def _embed(self, **params) -> Any:
+        return await self.pool.embed(self.api_key, self.base_url, **params)
+
+
+class LLMClientPool:
+    """进程级共享的 LLM 客户端池
+
+    - 相同 (base_url, api_key) 的 Agent 共用一个 AsyncOpenAI 实例及其 keep-alive 连接池
+    - 全局与按 (base_url, api_key, model) 的在途请求数上限
+    - 按模型的请求数/token 数令牌桶，由响应中的 x-ratelimit-* 头校准，429 时按 retry-after 暂停
+    - 在途名额按请求优先级（见 llm_priority）放行，低优先级请求随等待时间老化提升
+    SDK 自身的重试被关闭，重试由 BaseAgent 负责，以便限流暂停对所有调用方生效。
+    """
+
+    def __init__(self,
+                 max_connections: int = 20,
+                 max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 30.0,
+                 max_in_flight: int = 16,
+                 max_in_flight_per_model: int = 8,
+                 priority_aging: float = 10.0):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.max_in_flight = max_in_flight
+        self.max_in_flight_per_model = max_in_flight_per_model
+        self.priority_aging = priority_aging
+        self._governors: Dict[Tuple, _ModelGovernor] = {}
+        self._state: Optional[_LoopState] = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def configure(self, **options):
+        """修改连接池参数，下一次请求时按新参数重建客户端和信号量"""
+        for key, value in options.items():
+            if not hasattr(self, key) or key.startswith("_") or key in ("in_flight", "peak_in_flight"):
+                raise ValueError(f"未知的连接池参数: {key}")
+            setattr(self, key, value)
+        self._state = None
+
+    def client(self, api_key: str = None, base_url: str = None) -> PooledLLMClient:
+        """获取共享客户端（未指定时与 AsyncOpenAI 一样从环境变量读取）"""
+        return PooledLLMClient(self,
+                               api_key or os.environ.get("OPENAI_API_KEY"),
+                               base_url or os.environ.get("OPENAI_BASE_URL"))
+
+    def _loop_state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        if self._state is None or self._state.loop is not loop:
+            self._state = _LoopState(loop, self.max_in_flight, self.priority_aging)
+        return self._state
+
+    def _raw_client(self, state: _LoopState, api_key: Optional[str], base_url: Optional[str]) -> AsyncOpenAI:
+        client = state.clients.get((base_url, api_key))
+        if client is None:
+            http_options = {}
+            if Limits is not None:
+                http_options["limits"] = Limits(max_connections=self.max_connections,
+                                                max_keepalive_connections=self.max_keepalive_connections,
+                                                keepalive_expiry=self.keepalive_expiry)
+            client = state.clients[(base_url, api_key)] = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=0,
+                http_client=DefaultAsyncHttpxClient(**http_options)
+            )
+        return client
+
+    def _governor(self, key: Tuple) -> _ModelGovernor:
+        governor = self._governors.get(key)
+        if governor is None:
+            base_url, _, model = key
+            label = f"{model}@{base_url}" if base_url else str(model)
+            governor = self._governors[key] = _ModelGovernor(label)
+        return governor
+
+    def _model_slots(self, state: _LoopState, key: Tuple) -> PrioritySemaphore:
+        model_slots = state.model_slots.get(key)
+        if model_slots is None:
+            model_slots = state.model_slots[key] = PrioritySemaphore(self.max_in_flight_per_model,
+                                                                      self.priority_aging)
+        return model_slots
+
+    @asynccontextmanager
+    async def _in_flight(self, governor: _ModelGovernor):
+        self.in_flight += 1
+        governor.stats["in_flight"] += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        governor.stats["peak_in_flight"] = max(governor.stats["peak_in_flight"], governor.stats["in_flight"])
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            governor.stats["in_flight"] -= 1
+
+    async def create(self, api_key: Optional[str], base_url: Optional[str], **params) -> Any:
+        """发送 chat.completions 请求
+
+        先按优先级占用该模型的名额，再等待令牌桶，最后占用全局名额：
+        限流只阻塞同一模型的请求，且被限流时优先级最高的请求最先拿到令牌。
+        流式请求（stream=True）返回异步迭代器，名额一直占用到流结束或被关闭。
+        """
+        state = self._loop_state()
+        key = (base_url, api_key, params.get("model"))
+        governor = self._governor(key)
+        priority = current_llm_priority()
+        origin = current_request_origin()
+        cost = estimate_request_tokens(params)
+
+        started = time.monotonic()
+        async with AsyncExitStack() as stack:
+            await stack.enter_async_context(self._model_slots(state, key).slot(priority, origin))
+            throttled = await governor.requests.acquire(1) + await governor.tokens.acquire(cost)
+            if throttled:
+                governor.stats["throttled_seconds"] += throttled
+            await stack.enter_async_context(state.slots.slot(priority, origin))
+            queued = time.monotonic() - started
+            if queued > 0.001:
+                annotate(priority=priority.value, queued_seconds=round(queued, 3),
+                         throttled_seconds=round(throttled, 3))
+            governor.stats["requests"] += 1
+            await stack.enter_async_context(self._in_flight(governor))
+            try:
+                raw = await self._raw_client(state, api_key, base_url).chat.completions.with_raw_response.create(
+                    **params)
+            except RateLimitError as error:
+                response = getattr(error, "response", None)
+                governor.rate_limited(response.headers if response is not None else None)
+                raise
+            except Exception:
+                governor.stats["failures"] += 1
+                raise
+
+            governor.observe(raw.headers)
+            response = raw.parse()
+            if params.get("stream"):
+                return self._stream(response, stack.pop_all(), governor, cost)
+
+        self._settle(governor, cost, getattr(response, "usage", None))
+        return response
+
+    async def embed(self, api_key: Optional[str], base_url: Optional[str], **params) -> Any:
+        """发送 embeddings 请求（占用全局在途名额，计入该模型的统计，不经过令牌桶）"""
+        state = self._loop_state()
+        governor = self._governor((base_url, api_key, params.get("model")))
+        async with state.slots.slot(current_llm_priority(), current_request_origin()):
+            governor.stats["requests"] += 1
+            async with self._in_flight(governor):
+                try:
+                    return await self._raw_client(state, api_key, base_url).embeddings.create(**params)
+                except Exception:
+                    governor.stats["failures"] += 1
+                    raise
+
+    @staticmethod
+    def _settle(governor: _ModelGovernor, cost: int, usage):
+        """按实际 token 用量修正预扣的额度"""
+        if usage is not None:
+            actual = (usage.prompt_tokens or 0) + (usage.completion_tokens or 0)
+            governor.tokens.refund(cost - actual)
+
+    async def _stream(self, stream, stack: AsyncExitStack, governor: _ModelGovernor, cost: int) -> AsyncIterator[Any]:
+        async with stack:
+            async for chunk in stream:
+                self._settle(governor, cost, getattr(chunk, "usage", None))
+                yield chunk
+
+    async def close(self):
+        """关闭当前事件循环中创建的底层客户端（之后的请求会重新创建）"""
+        state, self._state = self._state, None
+        if state is None or state.loop is not asyncio.get_running_loop():
+            return
+        for client in state.clients.values():
+            await client.close()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        state = self._state
+        return {
+            "clients": len(state.clients) if state is not None else 0,
+            "max_in_flight": self.max_in_flight,
+            "max_in_flight_per_model": self.max_in_flight_per_model,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "priority_aging": self.priority_aging,
+            "queue": state.slots.get_statistics() if state is not None else None,
+            "models": {governor.label: {**governor.get_statistics(),
+                                        "queue": state.model_slots[key].get_statistics()
+                                        if state is not None and key in state.model_slots else None}
+                       for key, governor in self._governors.items()}
+        }
+
+
+# 全局连接池实例
+_pool_instance: Optional[LLMClientPool] = None
+
+
+def get_llm_client_pool() -> LLMClientPool:
+    """获取 LLM 客户端池单例"""
+    global _pool_instance
+    if _pool_instance is None:
+        _pool_instance = LLMClientPool()
+    return _pool_instance
@@ -0,0 +1,175 @@
+# multi_agent_system/utils/llm_hedging.py
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .latency_histogram import WindowedHistogram
+from .tracing import annotate
+
+
+class HedgingPolicy:
+    """LLM 请求对冲与自适应超时
+
+    按调用类别（迭代阶段或 Agent 名称）统计请求延迟：
+    - 超时时间取 timeout_percentile 分位数 × timeout_multiplier，并限制在 [min_timeout, 配置的超时] 之间
+    - 请求耗时超过 hedge_percentile 分位数仍未返回时，再发一个相同的请求，先返回者胜出
+    对冲请求受令牌桶预算约束：长期对冲比例不超过 budget_ratio，突发不超过 burst 个。
+    """
+
+    def __init__(self,
+                 enabled: bool = True,
+                 hedge_percentile: float = 95,
+                 timeout_percentile: float = 99,
+                 timeout_multiplier: float = 2.0,
+                 min_timeout: float = 5.0,
+                 min_samples: int = 20,
+                 budget_ratio: float = 0.1,
+                 burst: int = 3,
+                 window_seconds: float = 300.0):
+        self.enabled = enabled
+        self.hedge_percentile = hedge_percentile
+        self.timeout_percentile = timeout_percentile
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.min_samples = min_samples
+        self.budget_ratio = budget_ratio
+        self.burst = burst
+        self.window_seconds = window_seconds
+
+        # 单个请求自身的耗时（用于推导阈值），以及调用方实际等待的耗时（对冲后）
+        self._latency: Dict[str, WindowedHistogram] = {}
+        self._observed: Dict[str, WindowedHistogram] = {}
+        self._hedge_tokens = float(burst)
+        self.stats = {
+            "requests": 0,
+            "hedges_fired": 0,
+            "hedges_won": 0,
+            "hedges_denied": 0,
+            "timeouts": 0
+        }
+
+    def _histogram(self, table: Dict[str, WindowedHistogram], key: str) -> WindowedHistogram:
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = WindowedHistogram(self.window_seconds)
+        return histogram
+
+    def _percentile(self, key: str, percentile: float) -> Optional[float]:
+        histogram = self._latency.get(key)
+        if histogram is None:
+            return None
+        window = histogram.window()
+        if window.count >= self.min_samples:
+            return window.percentile(percentile)
+        if histogram.cumulative.count >= self.min_samples:
+            return histogram.cumulative.percentile(percentile)
+        return None
+
+    def record(self, key: str, seconds: float):
+        """记录单个请求自身的耗时"""
+        self._histogram(self._latency, key).record(seconds)
+
+    def timeout_for(self, key: str, default: float) -> float:
+        """自适应超时：样本不足时使用配置值"""
+        percentile = self._percentile(key, self.timeout_percentile)
+        if percentile is None:
+            return default
+        return min(default, max(self.min_timeout, percentile * self.timeout_multiplier))
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        """发起对冲请求前的等待时间，样本不足或未启用时为 None"""
+        if not self.enabled:
+            return None
+        return self._percentile(key, self.hedge_percentile)
+
+    def _acquire_hedge(self) -> bool:
+        if self._hedge_tokens >= 1:
+            self._hedge_tokens -= 1
+            return True
+        self.stats["hedges_denied"] += 1
+        return False
+
+    async def run(self, key: str, request: Callable[[], Awaitable[Any]], timeout: float) -> Any:
+        """执行请求（必要时对冲），超时抛出 asyncio.TimeoutError"""
+        self.stats["requests"] += 1
+        # 每个请求为对冲预算补充 budget_ratio 个令牌
+        self._hedge_tokens = min(self.burst, self._hedge_tokens + self.budget_ratio)
+
+        started = time.perf_counter()
+        deadline = started + timeout
+        primary = asyncio.ensure_future(request())
+        tasks = {primary: started}
+        last_error: Optional[BaseException] = None
+        try:
+            delay = self.hedge_delay(key)
+            if delay is not None and delay < timeout:
+                done, _ = await asyncio.wait([primary], timeout=delay)
+                if not done and self._acquire_hedge():
+                    self.stats["hedges_fired"] += 1
+                    annotate(hedged=True, hedge_delay=round(delay, 3))
+                    tasks[asyncio.ensure_future(request())] = time.perf_counter()
+
+            while tasks:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                done, _ = await asyncio.wait(list(tasks), timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    tasks.pop(task)
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        continue
+                    now = time.perf_counter()
+                    self._histogram(self._observed, key).record(now - started)
+                    if task is primary:
+                        self.record(key, now - started)
+                    else:
+                        self.stats["hedges_won"] += 1
+                        annotate(hedge_won=True)
+                        self._measure_primary(key, primary, started, deadline - now, tasks)
+                    return task.result()
+
+            if last_error is not None and not tasks:
+                raise last_error
+            self.stats["timeouts"] += 1
+            raise asyncio.TimeoutError()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _measure_primary(self, key: str, primary: asyncio.Future, started: float, remaining: float,
+                         tasks: Dict[asyncio.Future, float]):
+        """对冲胜出后让主请求在截止时间前继续执行，以记录未对冲时的真实耗时"""
+        if primary not in tasks:
+            return
+        del tasks[primary]
+        handle = asyncio.get_running_loop().call_later(max(0.0, remaining), primary.cancel)
+
+        def on_done(task: asyncio.Future):
+            handle.cancel()
+            # 被截止时间取消的主请求按截止时间记录（截尾样本）
+            if task.cancelled() or task.exception() is None:
+                self.record(key, time.perf_counter() - started)
+
+        primary.add_done_callback(on_done)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """对冲比例与各类别的延迟分位数（raw 为单个请求耗时，observed 为对冲后调用方等待的耗时）"""
+        requests = self.stats["requests"]
+        statistics: Dict[str, Any] = {
+            **self.stats,
+            "hedge_rate": self.stats["hedges_fired"] / requests if requests else 0.0,
+            "latency": {}
+        }
+        for key, histogram in self._latency.items():
+            raw = histogram.cumulative
+            observed = self._observed[key].cumulative if key in self._observed else raw
+            raw_p99 = raw.percentile(99)
+            statistics["latency"][key] = {
+                "raw": raw.summary((50, 95, 99)),
+                "observed": observed.summary((50, 95, 99)),
+                "p99_improvement": 1 - observed.percentile(99) / raw_p99 if raw_p99 else 0.0
+            }
+        return statistics
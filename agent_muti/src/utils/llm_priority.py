@@ -0,0 +1,166 @@
+# multi_agent_system/utils/llm_priority.py
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, List, Optional, Union
+
+
+class LLMPriority(Enum):
+    """LLM 请求优先级枚举"""
+    CRITICAL = "critical"      # 协调器的 THINK/PLAN/NEXT/总结，位于关键路径上
+    NORMAL = "normal"          # 专业 Agent 的调用
+    BACKGROUND = "background"  # 结果不被立即等待的调用
+
+    @property
+    def rank(self) -> int:
+        """数值越小越先放行"""
+        return _RANKS[self]
+
+
+_RANKS = {LLMPriority.CRITICAL: 0, LLMPriority.NORMAL: 1, LLMPriority.BACKGROUND: 2}
+
+_current_priority: ContextVar[LLMPriority] = ContextVar("llm_priority", default=LLMPriority.NORMAL)
+_request_origin: ContextVar[Optional[float]] = ContextVar("llm_request_origin", default=None)
+
+
+def current_llm_priority() -> LLMPriority:
+    """当前上下文中 LLM 请求的优先级"""
+    return _current_priority.get()
+
+
+@contextmanager
+def llm_priority(priority: Union[LLMPriority, str]):
+    """在上下文中为 LLM 请求打上优先级（对其中创建的任务同样生效）"""
+    token = _current_priority.set(LLMPriority(priority))
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_request_origin() -> Optional[float]:
+    """当前端到端请求的开始时间（time.monotonic），不在请求范围内时为 None"""
+    return _request_origin.get()
+
+
+@contextmanager
+def llm_request_scope():
+    """标记一个端到端请求的范围，其中的 LLM 调用按请求开始时间老化（已在范围内时沿用外层）"""
+    if _request_origin.get() is not None:
+        yield
+        return
+    token = _request_origin.set(time.monotonic())
+    try:
+        yield
+    finally:
+        _request_origin.reset(token)
+
+
+@dataclass
+class _Waiter:
+    priority: LLMPriority
+    enqueued: float
+    origin: float
+    sequence: int
+    future: asyncio.Future = field(compare=False)
+
+
+class PrioritySemaphore:
+    """按优先级放行的信号量
+
+    名额空出时放行有效优先级最高的等待者。
+    有效优先级 = 优先级等级 - 已老化秒数 / aging，每 aging 秒提升一级，避免低优先级请求饿死。
+    老化从调用所属端到端请求的开始时间算起（见 llm_request_scope，不在请求范围内时从排队时算起），
+    因此先开始的查询的 Agent 调用最终会先于新查询的协调器调用，不会一直被新到的关键请求插队。
+    """
+
+    def __init__(self, value: int, aging: float = 2.0):
+        self._value = value
+        self.aging = aging
+        self._waiters: List[_Waiter] = []
+        self._sequence = itertools.count()
+        self.stats = {priority.value: {"admitted": 0, "waited": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+                      for priority in LLMPriority}
+
+    def locked(self) -> bool:
+        return self._value <= 0
+
+    def waiting(self) -> Dict[str, int]:
+        """各优先级正在排队的请求数"""
+        counts = {priority.value: 0 for priority in LLMPriority}
+        for waiter in self._waiters:
+            counts[waiter.priority.value] += 1
+        return counts
+
+    def _effective_rank(self, waiter: _Waiter, now: float) -> float:
+        if not self.aging:
+            return waiter.priority.rank
+        return waiter.priority.rank - (now - waiter.origin) / self.aging
+
+    def _record(self, priority: LLMPriority, waited: float):
+        stats = self.stats[priority.value]
+        stats["admitted"] += 1
+        if waited > 0:
+            stats["waited"] += 1
+            stats["wait_seconds"] += waited
+            stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+
+    async def acquire(self, priority: LLMPriority = LLMPriority.NORMAL, origin: float = None) -> float:
+        """获取名额，返回排队等待的秒数；origin 为老化的起点，默认为排队时间"""
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            self._record(priority, 0.0)
+            return 0.0
+
+        now = time.monotonic()
+        waiter = _Waiter(priority, now, origin if origin is not None else now, next(self._sequence),
+                         asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif not waiter.future.cancelled():
+                # 已被放行但调用方随即取消，归还名额
+                self.release()
+            raise
+        waited = time.monotonic() - waiter.enqueued
+        self._record(priority, waited)
+        return waited
+
+    def release(self):
+        self._value += 1
+        self._wake()
+
+    def _wake(self):
+        now = time.monotonic()
+        while self._value > 0 and self._waiters:
+            waiter = min(self._waiters,
+                         key=lambda item: (self._effective_rank(item, now), item.origin, item.sequence))
+            self._waiters.remove(waiter)
+            if waiter.future.done():
+                continue
+            self._value -= 1
+            waiter.future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: LLMPriority = LLMPriority.NORMAL, origin: float = None):
+        await self.acquire(priority, origin)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            "available": self._value,
+            "waiting": self.waiting(),
+            "priorities": {name: {**stats, "wait_seconds": round(stats["wait_seconds"], 3),
+                                  "max_wait_seconds": round(stats["max_wait_seconds"], 3)}
+                           for name, stats in self.stats.items()}
+        }
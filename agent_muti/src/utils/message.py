@@ -0,0 +1,90 @@
+# multi_agent_system/utils/message.py
+import json
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Any
+
+
+class MessageType(Enum):
+    """消息类型枚举"""
+    AGENT_REQUEST = "agent_request"
+    AGENT_RESPONSE = "agent_response"
+    SYSTEM_EVENT = "system_event"
+    PERFORMANCE_METRIC = "performance_metric"
+    ERROR_REPORT = "error_report"
+    PLANNING_UPDATE = "planning_update"
+    ITERATION_PROGRESS = "iteration_progress"
+
+
+class MessagePriority(Enum):
+    """消息优先级枚举"""
+    LOW = 1
+    NORMAL = 2
+    HIGH = 3
+    CRITICAL = 4
+
+
+@dataclass(slots=True)
+class Message:
+    """消息数据结构（slots 实现，避免每条消息分配实例 __dict__）"""
+    message_id: str
+    message_type: MessageType
+    channel: str
+    payload: Dict[str, Any]
+    priority: MessagePriority = MessagePriority.NORMAL
+    timestamp: float = None
+    source: str = None
+    target: str = None
+    correlation_id: str = None
+    metadata: Dict[str, Any] = None
+    
+    def __post_init__(self):
+        """初始化后自动设置时间戳"""
+        if self.timestamp is None:
+            self.timestamp = time.time()
+    
+    def __lt__(self, other):
+        """定义比较方法，优先按优先级排序，相同优先级则按时间戳排序"""
+        if not isinstance(other, Message):
+            return NotImplemented
+        # 优先级数字越小优先级越低，所以返回负号进行降序排序
+        if self.priority.value != other.priority.value:
+            return self.priority.value > other.priority.value
+        # 相同优先级时，时间戳小的优先（先到达的消息优先）
+        return self.timestamp < other.timestamp
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            "message_id": self.message_id,
+            "message_type": self.message_type.value,
+            "channel": self.channel,
+            "payload": self.payload,
+            "priority": self.priority.value,
+            "timestamp": self.timestamp,
+            "source": self.source,
+            "target": self.target,
+            "correlation_id": self.correlation_id,
+            "metadata": self.metadata or {}
+        }
+
+    def to_json(self) -> str:
+        """转换为JSON字符串"""
+        return json.dumps(self.to_dict(), ensure_ascii=False, default=str)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Message":
+        """从字典创建消息"""
+        return cls(
+            message_id=data["message_id"],
+            message_type=MessageType(data["message_type"]),
+            channel=data["channel"],
+            payload=data["payload"],
+            priority=MessagePriority(data["priority"]),
+            timestamp=data["timestamp"],
+            source=data.get("source"),
+            target=data.get("target"),
+            correlation_id=data.get("correlation_id"),
+            metadata=data.get("metadata") or None
+        )
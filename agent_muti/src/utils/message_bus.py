@@ -1,91 +1,217 @@
 # multi_agent_system/utils/message_bus.py
 import asyncio
-import json
+import itertools
+import os
 import uuid
-from typing import Dict, List, Any, Callable, Optional, Union
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Any, Callable, Optional, Set, Tuple, Union
 from enum import Enum
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import threading
 import time
 
-
-class MessageType(Enum):
-    """消息类型枚举"""
-    AGENT_REQUEST = "agent_request"
-    AGENT_RESPONSE = "agent_response"
-    SYSTEM_EVENT = "system_event"
-    PERFORMANCE_METRIC = "performance_metric"
-    ERROR_REPORT = "error_report"
-    PLANNING_UPDATE = "planning_update"
-    ITERATION_PROGRESS = "iteration_progress"
-
-
-class MessagePriority(Enum):
-    """消息优先级枚举"""
-    LOW = 1
-    NORMAL = 2
-    HIGH = 3
-    CRITICAL = 4
-
-
-@dataclass
-class Message:
-    """消息数据结构"""
-    message_id: str
-    message_type: MessageType
-    channel: str
-    payload: Dict[str, Any]
-    priority: MessagePriority = MessagePriority.NORMAL
-    timestamp: float = None
-    source: str = None
-    target: str = None
-    correlation_id: str = None
-    metadata: Dict[str, Any] = None
-    
-    def __post_init__(self):
-        """初始化后自动设置时间戳"""
-        if self.timestamp is None:
-            self.timestamp = time.time()
-    
-    def __lt__(self, other):
-        """定义比较方法，优先按优先级排序，相同优先级则按时间戳排序"""
-        if not isinstance(other, Message):
-            return NotImplemented
-        # 优先级数字越小优先级越低，所以返回负号进行降序排序
-        if self.priority.value != other.priority.value:
-            return self.priority.value > other.priority.value
-        # 相同优先级时，时间戳小的优先（先到达的消息优先）
-        return self.timestamp < other.timestamp
-
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        return {
-            "message_id": self.message_id,
-            "message_type": self.message_type.value,
-            "channel": self.channel,
-            "payload": self.payload,
-            "priority": self.priority.value,
-            "timestamp": self.timestamp,
-            "source": self.source,
-            "target": self.target,
-            "correlation_id": self.correlation_id,
-            "metadata": self.metadata or {}
+from .message import Message, MessageType, MessagePriority
+from .message_codec import MessageCodec, get_codec
+from .message_transport import MessageTransport, InProcessTransport
+from .message_log import MessageLog
+from .topic_trie import TopicTrie, topic_matches
+
+# 每个具体频道缓存的订阅者路由表上限
+_ROUTE_CACHE_SIZE = 4096
+
+
+class MessageIdGenerator:
+    """消息ID生成器 - 进程前缀 + 单调递增计数，避免每条消息生成 uuid4"""
+
+    def __init__(self, prefix: str = None):
+        self.prefix = prefix or f"{os.getpid():x}-{uuid.uuid4().hex[:8]}"
+        self._counter = itertools.count(1)
+
+    def next_id(self) -> str:
+        """生成下一个消息ID"""
+        return f"{self.prefix}-{next(self._counter):x}"
+
+
+class OverflowPolicy(Enum):
+    """订阅者邮箱溢出策略"""
+    BLOCK = "block"              # 等待邮箱腾出空间
+    DROP_OLDEST = "drop_oldest"  # 丢弃最早的未处理消息
+    REJECT = "reject"            # 拒绝新消息
+
+
+class Subscription:
+    """订阅者邮箱 - 有界队列 + 常驻工作协程"""
+
+    def __init__(self,
+                 key: Union[str, MessageType],
+                 callback: Callable,
+                 executor_factory: Callable[[], ThreadPoolExecutor],
+                 mailbox_size: int = 1000,
+                 overflow_policy: OverflowPolicy = OverflowPolicy.BLOCK,
+                 concurrency: int = 1,
+                 group: str = None):
+        self.key = key
+        self.group = group
+        self.callback = callback
+        self.is_async = asyncio.iscoroutinefunction(callback)
+        self.mailbox_size = mailbox_size
+        self.overflow_policy = overflow_policy
+        self.concurrency = max(1, concurrency)
+        self._executor_factory = executor_factory
+        self._mailbox: asyncio.Queue = asyncio.Queue(maxsize=mailbox_size)
+        self._workers: List[asyncio.Task] = []
+        self._statistics = {
+            "delivered": 0,
+            "processed": 0,
+            "failed": 0,
+            "dropped": 0,
+            "rejected": 0,
+            "max_backlog": 0,
+            "total_lag": 0.0,
+            "max_lag": 0.0
         }
 
-    def to_json(self) -> str:
-        """转换为JSON字符串"""
-        return json.dumps(self.to_dict(), ensure_ascii=False, default=str)
+    @property
+    def name(self) -> str:
+        """订阅者名称"""
+        return getattr(self.callback, '__name__', str(self.callback))
+
+    async def offer(self, message: "Message") -> bool:
+        """将消息放入邮箱，返回是否已接收"""
+        return await self.offer_batch([message])
+
+    async def offer_batch(self, messages: List["Message"]) -> bool:
+        """将一批消息作为一个邮箱条目放入，工作协程一次唤醒处理整批"""
+        self._ensure_workers()
+        item = (time.time(), messages)
+
+        if self._mailbox.full():
+            if self.overflow_policy == OverflowPolicy.REJECT:
+                self._statistics["rejected"] += len(messages)
+                return False
+            if self.overflow_policy == OverflowPolicy.DROP_OLDEST:
+                _, dropped = self._mailbox.get_nowait()
+                self._mailbox.task_done()
+                self._statistics["dropped"] += len(dropped)
+
+        if self.overflow_policy == OverflowPolicy.BLOCK:
+            await self._mailbox.put(item)
+        else:
+            self._mailbox.put_nowait(item)
+
+        self._statistics["delivered"] += len(messages)
+        backlog = self._mailbox.qsize()
+        if backlog > self._statistics["max_backlog"]:
+            self._statistics["max_backlog"] = backlog
+        return True
+
+    def _ensure_workers(self):
+        """按需启动工作协程"""
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.concurrency:
+            self._workers.append(asyncio.create_task(self._run()))
+
+    async def _run(self):
+        """工作协程 - 依次处理邮箱中的消息"""
+        loop = asyncio.get_running_loop()
+        while True:
+            enqueued_at, messages = await self._mailbox.get()
+            lag = time.time() - enqueued_at
+            self._statistics["total_lag"] += lag * len(messages)
+            if lag > self._statistics["max_lag"]:
+                self._statistics["max_lag"] = lag
+
+            try:
+                if self.is_async:
+                    for message in messages:
+                        await self._invoke_async(message)
+                else:
+                    # 同步处理器在共享的有界线程池中执行，整批只提交一次
+                    failed = await loop.run_in_executor(self._executor_factory(), self._invoke_sync_batch, messages)
+                    self._statistics["processed"] += len(messages) - failed
+                    self._statistics["failed"] += failed
+            finally:
+                self._mailbox.task_done()
+
+    async def _invoke_async(self, message: "Message"):
+        """调用异步处理器"""
+        try:
+            await self.callback(message)
+            self._statistics["processed"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._statistics["failed"] += 1
+            print(f"❌ 订阅者 '{self.name}' 处理消息失败: {e}")
+
+    def _invoke_sync_batch(self, messages: List["Message"]) -> int:
+        """在线程池中依次调用同步处理器，返回失败数量"""
+        failed = 0
+        for message in messages:
+            try:
+                self.callback(message)
+            except Exception as e:
+                failed += 1
+                print(f"❌ 订阅者 '{self.name}' 处理消息失败: {e}")
+        return failed
+
+    async def join(self):
+        """等待邮箱中的消息全部处理完毕"""
+        await self._mailbox.join()
+
+    async def close(self):
+        """停止工作协程"""
+        for worker in self._workers:
+            worker.cancel()
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取订阅者统计信息"""
+        stats = self._statistics.copy()
+        processed = stats["processed"] + stats["failed"]
+        stats["average_lag"] = stats.pop("total_lag") / processed if processed else 0.0
+        stats["backlog"] = self._mailbox.qsize()
+        stats["subscription"] = self.key.value if isinstance(self.key, MessageType) else self.key
+        stats["handler"] = self.name
+        stats["overflow_policy"] = self.overflow_policy.value
+        return stats
 
 
 class MessageBus:
     """增强的消息总线系统"""
 
-    def __init__(self, max_queue_size: int = 1000):
+    def __init__(self,
+                 max_queue_size: int = 1000,
+                 mailbox_size: int = None,
+                 overflow_policy: OverflowPolicy = OverflowPolicy.BLOCK,
+                 handler_workers: int = 8,
+                 codec: Union[str, MessageCodec] = "binary",
+                 transport: MessageTransport = None,
+                 message_log: MessageLog = None,
+                 persisted_channels: List[str] = None):
         self.channels: Dict[str, asyncio.PriorityQueue] = {}
-        self.subscribers: Dict[str, List[Callable]] = defaultdict(list)
-        self.message_handlers: Dict[MessageType, List[Callable]] = defaultdict(list)
+        # 调用过 receive() 的频道，只有这些频道的队列会接收消息
+        self._receive_channels: Set[str] = set()
+        # 订阅键（具体频道或 agent.* / system.# 等模式）-> 订阅者
+        self.subscribers: Dict[str, List[Subscription]] = defaultdict(list)
+        self._subscription_index: TopicTrie[Subscription] = TopicTrie()
+        self._route_cache: Dict[str, Tuple[Subscription, ...]] = {}
+        self.message_handlers: Dict[MessageType, List[Subscription]] = defaultdict(list)
         self.max_queue_size = max_queue_size
+        self.mailbox_size = mailbox_size or max_queue_size
+        self.overflow_policy = overflow_policy
+        self.handler_workers = handler_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._id_generator = MessageIdGenerator()
+        self.codec = get_codec(codec)
+        self.transport = transport or InProcessTransport()
+        # 可选的持久化消息日志；persisted_channels 为 None 时记录所有频道
+        self.message_log = message_log
+        self.persisted_channels = list(persisted_channels) if persisted_channels is not None else None
+        self._persist_cache: Dict[str, bool] = {}
+        self._health_snapshot: bytes = b""
         self.message_counter = 0
         self._lock = threading.Lock()
         self._statistics = {
@@ -93,15 +219,31 @@ class MessageBus:
             "messages_received": 0,
             "messages_processed": 0,
             "channels_created": 0,
-            "subscribers_registered": 0
+            "subscribers_registered": 0,
+            "replies_routed": 0,
+            "replies_orphaned": 0,
+            "batches_published": 0,
+            "messages_forwarded": 0,
+            "messages_from_remote": 0,
+            "messages_persisted": 0,
+            "messages_overflowed": 0
         }
 
+        # 请求-响应路由表: correlation_id -> (响应频道, 请求消息ID, Future)
+        self._pending_replies: Dict[str, Tuple[str, str, asyncio.Future]] = {}
+
         # 启动后台任务
         self._background_tasks = set()
         self._is_running = True
 
     async def initialize(self):
         """初始化消息总线"""
+        # 启动传输后端（跨进程时连接传输中枢）
+        await self.transport.start(self)
+
+        if self.message_log is not None:
+            await self.message_log.start()
+
         # 创建系统监控任务
         monitor_task = asyncio.create_task(self._monitor_system_health())
         self._background_tasks.add(monitor_task)
@@ -113,6 +255,12 @@ class MessageBus:
         """关闭消息总线"""
         self._is_running = False
 
+        # 取消所有未完成的请求
+        for _, _, future in self._pending_replies.values():
+            if not future.done():
+                future.cancel()
+        self._pending_replies.clear()
+
         # 等待所有后台任务完成
         for task in self._background_tasks:
             task.cancel()
@@ -120,6 +268,19 @@ class MessageBus:
         if self._background_tasks:
             await asyncio.gather(*self._background_tasks, return_exceptions=True)
 
+        await self.transport.close()
+
+        if self.message_log is not None:
+            await self.message_log.close()
+
+        # 停止所有订阅者工作协程
+        for subscription in self._all_subscriptions():
+            await subscription.close()
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
         print("🛑 消息总线系统已关闭")
 
     async def publish(self,
@@ -134,8 +295,23 @@ class MessageBus:
         """发布消息到指定频道"""
 
         # 创建消息
-        message = Message(
-            message_id=str(uuid.uuid4()),
+        message = self._create_message(
+            channel, message_type, payload, priority, source, target, correlation_id, metadata
+        )
+        return await self._publish_message(message)
+
+    def _create_message(self,
+                        channel: str,
+                        message_type: MessageType,
+                        payload: Dict[str, Any],
+                        priority: MessagePriority = MessagePriority.NORMAL,
+                        source: str = None,
+                        target: str = None,
+                        correlation_id: str = None,
+                        metadata: Dict[str, Any] = None) -> Message:
+        """创建消息对象"""
+        return Message(
+            message_id=self._id_generator.next_id(),
             message_type=message_type,
             channel=channel,
             payload=payload,
@@ -147,61 +323,256 @@ class MessageBus:
             metadata=metadata
         )
 
-        # 确保频道存在
-        if channel not in self.channels:
-            self.channels[channel] = asyncio.PriorityQueue(maxsize=self.max_queue_size)
-            self._statistics["channels_created"] += 1
+    async def _publish_message(self, message: Message) -> str:
+        """投递已创建的消息"""
+        channel = message.channel
 
-        # 计算优先级权重（数值越小优先级越高）
-        priority_weight = 5 - message.priority.value  # CRITICAL=1, HIGH=2, NORMAL=3, LOW=4
+        # 响应消息直接交给等待中的请求，不进入队列
+        if self._accept(message):
+            print(f"📤 路由响应 [{message.message_type.value}] 到频道 '{channel}' (关联ID: {message.correlation_id})")
+            return message.message_id
 
-        try:
-            # 发布消息到队列
-            await self.channels[channel].put((priority_weight, message))
-            self._statistics["messages_sent"] += 1
+        # 通知订阅者
+        await self._notify_subscribers(message)
+
+        # 转发给其他进程中的订阅者
+        if self.transport.is_remote:
+            await self.transport.send(message)
+            self._statistics["messages_forwarded"] += 1
+        elif not self._route(channel):
+            self._enqueue(message)
+
+        print(f"📤 发布消息 [{message.message_type.value}] 到频道 '{channel}' (ID: {message.message_id})")
+        return message.message_id
+
+    def _accept(self, message: Message) -> bool:
+        """登记并持久化消息，响应消息直接交给等待中的请求；返回是否按响应路由"""
+        self._statistics["messages_sent"] += 1
+        self._persist(message)
+        if self._route_reply(message):
+            return True
+        self._get_channel(message.channel)
+        return False
+
+    def _get_channel(self, channel: str) -> asyncio.PriorityQueue:
+        """获取频道队列，不存在时创建"""
+        queue = self.channels.get(channel)
+        if queue is None:
+            queue = self.channels[channel] = asyncio.PriorityQueue(maxsize=self.max_queue_size)
+            self._statistics["channels_created"] += 1
+        return queue
 
-            # 通知订阅者
-            await self._notify_subscribers(message)
+    def _enqueue(self, message: Message) -> bool:
+        """放入频道队列供 receive() 消费，返回是否已入队
 
-            print(f"📤 发布消息 [{message.message_type.value}] 到频道 '{channel}' (ID: {message.message_id})")
+        只在频道有 receive() 消费者时入队（已交给订阅者或转发到其他进程的消息由调用方跳过），
+        队列已满时丢弃并计数，从不阻塞发布者。
+        """
+        if message.channel not in self._receive_channels:
+            return False
 
-            return message.message_id
+        # 计算优先级权重（数值越小优先级越高）
+        priority_weight = 5 - message.priority.value  # CRITICAL=1, HIGH=2, NORMAL=3, LOW=4
 
+        try:
+            self._get_channel(message.channel).put_nowait((priority_weight, message))
         except asyncio.QueueFull:
-            print(f"⚠️  消息队列已满，无法发布消息到频道 '{channel}'")
-            raise
+            self._statistics["messages_overflowed"] += 1
+            print(f"⚠️  消息队列已满，丢弃频道 '{message.channel}' 的消息 (ID: {message.message_id})")
+            return False
+        return True
+
+    async def publish_many(self, messages: List[Dict[str, Any]]) -> List[str]:
+        """批量发布消息
 
-    # async def subscribe(self, channel: str, callback: Callable):
-    #     """订阅频道"""
-    #     self.subscribers[channel].append(callback)
-    #     self._statistics["subscribers_registered"] += 1
-    #     print(f"📥 订阅频道 '{channel}'，当前订阅者: {len(self.subscribers[channel])}")
+        messages 中每一项为 publish() 的关键字参数字典。整批消息依次入队，
+        每个订阅者只被通知一次（一个邮箱条目包含其关心的全部消息）。
+        """
+        batch = [self._create_message(**spec) for spec in messages]
+        if not batch:
+            return []
 
-    # multi_agent_system/utils/message_bus.py
-    # 修改 subscribe 方法为同步：
+        forward = [message for message in batch if not self._accept(message)]
 
-    def subscribe(self, channel: str, callback: Callable):
-        """订阅频道"""
-        if channel not in self.subscribers:
-            self.subscribers[channel] = []
+        await self._notify_subscribers_batch(batch)
 
-        self.subscribers[channel].append(callback)
+        if self.transport.is_remote:
+            for message in forward:
+                await self.transport.send(message)
+            self._statistics["messages_forwarded"] += len(forward)
+        else:
+            for message in forward:
+                if not self._route(message.channel):
+                    self._enqueue(message)
+        self._statistics["batches_published"] += 1
+
+        channels = {message.channel for message in batch}
+        print(f"📤 批量发布 {len(batch)} 条消息到 {len(channels)} 个频道")
+
+        return [message.message_id for message in batch]
+
+    async def deliver_remote(self, message: Message):
+        """投递来自其他进程的消息（由传输后端调用，不再转发）"""
+        self._statistics["messages_from_remote"] += 1
+        self._persist(message)
+
+        if self._route_reply(message):
+            return
+
+        await self._notify_subscribers(message)
+        if not self._route(message.channel):
+            self._enqueue(message)
+
+    def _persist(self, message: Message):
+        """将消息追加到持久化日志（只写入内存缓冲区，由日志后台任务批量刷盘）"""
+        if self.message_log is None:
+            return
+        if self.persisted_channels is not None and not self._should_persist(message.channel):
+            return
+        self.message_log.append(message)
+        self._statistics["messages_persisted"] += 1
+
+    def _should_persist(self, channel: str) -> bool:
+        """persisted_channels 支持通配符模式，结果按频道缓存"""
+        persist = self._persist_cache.get(channel)
+        if persist is None:
+            persist = any(topic_matches(pattern, channel) for pattern in self.persisted_channels)
+            if len(self._persist_cache) >= _ROUTE_CACHE_SIZE:
+                self._persist_cache.clear()
+            self._persist_cache[channel] = persist
+        return persist
+
+    async def replay(self, channel: str, from_offset: int = 0, redeliver: bool = False) -> List[Message]:
+        """从持久化日志重放频道消息；redeliver=True 时重新通知本地订阅者"""
+        if self.message_log is None:
+            raise RuntimeError("消息总线未配置持久化日志")
+
+        await self.message_log.flush()
+        messages = [message for _, message in self.message_log.replay(channel, from_offset)]
+
+        if redeliver:
+            for message in messages:
+                await self._notify_subscribers(message)
+
+        print(f"🔁 从日志重放频道 '{channel}' 的 {len(messages)} 条消息 (起始偏移量: {from_offset})")
+        return messages
+
+    def subscribe(self,
+                  channel: str,
+                  callback: Callable,
+                  mailbox_size: int = None,
+                  overflow_policy: OverflowPolicy = None,
+                  concurrency: int = 1,
+                  group: str = None) -> Subscription:
+        """订阅频道
+
+        channel 可以是具体频道，也可以是按 '.' 分段的模式：'*' 匹配恰好一段
+        （如 agent.*），'#' 匹配零段或多段（如 system.#）。
+        group 仅在跨进程传输时生效：同一 group 的多个进程共同消费该频道，
+        每条消息只投递给其中一个进程。
+        """
+        subscription = self._create_subscription(channel, callback, mailbox_size, overflow_policy, concurrency, group)
+        self.transport.subscribe(channel, group)
+        self.subscribers[channel].append(subscription)
+        self._subscription_index.add(channel, subscription)
+        self._route_cache.clear()
         self._statistics["subscribers_registered"] += 1
         print(f"📥 订阅频道 '{channel}'，当前订阅者: {len(self.subscribers[channel])}")
-
-    def subscribe_to_message_type(self, message_type: MessageType, callback: Callable):
+        return subscription
+
+    def subscribe_to_message_type(self,
+                                  message_type: MessageType,
+                                  callback: Callable,
+                                  mailbox_size: int = None,
+                                  overflow_policy: OverflowPolicy = None,
+                                  concurrency: int = 1) -> Subscription:
         """订阅特定类型的消息"""
-        self.message_handlers[message_type].append(callback)
+        subscription = self._create_subscription(message_type, callback, mailbox_size, overflow_policy, concurrency)
+        self.message_handlers[message_type].append(subscription)
         print(f"📥 订阅消息类型 '{message_type.value}'，当前处理器: {len(self.message_handlers[message_type])}")
+        return subscription
+
+    async def unsubscribe(self, channel: str, callback: Callable):
+        """取消订阅频道"""
+        removed = []
+        remaining = []
+        for subscription in self.subscribers.get(channel, []):
+            if subscription.callback == callback:
+                await subscription.close()
+                self._subscription_index.remove(channel, subscription)
+                removed.append(subscription)
+            else:
+                remaining.append(subscription)
+
+        if remaining:
+            self.subscribers[channel] = remaining
+        else:
+            self.subscribers.pop(channel, None)
+        self._route_cache.clear()
+
+        # 本进程不再有该分组的订阅者时，撤销跨进程声明
+        remaining_groups = {subscription.group for subscription in remaining}
+        for group in {subscription.group for subscription in removed} - remaining_groups:
+            self.transport.unsubscribe(channel, group)
+
+        print(f"📤 取消订阅频道 '{channel}'，当前订阅者: {len(remaining)}")
+
+    def _route(self, channel: str) -> Tuple[Subscription, ...]:
+        """获取具体频道的订阅者（含通配符订阅），路由表按频道缓存，订阅变化时失效"""
+        route = self._route_cache.get(channel)
+        if route is None:
+            route = tuple(self._subscription_index.match(channel))
+            if len(self._route_cache) >= _ROUTE_CACHE_SIZE:
+                self._route_cache.clear()
+            self._route_cache[channel] = route
+        return route
+
+    def _create_subscription(self,
+                             key: Union[str, MessageType],
+                             callback: Callable,
+                             mailbox_size: int = None,
+                             overflow_policy: OverflowPolicy = None,
+                             concurrency: int = 1,
+                             group: str = None) -> Subscription:
+        """创建订阅者邮箱"""
+        return Subscription(
+            key=key,
+            callback=callback,
+            executor_factory=self._get_executor,
+            mailbox_size=mailbox_size or self.mailbox_size,
+            overflow_policy=overflow_policy or self.overflow_policy,
+            concurrency=concurrency,
+            group=group
+        )
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """获取同步处理器共享的线程池"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.handler_workers,
+                                                thread_name_prefix="message-bus")
+        return self._executor
+
+    def _all_subscriptions(self) -> List[Subscription]:
+        """列出所有订阅者邮箱"""
+        subscriptions = [sub for subs in self.subscribers.values() for sub in subs]
+        subscriptions.extend(sub for subs in self.message_handlers.values() for sub in subs)
+        return subscriptions
+
+    async def wait_until_idle(self):
+        """等待所有订阅者邮箱处理完毕"""
+        for subscription in self._all_subscriptions():
+            await subscription.join()
 
     async def receive(self,
                       channel: str,
                       timeout: float = None,
                       filter_func: Callable[[Message], bool] = None) -> Optional[Message]:
-        """从频道接收消息"""
-        if channel not in self.channels:
-            self.channels[channel] = asyncio.PriorityQueue(maxsize=self.max_queue_size)
-            self._statistics["channels_created"] += 1
+        """从频道接收消息
+
+        调用后该频道成为 receive() 频道：此后没有订阅者的消息放入频道队列等待接收。
+        """
+        self._get_channel(channel)
+        self._receive_channels.add(channel)
 
         try:
             if timeout:
@@ -238,10 +609,9 @@ class MessageBus:
                                timeout: float = 30.0,
                                priority: MessagePriority = MessagePriority.NORMAL) -> Optional[Message]:
         """请求-响应模式"""
-        correlation_id = str(uuid.uuid4())
+        correlation_id = self._id_generator.next_id()
 
-        # 发布请求
-        request_id = await self.publish(
+        request = self._create_message(
             channel=request_channel,
             message_type=message_type,
             payload=payload,
@@ -249,109 +619,133 @@ class MessageBus:
             correlation_id=correlation_id
         )
 
-        print(f"🔄 发送请求 [{message_type.value}] (ID: {request_id})，等待响应...")
+        # 响应可能来自其他进程，声明关心响应频道
+        self.transport.subscribe(response_channel)
 
-        # 等待响应
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            response = await self.receive(
-                channel=response_channel,
-                timeout=1.0,  # 短超时以便检查总超时
-                filter_func=lambda msg: msg.correlation_id == correlation_id
-            )
+        # 先登记等待的 Future，保证响应不会早于登记到达
+        future = asyncio.get_running_loop().create_future()
+        self._pending_replies[correlation_id] = (response_channel, request.message_id, future)
+
+        try:
+            # 发布请求
+            request_id = await self._publish_message(request)
+
+            print(f"🔄 发送请求 [{message_type.value}] (ID: {request_id})，等待响应...")
+
+            # 等待响应
+            response = await asyncio.wait_for(future, timeout=timeout)
+            print(f"✅ 收到响应 (关联ID: {correlation_id})")
+            return response
+
+        except asyncio.TimeoutError:
+            print(f"⏰ 请求响应超时 (关联ID: {correlation_id})")
+            return None
+
+        finally:
+            self._pending_replies.pop(correlation_id, None)
+
+    def _route_reply(self, message: Message) -> bool:
+        """将响应消息分发给等待中的请求，返回是否已路由"""
+        if not message.correlation_id:
+            return False
+
+        pending = self._pending_replies.get(message.correlation_id)
+        if pending is None:
+            return False
+
+        response_channel, request_id, future = pending
+        if response_channel != message.channel or request_id == message.message_id:
+            # 请求消息本身或其他频道上的同关联ID消息，不视为响应
+            return False
 
-            if response:
-                print(f"✅ 收到响应 (关联ID: {correlation_id})")
-                return response
+        del self._pending_replies[message.correlation_id]
+        if future.done():
+            self._statistics["replies_orphaned"] += 1
+            return False
 
-        print(f"⏰ 请求响应超时 (关联ID: {correlation_id})")
-        return None
+        future.set_result(message)
+        self._statistics["replies_routed"] += 1
+        return True
+
+    def pending_requests(self) -> int:
+        """获取等待响应的请求数量"""
+        return len(self._pending_replies)
 
     async def broadcast(self,
                         message_type: MessageType,
                         payload: Dict[str, Any],
                         exclude_channels: List[str] = None,
-                        priority: MessagePriority = MessagePriority.NORMAL):
-        """广播消息到所有频道"""
+                        priority: MessagePriority = MessagePriority.NORMAL,
+                        pattern: str = None) -> List[str]:
+        """广播消息到所有频道；指定 pattern（如 agents.*）时只广播到匹配的频道"""
         exclude_channels = exclude_channels or []
         broadcast_channels = [channel for channel in self.channels.keys()
-                              if channel not in exclude_channels]
-
-        tasks = []
-        for channel in broadcast_channels:
-            task = self.publish(
-                channel=channel,
-                message_type=message_type,
-                payload=payload,
-                priority=priority
-            )
-            tasks.append(task)
+                              if channel not in exclude_channels
+                              and (pattern is None or topic_matches(pattern, channel))]
+
+        message_ids = await self.publish_many([
+            {
+                "channel": channel,
+                "message_type": message_type,
+                "payload": payload,
+                "priority": priority
+            }
+            for channel in broadcast_channels
+        ])
 
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        if message_ids:
             print(f"📢 广播消息 [{message_type.value}] 到 {len(broadcast_channels)} 个频道")
+        return message_ids
 
     async def _notify_subscribers(self, message: Message):
-        """通知订阅者"""
-        channel = message.channel
-        message_type = message.message_type
-
+        """通知订阅者 - 仅投递到各自邮箱，不等待处理完成"""
         # 通知频道订阅者
-        if channel in self.subscribers:
-            tasks = []
-            for subscriber in self.subscribers[channel]:
-                try:
-                    if asyncio.iscoroutinefunction(subscriber):
-                        task = asyncio.create_task(subscriber(message))
-                    else:
-                        # 如果是同步函数，在线程池中执行
-                        task = asyncio.create_task(
-                            asyncio.to_thread(subscriber, message)
-                        )
-                    tasks.append(task)
-                except Exception as e:
-                    print(f"❌ 通知订阅者失败: {e}")
-
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
+        for subscription in self._route(message.channel):
+            try:
+                await subscription.offer(message)
+            except Exception as e:
+                print(f"❌ 通知订阅者失败: {e}")
 
         # 通知消息类型处理器
-        if message_type in self.message_handlers:
-            tasks = []
-            for handler in self.message_handlers[message_type]:
-                try:
-                    if asyncio.iscoroutinefunction(handler):
-                        task = asyncio.create_task(handler(message))
-                    else:
-                        task = asyncio.create_task(
-                            asyncio.to_thread(handler, message)
-                        )
-                    tasks.append(task)
-                except Exception as e:
-                    print(f"❌ 处理消息类型失败: {e}")
-
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
+        for subscription in self.message_handlers.get(message.message_type, ()):
+            try:
+                await subscription.offer(message)
+            except Exception as e:
+                print(f"❌ 处理消息类型失败: {e}")
+
+    async def _notify_subscribers_batch(self, messages: List[Message]):
+        """按订阅者聚合一批消息，每个订阅者只投递一次"""
+        deliveries: Dict[int, Tuple[Subscription, List[Message]]] = {}
+
+        for message in messages:
+            subscriptions = itertools.chain(
+                self._route(message.channel),
+                self.message_handlers.get(message.message_type, ())
+            )
+            for subscription in subscriptions:
+                entry = deliveries.get(id(subscription))
+                if entry is None:
+                    deliveries[id(subscription)] = (subscription, [message])
+                else:
+                    entry[1].append(message)
+
+        for subscription, batch in deliveries.values():
+            try:
+                await subscription.offer_batch(batch)
+            except Exception as e:
+                print(f"❌ 通知订阅者失败: {e}")
 
     async def _monitor_system_health(self):
         """监控系统健康状态"""
         while self._is_running:
             try:
                 # 收集统计信息
-                stats = self.get_statistics()
+                health_payload = self._build_health_payload()
 
-                # 发布健康状态
-                health_payload = {
-                    "timestamp": time.time(),
-                    "statistics": stats,
-                    "channels_count": len(self.channels),
-                    "total_subscribers": sum(len(subs) for subs in self.subscribers.values()),
-                    "queue_sizes": {
-                        channel: self.channels[channel].qsize()
-                        for channel in self.channels
-                    }
-                }
+                # 编码后的快照供外部读取/跨进程传输
+                self._health_snapshot = self.codec.encode_value(health_payload)
 
+                # 发布健康状态
                 await self.publish(
                     channel="system.health",
                     message_type=MessageType.SYSTEM_EVENT,
@@ -366,10 +760,41 @@ class MessageBus:
                 print(f"❌ 系统健康监控失败: {e}")
                 await asyncio.sleep(60)  # 出错时等待更长时间
 
+    def _build_health_payload(self) -> Dict[str, Any]:
+        """构建健康状态数据"""
+        return {
+            "timestamp": time.time(),
+            "statistics": self.get_statistics(),
+            "channels_count": len(self.channels),
+            "total_subscribers": sum(len(subs) for subs in self.subscribers.values()),
+            "queue_sizes": {
+                channel: self.channels[channel].qsize()
+                for channel in self.channels
+            }
+        }
+
     def get_statistics(self) -> Dict[str, Any]:
         """获取统计信息"""
         with self._lock:
-            return self._statistics.copy()
+            stats = self._statistics.copy()
+
+        subscriber_stats = [sub.get_statistics() for sub in self._all_subscriptions()]
+        stats["messages_dropped"] = sum(sub["dropped"] for sub in subscriber_stats)
+        stats["messages_rejected"] = sum(sub["rejected"] for sub in subscriber_stats)
+        stats["subscribers"] = subscriber_stats
+        if self.message_log is not None:
+            stats["message_log"] = self.message_log.get_statistics()
+        return stats
+
+    def encode_statistics(self) -> bytes:
+        """使用总线编解码器编码统计信息"""
+        return self.codec.encode_value(self.get_statistics())
+
+    def get_health_snapshot(self, refresh: bool = False) -> bytes:
+        """获取编码后的健康快照，使用 self.codec.decode_value() 解码"""
+        if refresh or not self._health_snapshot:
+            self._health_snapshot = self.codec.encode_value(self._build_health_payload())
+        return self._health_snapshot
 
     def get_channel_info(self, channel: str) -> Dict[str, Any]:
         """获取频道信息"""
@@ -379,7 +804,7 @@ class MessageBus:
         return {
             "channel": channel,
             "queue_size": self.channels[channel].qsize(),
-            "subscribers_count": len(self.subscribers.get(channel, [])),
+            "subscribers_count": len(self._route(channel)),
             "max_queue_size": self.max_queue_size
         }
 
@@ -391,13 +816,11 @@ class MessageBus:
         """列出订阅者"""
         if channel:
             return {
-                channel: [sub.__name__ if hasattr(sub, '__name__') else str(sub)
-                          for sub in self.subscribers.get(channel, [])]
+                channel: [sub.name for sub in self.subscribers.get(channel, [])]
             }
         else:
             return {
-                chan: [sub.__name__ if hasattr(sub, '__name__') else str(sub)
-                       for sub in subscribers]
+                chan: [sub.name for sub in subscribers]
                 for chan, subscribers in self.subscribers.items()
             }
 
@@ -418,4 +841,9 @@ class MessageChannels:
     WEATHER_AGENT = "agents.weather"
     TRANSPORT_AGENT = "agents.transport"
     BUDGET_AGENT = "agents.budget"
-    COORDINATOR_AGENT = "agents.coordinator"
\ No newline at end of file
+    COORDINATOR_AGENT = "agents.coordinator"
+
+    @staticmethod
+    def agent_requests_for(agent_name: str) -> str:
+        """指定Agent的请求频道（跨进程部署时按Agent分组消费）"""
+        return f"{MessageChannels.AGENT_REQUESTS}.{agent_name}"
\ No newline at end of file
@@ -0,0 +1,352 @@
+# multi_agent_system/utils/message_codec.py
+import json
+import struct
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Any, Dict, Tuple, Type, Union
+
+from .message import Message, MessageType, MessagePriority
+
+try:
+    import msgpack
+except ImportError:  # 可选依赖，缺失时使用纯 Python 实现
+    msgpack = None
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+_U8 = struct.Struct("!B")
+_U16 = struct.Struct("!H")
+_U32 = struct.Struct("!I")
+_U64 = struct.Struct("!Q")
+_I8 = struct.Struct("!b")
+_I16 = struct.Struct("!h")
+_I32 = struct.Struct("!i")
+_I64 = struct.Struct("!q")
+_F32 = struct.Struct("!f")
+_F64 = struct.Struct("!d")
+
+# 定长数值类型标记 -> 解码结构
+_FIXED_WIDTH = {
+    0xcc: _U8, 0xcd: _U16, 0xce: _U32, 0xcf: _U64,
+    0xd0: _I8, 0xd1: _I16, 0xd2: _I32, 0xd3: _I64,
+    0xca: _F32, 0xcb: _F64
+}
+
+
+class MessageCodec(ABC):
+    """消息编解码器接口"""
+
+    name = "base"
+
+    @abstractmethod
+    def encode(self, message: Message) -> bytes:
+        """编码消息"""
+        pass
+
+    @abstractmethod
+    def decode(self, data: Buffer) -> Message:
+        """解码消息"""
+        pass
+
+    @abstractmethod
+    def encode_value(self, value: Any) -> bytes:
+        """编码任意可序列化的值（统计信息、健康快照等）"""
+        pass
+
+    @abstractmethod
+    def decode_value(self, data: Buffer) -> Any:
+        """解码任意值"""
+        pass
+
+
+class JsonMessageCodec(MessageCodec):
+    """JSON 编解码器 - 与 Message.to_json() 保持一致"""
+
+    name = "json"
+
+    def encode(self, message: Message) -> bytes:
+        return message.to_json().encode("utf-8")
+
+    def decode(self, data: Buffer) -> Message:
+        return Message.from_dict(json.loads(bytes(data)))
+
+    def encode_value(self, value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+
+    def decode_value(self, data: Buffer) -> Any:
+        return json.loads(bytes(data))
+
+
+class BinaryMessageCodec(MessageCodec):
+    """二进制编解码器 - msgpack 风格的长度前缀格式
+
+    帧结构:
+        magic(2) | version(1) | type(1) | priority(1) | timestamp(f64)
+        | message_id, channel, source, target, correlation_id (u16 长度 + UTF-8, 0xFFFF 表示 None)
+        | metadata (u32 长度 + msgpack 值, 长度 0 表示 None)
+        | payload  (u32 长度 + msgpack 值)
+
+    payload 放在帧尾，decode_envelope() 只解析头部并返回 payload 的 memoryview 切片，
+    路由/转发时无需解码或复制 payload。安装了 msgpack 时使用其 C 实现编解码值，
+    否则使用本模块的纯 Python 实现，两者产生的字节互相兼容。
+    """
+
+    name = "binary"
+
+    MAGIC = b"MB"
+    VERSION = 1
+    _HEADER = struct.Struct("!2sBBBd")
+    _NONE_LENGTH = 0xFFFF
+    _MESSAGE_TYPES = list(MessageType)
+    _TYPE_CODES = {message_type: code for code, message_type in enumerate(_MESSAGE_TYPES)}
+
+    def __init__(self, accelerated: bool = True):
+        self.accelerated = accelerated and msgpack is not None
+
+    def encode(self, message: Message) -> bytes:
+        out = bytearray(self._HEADER.pack(
+            self.MAGIC,
+            self.VERSION,
+            self._TYPE_CODES[message.message_type],
+            message.priority.value,
+            message.timestamp
+        ))
+
+        for field, text in (("message_id", message.message_id), ("channel", message.channel),
+                            ("source", message.source), ("target", message.target),
+                            ("correlation_id", message.correlation_id)):
+            if text is None:
+                out += _U16.pack(self._NONE_LENGTH)
+            else:
+                raw = text.encode("utf-8")
+                # 0xFFFF 保留给 None，头部字符串最长 0xFFFE 字节
+                if len(raw) >= self._NONE_LENGTH:
+                    raise ValueError(f"消息头字段 {field} 过长: {len(raw)} 字节（上限 {self._NONE_LENGTH - 1}）")
+                out += _U16.pack(len(raw))
+                out += raw
+
+        for section in (message.metadata, message.payload):
+            packed = self.encode_value(section) if section is not None else b""
+            out += _U32.pack(len(packed))
+            out += packed
+
+        return bytes(out)
+
+    def decode(self, data: Buffer) -> Message:
+        message, payload_view = self.decode_envelope(data)
+        message.payload = self.decode_payload(payload_view)
+        return message
+
+    def decode_envelope(self, data: Buffer) -> Tuple[Message, memoryview]:
+        """只解码消息头，payload 以 memoryview 形式返回（零拷贝）"""
+        view = memoryview(data)
+        magic, version, type_code, priority, timestamp = self._HEADER.unpack_from(view, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"无效的消息帧: magic={bytes(magic)!r}, version={version}")
+
+        offset = self._HEADER.size
+        texts = []
+        for _ in range(5):
+            (length,) = _U16.unpack_from(view, offset)
+            offset += 2
+            if length == self._NONE_LENGTH:
+                texts.append(None)
+            else:
+                texts.append(str(view[offset:offset + length], "utf-8"))
+                offset += length
+
+        (metadata_length,) = _U32.unpack_from(view, offset)
+        offset += 4
+        metadata = self.decode_value(view[offset:offset + metadata_length]) if metadata_length else None
+        offset += metadata_length
+
+        (payload_length,) = _U32.unpack_from(view, offset)
+        offset += 4
+        payload_view = view[offset:offset + payload_length]
+
+        message_id, channel, source, target, correlation_id = texts
+        message = Message(
+            message_id=message_id,
+            message_type=self._MESSAGE_TYPES[type_code],
+            channel=channel,
+            payload=None,
+            priority=MessagePriority(priority),
+            timestamp=timestamp,
+            source=source,
+            target=target,
+            correlation_id=correlation_id,
+            metadata=metadata
+        )
+        return message, payload_view
+
+    def decode_payload(self, payload_view: Buffer) -> Any:
+        """解码 decode_envelope() 返回的 payload"""
+        return self.decode_value(payload_view) if len(payload_view) else None
+
+    def encode_value(self, value: Any) -> bytes:
+        if self.accelerated:
+            return msgpack.packb(value, default=_to_builtin, use_bin_type=True)
+        out = bytearray()
+        _pack(value, out)
+        return bytes(out)
+
+    def decode_value(self, data: Buffer) -> Any:
+        if self.accelerated:
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+        view = memoryview(data)
+        value, _ = _unpack(view, 0)
+        return value
+
+
+def _to_builtin(value: Any) -> Any:
+    """将不可直接序列化的对象转换为基础类型，与 json.dumps(default=str) 行为对齐"""
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, "to_dict") and callable(getattr(value, "to_dict")):
+        return value.to_dict()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def _pack_length(out: bytearray, length: int, fix_base: int, fix_limit: int, codes: Tuple[int, int, int]):
+    """写入容器/字符串长度头"""
+    if length < fix_limit:
+        out.append(fix_base | length)
+    elif codes[0] is not None and length < 0x100:
+        out.append(codes[0])
+        out.append(length)
+    elif length < 0x10000:
+        out.append(codes[1])
+        out += _U16.pack(length)
+    else:
+        out.append(codes[2])
+        out += _U32.pack(length)
+
+
+def _pack(value: Any, out: bytearray):
+    """纯 Python msgpack 编码"""
+    if value is None:
+        out.append(0xc0)
+    elif value is True:
+        out.append(0xc3)
+    elif value is False:
+        out.append(0xc2)
+    elif isinstance(value, int):
+        if 0 <= value < 0x80:
+            out.append(value)
+        elif -32 <= value < 0:
+            out.append(value & 0xff)
+        elif -(1 << 63) <= value < (1 << 63):
+            out.append(0xd3)
+            out += _I64.pack(value)
+        elif 0 <= value < (1 << 64):
+            out.append(0xcf)
+            out += _U64.pack(value)
+        else:
+            _pack(str(value), out)
+    elif isinstance(value, float):
+        out.append(0xcb)
+        out += _F64.pack(value)
+    elif isinstance(value, str):
+        raw = value.encode("utf-8")
+        _pack_length(out, len(raw), 0xa0, 32, (0xd9, 0xda, 0xdb))
+        out += raw
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        _pack_length(out, len(value), 0, 0, (0xc4, 0xc5, 0xc6))
+        out += value
+    elif isinstance(value, dict):
+        _pack_length(out, len(value), 0x80, 16, (None, 0xde, 0xdf))
+        for key, item in value.items():
+            _pack(key, out)
+            _pack(item, out)
+    elif isinstance(value, (list, tuple)):
+        _pack_length(out, len(value), 0x90, 16, (None, 0xdc, 0xdd))
+        for item in value:
+            _pack(item, out)
+    else:
+        _pack(_to_builtin(value), out)
+
+
+def _unpack(view: memoryview, offset: int) -> Tuple[Any, int]:
+    """纯 Python msgpack 解码，返回 (值, 新偏移量)"""
+    code = view[offset]
+    offset += 1
+
+    if code <= 0x7f:
+        return code, offset
+    if code >= 0xe0:
+        return code - 0x100, offset
+    if 0xa0 <= code <= 0xbf:
+        length = code & 0x1f
+        return str(view[offset:offset + length], "utf-8"), offset + length
+    if 0x80 <= code <= 0x8f:
+        return _unpack_map(view, offset, code & 0x0f)
+    if 0x90 <= code <= 0x9f:
+        return _unpack_array(view, offset, code & 0x0f)
+    if code == 0xc0:
+        return None, offset
+    if code == 0xc2:
+        return False, offset
+    if code == 0xc3:
+        return True, offset
+
+    fixed = _FIXED_WIDTH.get(code)
+    if fixed is not None:
+        return fixed.unpack_from(view, offset)[0], offset + fixed.size
+
+    if code in (0xd9, 0xda, 0xdb, 0xc4, 0xc5, 0xc6):
+        length_struct = {0xd9: _U8, 0xda: _U16, 0xdb: _U32, 0xc4: _U8, 0xc5: _U16, 0xc6: _U32}[code]
+        (length,) = length_struct.unpack_from(view, offset)
+        offset += length_struct.size
+        chunk = view[offset:offset + length]
+        value = str(chunk, "utf-8") if code >= 0xd9 else bytes(chunk)
+        return value, offset + length
+
+    if code in (0xdc, 0xdd, 0xde, 0xdf):
+        length_struct = _U16 if code in (0xdc, 0xde) else _U32
+        (length,) = length_struct.unpack_from(view, offset)
+        offset += length_struct.size
+        if code in (0xdc, 0xdd):
+            return _unpack_array(view, offset, length)
+        return _unpack_map(view, offset, length)
+
+    raise ValueError(f"不支持的类型标记: 0x{code:02x}")
+
+
+def _unpack_array(view: memoryview, offset: int, length: int) -> Tuple[list, int]:
+    items = []
+    for _ in range(length):
+        item, offset = _unpack(view, offset)
+        items.append(item)
+    return items, offset
+
+
+def _unpack_map(view: memoryview, offset: int, length: int) -> Tuple[dict, int]:
+    result = {}
+    for _ in range(length):
+        key, offset = _unpack(view, offset)
+        value, offset = _unpack(view, offset)
+        result[key] = value
+    return result, offset
+
+
+# 编解码器注册表
+_CODECS: Dict[str, Type[MessageCodec]] = {
+    JsonMessageCodec.name: JsonMessageCodec,
+    BinaryMessageCodec.name: BinaryMessageCodec
+}
+
+
+def register_codec(name: str, codec_class: Type[MessageCodec]):
+    """注册自定义编解码器"""
+    _CODECS[name] = codec_class
+
+
+def get_codec(codec: Union[str, MessageCodec] = "binary") -> MessageCodec:
+    """按名称获取编解码器实例"""
+    if isinstance(codec, MessageCodec):
+        return codec
+    if codec not in _CODECS:
+        raise ValueError(f"编解码器 '{codec}' 未注册")
+    return _CODECS[codec]()
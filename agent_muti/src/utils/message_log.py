@@ -0,0 +1,439 @@
+# multi_agent_system/utils/message_log.py
+import asyncio
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import quote, unquote
+
+from .message import Message
+from .message_codec import MessageCodec, get_codec
+
+# 记录结构: 长度(u32) | CRC32(u32) | 编码后的消息
+_RECORD_HEADER = struct.Struct("!II")
+# 稀疏索引间隔：每隔多少条记录保存一次文件位置
+_INDEX_INTERVAL = 64
+_SEGMENT_SUFFIX = ".log"
+_OFFSET_SUFFIX = ".offset"
+
+
+def _channel_dirname(channel: str) -> str:
+    """频道名转为目录名：'/' 等字符百分号编码，'.' 和 '..' 的点也编码，避免指向日志目录本身或其上级"""
+    if not channel:
+        raise ValueError("频道名不能为空")
+    name = quote(channel, safe="")
+    if name.strip(".") == "":
+        name = name.replace(".", "%2E")
+    return name
+
+
+class _Segment:
+    """日志分段 - 文件名为该分段第一条记录的偏移量"""
+
+    def __init__(self, base_offset: int, path: Path):
+        self.base_offset = base_offset
+        self.path = path
+        self.size = 0
+        self.count = 0
+        # 稀疏索引: (分段内记录序号, 文件位置)
+        self.index: List[Tuple[int, int]] = []
+
+    @property
+    def next_offset(self) -> int:
+        return self.base_offset + self.count
+
+    def scan(self) -> bool:
+        """扫描分段重建索引，截断崩溃时写了一半的尾部记录；返回是否发生截断"""
+        file_size = self.path.stat().st_size
+        self.size = self.count = 0
+        self.index = []
+        if file_size:
+            with open(self.path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                position = 0
+                while position + _RECORD_HEADER.size <= file_size:
+                    length, crc = _RECORD_HEADER.unpack_from(mm, position)
+                    end = position + _RECORD_HEADER.size + length
+                    if end > file_size or zlib.crc32(mm[position + _RECORD_HEADER.size:end]) != crc:
+                        break
+                    if self.count % _INDEX_INTERVAL == 0:
+                        self.index.append((self.count, position))
+                    self.count += 1
+                    position = end
+                self.size = position
+
+        if self.size < file_size:
+            with open(self.path, "r+b") as file:
+                file.truncate(self.size)
+            return True
+        return False
+
+    def locate(self, offset: int) -> Tuple[int, int]:
+        """返回不大于 offset 的最近索引点 (记录序号, 文件位置)"""
+        relative = offset - self.base_offset
+        best = (0, 0)
+        for entry in self.index:
+            if entry[0] > relative:
+                break
+            best = entry
+        return best
+
+
+class _ChannelLog:
+    """单个频道的分段日志"""
+
+    def __init__(self, directory: Path, segment_bytes: int):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segments: List[_Segment] = []
+        self.recovered_truncations = 0
+
+        for path in sorted(self.directory.glob(f"*{_SEGMENT_SUFFIX}")):
+            segment = _Segment(int(path.stem), path)
+            if segment.scan():
+                self.recovered_truncations += 1
+            self.segments.append(segment)
+
+        if not self.segments:
+            self.segments.append(self._new_segment(0))
+
+        self._file = open(self.active.path, "ab")
+        self.next_offset = self.active.next_offset
+        self._pending: List[bytes] = []
+
+    @property
+    def active(self) -> _Segment:
+        return self.segments[-1]
+
+    @property
+    def start_offset(self) -> int:
+        return self.segments[0].base_offset
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(segment.size for segment in self.segments)
+
+    def _new_segment(self, base_offset: int) -> _Segment:
+        path = self.directory / f"{base_offset:020d}{_SEGMENT_SUFFIX}"
+        path.touch()
+        return _Segment(base_offset, path)
+
+    def append(self, record: bytes) -> int:
+        """追加到待写缓冲区，返回分配的偏移量（事件循环线程调用）"""
+        offset = self.next_offset
+        self.next_offset += 1
+        self._pending.append(record)
+        return offset
+
+    def take_pending(self) -> List[bytes]:
+        records, self._pending = self._pending, []
+        return records
+
+    def write(self, records: List[bytes], fsync: bool):
+        """写入一批记录（在线程池中执行，调用方持有日志锁）"""
+        for record in records:
+            active = self.active
+            if active.size and active.size + len(record) > self.segment_bytes:
+                self._rotate(fsync)
+                active = self.active
+            if active.count % _INDEX_INTERVAL == 0:
+                active.index.append((active.count, active.size))
+            self._file.write(record)
+            active.size += len(record)
+            active.count += 1
+
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+
+    def _rotate(self, fsync: bool):
+        """滚动到新分段"""
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self.segments.append(self._new_segment(self.active.next_offset))
+        self._file = open(self.active.path, "ab")
+
+    def read(self, offset: int, max_messages: Optional[int]) -> Iterator[Tuple[int, memoryview]]:
+        """从 offset 开始按顺序读取已落盘的记录（mmap，不复制记录内容）"""
+        offset = max(offset, self.start_offset)
+        remaining = max_messages if max_messages is not None else float("inf")
+
+        for segment in list(self.segments):
+            if remaining <= 0:
+                return
+            if segment.next_offset <= offset or segment.size == 0:
+                continue
+
+            size = segment.size
+            record_number, position = segment.locate(offset)
+            with open(segment.path, "rb") as file, \
+                    mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    while position < size and remaining > 0:
+                        (length, _) = _RECORD_HEADER.unpack_from(view, position)
+                        start = position + _RECORD_HEADER.size
+                        current = segment.base_offset + record_number
+                        if current >= offset:
+                            record = view[start:start + length]
+                            yield current, record
+                            record.release()
+                            remaining -= 1
+                        position = start + length
+                        record_number += 1
+                finally:
+                    view.release()
+
+    def enforce_retention(self, retention_bytes: Optional[int], retention_seconds: Optional[float]) -> int:
+        """按大小和时间删除旧分段（不删除活跃分段），返回删除数量"""
+        removed = 0
+        now = time.time()
+        while len(self.segments) > 1:
+            oldest = self.segments[0]
+            too_large = retention_bytes is not None and self.total_bytes > retention_bytes
+            too_old = (retention_seconds is not None and
+                       now - oldest.path.stat().st_mtime > retention_seconds)
+            if not (too_large or too_old):
+                break
+            oldest.path.unlink(missing_ok=True)
+            self.segments.pop(0)
+            removed += 1
+        return removed
+
+    def close(self):
+        self._file.close()
+
+
+class LogConsumer:
+    """基于偏移量的日志消费者，提交的偏移量持久化在频道目录中"""
+
+    def __init__(self, log: "MessageLog", channel: str, name: str):
+        self.log = log
+        self.channel = channel
+        self.name = name
+        self._offset_path = log.channel_directory(channel) / f"{name}{_OFFSET_SUFFIX}"
+        self.position = self._load_committed()
+
+    def _load_committed(self) -> int:
+        try:
+            return int(self._offset_path.read_text().strip())
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    @property
+    def committed(self) -> int:
+        return self._load_committed()
+
+    def poll(self, max_messages: int = 100) -> List[Tuple[int, Message]]:
+        """读取下一批消息并前移消费位置"""
+        records = self.log.read(self.channel, self.position, max_messages)
+        if records:
+            self.position = records[-1][0] + 1
+        return records
+
+    def seek(self, offset: int):
+        """移动消费位置"""
+        self.position = offset
+
+    def commit(self):
+        """原子地持久化当前消费位置"""
+        temp_path = self._offset_path.with_suffix(".tmp")
+        temp_path.write_text(str(self.position))
+        os.replace(temp_path, self._offset_path)
+
+
+class MessageLog:
+    """持久化分段消息日志 - 每个频道一个目录，追加写入，按偏移量重放
+
+    append() 只编码并放入内存缓冲区；后台任务按 flush_interval 周期
+    （或缓冲达到 flush_batch 条时）在线程池中批量写盘并 fsync，
+    因此对 publish 的额外开销是有界的。进程崩溃时最多丢失最后一个刷盘周期内的消息，
+    写了一半的尾部记录会在重新打开时通过 CRC 校验被截断。
+    """
+
+    def __init__(self,
+                 directory: Union[str, Path],
+                 codec: Union[str, MessageCodec] = "binary",
+                 segment_bytes: int = 64 * 1024 * 1024,
+                 retention_bytes: Optional[int] = None,
+                 retention_seconds: Optional[float] = None,
+                 flush_interval: float = 0.2,
+                 flush_batch: int = 512,
+                 fsync: bool = True):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.codec = get_codec(codec)
+        self.segment_bytes = segment_bytes
+        self.retention_bytes = retention_bytes
+        self.retention_seconds = retention_seconds
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.fsync = fsync
+
+        self._channels: Dict[str, _ChannelLog] = {}
+        self._lock = threading.Lock()
+        self._pending_count = 0
+        self._flush_requested: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._statistics = {
+            "messages_appended": 0,
+            "bytes_appended": 0,
+            "flushes": 0,
+            "segments_removed": 0
+        }
+
+    def channel_directory(self, channel: str) -> Path:
+        """频道对应的日志目录（频道名经百分号编码，始终位于日志目录之下）"""
+        return self.directory / _channel_dirname(channel)
+
+    def _channel(self, channel: str) -> _ChannelLog:
+        log = self._channels.get(channel)
+        if log is None:
+            with self._lock:
+                log = self._channels.get(channel)
+                if log is None:
+                    log = self._channels[channel] = _ChannelLog(self.channel_directory(channel), self.segment_bytes)
+        return log
+
+    async def start(self):
+        """启动后台刷盘任务"""
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._closing = False
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        """刷盘并关闭所有分段文件"""
+        if self._flush_task is not None:
+            # 通过标志位退出刷盘循环（事件已置位时取消可能被 wait_for 吞掉）
+            self._closing = True
+            self._flush_requested.set()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+
+        await self.flush()
+        with self._lock:
+            for log in self._channels.values():
+                log.close()
+            self._channels.clear()
+
+    def append(self, message: Message) -> int:
+        """追加消息，返回其在频道日志中的偏移量"""
+        data = self.codec.encode(message)
+        record = _RECORD_HEADER.pack(len(data), zlib.crc32(data)) + data
+        offset = self._channel(message.channel).append(record)
+
+        self._statistics["messages_appended"] += 1
+        self._statistics["bytes_appended"] += len(record)
+        self._pending_count += 1
+        if self._pending_count >= self.flush_batch and self._flush_requested is not None:
+            self._flush_requested.set()
+        return offset
+
+    async def _flush_loop(self):
+        """按周期或批量阈值刷盘"""
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ 消息日志刷盘失败: {e}")
+
+    async def flush(self):
+        """将缓冲区中的记录写盘"""
+        if self._flush_lock is None:
+            self._write_pending(self._take_pending())
+            return
+
+        async with self._flush_lock:
+            batches = self._take_pending()
+            if batches:
+                await asyncio.get_running_loop().run_in_executor(None, self._write_pending, batches)
+
+    def _take_pending(self) -> Dict[str, List[bytes]]:
+        self._pending_count = 0
+        batches = {}
+        for channel, log in list(self._channels.items()):
+            records = log.take_pending()
+            if records:
+                batches[channel] = records
+        return batches
+
+    def _write_pending(self, batches: Dict[str, List[bytes]]):
+        if not batches:
+            return
+        with self._lock:
+            for channel, records in batches.items():
+                log = self._channels[channel]
+                log.write(records, self.fsync)
+                self._statistics["segments_removed"] += log.enforce_retention(
+                    self.retention_bytes, self.retention_seconds
+                )
+            self._statistics["flushes"] += 1
+
+    def read(self, channel: str, offset: int = 0, max_messages: int = None) -> List[Tuple[int, Message]]:
+        """读取已落盘的消息，返回 (偏移量, 消息) 列表"""
+        return list(self.replay(channel, offset, max_messages))
+
+    def replay(self, channel: str, offset: int = 0, max_messages: int = None) -> Iterator[Tuple[int, Message]]:
+        """按顺序重放已落盘的消息"""
+        if channel not in self._channels and not self.channel_directory(channel).exists():
+            return
+        log = self._channel(channel)
+        with self._lock:
+            records = [(record_offset, self.codec.decode(record))
+                       for record_offset, record in log.read(offset, max_messages)]
+        yield from records
+
+    def latest_by_correlation(self, channel: str, offset: int = 0) -> Dict[str, Message]:
+        """按关联ID汇总频道中最新的消息，用于崩溃后恢复 Agent 响应"""
+        latest = {}
+        for _, message in self.replay(channel, offset):
+            if message.correlation_id:
+                latest[message.correlation_id] = message
+        return latest
+
+    def consumer(self, channel: str, name: str) -> LogConsumer:
+        """创建基于偏移量的消费者"""
+        self._channel(channel)
+        return LogConsumer(self, channel, name)
+
+    def start_offset(self, channel: str) -> int:
+        """频道中最早仍保留的偏移量"""
+        return self._channel(channel).start_offset
+
+    def end_offset(self, channel: str) -> int:
+        """频道中下一条消息的偏移量"""
+        return self._channel(channel).next_offset
+
+    def list_channels(self) -> List[str]:
+        """列出磁盘上已有日志的频道"""
+        return sorted(unquote(path.name) for path in self.directory.iterdir() if path.is_dir())
+
+    def get_statistics(self) -> Dict[str, object]:
+        """获取日志统计信息"""
+        stats = self._statistics.copy()
+        stats["pending"] = self._pending_count
+        stats["channels"] = {
+            channel: {
+                "start_offset": log.start_offset,
+                "end_offset": log.next_offset,
+                "segments": len(log.segments),
+                "bytes": log.total_bytes
+            }
+            for channel, log in self._channels.items()
+        }
+        return stats
@@ -0,0 +1,377 @@
+# multi_agent_system/utils/message_transport.py
+import asyncio
+import itertools
+import json
+import struct
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from .message import Message
+from .topic_trie import TopicTrie
+
+# 帧结构: 长度(u32, 不含帧头) | 帧类型(u8) | 帧体
+_FRAME_HEADER = struct.Struct("!IB")
+_CHANNEL_LENGTH = struct.Struct("!H")
+
+FRAME_MESSAGE = 1      # 帧体: 频道名(u16 长度 + UTF-8) | 编码后的消息
+FRAME_SUBSCRIBE = 2    # 帧体: {"channel": ..., "group": ...} JSON
+FRAME_UNSUBSCRIBE = 3  # 帧体同 FRAME_SUBSCRIBE
+
+# 中枢按具体频道缓存的模式匹配结果上限
+_PATTERN_CACHE_SIZE = 4096
+
+
+def parse_address(address: str) -> Tuple[str, str, Optional[int]]:
+    """解析传输地址: unix:/path/to.sock 或 tcp://host:port"""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):], None
+    if address.startswith("tcp://"):
+        host, _, port = address[len("tcp://"):].rpartition(":")
+        return "tcp", host or "127.0.0.1", int(port)
+    raise ValueError(f"不支持的传输地址: {address}")
+
+
+def _encode_frame(kind: int, body: bytes) -> bytes:
+    return _FRAME_HEADER.pack(len(body), kind) + body
+
+
+def _encode_message_frame(channel: str, encoded_message: bytes) -> bytes:
+    raw_channel = channel.encode("utf-8")
+    return _encode_frame(
+        FRAME_MESSAGE,
+        _CHANNEL_LENGTH.pack(len(raw_channel)) + raw_channel + encoded_message
+    )
+
+
+def _split_message_body(body: bytes) -> Tuple[str, memoryview]:
+    """拆分消息帧体，返回频道名和消息部分（memoryview，不复制）"""
+    view = memoryview(body)
+    (length,) = _CHANNEL_LENGTH.unpack_from(view, 0)
+    channel = str(view[2:2 + length], "utf-8")
+    return channel, view[2 + length:]
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    header = await reader.readexactly(_FRAME_HEADER.size)
+    length, kind = _FRAME_HEADER.unpack(header)
+    body = await reader.readexactly(length)
+    return kind, body
+
+
+class MessageTransport(ABC):
+    """消息传输后端接口 - 负责把总线上的消息桥接到其他进程"""
+
+    # 是否需要把本地发布的消息转发出去
+    is_remote = False
+
+    @abstractmethod
+    async def start(self, bus):
+        """启动传输，bus 用于投递远端消息"""
+        pass
+
+    @abstractmethod
+    async def send(self, message: Message):
+        """将本地发布的消息发送给远端订阅者"""
+        pass
+
+    @abstractmethod
+    def subscribe(self, channel: str, group: str = None):
+        """声明本进程关心的频道；同组订阅者之间负载均衡"""
+        pass
+
+    @abstractmethod
+    def unsubscribe(self, channel: str, group: str = None):
+        """取消频道声明"""
+        pass
+
+    @abstractmethod
+    async def close(self):
+        """关闭传输"""
+        pass
+
+
+class InProcessTransport(MessageTransport):
+    """进程内传输 - 所有订阅者都在同一个事件循环中（默认行为）"""
+
+    async def start(self, bus):
+        pass
+
+    async def send(self, message: Message):
+        pass
+
+    def subscribe(self, channel: str, group: str = None):
+        pass
+
+    def unsubscribe(self, channel: str, group: str = None):
+        pass
+
+    async def close(self):
+        pass
+
+
+class SocketTransport(MessageTransport):
+    """套接字传输 - 通过 SocketTransportHub 与其他进程中的总线互通"""
+
+    is_remote = True
+
+    def __init__(self, address: str):
+        self.address = address
+        self._bus = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._interests: Set[Tuple[str, Optional[str]]] = set()
+        self._statistics = {
+            "frames_sent": 0,
+            "frames_received": 0,
+            "bytes_sent": 0,
+            "bytes_received": 0
+        }
+
+    async def start(self, bus):
+        self._bus = bus
+        kind, target, port = parse_address(self.address)
+        if kind == "unix":
+            self._reader, self._writer = await asyncio.open_unix_connection(target)
+        else:
+            self._reader, self._writer = await asyncio.open_connection(target, port)
+
+        # 补发连接前登记的订阅
+        for channel, group in self._interests:
+            self._write_interest(FRAME_SUBSCRIBE, channel, group)
+        await self._writer.drain()
+
+        self._reader_task = asyncio.create_task(self._read_loop())
+        print(f"🔌 已连接消息传输中枢: {self.address}")
+
+    async def send(self, message: Message):
+        if self._writer is None:
+            return
+        frame = _encode_message_frame(message.channel, self._bus.codec.encode(message))
+        self._writer.write(frame)
+        self._statistics["frames_sent"] += 1
+        self._statistics["bytes_sent"] += len(frame)
+        await self._writer.drain()
+
+    def subscribe(self, channel: str, group: str = None):
+        interest = (channel, group)
+        if interest in self._interests:
+            return
+        self._interests.add(interest)
+        if self._writer is not None:
+            self._write_interest(FRAME_SUBSCRIBE, channel, group)
+
+    def unsubscribe(self, channel: str, group: str = None):
+        interest = (channel, group)
+        if interest not in self._interests:
+            return
+        self._interests.discard(interest)
+        if self._writer is not None:
+            self._write_interest(FRAME_UNSUBSCRIBE, channel, group)
+
+    def _write_interest(self, kind: int, channel: str, group: Optional[str]):
+        body = json.dumps({"channel": channel, "group": group}, ensure_ascii=False).encode("utf-8")
+        self._writer.write(_encode_frame(kind, body))
+
+    async def _read_loop(self):
+        """接收中枢转发的消息并投递到本地总线"""
+        try:
+            while True:
+                kind, body = await _read_frame(self._reader)
+                if kind != FRAME_MESSAGE:
+                    continue
+                self._statistics["frames_received"] += 1
+                self._statistics["bytes_received"] += len(body)
+
+                _, encoded = _split_message_body(body)
+                message = self._bus.codec.decode(encoded)
+                await self._bus.deliver_remote(message)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            print(f"🔌 消息传输连接已断开: {self.address}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ 消息传输接收失败: {e}")
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+            self._writer = None
+
+    def get_statistics(self):
+        """获取传输统计信息"""
+        return self._statistics.copy()
+
+
+class _HubPeer:
+    """中枢侧的连接对象"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.peer_id = next(self._ids)
+        self.writer = writer
+
+
+class SocketTransportHub:
+    """套接字传输中枢 - 在进程之间按频道订阅转发消息帧
+
+    中枢只解析帧头中的频道名，消息本身按原始字节转发，不做解码。
+    同一频道上声明了相同 group 的订阅者之间轮询分发（每条消息只投递给组内一个进程），
+    未声明 group 的订阅者各自收到一份。订阅的频道可以是通配符模式（agent.*、system.#），
+    匹配结果按具体频道缓存，订阅变化时失效；同一连接即使匹配多个模式也只收到一份。
+    """
+
+    def __init__(self, address: str):
+        self.address = address
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: Dict[int, _HubPeer] = {}
+        # 频道或模式 -> 分组键 -> 订阅该频道的连接
+        self._interests: Dict[str, Dict[str, List[_HubPeer]]] = defaultdict(dict)
+        self._pattern_index: TopicTrie[str] = TopicTrie()
+        self._pattern_cache: Dict[str, List[str]] = {}
+        self._round_robin: Dict[Tuple[str, str], itertools.count] = {}
+        self._statistics = {
+            "frames_forwarded": 0,
+            "frames_unrouted": 0
+        }
+
+    async def start(self):
+        """启动中枢"""
+        kind, target, port = parse_address(self.address)
+        if kind == "unix":
+            self._server = await asyncio.start_unix_server(self._handle_peer, path=target)
+        else:
+            self._server = await asyncio.start_server(self._handle_peer, target, port)
+        print(f"🚀 消息传输中枢已启动: {self.address}")
+
+    async def close(self):
+        """关闭中枢"""
+        if self._server is None:
+            return
+        self._server.close()
+        for peer in list(self._peers.values()):
+            peer.writer.close()
+        await self._server.wait_closed()
+        self._server = None
+        print("🛑 消息传输中枢已关闭")
+
+    def subscriber_count(self, channel: str) -> int:
+        """获取频道上的远端订阅数量"""
+        return sum(len(peers) for peers in self._interests.get(channel, {}).values())
+
+    def get_statistics(self):
+        """获取中枢统计信息"""
+        stats = self._statistics.copy()
+        stats["peers"] = len(self._peers)
+        stats["channels"] = {channel: self.subscriber_count(channel) for channel in self._interests}
+        return stats
+
+    async def _handle_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = _HubPeer(writer)
+        self._peers[peer.peer_id] = peer
+        try:
+            while True:
+                kind, body = await _read_frame(reader)
+                if kind == FRAME_MESSAGE:
+                    await self._forward(peer, body)
+                elif kind in (FRAME_SUBSCRIBE, FRAME_UNSUBSCRIBE):
+                    interest = json.loads(body)
+                    self._update_interest(peer, kind, interest["channel"], interest.get("group"))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._remove_peer(peer)
+            writer.close()
+
+    def _update_interest(self, peer: _HubPeer, kind: int, channel: str, group: Optional[str]):
+        group_key = f"group:{group}" if group else f"peer:{peer.peer_id}"
+        if kind == FRAME_SUBSCRIBE:
+            if channel not in self._interests:
+                self._index_pattern(channel)
+            members = self._interests[channel].setdefault(group_key, [])
+            if peer not in members:
+                members.append(peer)
+            return
+
+        members = self._interests.get(channel, {}).get(group_key, [])
+        if peer in members:
+            members.remove(peer)
+            if not members:
+                del self._interests[channel][group_key]
+            if not self._interests[channel]:
+                self._drop_pattern(channel)
+
+    def _index_pattern(self, pattern: str):
+        self._pattern_index.add(pattern, pattern)
+        self._pattern_cache.clear()
+
+    def _drop_pattern(self, pattern: str):
+        del self._interests[pattern]
+        self._pattern_index.remove(pattern, pattern)
+        self._pattern_cache.clear()
+
+    def _patterns_for(self, channel: str) -> List[str]:
+        """获取匹配具体频道的订阅键（按频道缓存）"""
+        patterns = self._pattern_cache.get(channel)
+        if patterns is None:
+            if len(self._pattern_cache) >= _PATTERN_CACHE_SIZE:
+                self._pattern_cache.clear()
+            patterns = self._pattern_cache[channel] = self._pattern_index.match(channel)
+        return patterns
+
+    def _remove_peer(self, peer: _HubPeer):
+        self._peers.pop(peer.peer_id, None)
+        for channel, groups in list(self._interests.items()):
+            for group_key, members in list(groups.items()):
+                if peer in members:
+                    members.remove(peer)
+                if not members:
+                    del groups[group_key]
+            if not groups:
+                self._drop_pattern(channel)
+
+    def _select_recipients(self, channel: str, sender: _HubPeer) -> List[_HubPeer]:
+        recipients: Dict[int, _HubPeer] = {}
+        for pattern in self._patterns_for(channel):
+            for group_key, members in self._interests[pattern].items():
+                candidates = [member for member in members if member is not sender]
+                if not candidates:
+                    continue
+                if group_key.startswith("group:"):
+                    counter = self._round_robin.setdefault((pattern, group_key), itertools.count())
+                    chosen = candidates[next(counter) % len(candidates)]
+                    recipients[chosen.peer_id] = chosen
+                else:
+                    for member in candidates:
+                        recipients[member.peer_id] = member
+        return list(recipients.values())
+
+    async def _forward(self, sender: _HubPeer, body: bytes):
+        channel, _ = _split_message_body(body)
+        recipients = self._select_recipients(channel, sender)
+        if not recipients:
+            self._statistics["frames_unrouted"] += 1
+            return
+
+        header = _FRAME_HEADER.pack(len(body), FRAME_MESSAGE)
+        for peer in recipients:
+            peer.writer.write(header)
+            peer.writer.write(body)
+            self._statistics["frames_forwarded"] += 1
+
+        for peer in recipients:
+            try:
+                await peer.writer.drain()
+            except ConnectionError:
+                self._remove_peer(peer)
@@ -0,0 +1,153 @@
+# multi_agent_system/utils/metric_store.py
+import bisect
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖，缺失时使用 array + memoryview
+    np = None
+
+
+class TagInterner:
+    """标签驻留表 - 相同的标签组合映射为同一个小整数ID，ID 0 表示空标签
+
+    条目数达到 max_entries 后新的组合不再登记，退化为 ID 0（计入 overflowed），内存有界。
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self.overflowed = 0
+        self._ids: Dict[Tuple, int] = {(): 0}
+        self._tags: List[Dict[str, Any]] = [{}]
+
+    def __len__(self) -> int:
+        return len(self._tags)
+
+    @staticmethod
+    def _key(tags: Dict[str, Any]) -> Tuple:
+        key = tuple(sorted(tags.items()))
+        try:
+            hash(key)
+        except TypeError:
+            # 不可哈希的值（列表、字典等）按其表示形式驻留
+            key = tuple((name, repr(value)) for name, value in key)
+        return key
+
+    def intern(self, tags: Optional[Dict[str, Any]]) -> int:
+        """获取标签组合的ID，首次出现时登记"""
+        if not tags:
+            return 0
+        key = self._key(tags)
+        tag_id = self._ids.get(key)
+        if tag_id is None:
+            if len(self._tags) >= self.max_entries:
+                self.overflowed += 1
+                return 0
+            tag_id = self._ids[key] = len(self._tags)
+            self._tags.append(dict(tags))
+        return tag_id
+
+    def find(self, tags: Optional[Dict[str, Any]]) -> Optional[int]:
+        """查找已登记的标签组合ID，不存在时返回 None"""
+        if not tags:
+            return 0
+        return self._ids.get(self._key(tags))
+
+    def lookup(self, tag_id: int) -> Dict[str, Any]:
+        """按ID取回标签字典（副本）"""
+        return dict(self._tags[tag_id])
+
+
+def _column(typecode: str, length: int):
+    if np is not None:
+        return np.zeros(length, dtype=np.float64 if typecode == "d" else np.uint32)
+    return array(typecode, bytes(array(typecode).itemsize * length))
+
+
+class MetricSeries:
+    """列式环形缓冲区 - 时间戳、数值、标签ID、元数据ID 各占一列
+
+    底层数组比容量多出 1/4 的余量，样本顺序追加；写到数组末尾时把最近的样本整体搬回开头。
+    因此最近的 N 个样本始终连续，columns() 可以直接返回切片视图（NumPy 视图或 memoryview），
+    搬移开销摊销后为 O(1)。每个样本约占用 1.25 × (8 + 8 + 4 + 4) = 30 字节。
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._length = capacity + max(16, capacity // 4)
+        self._end = 0
+        self._size = 0
+        self.timestamps = _column("d", self._length)
+        self.values = _column("d", self._length)
+        self.tag_ids = _column("I", self._length)
+        self.meta_ids = _column("I", self._length)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, value: float, tag_id: int = 0, meta_id: int = 0):
+        """追加样本，写满后覆盖最旧的样本"""
+        if self._end == self._length:
+            self._compact()
+
+        index = self._end
+        self.timestamps[index] = timestamp
+        self.values[index] = value
+        self.tag_ids[index] = tag_id
+        self.meta_ids[index] = meta_id
+
+        self._end += 1
+        if self._size < self.capacity:
+            self._size += 1
+
+    def _compact(self):
+        """把最近的 capacity - 1 个样本搬回数组开头，为新样本腾出空间"""
+        keep = min(self._size, self.capacity - 1)
+        source = self._length - keep
+        for column in (self.timestamps, self.values, self.tag_ids, self.meta_ids):
+            column[0:keep] = column[source:self._length]
+        self._end = keep
+        self._size = keep
+
+    def clear(self):
+        self._end = 0
+        self._size = 0
+
+    def _bounds(self, since: float = None, limit: int = None) -> Tuple[int, int]:
+        end = self._end
+        start = end - self._size
+        if limit is not None:
+            start = max(start, end - limit)
+        if since is not None:
+            # 样本按记录时间顺序追加，时间窗口可以二分定位
+            if np is not None:
+                start += int(np.searchsorted(self.timestamps[start:end], since, side="left"))
+            else:
+                start = bisect.bisect_left(memoryview(self.timestamps), since, start, end)
+        return start, end
+
+    def _view(self, column, start: int, end: int):
+        if np is not None:
+            view = column[start:end]
+            view.flags.writeable = False
+            return view
+        return memoryview(column)[start:end].toreadonly()
+
+    def columns(self, since: float = None, limit: int = None) -> Dict[str, Any]:
+        """按时间顺序导出各列的只读视图（不复制）
+
+        视图直接引用环形缓冲区，后续写入可能覆盖其中的样本；需要长期保存时请自行复制。
+        """
+        start, end = self._bounds(since, limit)
+        return {
+            "timestamps": self._view(self.timestamps, start, end),
+            "values": self._view(self.values, start, end),
+            "tag_ids": self._view(self.tag_ids, start, end),
+            "meta_ids": self._view(self.meta_ids, start, end)
+        }
+
+    def values_since(self, since: float = None):
+        """导出时间窗口内的数值列视图"""
+        start, end = self._bounds(since)
+        return self._view(self.values, start, end)
@@ -0,0 +1,321 @@
+# multi_agent_system/utils/metrics_exporter.py
+import asyncio
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from .latency_histogram import LatencyHistogram
+from .performance_monitor import PerformanceMonitor
+from .llm_hedging import HedgingPolicy
+from .llm_client_pool import LLMClientPool
+from .plugin_cache import PluginCache
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# 导出直方图使用的上界（秒），覆盖从毫秒级的总线处理到分钟级的 LLM 调用
+DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0]
+
+_QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{_sanitize(name)}="{_escape(value)}"' for name, value in labels.items() if value is not None)
+    return "{" + pairs + "}" if pairs else ""
+
+
+def _sanitize(name: str) -> str:
+    """将任意字符串转换为合法的指标/标签名"""
+    cleaned = "".join(ch if ch.isascii() and (ch.isalnum() or ch == "_") else "_" for ch in str(name))
+    return cleaned if cleaned and not cleaned[0].isdigit() else f"_{cleaned}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+class _MetricFamily:
+    """一个指标族（同名、同类型的一组样本）"""
+
+    __slots__ = ("name", "kind", "help", "samples")
+
+    def __init__(self, name: str, kind: str, help_text: str):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.samples: List[Tuple[str, Dict[str, Any], float]] = []
+
+    def add(self, value: float, suffix: str = "", **labels):
+        self.samples.append((suffix, labels, value))
+
+    def add_histogram(self, histogram: LatencyHistogram, bounds: List[float], **labels):
+        cumulative = histogram.cumulative_counts(bounds)
+        for bound, count in zip(bounds, cumulative):
+            self.samples.append(("_bucket", {**labels, "le": _format_value(float(bound))}, count))
+        self.samples.append(("_bucket", {**labels, "le": "+Inf"}, histogram.count))
+        self.samples.append(("_count", labels, histogram.count))
+        self.samples.append(("_sum", labels, histogram.total))
+
+    def render(self, out: List[str]):
+        out.append(f"# TYPE {self.name} {self.kind}")
+        out.append(f"# HELP {self.name} {_escape(self.help)}")
+        for suffix, labels, value in self.samples:
+            out.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+
+
+def render_openmetrics(snapshot: Dict[str, Any], namespace: str = "agent_muti",
+                       buckets: List[float] = None) -> bytes:
+    """将快照序列化为 OpenMetrics 文本（纯函数，可在线程池中执行）"""
+    buckets = buckets or DEFAULT_BUCKETS
+    families: List[_MetricFamily] = []
+
+    def family(name: str, kind: str, help_text: str) -> _MetricFamily:
+        metric_family = _MetricFamily(f"{namespace}_{name}", kind, help_text)
+        families.append(metric_family)
+        return metric_family
+
+    performance = snapshot.get("performance")
+    if performance is not None:
+        aggregated = performance["aggregated"]
+        requests = family("requests", "counter", "已跟踪的操作数")
+        requests.add(aggregated["successful_requests"], "_total", status="success")
+        requests.add(aggregated["failed_requests"], "_total", status="failed")
+        family("response_time_seconds", "counter", "成功操作的累计耗时").add(
+            aggregated["total_response_time"], "_total")
+        family("active_agents", "gauge", "正在执行的 Agent 数").add(aggregated["active_agents"])
+        family("max_concurrent_agents", "gauge", "Agent 最大并发数").add(aggregated["max_concurrent_agents"])
+
+        operations = family("operation_duration_seconds", "histogram", "按指标名与标签划分的耗时分布")
+        for name, tags, histogram in performance["histograms"]:
+            operations.add_histogram(histogram, buckets, metric=name, **{_sanitize(k): v for k, v in tags.items()})
+
+        executions = family("agent_executions", "counter", "Agent 执行次数")
+        execution_time = family("agent_execution_time_seconds", "counter", "Agent 成功执行的累计耗时")
+        last_execution = family("agent_last_execution_seconds", "gauge", "Agent 最近一次执行耗时")
+        for agent_name, agent_metric in performance["agents"].items():
+            executions.add(agent_metric["successful_executions"], "_total", agent=agent_name, status="success")
+            executions.add(agent_metric["failed_executions"], "_total", agent=agent_name, status="failed")
+            execution_time.add(agent_metric["total_execution_time"], "_total", agent=agent_name)
+            last_execution.add(agent_metric["last_execution_time"], agent=agent_name)
+
+        agent_latency = family("agent_execution_duration_seconds", "histogram", "Agent 执行耗时分布")
+        agent_quantiles = family("agent_execution_quantile_seconds", "gauge", "Agent 执行耗时分位数")
+        for agent_name, histogram in performance["agent_histograms"].items():
+            agent_latency.add_histogram(histogram, buckets, agent=agent_name)
+            for quantile in _QUANTILES:
+                agent_quantiles.add(histogram.percentile(quantile * 100), agent=agent_name, quantile=quantile)
+
+    bus = snapshot.get("message_bus")
+    if bus is not None:
+        statistics = bus["statistics"]
+        messages = family("bus_messages", "counter", "消息总线处理的消息数")
+        for kind in ("sent", "received", "processed", "forwarded", "from_remote", "persisted", "dropped",
+                     "rejected", "overflowed"):
+            key = f"messages_{kind}"
+            if key in statistics:
+                messages.add(statistics[key], "_total", kind=kind)
+        replies = family("bus_replies", "counter", "请求-响应路由的响应数")
+        replies.add(statistics.get("replies_routed", 0), "_total", result="routed")
+        replies.add(statistics.get("replies_orphaned", 0), "_total", result="orphaned")
+        family("bus_pending_requests", "gauge", "等待响应的请求数").add(bus["pending_requests"])
+
+        queue_depth = family("bus_channel_queue_depth", "gauge", "频道队列中的消息数")
+        for channel, depth in bus["queue_depths"].items():
+            queue_depth.add(depth, channel=channel)
+
+        delivered = family("bus_subscriber_messages", "counter", "订阅者邮箱的消息数")
+        backlog = family("bus_subscriber_backlog", "gauge", "订阅者邮箱积压的批次数")
+        max_lag = family("bus_subscriber_max_lag_seconds", "gauge", "消息从入邮箱到开始处理的最大延迟")
+        for subscriber in statistics.get("subscribers", []):
+            labels = {"subscription": subscriber["subscription"], "handler": subscriber["handler"]}
+            for state in ("delivered", "processed", "failed", "dropped", "rejected"):
+                delivered.add(subscriber[state], "_total", state=state, **labels)
+            backlog.add(subscriber["backlog"], **labels)
+            max_lag.add(subscriber["max_lag"], **labels)
+
+    hedging = snapshot.get("llm_hedging")
+    if hedging is not None:
+        family("llm_requests", "counter", "经过对冲策略的 LLM 请求数").add(hedging["requests"], "_total")
+        hedges = family("llm_hedges", "counter", "对冲请求数")
+        for result in ("fired", "won", "denied"):
+            hedges.add(hedging[f"hedges_{result}"], "_total", result=result)
+        family("llm_timeouts", "counter", "自适应超时触发次数").add(hedging["timeouts"], "_total")
+        family("llm_hedge_rate", "gauge", "对冲请求占全部请求的比例").add(hedging["hedge_rate"])
+
+        latency = family("llm_latency_quantile_seconds", "gauge", "LLM 请求延迟分位数（raw 为单个请求，observed 为对冲后）")
+        improvement = family("llm_p99_improvement_ratio", "gauge", "对冲带来的 p99 延迟降低比例")
+        for key, entry in hedging["latency"].items():
+            for kind in ("raw", "observed"):
+                for quantile in (0.5, 0.95, 0.99):
+                    latency.add(entry[kind][f"p{quantile * 100:g}"], key=key, kind=kind, quantile=quantile)
+            improvement.add(entry["p99_improvement"], key=key)
+
+    pool = snapshot.get("llm_pool")
+    if pool is not None:
+        family("llm_in_flight", "gauge", "共享客户端池中的在途 LLM 请求数").add(pool["in_flight"])
+        in_flight = family("llm_model_in_flight", "gauge", "各模型的在途 LLM 请求数")
+        rate_limited = family("llm_rate_limited", "counter", "各模型收到的 429 响应数")
+        throttled = family("llm_throttled_seconds", "counter", "各模型因令牌桶限流而等待的时间")
+        for model, entry in pool["models"].items():
+            in_flight.add(entry["in_flight"], model=model)
+            rate_limited.add(entry["rate_limited"], "_total", model=model)
+            throttled.add(entry["throttled_seconds"], "_total", model=model)
+
+    plugin_cache = snapshot.get("plugin_cache")
+    if plugin_cache is not None:
+        lookups = family("plugin_cache_lookups", "counter", "插件结果缓存查询数（hit 命中，coalesced 合并到进行中的执行）")
+        for plugin, stats in plugin_cache["plugins"].items():
+            for result in ("hits", "misses", "coalesced"):
+                lookups.add(stats[result], "_total", plugin=plugin, result=result)
+        family("plugin_cache_evictions", "counter", "因容量上限被淘汰的缓存条目数").add(plugin_cache["evictions"], "_total")
+        family("plugin_cache_entries", "gauge", "缓存条目数").add(plugin_cache["entries"])
+        family("plugin_cache_bytes", "gauge", "缓存占用的估算字节数").add(plugin_cache["bytes"])
+
+    capability_index = snapshot.get("capability_index")
+    if capability_index is not None:
+        routes = family("capability_routes", "counter", "能力索引路由次数（direct 直接调度，fallback 交给 PLAN 阶段）")
+        for result in ("direct", "fallback"):
+            routes.add(capability_index[result], "_total", result=result)
+        family("llm_calls_saved", "counter", "能力索引直接路由省去的 LLM 调用数").add(
+            capability_index["llm_calls_saved"], "_total")
+
+    sessions = snapshot.get("sessions")
+    if sessions is not None:
+        family("sessions", "gauge", "当前保留的会话数").add(sessions["sessions"])
+        family("session_requests_active", "gauge", "正在处理的会话请求数").add(sessions["active"])
+        family("session_requests_waiting", "gauge", "等待并发名额的会话请求数").add(sessions["waiting"])
+        removed = family("sessions_removed", "counter", "被移除的会话数（evicted 超出上限，expired 空闲超时）")
+        for reason in ("evicted", "expired"):
+            removed.add(sessions[reason], "_total", reason=reason)
+
+    out: List[str] = []
+    for metric_family in families:
+        if metric_family.samples or metric_family.kind != "histogram":
+            metric_family.render(out)
+    out.append("# EOF")
+    return ("\n".join(out) + "\n").encode("utf-8")
+
+
+class MetricsExporter:
+    """OpenMetrics HTTP 导出器 - 基于 asyncio 的轻量服务，GET /metrics 返回指标文本
+
+    抓取时先在事件循环中快速复制数据（性能监控器只在复制期间持锁），
+    文本序列化放到线程池中完成，避免阻塞事件循环。
+    """
+
+    def __init__(self,
+                 performance_monitor: PerformanceMonitor = None,
+                 message_bus=None,
+                 hedging_policy: HedgingPolicy = None,
+                 llm_client_pool: LLMClientPool = None,
+                 plugin_cache: PluginCache = None,
+                 capability_index=None,
+                 session_manager=None,
+                 host: str = "127.0.0.1",
+                 port: int = 9090,
+                 namespace: str = "agent_muti",
+                 buckets: List[float] = None):
+        self.performance_monitor = performance_monitor
+        self.message_bus = message_bus
+        self.hedging_policy = hedging_policy
+        self.llm_client_pool = llm_client_pool
+        self.plugin_cache = plugin_cache
+        self.capability_index = capability_index
+        self.session_manager = session_manager
+        self.host = host
+        self.port = port
+        self.namespace = namespace
+        self.buckets = buckets or DEFAULT_BUCKETS
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.scrapes = 0
+
+    async def start(self):
+        """启动 HTTP 服务（端口被占用等情况下只打印错误，系统继续运行但不导出指标）"""
+        try:
+            self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        except OSError as e:
+            print(f"⚠️  指标导出服务启动失败（{self.host}:{self.port}）: {e}，本次运行不导出指标")
+            return
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"📈 指标导出服务已启动: http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        """关闭 HTTP 服务"""
+        if self._server is None:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+        print("🛑 指标导出服务已关闭")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """复制当前指标（在事件循环线程中调用）"""
+        snapshot: Dict[str, Any] = {}
+        if self.performance_monitor is not None:
+            snapshot["performance"] = self.performance_monitor.export_snapshot()
+        if self.message_bus is not None:
+            snapshot["message_bus"] = {
+                "statistics": self.message_bus.get_statistics(),
+                "queue_depths": {channel: queue.qsize() for channel, queue in self.message_bus.channels.items()},
+                "pending_requests": self.message_bus.pending_requests()
+            }
+        if self.hedging_policy is not None:
+            snapshot["llm_hedging"] = self.hedging_policy.get_statistics()
+        if self.llm_client_pool is not None:
+            snapshot["llm_pool"] = self.llm_client_pool.get_statistics()
+        if self.plugin_cache is not None:
+            snapshot["plugin_cache"] = self.plugin_cache.get_statistics()
+        if self.capability_index is not None:
+            snapshot["capability_index"] = self.capability_index.get_statistics()
+        if self.session_manager is not None:
+            snapshot["sessions"] = self.session_manager.get_statistics()
+        return snapshot
+
+    async def render(self) -> bytes:
+        """生成 OpenMetrics 文本"""
+        snapshot = self.snapshot()
+        return await asyncio.to_thread(render_openmetrics, snapshot, self.namespace, self.buckets)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=10)
+            # 读完请求头，忽略其内容
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=10)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+
+            parts = request_line.decode("latin-1").split()
+            method, path = (parts[0], parts[1]) if len(parts) >= 2 else ("", "")
+            path = path.split("?", 1)[0]
+
+            if method not in ("GET", "HEAD"):
+                status, content_type, body = "405 Method Not Allowed", "text/plain; charset=utf-8", b"method not allowed\n"
+            elif path in ("/metrics", "/"):
+                status, content_type, body = "200 OK", CONTENT_TYPE, await self.render()
+                self.scrapes += 1
+            else:
+                status, content_type, body = "404 Not Found", "text/plain; charset=utf-8", b"not found\n"
+
+            header = (f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                      f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode("latin-1")
+            writer.write(header if method == "HEAD" else header + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            print(f"❌ 指标导出失败: {e}")
+        finally:
+            writer.close()
@@ -1,12 +1,18 @@
 # multi_agent_system/utils/performance_monitor.py
 import time
 import threading
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple, Iterable
 from contextlib import contextmanager
 from dataclasses import dataclass
-from collections import defaultdict, deque
+from collections import defaultdict
 import statistics
 
+from .latency_histogram import LatencyHistogram, WindowedHistogram
+from .metric_store import MetricSeries, TagInterner, np
+
+# 指标键: (指标名, 标签ID)
+MetricKey = Tuple[str, int]
+
 
 @dataclass
 class PerformanceMetric:
@@ -21,10 +27,19 @@ class PerformanceMetric:
 class PerformanceMonitor:
     """性能监控器"""
 
-    def __init__(self, max_metrics_history: int = 1000):
+    def __init__(self, max_metrics_history: int = 1000, histogram_window: float = 60.0,
+                 histogram_slots: int = 6):
         self.max_metrics_history = max_metrics_history
-        self.metrics_history: Dict[str, deque] = defaultdict(lambda: deque(maxlen=max_metrics_history))
+        # 指标历史按列存储在环形缓冲区中，标签与元数据驻留为整数ID
+        self.metrics_history: Dict[str, MetricSeries] = defaultdict(lambda: MetricSeries(max_metrics_history))
+        self._tag_interner = TagInterner()
         self._lock = threading.Lock()
+
+        # 流式直方图：每个指标名+标签组合一个，每个 Agent 一个（执行耗时）
+        self.histogram_window = histogram_window
+        self.histogram_slots = histogram_slots
+        self._histograms: Dict[MetricKey, WindowedHistogram] = {}
+        self._agent_histograms: Dict[str, WindowedHistogram] = {}
         self._aggregated_metrics = {
             "total_requests": 0,
             "successful_requests": 0,
@@ -65,14 +80,9 @@ class PerformanceMonitor:
             duration = end_time - start_time
 
             # 记录成功指标
-            self._record_metric(
-                PerformanceMetric(
-                    name=f"{operation_name}.duration",
-                    value=duration,
-                    timestamp=end_time,
-                    tags=tags or {},
-                    metadata={"agent": agent_name, "status": "success"}
-                )
+            self._record_sample(
+                f"{operation_name}.duration", duration, end_time, tags,
+                {"agent": agent_name, "status": "success"}
             )
 
             # 更新聚合指标
@@ -89,6 +99,7 @@ class PerformanceMonitor:
                     agent_metric["successful_executions"] += 1
                     agent_metric["total_execution_time"] += duration
                     agent_metric["last_execution_time"] = duration
+                    self._agent_histogram(agent_name).record(duration, end_time)
 
                     # 更新最小/最大执行时间
                     if duration < agent_metric["min_execution_time"]:
@@ -105,15 +116,10 @@ class PerformanceMonitor:
             end_time = time.time()
             duration = end_time - start_time
 
-            # 记录失败指标
-            self._record_metric(
-                PerformanceMetric(
-                    name=f"{operation_name}.duration",
-                    value=duration,
-                    timestamp=end_time,
-                    tags=tags or {},
-                    metadata={"agent": agent_name, "status": "failed", "error": str(e)}
-                )
+            # 记录失败指标（元数据会被驻留，只记录异常类型而不是每次都不同的错误信息）
+            self._record_sample(
+                f"{operation_name}.duration", duration, end_time, tags,
+                {"agent": agent_name, "status": "failed", "error": type(e).__name__}
             )
 
             # 更新聚合指标
@@ -139,20 +145,74 @@ class PerformanceMonitor:
 
     def _record_metric(self, metric: PerformanceMetric):
         """记录性能指标"""
+        self._record_sample(metric.name, metric.value, metric.timestamp, metric.tags, metric.metadata)
+
+    def _record_sample(self, name: str, value: float, timestamp: float,
+                       tags: Dict[str, str] = None, metadata: Dict[str, Any] = None):
+        """写入一个样本（列式存储 + 流式直方图）"""
         with self._lock:
-            self.metrics_history[metric.name].append(metric)
+            tag_id = self._tag_interner.intern(tags)
+            self.metrics_history[name].append(timestamp, value, tag_id, self._tag_interner.intern(metadata))
+
+            key = (name, tag_id)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = self._new_histogram()
+            histogram.record(value, timestamp)
+
+    def _new_histogram(self) -> WindowedHistogram:
+        return WindowedHistogram(self.histogram_window, self.histogram_slots)
+
+    def _agent_histogram(self, agent_name: str) -> WindowedHistogram:
+        """获取 Agent 执行耗时直方图（调用方持有锁）"""
+        histogram = self._agent_histograms.get(agent_name)
+        if histogram is None:
+            histogram = self._agent_histograms[agent_name] = self._new_histogram()
+        return histogram
+
+    def get_metric_percentiles(self, metric_name: str, tags: Dict[str, str] = None, windowed: bool = False,
+                               percentiles: Iterable[float] = (50, 90, 99)) -> Dict[str, float]:
+        """从流式直方图获取指标百分位数
+
+        tags 为 None 时合并该指标的所有标签组合；windowed=True 时只统计滑动窗口内的样本。
+        """
+        merged = LatencyHistogram()
+        with self._lock:
+            wanted_tag_id = self._tag_interner.find(tags) if tags is not None else None
+            for (name, tag_id), histogram in self._histograms.items():
+                if name != metric_name:
+                    continue
+                if tags is not None and tag_id != wanted_tag_id:
+                    continue
+                merged.merge(histogram.window() if windowed else histogram.cumulative)
+        return merged.summary(percentiles)
+
+    def _agent_percentiles(self, agent_name: str) -> Dict[str, float]:
+        """Agent 执行耗时百分位数（调用方持有锁）"""
+        histogram = self._agent_histograms.get(agent_name)
+        if histogram is None:
+            return {
+                "p50_execution_time": 0.0,
+                "p90_execution_time": 0.0,
+                "p99_execution_time": 0.0,
+                "recent_p99_execution_time": 0.0
+            }
+        cumulative = histogram.cumulative
+        return {
+            "p50_execution_time": cumulative.percentile(50),
+            "p90_execution_time": cumulative.percentile(90),
+            "p99_execution_time": cumulative.percentile(99),
+            "recent_p99_execution_time": histogram.window().percentile(99)
+        }
 
     def record_custom_metric(self, name: str, value: float, tags: Dict[str, str] = None,
                              metadata: Dict[str, Any] = None):
         """记录自定义指标"""
-        metric = PerformanceMetric(
-            name=name,
-            value=value,
-            timestamp=time.time(),
-            tags=tags or {},
-            metadata=metadata or {}
-        )
-        self._record_metric(metric)
+        self._record_sample(name, value, time.time(), tags, metadata)
+
+    def record_time_to_first_token(self, seconds: float, operation: str = "system_query"):
+        """记录首个输出片段的到达时间（从开始处理请求算起）"""
+        self._record_sample("time_to_first_token", seconds, time.time(), {"operation": operation})
 
     def get_metrics(self) -> Dict[str, Any]:
         """获取性能指标"""
@@ -171,38 +231,95 @@ class PerformanceMonitor:
             else:
                 metrics["success_rate"] = 0.0
 
-            # 添加Agent指标
-            metrics["agent_metrics"] = dict(self.agent_metrics)
+            # 添加Agent指标（含执行耗时百分位数）
+            metrics["agent_metrics"] = {
+                agent_name: {**agent_metric, **self._agent_percentiles(agent_name)}
+                for agent_name, agent_metric in self.agent_metrics.items()
+            }
 
             return metrics
 
+    def export_snapshot(self) -> Dict[str, Any]:
+        """在锁内复制导出所需的全部数据（计数与直方图副本），序列化在锁外进行"""
+        with self._lock:
+            return {
+                "aggregated": self._aggregated_metrics.copy(),
+                "agents": {name: metric.copy() for name, metric in self.agent_metrics.items()},
+                "agent_histograms": {
+                    name: histogram.cumulative.copy() for name, histogram in self._agent_histograms.items()
+                },
+                "histograms": [
+                    (name, self._tag_interner.lookup(tag_id), histogram.cumulative.copy())
+                    for (name, tag_id), histogram in self._histograms.items()
+                ]
+            }
+
     def get_metric_history(self, metric_name: str, limit: int = None) -> List[PerformanceMetric]:
-        """获取指标历史"""
+        """获取指标历史（按需还原为 PerformanceMetric 对象）"""
         with self._lock:
-            history = list(self.metrics_history.get(metric_name, []))
-            if limit and len(history) > limit:
-                return history[-limit:]
-            return history
+            series = self.metrics_history.get(metric_name)
+            if series is None:
+                return []
+            columns = series.columns(limit=limit or None)
+            return [
+                PerformanceMetric(
+                    name=metric_name,
+                    value=float(value),
+                    timestamp=float(timestamp),
+                    tags=self._tag_interner.lookup(int(tag_id)),
+                    metadata=self._tag_interner.lookup(int(meta_id))
+                )
+                for timestamp, value, tag_id, meta_id in zip(
+                    columns["timestamps"], columns["values"], columns["tag_ids"], columns["meta_ids"]
+                )
+            ]
 
-    def get_metric_statistics(self, metric_name: str, time_window: float = None) -> Dict[str, Any]:
-        """获取指标统计信息"""
-        history = self.get_metric_history(metric_name)
+    def get_metric_columns(self, metric_name: str, time_window: float = None) -> Dict[str, Any]:
+        """导出指标历史的列视图（安装 NumPy 时为 ndarray 视图，否则为 memoryview，均不复制）
 
-        if time_window:
-            cutoff_time = time.time() - time_window
-            history = [m for m in history if m.timestamp >= cutoff_time]
+        tag_ids / meta_ids 可以通过 resolve_tags() 还原为字典。
+        """
+        since = time.time() - time_window if time_window else None
+        with self._lock:
+            series = self.metrics_history.get(metric_name)
+            if series is None:
+                series = MetricSeries(1)
+            return series.columns(since=since)
 
-        if not history:
-            return {
-                "count": 0,
-                "average": 0,
-                "min": 0,
-                "max": 0,
-                "p95": 0,
-                "p99": 0
-            }
+    def resolve_tags(self, tag_id: int) -> Dict[str, Any]:
+        """将标签ID还原为标签字典"""
+        with self._lock:
+            return self._tag_interner.lookup(int(tag_id))
 
-        values = [m.value for m in history]
+    def get_metric_statistics(self, metric_name: str, time_window: float = None) -> Dict[str, Any]:
+        """获取指标统计信息（时间窗口通过二分定位后直接对列切片做向量化计算）"""
+        since = time.time() - time_window if time_window else None
+        with self._lock:
+            series = self.metrics_history.get(metric_name)
+            values = series.values_since(since) if series is not None else ()
+
+            if not len(values):
+                return {
+                    "count": 0,
+                    "average": 0,
+                    "min": 0,
+                    "max": 0,
+                    "p95": 0,
+                    "p99": 0
+                }
+
+            if np is not None:
+                p95, p99 = np.percentile(values, [95, 99])
+                return {
+                    "count": int(values.size),
+                    "average": float(values.mean()),
+                    "min": float(values.min()),
+                    "max": float(values.max()),
+                    "p95": float(p95),
+                    "p99": float(p99)
+                }
+
+            values = values.tolist()
 
         return {
             "count": len(values),
@@ -273,6 +390,9 @@ class PerformanceMonitor:
         """重置性能指标"""
         with self._lock:
             self.metrics_history.clear()
+            self._tag_interner = TagInterner()
+            self._histograms.clear()
+            self._agent_histograms.clear()
             self._aggregated_metrics = {
                 "total_requests": 0,
                 "successful_requests": 0,
@@ -295,7 +415,8 @@ class PerformanceMonitor:
                 "total_requests": metrics["total_requests"],
                 "success_rate": metrics["success_rate"],
                 "average_response_time": metrics["average_response_time"],
-                "max_concurrent_agents": metrics["max_concurrent_agents"]
+                "max_concurrent_agents": metrics["max_concurrent_agents"],
+                "time_to_first_token": self.get_metric_percentiles("time_to_first_token")
             },
             "agent_performance": {}
         }
@@ -308,7 +429,10 @@ class PerformanceMonitor:
                 agent_metric["total_executions"] > 0 else 0,
                 "average_execution_time": agent_metric["average_execution_time"],
                 "min_execution_time": agent_metric["min_execution_time"],
-                "max_execution_time": agent_metric["max_execution_time"]
+                "max_execution_time": agent_metric["max_execution_time"],
+                "p50_execution_time": agent_metric["p50_execution_time"],
+                "p90_execution_time": agent_metric["p90_execution_time"],
+                "p99_execution_time": agent_metric["p99_execution_time"]
             }
 
         return report
\ No newline at end of file
@@ -0,0 +1,163 @@
+# multi_agent_system/utils/plugin_cache.py
+import asyncio
+import copy
+import json
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# 缓存键: (Agent 名称, 插件名称, 规范化的参数)
+CacheKey = Tuple[str, str, str]
+
+
+def _normalize(value: Any) -> Any:
+    """规范化参数：去掉字符串首尾空白，整数值的浮点数转为整数，字典按键排序"""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in sorted(value.items(), key=lambda pair: str(pair[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def normalize_arguments(kwargs: Dict[str, Any]) -> str:
+    """将插件参数规范化为稳定的字符串，作为缓存键的一部分"""
+    return json.dumps(_normalize(kwargs), ensure_ascii=False, sort_keys=True, default=str)
+
+
+def _estimate_bytes(value: Any) -> int:
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 1024
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    expires_at: float
+    size: int
+
+
+class PluginCache:
+    """插件结果缓存 - TTL 过期 + LRU 淘汰（条目数与内存上限）+ 相同请求合并执行
+
+    并发的相同调用（singleflight）只执行一次插件，其余调用等待同一个结果；
+    执行失败的结果不缓存。返回给调用方的是缓存值的副本，调用方修改结果不会影响缓存。
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, _CacheEntry]" = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        self.total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expirations": 0}
+        self._plugin_stats: Dict[Tuple[str, str], Dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "coalesced": 0})
+
+    def configure(self, max_entries: int = None, max_bytes: int = None):
+        """修改容量上限（立即按新上限淘汰）"""
+        if max_entries is not None:
+            self.max_entries = max_entries
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        self._evict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _count(self, agent: str, plugin: str, result: str):
+        self.stats[result] += 1
+        self._plugin_stats[(agent, plugin)][result] += 1
+
+    def _lookup(self, key: CacheKey) -> Optional[_CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key: CacheKey):
+        entry = self._entries.pop(key)
+        self.total_bytes -= entry.size
+
+    def _store(self, key: CacheKey, value: Any, ttl: float):
+        if key in self._entries:
+            self._remove(key)
+        size = _estimate_bytes(value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = _CacheEntry(value, time.monotonic() + ttl, size)
+        self.total_bytes += size
+        self._evict()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.stats["evictions"] += 1
+
+    async def get_or_compute(self, agent: str, plugin: str, kwargs: Dict[str, Any], ttl: float,
+                             compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        """返回 (结果, 命中情况)，命中情况为 hit / coalesced / miss"""
+        key = (agent, plugin, normalize_arguments(kwargs))
+        entry = self._lookup(key)
+        if entry is not None:
+            self._count(agent, plugin, "hits")
+            return copy.deepcopy(entry.value), "hit"
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count(agent, plugin, "coalesced")
+            # shield：某个等待方被取消不会中断共享的执行
+            return copy.deepcopy(await asyncio.shield(task)), "coalesced"
+
+        self._count(agent, plugin, "misses")
+        task = self._inflight[key] = asyncio.ensure_future(compute())
+
+        def on_done(finished: asyncio.Future):
+            self._inflight.pop(key, None)
+            if not finished.cancelled() and finished.exception() is None:
+                self._store(key, finished.result(), ttl)
+
+        task.add_done_callback(on_done)
+        return copy.deepcopy(await asyncio.shield(task)), "miss"
+
+    def invalidate(self, agent: str = None, plugin: str = None):
+        """清除缓存（可按 Agent 和插件过滤）"""
+        for key in [key for key in self._entries
+                    if (agent is None or key[0] == agent) and (plugin is None or key[1] == plugin)]:
+            self._remove(key)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+        return {
+            **self.stats,
+            "hit_rate": (self.stats["hits"] + self.stats["coalesced"]) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "inflight": len(self._inflight),
+            "plugins": {f"{agent}.{plugin}": dict(stats) for (agent, plugin), stats in self._plugin_stats.items()}
+        }
+
+
+# 全局缓存实例
+_cache_instance: Optional[PluginCache] = None
+
+
+def get_plugin_cache() -> PluginCache:
+    """获取插件结果缓存单例"""
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = PluginCache()
+    return _cache_instance
@@ -0,0 +1,290 @@
+# multi_agent_system/utils/query_features.py
+import re
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 默认词典（配置文件 query_understanding.gazetteer 未提供时使用）
+DEFAULT_GAZETTEER = {
+    "cities": ["北京", "上海", "广州", "深圳", "杭州", "成都", "武汉", "西安"],
+    "pois": {
+        "北京": ["故宫", "长城", "天坛", "颐和园", "圆明园", "鸟巢", "天安门广场", "王府井"],
+        "上海": ["外滩", "东方明珠", "迪士尼乐园", "豫园", "田子坊", "上海博物馆", "南京路", "城隍庙"],
+        "杭州": ["西湖", "灵隐寺", "千岛湖", "宋城", "西溪湿地", "雷峰塔"],
+        "成都": ["大熊猫繁育研究基地", "锦里古街", "宽窄巷子", "武侯祠", "都江堰", "青城山"]
+    },
+    "interests": {
+        "历史": ["历史", "文化", "古迹", "博物馆"],
+        "自然": ["自然", "风景", "公园", "山水"],
+        "美食": ["美食", "小吃", "餐厅", "特色菜"],
+        "购物": ["购物", "商场", "商业街", "买"]
+    },
+    "price_tiers": {
+        "economy": ["经济", "便宜", "实惠", "快捷"],
+        "comfort": ["舒适", "商务"],
+        "luxury": ["豪华", "高档", "五星"]
+    }
+}
+
+_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "俩": 2, "三": 3, "四": 4, "五": 5,
+           "六": 6, "七": 7, "八": 8, "九": 9}
+_UNITS = {"十": 10, "百": 100, "千": 1000}
+_NUMBER = r"(?:\d+(?:\.\d+)?|[零〇一二两俩三四五六七八九十百千万]+)"
+# 数字须从头匹配（排除"第三天"、"10月12日"这类序数与日期）
+_NUMBER_START = r"(?<![第月号\d.零〇一二两俩三四五六七八九十百千万])"
+
+_DURATION_PATTERN = re.compile(rf"{_NUMBER_START}({_NUMBER}|半)\s*(?:个)?\s*(天|日|晚|夜|周|星期|礼拜)")
+_TRAVELERS_PATTERN = re.compile(rf"{_NUMBER_START}({_NUMBER})\s*(?:个)?\s*(?:人|位|口)")
+_FAMILY_PATTERN = re.compile(rf"一家({_NUMBER})口")
+_BUDGET_PATTERN = re.compile(rf"预算\D{{0,4}}?({_NUMBER})\s*(万|千|k|K)?\s*(?:元|块|RMB|rmb)?"
+                             rf"|({_NUMBER})\s*(万|千)?\s*(?:元|块)")
+
+
+def parse_number(text: str) -> Optional[float]:
+    """解析阿拉伯数字或中文数字（支持十/百/千/万），无法解析时返回 None"""
+    text = text.strip()
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        pass
+
+    total, section, digit = 0, 0, None
+    for char in text:
+        if char in _DIGITS:
+            digit = _DIGITS[char]
+        elif char in _UNITS:
+            section += (1 if digit is None else digit) * _UNITS[char]
+            digit = None
+        elif char == "万":
+            total += (section + (digit or 0)) * 10000
+            section, digit = 0, None
+        else:
+            return None
+    return float(total + section + (digit or 0))
+
+
+def parse_duration_days(query: str) -> Optional[int]:
+    """解析行程天数：N天/N日/N晚（按 N+1 天）/N周"""
+    for match in _DURATION_PATTERN.finditer(query):
+        value = 0.5 if match.group(1) == "半" else parse_number(match.group(1))
+        if value is None:
+            continue
+        unit = match.group(2)
+        if unit in ("周", "星期", "礼拜"):
+            value *= 7
+        elif unit in ("晚", "夜"):
+            value += 1
+        return max(1, int(round(value)))
+    return None
+
+
+def parse_travelers(query: str) -> Optional[int]:
+    """解析出行人数：N人/N位/一家N口"""
+    for pattern in (_FAMILY_PATTERN, _TRAVELERS_PATTERN):
+        match = pattern.search(query)
+        if match:
+            value = parse_number(match.group(1))
+            if value:
+                return int(value)
+    return None
+
+
+def parse_budget(query: str) -> Optional[float]:
+    """解析预算金额（元）：预算5000、3000元、两万块"""
+    match = _BUDGET_PATTERN.search(query)
+    if not match:
+        return None
+    number, unit = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+    value = parse_number(number)
+    if value is None:
+        return None
+    return value * {"万": 10000, "千": 1000, "k": 1000, "K": 1000}.get(unit or "", 1)
+
+
+class AhoCorasick:
+    """Aho-Corasick 多模式匹配自动机，一次扫描找出文本中的全部词条"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[str, Any]]] = [[]]
+        self._built = True
+
+    def add(self, pattern: str, value: Any = None):
+        """添加词条，value 为匹配时返回的附加数据"""
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append((pattern, value))
+        self._built = False
+
+    def build(self):
+        """按广度优先计算失败指针"""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+        self._built = True
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[int, int, str, Any]]:
+        """产出全部匹配 (起始位置, 结束位置, 词条, 附加数据)，允许重叠"""
+        if not self._built:
+            self.build()
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern, value in self._outputs[state]:
+                yield index - len(pattern) + 1, index + 1, pattern, value
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str, Any]]:
+        """最左最长的不重叠匹配"""
+        return _leftmost_longest(self.iter_matches(text))
+
+
+def _leftmost_longest(matches: Iterable[Tuple[int, int, str, Any]]) -> List[Tuple[int, int, str, Any]]:
+    selected, end = [], 0
+    for match in sorted(matches, key=lambda item: (item[0], item[0] - item[1])):
+        if match[0] >= end:
+            selected.append(match)
+            end = match[1]
+    return selected
+
+
+def _unique(values: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(values))
+
+
+@dataclass
+class QueryFeatures:
+    """查询特征 - 每个请求解析一次，随执行上下文传给各 Agent"""
+    query: str = ""
+    cities: List[str] = field(default_factory=list)
+    pois: List[str] = field(default_factory=list)
+    poi_cities: List[str] = field(default_factory=list)
+    interests: List[str] = field(default_factory=list)
+    price_tier: Optional[str] = None
+    days: Optional[int] = None
+    travelers: Optional[int] = None
+    budget: Optional[float] = None
+
+    @property
+    def from_city(self) -> Optional[str]:
+        """出发城市（提到两个及以上城市时为第一个）"""
+        return self.cities[0] if len(self.cities) >= 2 else None
+
+    @property
+    def to_city(self) -> Optional[str]:
+        """目的城市：明确提到的城市中出发城市之后的一个，没有时取景点所在城市"""
+        if self.cities:
+            return self.cities[1] if len(self.cities) >= 2 else self.cities[0]
+        return self.poi_cities[0] if self.poi_cities else None
+
+    @property
+    def city(self) -> Optional[str]:
+        """查询涉及的城市（即目的城市）"""
+        return self.to_city
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（省略空字段；原始查询已在上下文的 last_query 中）"""
+        return {key: value for key, value in asdict(self).items() if key != "query" and value not in (None, [])}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'QueryFeatures':
+        """从字典创建"""
+        return cls(**{key: data[key] for key in cls.__dataclass_fields__ if key in data})
+
+
+class QueryAnalyzer:
+    """查询理解 - 词典匹配城市/景点/兴趣/档次，正则解析天数、人数与预算"""
+
+    def __init__(self, gazetteer: Dict[str, Any] = None):
+        self.configure(gazetteer)
+
+    def configure(self, gazetteer: Dict[str, Any] = None):
+        """加载词典（未提供的类别使用默认词典）"""
+        gazetteer = {**DEFAULT_GAZETTEER, **(gazetteer or {})}
+        self.cities = list(gazetteer["cities"])
+        self.poi_cities = {poi: city for city, pois in gazetteer["pois"].items() for poi in pois}
+        self.automaton = AhoCorasick()
+        for city in self.cities:
+            self.automaton.add(city, ("city", city))
+        for poi, city in self.poi_cities.items():
+            self.automaton.add(poi, ("poi", city))
+        for category, keywords in gazetteer["interests"].items():
+            for keyword in keywords:
+                self.automaton.add(keyword, ("interest", category))
+        for tier, keywords in gazetteer["price_tiers"].items():
+            for keyword in keywords:
+                self.automaton.add(keyword, ("price_tier", tier))
+        self.automaton.build()
+
+    def analyze(self, query: str) -> QueryFeatures:
+        """解析查询，返回查询特征"""
+        features = QueryFeatures(query=query)
+        matches = sorted(self.automaton.iter_matches(query), key=lambda match: (match[0], match[0] - match[1]))
+        # 地名取最左最长的不重叠匹配（"上海博物馆"是景点而不是城市），兴趣与档次关键词全部保留
+        cities, pois, poi_cities = [], [], []
+        for _, _, term, (kind, value) in _leftmost_longest(
+                match for match in matches if match[3][0] in ("city", "poi")):
+            if kind == "city":
+                cities.append(value)
+            else:
+                pois.append(term)
+                poi_cities.append(value)
+        interests = [value for _, _, _, (kind, value) in matches if kind == "interest"]
+        tiers = [value for _, _, _, (kind, value) in matches if kind == "price_tier"]
+
+        features.cities = _unique(cities)
+        features.pois = _unique(pois)
+        features.poi_cities = _unique(poi_cities)
+        features.interests = _unique(interests)
+        features.price_tier = tiers[0] if tiers else None
+        features.days = parse_duration_days(query)
+        features.travelers = parse_travelers(query)
+        features.budget = parse_budget(query)
+        return features
+
+
+def query_features(query: str, context: Dict[str, Any] = None) -> QueryFeatures:
+    """取执行上下文中已解析的查询特征；直接调用 Agent 时（无上下文）按传入的查询解析"""
+    features = (context or {}).get("query_features")
+    if isinstance(features, QueryFeatures):
+        return features
+    if isinstance(features, dict):
+        return QueryFeatures.from_dict(features)
+    return get_query_analyzer().analyze(query)
+
+
+# 全局解析器实例
+_analyzer_instance: Optional[QueryAnalyzer] = None
+
+
+def get_query_analyzer() -> QueryAnalyzer:
+    """获取查询解析器单例"""
+    global _analyzer_instance
+    if _analyzer_instance is None:
+        _analyzer_instance = QueryAnalyzer()
+    return _analyzer_instance
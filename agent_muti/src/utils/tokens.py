@@ -0,0 +1,50 @@
+# multi_agent_system/utils/tokens.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：ASCII 约 4 个字符一个 token，其余字符（中文等）约一个字符一个 token"""
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+# 当前请求的 token 用量累计（见 track_token_usage），子任务共享同一个字典
+_request_usage: ContextVar[Optional[Dict[str, Any]]] = ContextVar("llm_request_usage", default=None)
+
+
+@contextmanager
+def track_token_usage() -> Iterator[Dict[str, Any]]:
+    """统计范围内（包括其中创建的任务）所有 LLM 调用的用量，按模型分别累计"""
+    usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "models": {}}
+    token = _request_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _request_usage.reset(token)
+
+
+def record_token_usage(model: str, prompt_tokens: int = 0, completion_tokens: int = 0, calls: int = 0):
+    """把一次 LLM 调用的用量计入当前请求（不在 track_token_usage 范围内时忽略）"""
+    usage = _request_usage.get()
+    if usage is None:
+        return
+    usage["calls"] += calls
+    usage["prompt_tokens"] += prompt_tokens
+    usage["completion_tokens"] += completion_tokens
+    per_model = usage["models"].setdefault(model, {"prompt_tokens": 0, "completion_tokens": 0})
+    per_model["prompt_tokens"] += prompt_tokens
+    per_model["completion_tokens"] += completion_tokens
+
+
+def usage_cost(usage: Dict[str, Any], pricing: Dict[str, Dict[str, float]]) -> Optional[float]:
+    """按每千 token 单价计算费用（pricing: 模型 -> {prompt, completion}），没有单价的模型不计费；未配置单价时返回 None"""
+    if not pricing:
+        return None
+    cost = 0.0
+    for model, tokens in usage.get("models", {}).items():
+        price = pricing.get(model) or {}
+        cost += tokens["prompt_tokens"] / 1000 * price.get("prompt", 0.0)
+        cost += tokens["completion_tokens"] / 1000 * price.get("completion", 0.0)
+    return cost
@@ -0,0 +1,117 @@
+# multi_agent_system/utils/topic_trie.py
+from typing import Dict, Generic, List, TypeVar
+
+T = TypeVar("T")
+
+TOPIC_SEPARATOR = "."
+SINGLE_WILDCARD = "*"   # 匹配恰好一段
+MULTI_WILDCARD = "#"    # 匹配零段或多段
+
+
+def is_pattern(topic: str) -> bool:
+    """判断主题是否包含通配符段"""
+    return any(segment in (SINGLE_WILDCARD, MULTI_WILDCARD) for segment in topic.split(TOPIC_SEPARATOR))
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """判断具体主题是否匹配订阅模式"""
+    return _segments_match(pattern.split(TOPIC_SEPARATOR), 0, topic.split(TOPIC_SEPARATOR), 0)
+
+
+def _segments_match(pattern: List[str], i: int, topic: List[str], j: int) -> bool:
+    if i == len(pattern):
+        return j == len(topic)
+    if pattern[i] == MULTI_WILDCARD:
+        return any(_segments_match(pattern, i + 1, topic, k) for k in range(j, len(topic) + 1))
+    if j == len(topic):
+        return False
+    if pattern[i] in (SINGLE_WILDCARD, topic[j]):
+        return _segments_match(pattern, i + 1, topic, j + 1)
+    return False
+
+
+class _TrieNode:
+    __slots__ = ("children", "values")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.values: List = []
+
+
+class TopicTrie(Generic[T]):
+    """主题前缀树 - 按 '.' 分段索引订阅模式
+
+    支持 '*'（恰好一段）和 '#'（零段或多段）通配符，匹配开销取决于主题层级深度，
+    与已注册的模式数量无关。
+    """
+
+    def __init__(self):
+        self._root = _TrieNode()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, pattern: str, value: T):
+        """在模式下登记一个值"""
+        node = self._root
+        for segment in pattern.split(TOPIC_SEPARATOR):
+            node = node.children.setdefault(segment, _TrieNode())
+        node.values.append(value)
+        self._size += 1
+
+    def remove(self, pattern: str, value: T) -> bool:
+        """移除模式下的值，并清理空节点；返回是否找到该值"""
+        path = [self._root]
+        segments = pattern.split(TOPIC_SEPARATOR)
+        for segment in segments:
+            node = path[-1].children.get(segment)
+            if node is None:
+                return False
+            path.append(node)
+
+        node = path[-1]
+        if value not in node.values:
+            return False
+        node.values.remove(value)
+        self._size -= 1
+
+        # 自底向上清理不再使用的节点
+        for depth in range(len(segments), 0, -1):
+            node = path[depth]
+            if node.values or node.children:
+                break
+            del path[depth - 1].children[segments[depth - 1]]
+        return True
+
+    def match(self, topic: str) -> List[T]:
+        """返回所有匹配具体主题的值（去重，保持登记顺序）"""
+        found: List[T] = []
+        self._collect(self._root, topic.split(TOPIC_SEPARATOR), 0, found)
+
+        seen = set()
+        unique = []
+        for value in found:
+            if id(value) not in seen:
+                seen.add(id(value))
+                unique.append(value)
+        return unique
+
+    def _collect(self, node: _TrieNode, segments: List[str], index: int, found: List[T]):
+        multi = node.children.get(MULTI_WILDCARD)
+        if multi is not None:
+            # '#' 可以吞掉剩余的任意段数（包括零段）
+            for next_index in range(index, len(segments) + 1):
+                self._collect(multi, segments, next_index, found)
+
+        if index == len(segments):
+            found.extend(node.values)
+            return
+
+        exact = node.children.get(segments[index])
+        if exact is not None:
+            self._collect(exact, segments, index + 1, found)
+
+        single = node.children.get(SINGLE_WILDCARD)
+        if single is not None:
+            self._collect(single, segments, index + 1, found)
@@ -0,0 +1,206 @@
+# multi_agent_system/utils/tracing.py
+import asyncio
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+
+@dataclass(slots=True)
+class Span:
+    """一段计时区间"""
+    name: str
+    category: str
+    span_id: int
+    parent_id: Optional[int]
+    lane: int
+    start_us: float
+    end_us: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def set_attribute(self, key: str, value: Any):
+        """设置属性（导出到 Chrome trace 的 args 中）"""
+        self.attributes[key] = value
+
+    @property
+    def duration_us(self) -> float:
+        return (self.end_us if self.end_us is not None else self.start_us) - self.start_us
+
+
+class Trace:
+    """一次请求的完整追踪记录"""
+
+    def __init__(self, name: str, attributes: Dict[str, Any] = None):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.attributes = attributes or {}
+        self.spans: List[Span] = []
+        self.started_at = time.time()
+        self._origin_ns = time.perf_counter_ns()
+        self._span_ids = itertools.count(1)
+        # asyncio 任务（或线程）-> (泳道编号, 名称)
+        self._lanes: Dict[int, Tuple[int, str]] = {}
+
+    def _now_us(self) -> float:
+        return (time.perf_counter_ns() - self._origin_ns) / 1000
+
+    def _lane(self) -> int:
+        """每个 asyncio 任务一条泳道，保证同一泳道上的区间严格嵌套"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = id(task) if task is not None else threading.get_ident()
+        lane = self._lanes.get(key)
+        if lane is None:
+            label = task.get_name() if task is not None else threading.current_thread().name
+            lane = self._lanes[key] = (len(self._lanes) + 1, label)
+        return lane[0]
+
+    def open_span(self, name: str, category: str, parent: Optional[Span], attributes: Dict[str, Any]) -> Span:
+        span = Span(
+            name=name,
+            category=category,
+            span_id=next(self._span_ids),
+            parent_id=parent.span_id if parent is not None else None,
+            lane=self._lane(),
+            start_us=self._now_us(),
+            attributes=dict(attributes)
+        )
+        self.spans.append(span)
+        return span
+
+    def close_span(self, span: Span):
+        span.end_us = self._now_us()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """按区间名汇总次数和总耗时（毫秒）"""
+        totals: Dict[str, Dict[str, float]] = {}
+        for span in self.spans:
+            entry = totals.setdefault(span.name, {"count": 0, "total_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] += span.duration_us / 1000
+        return totals
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """转换为 Chrome trace-event 格式（可用 chrome://tracing 或 Perfetto 打开）"""
+        pid = os.getpid()
+        now_us = self._now_us()
+        events: List[Dict[str, Any]] = [{
+            "name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+            "args": {"name": f"{self.name} [{self.trace_id}]"}
+        }]
+        for lane, label in sorted(self._lanes.values()):
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": lane, "args": {"name": label}})
+
+        for span in self.spans:
+            end_us = span.end_us if span.end_us is not None else now_us
+            args = {"span_id": span.span_id, "parent_id": span.parent_id, **span.attributes}
+            if span.end_us is None:
+                args["unfinished"] = True
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round(span.start_us, 3),
+                "dur": round(end_us - span.start_us, 3),
+                "pid": pid,
+                "tid": span.lane,
+                "args": args
+            })
+
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"trace_id": self.trace_id, "started_at": self.started_at, **self.attributes}
+        }
+
+    def export(self, directory: Union[str, Path]) -> str:
+        """导出为 <directory>/<trace_id>.json，返回文件路径"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{self.trace_id}.json"
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_chrome_trace(), file, ensure_ascii=False, default=str)
+        return str(path)
+
+
+# 当前追踪与当前区间随 contextvars 传播：asyncio 任务创建时会复制上下文，
+# 因此 gather / wait_for 中的子任务自动以创建时的区间为父区间
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    """获取当前追踪（未开启追踪时为 None）"""
+    return _current_trace.get()
+
+
+def current_span() -> Optional[Span]:
+    """获取当前区间"""
+    return _current_span.get()
+
+
+def annotate(**attributes):
+    """为当前区间添加属性（未开启追踪时无操作）"""
+    span = _current_span.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+@contextmanager
+def span(name: str, category: str = "function", **attributes) -> Iterator[Optional[Span]]:
+    """记录一个区间；当前没有活动的追踪时不做任何事情"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    current = trace.open_span(name, category, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        trace.close_span(current)
+
+
+@contextmanager
+def start_trace(name: str, **attributes) -> Iterator[Trace]:
+    """开始一次请求级追踪，根区间与追踪同名"""
+    trace = Trace(name, attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        with span(name, "request", **attributes):
+            yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+def traced(name: str = None, category: str = "function") -> Callable:
+    """异步函数装饰器：每次调用记录一个区间"""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(span_name, category):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator